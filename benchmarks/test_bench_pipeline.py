@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+記録の処理量のベンチマーク（pytest benchmarks で実行する）
+
+偽のバックエンドで ScreenOCRLogger を動かし、benchmarks/baseline.json と比べて
+しきい値を超えて悪化した指標があれば失敗する。ベースラインを測ったマシンと速さが
+違っても失敗しないよう、既定ではマシンにほとんど依存しない指標（書き込み方法ごとの
+速さの比、バイト数、メモリ確保）だけを比べる。SCREENOCR_BENCH_TIMINGS=1 の場合は、
+校正ループで補正した時間の指標も比べる（ベースラインを測ったマシンで使う）。
+結果は環境変数 SCREENOCR_BENCH_OUTPUT に指定したパスに保存する（未指定の場合は保存しない）。
+しきい値は SCREENOCR_BENCH_TOLERANCE（デフォルト: 0.3）と
+SCREENOCR_BENCH_TIMING_TOLERANCE（デフォルト: 0.5）で変更できる。
+ベースラインは `screenocr bench --baseline benchmarks/baseline.json --update-baseline`
+で作り直す。
+"""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from screen_times.benchmark import TIMING_TOLERANCE, compare_to_baseline, run_benchmarks
+
+BASELINE = Path(__file__).parent / "baseline.json"
+
+
+def test_no_regression_against_baseline():
+    """ベースラインより悪化した指標がないこと"""
+    if not BASELINE.exists():
+        pytest.skip(f"baseline not found: {BASELINE}")
+    results = run_benchmarks()
+
+    output = os.environ.get("SCREENOCR_BENCH_OUTPUT")
+    if output:
+        Path(output).write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n")
+
+    regressions = compare_to_baseline(
+        results,
+        json.loads(BASELINE.read_text()),
+        tolerance=float(os.environ.get("SCREENOCR_BENCH_TOLERANCE", "0.3")),
+        timing_tolerance=float(
+            os.environ.get("SCREENOCR_BENCH_TIMING_TOLERANCE", str(TIMING_TOLERANCE))
+        ),
+        timings=os.environ.get("SCREENOCR_BENCH_TIMINGS") == "1",
+    )
+    assert not regressions, "\n".join(str(regression) for regression in regressions)
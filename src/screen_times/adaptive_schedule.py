@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Adaptive Schedule - 画面の変化量に応じたキャプチャ間隔の調整
+
+固定間隔のキャプチャは、変化しない画面では撮りすぎになり、作業が活発な時間帯では
+取りこぼしが多くなる。直近のフレームの変化、前回のレコードとのテキスト類似度
+（rapidfuzz）、ウィンドウの切り替えから活動量を求め、最小～最大の範囲で
+キャプチャ間隔を調整する。OCR回数の予算を指定した場合は、長期的なキャプチャ回数が
+予算の間隔で固定キャプチャした場合を超えないように間隔を延ばす。
+"""
+
+import statistics
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from rapidfuzz import fuzz
+
+from .frame_hash import hamming_distance, parse_hash
+
+
+@dataclass
+class ScheduleSample:
+    """キャプチャ間隔の記録"""
+
+    timestamp: datetime
+    interval_seconds: float  # このキャプチャから次のキャプチャまでの間隔
+    activity: float  # 直近の活動量（0.0～1.0）
+
+
+class AdaptiveScheduler:
+    """
+    活動量に応じてキャプチャ間隔を調整するスケジューラ
+
+    1回の観測の活動量（0.0～1.0）:
+    - ウィンドウが切り替わった場合は 1.0
+    - それ以外はテキストの変化量（1 - 類似度）。フレームハッシュがある場合は
+      フレームが変化したか（0 または 1）との平均
+    - スリープ中（status が "sleep"）は 0.0
+
+    直近 history 回の平均を活動量とし、間隔は活動量 1.0 で min_interval、
+    0.0 で max_interval になるよう対数スケールで補間する。
+
+    使用例:
+        >>> scheduler = AdaptiveScheduler(20, 180, budget_interval=60)
+        >>> scheduler.record_capture()
+        >>> scheduler.observe("Chrome", text, frame_hash)
+        >>> delay = scheduler.next_delay()
+    """
+
+    def __init__(
+        self,
+        min_interval: float,
+        max_interval: float,
+        budget_interval: Optional[float] = None,
+        history: int = 5,
+        frame_hash_distance: int = 4,
+        budget_burst: int = 60,
+        max_samples: int = 1440,
+    ):
+        """
+        初期化
+
+        Args:
+            min_interval: 最小のキャプチャ間隔（秒）
+            max_interval: 最大のキャプチャ間隔（秒）
+            budget_interval: OCR回数の予算（この間隔で固定キャプチャした場合の回数まで、
+                             Noneの場合は予算を設けない）
+            history: 活動量の平均を取る直近の観測数
+            frame_hash_distance: フレームが変化したとみなすハミング距離の下限（これを超えたら変化）
+            budget_burst: 変化の少ない時間帯に貯めておける予算の回数
+                          （活発な時間帯にはこの回数まで予算の間隔より短くキャプチャできる）
+            max_samples: 保持するキャプチャ間隔の記録の最大数
+        """
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("0 < min_interval <= max_interval is required")
+        if budget_interval is not None and budget_interval <= 0:
+            raise ValueError("budget_interval must be positive")
+        if history <= 0:
+            raise ValueError("history must be positive")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget_interval = budget_interval
+        self.frame_hash_distance = frame_hash_distance
+        self.budget_burst = budget_burst
+        self._lock = threading.Lock()
+        self._recent: Deque[float] = deque(maxlen=history)
+        self._previous: Optional[Tuple[str, str, Optional[str]]] = None
+        # 予算は1回分だけ持って始める（起動直後に貯めていない分まで使わないように）
+        self._tokens = 1.0
+        self._last_capture: Optional[datetime] = None
+        self.samples: Deque[ScheduleSample] = deque(maxlen=max_samples)
+
+    @property
+    def activity(self) -> float:
+        """直近の活動量（観測がない場合は0.5）"""
+        with self._lock:
+            return self._activity()
+
+    def observe(
+        self,
+        window: str,
+        text: str,
+        frame_hash: Optional[str] = None,
+        status: str = "normal",
+    ) -> float:
+        """
+        1回分の記録を観測する
+
+        Args:
+            window: ウィンドウ名
+            text: OCRテキスト
+            frame_hash: フレームハッシュ（16進文字列、ない場合はNone）
+            status: レコードの状態
+
+        Returns:
+            この観測の活動量（0.0～1.0）
+        """
+        with self._lock:
+            previous = self._previous
+            self._previous = (window, text, frame_hash)
+            if status == "sleep":
+                activity = 0.0
+            elif previous is None:
+                activity = 0.5
+            elif previous[0] != window:
+                activity = 1.0
+            else:
+                activity = self._change(previous[1], text, previous[2], frame_hash)
+            self._recent.append(activity)
+            return activity
+
+    def record_capture(self, now: Optional[datetime] = None) -> None:
+        """
+        キャプチャしたことを記録する（予算を1回分消費する）
+
+        Args:
+            now: キャプチャの時刻（Noneの場合は現在時刻）
+        """
+        now = now or datetime.now()
+        with self._lock:
+            if self.budget_interval is not None and self._last_capture is not None:
+                elapsed = (now - self._last_capture).total_seconds()
+                self._tokens = min(
+                    float(self.budget_burst), self._tokens + elapsed / self.budget_interval
+                )
+            self._last_capture = now
+            self._tokens -= 1
+
+    def next_delay(self) -> float:
+        """
+        前回のキャプチャから次のキャプチャまでの間隔
+
+        Returns:
+            間隔（秒）
+        """
+        with self._lock:
+            activity = self._activity()
+            ratio = self.max_interval / self.min_interval
+            interval = float(self.min_interval * ratio ** (1.0 - activity))
+            if self.budget_interval is not None and self._tokens < 1:
+                # 予算を使い切った場合は、1回分の予算が貯まるまで待つ
+                interval = max(interval, (1 - self._tokens) * self.budget_interval)
+            self.samples.append(
+                ScheduleSample(
+                    timestamp=self._last_capture or datetime.now(),
+                    interval_seconds=interval,
+                    activity=activity,
+                )
+            )
+            return interval
+
+    def timeline(self, bucket_seconds: float = 600) -> List[Tuple[datetime, float]]:
+        """
+        一定時間ごとのキャプチャ間隔の平均
+
+        Args:
+            bucket_seconds: 集計する時間の幅（秒）
+
+        Returns:
+            (時間帯の開始時刻, その時間帯の平均間隔) のリスト
+        """
+        buckets: Dict[datetime, List[float]] = {}
+        with self._lock:
+            for sample in self.samples:
+                epoch = sample.timestamp.timestamp()
+                start = datetime.fromtimestamp(epoch - epoch % bucket_seconds)
+                buckets.setdefault(start, []).append(sample.interval_seconds)
+        return [(start, statistics.mean(values)) for start, values in sorted(buckets.items())]
+
+    def summary(self) -> str:
+        """キャプチャ間隔の記録を要約した文字列"""
+        with self._lock:
+            intervals = [sample.interval_seconds for sample in self.samples]
+        if not intervals:
+            return "Adaptive interval: no captures"
+        mean = statistics.mean(intervals)
+        line = (
+            f"Adaptive interval: mean {mean:.1f}s (min {min(intervals):.1f}s, "
+            f"max {max(intervals):.1f}s) over {len(intervals)} capture(s), "
+            f"{3600 / mean:.1f} captures/h"
+        )
+        if self.budget_interval is not None:
+            line += f" (budget {3600 / self.budget_interval:.1f}/h)"
+        return line
+
+    def _activity(self) -> float:
+        """直近の活動量（ロックを取得して呼ぶ）"""
+        if not self._recent:
+            return 0.5
+        return sum(self._recent) / len(self._recent)
+
+    def _change(
+        self,
+        previous_text: str,
+        text: str,
+        previous_hash: Optional[str],
+        frame_hash: Optional[str],
+    ) -> float:
+        """同じウィンドウの前回の記録からの変化量（0.0～1.0）"""
+        if not previous_text and not text:
+            text_change = 0.0
+        else:
+            text_change = 1.0 - fuzz.ratio(previous_text, text) / 100.0
+        if previous_hash is None or frame_hash is None:
+            return text_change
+        distance = hamming_distance(parse_hash(previous_hash), parse_hash(frame_hash))
+        frame_change = 1.0 if distance > self.frame_hash_distance else 0.0
+        return (text_change + frame_change) / 2
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Analytics - 実効日付ごとの列形式キャッシュと画面時間の集計
+
+JSONLのレコードから集計に必要な列（開始・終了時刻、ウィンドウID、テキスト長、状態）
+だけを取り出し、実効日付ごとに array のバイト列として保存する。ウィンドウ名と状態は
+日ごとの辞書で整数に置き換える。キャッシュは元のセグメントの名前・サイズ・更新時刻が
+変わった日だけ作り直すため、長い期間の集計でもJSONLを読み直すのは記録中の日だけになる。
+
+時刻はローカル時刻をそのままUTCとみなしたエポック秒で持つ（時間帯別の集計で
+タイムゾーンや夏時間を考慮せずに `秒 // 3600 % 24` で時を求めるため）。
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+from array import array
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from itertools import compress, repeat
+from operator import add, not_
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .jsonl_manager import COMPRESSED_SUFFIX, iter_segment_records
+
+# キャッシュの形式のバージョン（形式を変えたら既存のキャッシュは作り直される）
+ANALYTICS_SCHEMA = 1
+
+# キャッシュの保存先（ログディレクトリごとにサブディレクトリを作る）
+DEFAULT_CACHE_DIR = Path.home() / "Library" / "Caches" / "screen-times" / "analytics"
+
+CACHE_SUFFIX = ".cols"
+
+# レコードの終了時刻から次のレコードまでをこの秒数までは同じ作業の続きとみなす
+# （既定の記録間隔60秒に処理時間のばらつきを見込んだ値）
+DEFAULT_MAX_GAP_SECONDS = 90.0
+
+# アプリ別・時間帯別の時間に含めない状態
+IDLE_STATUSES = frozenset({"sleep"})
+
+# 列の名前と array の型コード（キャッシュファイルにはこの順で並ぶ）
+COLUMNS = (
+    ("starts", "d"),
+    ("ends", "d"),
+    ("window_ids", "I"),
+    ("text_lengths", "I"),
+    ("status_ids", "B"),
+)
+
+_EPOCH = datetime(1970, 1, 1)
+
+# 実効日付ごとのセグメントのファイル名（YYYY-MM-DD*.jsonl / YYYY-MM-DD*.jsonl.gz）
+_SEGMENT_NAME = re.compile(
+    r"^(\d{4}-\d{2}-\d{2}).*\.jsonl(?:" + re.escape(COMPRESSED_SUFFIX) + ")?$"
+)
+
+# セグメントの署名（ファイル名 → [サイズ, 更新時刻(ns)]。iCloudに退避中のファイルは None）
+SourceSignature = Dict[str, Optional[List[int]]]
+
+
+def to_epoch(dt: datetime) -> float:
+    """ローカル時刻をUTCとみなしたエポック秒を返す"""
+    return (dt.replace(tzinfo=None) - _EPOCH).total_seconds()
+
+
+@dataclass
+class DayColumns:
+    """1日分（実効日付）のレコードの列"""
+
+    day: str
+    starts: array = field(default_factory=lambda: array("d"))
+    ends: array = field(default_factory=lambda: array("d"))
+    window_ids: array = field(default_factory=lambda: array("I"))
+    text_lengths: array = field(default_factory=lambda: array("I"))
+    status_ids: array = field(default_factory=lambda: array("B"))
+    windows: List[str] = field(default_factory=list)
+    statuses: List[str] = field(default_factory=list)
+    sources: SourceSignature = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def to_bytes(self) -> bytes:
+        """キャッシュファイルの内容（JSONのヘッダー1行と各列のバイト列）を返す"""
+        header = {
+            "schema": ANALYTICS_SCHEMA,
+            "day": self.day,
+            "byteorder": sys.byteorder,
+            "itemsizes": [getattr(self, name).itemsize for name, _ in COLUMNS],
+            "count": len(self),
+            "windows": self.windows,
+            "statuses": self.statuses,
+            "sources": self.sources,
+        }
+        parts = [json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n"]
+        parts.extend(getattr(self, name).tobytes() for name, _ in COLUMNS)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DayColumns":
+        """
+        to_bytes() の内容から復元する
+
+        Raises:
+            ValueError: 形式が異なる・壊れている場合
+        """
+        newline = data.find(b"\n")
+        if newline < 0:
+            raise ValueError("missing header")
+        header = json.loads(data[:newline].decode("utf-8"))
+        if header.get("schema") != ANALYTICS_SCHEMA or header.get("byteorder") != sys.byteorder:
+            raise ValueError("incompatible cache")
+        count = int(header["count"])
+        columns = cls(
+            day=header["day"],
+            windows=list(header["windows"]),
+            statuses=list(header["statuses"]),
+            sources=dict(header["sources"]),
+        )
+        offset = newline + 1
+        for (name, _), itemsize in zip(COLUMNS, header["itemsizes"]):
+            column = getattr(columns, name)
+            if column.itemsize != itemsize:
+                raise ValueError("incompatible cache")
+            end = offset + count * itemsize
+            column.frombytes(data[offset:end])
+            offset = end
+        if offset != len(data) or len(columns.status_ids) != count:
+            raise ValueError("truncated cache")
+        return columns
+
+
+def scan_sources(logs_dir: Path) -> Dict[str, SourceSignature]:
+    """
+    ログディレクトリを1回だけ走査し、実効日付ごとのセグメントの署名を返す
+
+    対象は実効日付で始まる .jsonl と圧縮済みの .jsonl.gz。iCloudに退避されて
+    .icloud プレースホルダーだけがあるファイルは None とする。
+    """
+    days: Dict[str, SourceSignature] = {}
+    try:
+        entries = list(os.scandir(logs_dir))
+    except OSError:
+        return days
+    for entry in entries:
+        name = entry.name
+        placeholder = name.startswith(".") and name.endswith(".icloud")
+        if placeholder:
+            name = name[1:-7]  # 先頭の "." と末尾の ".icloud" を除去
+        match = _SEGMENT_NAME.match(name)
+        if match is None:
+            continue
+        sources = days.setdefault(match.group(1), {})
+        if placeholder:
+            sources.setdefault(name, None)
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        sources[name] = [stat.st_size, stat.st_mtime_ns]
+    return {day: dict(sorted(sources.items())) for day, sources in days.items()}
+
+
+def day_sources(logs_dir: Path, day: str) -> SourceSignature:
+    """実効日付のセグメントの署名を返す（scan_sources() を参照）"""
+    return scan_sources(logs_dir).get(day, {})
+
+
+def sources_match(cached: SourceSignature, current: SourceSignature) -> bool:
+    """
+    キャッシュを作ったときのセグメントが変わっていないか判定する
+
+    キャッシュを作った後にiCloudに退避されただけのファイルは変わっていないとみなす。
+    """
+    if cached.keys() != current.keys():
+        return False
+    return all(
+        signature is None or signature == cached[name] for name, signature in current.items()
+    )
+
+
+def build_day_columns(
+    logs_dir: Path,
+    day: str,
+    download: Optional[Callable[[Path], bool]] = None,
+    sources: Optional[SourceSignature] = None,
+) -> DayColumns:
+    """
+    実効日付のセグメントを読んで列を作る
+
+    Args:
+        logs_dir: ログディレクトリ
+        day: 実効日付（YYYY-MM-DD）
+        download: iCloudに退避されたファイルをダウンロードする関数（成功したらTrue）。
+            Noneの場合や失敗した場合、そのファイルは読まない
+        sources: 走査済みのセグメントの署名（Noneの場合はログディレクトリを走査する）
+
+    Returns:
+        開始時刻の順に並べた列
+    """
+    if sources is None:
+        sources = day_sources(logs_dir, day)
+    sources = dict(sources)
+    rows = []
+    for name, signature in list(sources.items()):
+        path = logs_dir / name
+        if signature is None:
+            if download is None or not download(path):
+                continue
+            # ダウンロードしたファイルは実ファイルの署名で記録する
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            sources[name] = [stat.st_size, stat.st_mtime_ns]
+        try:
+            for record in iter_segment_records(path):
+                if record.get("type") == "task_metadata":
+                    continue
+                try:
+                    timestamp = record["timestamp"]
+                    start = to_epoch(datetime.fromisoformat(timestamp))
+                    end = to_epoch(datetime.fromisoformat(record.get("timestamp_end", timestamp)))
+                except (ValueError, TypeError, KeyError):
+                    continue
+                text_length = record.get("text_length")
+                if text_length is None:
+                    text_length = len(record.get("text", ""))
+                rows.append(
+                    (
+                        start,
+                        max(start, end),
+                        str(record.get("window", "")),
+                        int(text_length),
+                        str(record.get("status", "normal")),
+                    )
+                )
+        except OSError:
+            continue
+    rows.sort(key=lambda row: row[0])
+
+    windows: Dict[str, int] = {}
+    statuses: Dict[str, int] = {}
+    columns = DayColumns(day=day)
+    if rows:
+        starts, ends, window_names, text_lengths, status_names = zip(*rows)
+        columns.starts.extend(starts)
+        columns.ends.extend(ends)
+        columns.window_ids.extend(windows.setdefault(name, len(windows)) for name in window_names)
+        columns.text_lengths.extend(text_lengths)
+        columns.status_ids.extend(statuses.setdefault(name, len(statuses)) for name in status_names)
+    columns.windows = list(windows)
+    columns.statuses = list(statuses)
+    columns.sources = sources
+    return columns
+
+
+class AnalyticsCache:
+    """
+    実効日付ごとの列形式キャッシュ
+
+    キャッシュは cache_dir/<実効日付>.cols に保存する。読み出し時に元のセグメントの
+    署名を比べ、変わっていた日だけJSONLから作り直す。
+
+    使用例:
+        >>> cache = AnalyticsCache(logs_dir)
+        >>> days = cache.load_days(iter_days(first, last))
+        >>> stats = compute_stats(days)
+    """
+
+    def __init__(
+        self,
+        logs_dir: Path,
+        cache_dir: Optional[Path] = None,
+        download: Optional[Callable[[Path], bool]] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            logs_dir: ログディレクトリ
+            cache_dir: キャッシュディレクトリ（Noneの場合は DEFAULT_CACHE_DIR の下に
+                ログディレクトリごとのディレクトリを作る）
+            download: iCloudに退避されたファイルをダウンロードする関数
+        """
+        self.logs_dir = logs_dir
+        if cache_dir is None:
+            digest = hashlib.sha1(str(logs_dir).encode("utf-8")).hexdigest()[:12]
+            cache_dir = DEFAULT_CACHE_DIR / digest
+        self.cache_dir = cache_dir
+        self.download = download
+        self.rebuilt_days = 0  # JSONLから作り直した日数
+
+    def cache_path(self, day: str) -> Path:
+        """実効日付のキャッシュファイルのパス"""
+        return self.cache_dir / f"{day}{CACHE_SUFFIX}"
+
+    def load_day(self, day: str, sources: Optional[SourceSignature] = None) -> DayColumns:
+        """
+        実効日付の列を取得する（セグメントが変わっていれば作り直して保存する）
+
+        Args:
+            day: 実効日付（YYYY-MM-DD）
+            sources: 走査済みのセグメントの署名（Noneの場合はログディレクトリを走査する）
+
+        Returns:
+            1日分の列
+        """
+        if sources is None:
+            sources = day_sources(self.logs_dir, day)
+        cached = self._read(day)
+        if cached is not None and sources_match(cached.sources, sources):
+            return cached
+
+        columns = build_day_columns(self.logs_dir, day, self.download, sources)
+        self.rebuilt_days += 1
+        self._write(columns)
+        return columns
+
+    def load_days(self, days: Iterable[str]) -> List[DayColumns]:
+        """
+        複数の実効日付の列を取得する（ログディレクトリの走査は1回だけ行う）
+
+        Args:
+            days: 実効日付（YYYY-MM-DD）
+
+        Returns:
+            実効日付ごとの列
+        """
+        sources = scan_sources(self.logs_dir)
+        return [self.load_day(day, sources.get(day, {})) for day in days]
+
+    def _read(self, day: str) -> Optional[DayColumns]:
+        try:
+            return DayColumns.from_bytes(self.cache_path(day).read_bytes())
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write(self, columns: DayColumns) -> None:
+        path = self.cache_path(columns.day)
+        temp = path.with_name(path.name + ".tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            temp.write_bytes(columns.to_bytes())
+            os.replace(temp, path)
+        except OSError as write_error:
+            # キャッシュは次回作り直せるため、保存できなくても集計は続ける
+            print(f"Warning: Failed to save analytics cache: {write_error}", file=sys.stderr)
+
+
+def iter_days(first: date, last: date) -> Iterable[str]:
+    """first から last まで（両端を含む）の実効日付を YYYY-MM-DD で返す"""
+    current = first
+    while current <= last:
+        yield current.strftime("%Y-%m-%d")
+        current += timedelta(days=1)
+
+
+@dataclass
+class ScreenTimeStats:
+    """画面時間の集計結果"""
+
+    days: int = 0
+    records: int = 0
+    app_seconds: Dict[str, float] = field(default_factory=dict)
+    app_records: Dict[str, int] = field(default_factory=dict)
+    hour_seconds: List[float] = field(default_factory=lambda: [0.0] * 24)
+    idle_seconds: float = 0.0
+
+    @property
+    def total_seconds(self) -> float:
+        """アイドル時間を除いた合計"""
+        return sum(self.app_seconds.values())
+
+    def top_apps(self, limit: Optional[int] = None) -> List[tuple]:
+        """時間の長い順に (ウィンドウ名, 秒, レコード数) を返す"""
+        apps = sorted(self.app_seconds.items(), key=lambda item: (-item[1], item[0]))
+        return [(name, seconds, self.app_records[name]) for name, seconds in apps[:limit]]
+
+
+def interval_ends(columns: DayColumns, max_gap: float = DEFAULT_MAX_GAP_SECONDS) -> array:
+    """
+    各レコードが表す期間の終わりを返す
+
+    次のレコードの開始時刻までをそのレコードの期間とし、終了時刻から max_gap 秒より
+    離れている場合は終了時刻 + max_gap で打ち切る。
+    """
+    next_starts = columns.starts[1:]
+    next_starts.append(float("inf"))
+    return array("d", map(min, next_starts, map(add, columns.ends, repeat(max_gap))))
+
+
+def compute_stats(
+    days: Iterable[DayColumns], max_gap: float = DEFAULT_MAX_GAP_SECONDS
+) -> ScreenTimeStats:
+    """
+    アプリ（ウィンドウ）別・時間帯別の画面時間を集計する
+
+    Args:
+        days: 実効日付ごとの列
+        max_gap: レコードの終了時刻から次のレコードまでを同じ作業とみなす最大の秒数
+
+    Returns:
+        集計結果
+    """
+    stats = ScreenTimeStats()
+    for columns in days:
+        stats.days += 1
+        if not len(columns):
+            continue
+        stats.records += len(columns)
+
+        ends = interval_ends(columns, max_gap)
+        idle_ids = {i for i, status in enumerate(columns.statuses) if status in IDLE_STATUSES}
+        if idle_ids:
+            active = [status_id not in idle_ids for status_id in columns.status_ids]
+            idle = list(map(not_, active))
+            stats.idle_seconds += sum(compress(ends, idle)) - sum(compress(columns.starts, idle))
+            rows: Iterable[Tuple[int, float, float]] = compress(
+                zip(columns.window_ids, columns.starts, ends), active
+            )
+        else:
+            rows = zip(columns.window_ids, columns.starts, ends)
+
+        # ウィンドウID別の合計（日ごとの辞書で集計してから名前で足し合わせる）と
+        # 時間帯別の合計（時をまたぐ期間はそれぞれの時に分ける）
+        window_seconds = [0.0] * len(columns.windows)
+        window_records = [0] * len(columns.windows)
+        hours = stats.hour_seconds
+        for window_id, start, end in rows:
+            window_seconds[window_id] += end - start
+            window_records[window_id] += 1
+            hour = int(start // 3600)
+            boundary = (hour + 1) * 3600.0
+            while end > boundary:
+                hours[hour % 24] += boundary - start
+                start, hour, boundary = boundary, hour + 1, boundary + 3600.0
+            hours[hour % 24] += end - start
+        for name, seconds, count in zip(columns.windows, window_seconds, window_records):
+            if count:
+                stats.app_seconds[name] = stats.app_seconds.get(name, 0.0) + seconds
+                stats.app_records[name] = stats.app_records.get(name, 0) + count
+    return stats
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Benchmark - 偽のバックエンドで ScreenOCRLogger を動かすベンチマーク
+
+ウィンドウ取得・キャプチャ・OCRを決定的な偽の実装に差し替え、macOS以外の環境でも
+tickの処理量（ticks/sec）、処理段階ごとのレイテンシ、メモリ確保、JSONLの書き込み量を
+マージの有無それぞれで測定する。結果はJSONで保存し、保存済みのベースラインと比べて
+しきい値を超えて悪化した指標を報告する。
+
+時間の指標は繰り返した測定の中央値を採り、同じ処理を繰り返す校正ループの時間で
+マシンの速さの違いを補正してから比べる。補正してもマシンや負荷によるばらつきは残るため、
+時間から求めた指標を比べるかどうかは選べるようにし、バイト数・メモリ確保の指標だけでも比べられる。
+"""
+
+import json
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .jsonl_manager import FlushPolicy, JsonlManager, JsonlRecord, iter_segment_records
+from .metrics import STAGES, percentile
+from .record_codec import RECORD_ENCODING_COMPACT, RECORD_ENCODING_DELTA, RECORD_ENCODING_FULL
+from .ocr_backend import FakeOcrBackend
+from .screen_ocr_logger import ScreenOCRConfig, ScreenOCRLogger
+from .screenshot import FakeCaptureBackend
+from .screenshot_writer import PERSIST_NEVER
+from .window_provider import FakeWindowProvider
+
+# 結果のJSONの形式のバージョン（形式を変えたらベースラインを作り直す）
+BENCHMARK_SCHEMA = 3
+
+# 時間から求めた指標（名前の末尾）と、悪化とみなす変化の割合の既定値
+# （校正で補正してもばらつきが大きいため、バイト数などの指標より広くする）
+TIMING_SUFFIXES = ("_per_second", "_ms", "speedup")
+TIMING_TOLERANCE = 0.5
+
+# 校正ループの1回あたりの繰り返し数
+CALIBRATION_LOOPS = 2000
+
+# 小さいほど良い指標で、この量以下の増加は測定のばらつきとして無視する（指標名の末尾 → 量）
+# （p95 は外れ値の影響を受けやすいため p50 より大きくする）
+MIN_DELTAS = {
+    "p95_ms": 2.0,
+    "_ms": 0.5,
+    "alloc_blocks_per_tick": 10.0,
+    "_kb": 64.0,
+    "bytes_per_tick": 1.0,
+    "bytes_per_record": 1.0,
+}
+
+# ベンチマークで切り替えるウィンドウ（同じウィンドウが続く間はマージの対象になる）
+BENCHMARK_WINDOWS = ["Editor"] * 4 + ["Browser"] * 3 + ["Terminal"] * 2
+
+# JsonlWriter のシナリオで使う書き出しの条件
+WRITER_FLUSH_POLICY = FlushPolicy(every_records=100)
+
+
+@dataclass
+class BenchmarkConfig:
+    """ベンチマークの設定"""
+
+    ticks: int = 200  # 処理量を測定するtick数
+    warmup_ticks: int = 5  # 測定前に捨てるtick数
+    allocation_ticks: int = 50  # メモリ確保を測定するtick数（tracemallocを有効にして別に測る）
+    records: int = 2000  # JSONLの書き込みを測定するレコード数
+    repeat: int = 5  # JSONLの書き込みを測定する回数（中央値を採る）
+    batch_records: int = 100  # append_records の1回あたりのレコード数
+    frame_size: Tuple[int, int] = (800, 600)
+    frames: int = 6  # 異なる画像の数
+    change_every: int = 2  # 同じ画像を返すtick数
+    merge_threshold: float = 0.9
+
+
+@dataclass
+class Regression:
+    """ベースラインより悪化した指標"""
+
+    metric: str
+    baseline: float
+    current: float
+
+    def __str__(self) -> str:
+        """悪化の内容を表す文字列"""
+        change = (self.current - self.baseline) / self.baseline if self.baseline else 0.0
+        return f"{self.metric}: {self.baseline:.3f} -> {self.current:.3f} ({change:+.0%})"
+
+
+@dataclass
+class _TickSamples:
+    """1シナリオ分のtickの測定値"""
+
+    wall: List[float] = field(default_factory=list)
+    stages: Dict[str, List[float]] = field(default_factory=dict)
+
+
+def make_logger(
+    work_dir: Path, config: BenchmarkConfig, merge_threshold: Optional[float]
+) -> ScreenOCRLogger:
+    """
+    偽のバックエンドを使う ScreenOCRLogger を作る
+
+    Args:
+        work_dir: スクリーンショット・JSONL・メトリクスを保存するディレクトリ
+        config: ベンチマークの設定
+        merge_threshold: マージのしきい値（Noneの場合はマージしない）
+
+    Returns:
+        ScreenOCRLogger
+    """
+    return ScreenOCRLogger(
+        ScreenOCRConfig(
+            screenshot_dir=work_dir / "screenshots",
+            jsonl_base_dir=work_dir,
+            merge_threshold=merge_threshold,
+            window_provider=FakeWindowProvider([(name, None) for name in BENCHMARK_WINDOWS]),
+            capture_backend=FakeCaptureBackend(
+                config.frame_size, frames=config.frames, change_every=config.change_every
+            ),
+            screenshot_persistence=PERSIST_NEVER,
+            ocr_backend=FakeOcrBackend(),
+        )
+    )
+
+
+def bench_ticks(config: BenchmarkConfig, merge_threshold: Optional[float]) -> Dict[str, Any]:
+    """
+    ScreenOCRLogger.run() を繰り返し、tickの処理量とレイテンシ、メモリ確保を測定する
+
+    Args:
+        config: ベンチマークの設定
+        merge_threshold: マージのしきい値（Noneの場合はマージしない）
+
+    Returns:
+        指標名 → 値の辞書（stages は処理段階ごとの p50 / p95）
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        logger = make_logger(Path(work_dir), config, merge_threshold)
+        for _ in range(config.warmup_ticks):
+            _checked_run(logger)
+
+        samples = _TickSamples()
+        jsonl_bytes = _jsonl_bytes(logger)
+        for _ in range(config.ticks):
+            tick_started = time.perf_counter()
+            result = _checked_run(logger)
+            samples.wall.append(time.perf_counter() - tick_started)
+            for name, seconds in result.timings.items():
+                samples.stages.setdefault(name, []).append(seconds)
+        jsonl_bytes = _jsonl_bytes(logger) - jsonl_bytes
+
+        blocks, peak = _measure_allocations(lambda: _checked_run(logger), config.allocation_ticks)
+        logger.shutdown()
+
+    return {
+        # 外れ値のtickに左右されないよう、tickの時間の中央値から求める
+        "ticks_per_second": 1 / statistics.median(samples.wall),
+        "tick_p50_ms": percentile(samples.wall, 50) * 1000,
+        "tick_p95_ms": percentile(samples.wall, 95) * 1000,
+        "stages": {
+            name: {
+                "p50_ms": percentile(samples.stages[name], 50) * 1000,
+                "p95_ms": percentile(samples.stages[name], 95) * 1000,
+            }
+            for name in STAGES
+            if name in samples.stages
+        },
+        "alloc_blocks_per_tick": blocks,
+        "peak_alloc_kb": peak / 1024,
+        "jsonl_bytes_per_tick": jsonl_bytes / config.ticks,
+    }
+
+
+def bench_jsonl(
+    config: BenchmarkConfig,
+    merge_threshold: Optional[float],
+    flush_policy: Optional[FlushPolicy] = None,
+) -> Dict[str, Any]:
+    """
+    JsonlManager.append_record を連続で呼び、JSONLの書き込み量を測定する
+
+    書き込み先のパスの解決は時間に含めず、append_record と最後の書き出しだけを測る。
+
+    Args:
+        config: ベンチマークの設定
+        merge_threshold: マージのしきい値（Noneの場合はマージしない）
+        flush_policy: 指定した場合はセグメントを開いたままにする JsonlWriter で書き込む
+
+    Returns:
+        指標名 → 値の辞書
+    """
+    records = _sample_records(config.records)
+    elapsed: List[float] = []
+    for _ in range(max(config.repeat, 1)):
+        with tempfile.TemporaryDirectory() as work_dir:
+            manager = JsonlManager(
+                base_dir=Path(work_dir), merge_threshold=merge_threshold, flush_policy=flush_policy
+            )
+            spent = 0.0
+            for timestamp, window, text in records:
+                path = manager.get_current_jsonl_path(timestamp)
+                started = time.perf_counter()
+                manager.append_record(path, timestamp, window, text)
+                spent += time.perf_counter() - started
+            path = manager.get_current_jsonl_path(records[-1][0])
+            started = time.perf_counter()
+            manager.flush_merger(path)
+            manager.close()
+            spent += time.perf_counter() - started
+            elapsed.append(spent)
+            written = sum(path.stat().st_size for path in manager.logs_dir.glob("*.jsonl"))
+
+    return _throughput(len(records), written, statistics.median(elapsed))
+
+
+def bench_jsonl_batch(config: BenchmarkConfig, merge_threshold: Optional[float]) -> Dict[str, Any]:
+    """
+    JsonlManager.append_records で batch_records 件ずつまとめて書き込み、bench_jsonl と比べる
+
+    書き込み先のパスの解決は append_records の中で行うため時間に含まれる。
+
+    Args:
+        config: ベンチマークの設定
+        merge_threshold: マージのしきい値（Noneの場合はマージしない）
+
+    Returns:
+        指標名 → 値の辞書
+    """
+    records = [JsonlRecord(*record) for record in _sample_records(config.records)]
+    size = max(config.batch_records, 1)
+    batches = [records[start:][:size] for start in range(0, len(records), size)]
+    elapsed: List[float] = []
+    for _ in range(max(config.repeat, 1)):
+        with tempfile.TemporaryDirectory() as work_dir:
+            manager = JsonlManager(base_dir=Path(work_dir), merge_threshold=merge_threshold)
+            started = time.perf_counter()
+            for batch in batches:
+                manager.append_records(batch)
+            manager.flush_merger(manager.get_current_jsonl_path(records[-1].timestamp))
+            elapsed.append(time.perf_counter() - started)
+            written = sum(path.stat().st_size for path in manager.logs_dir.glob("*.jsonl"))
+
+    return _throughput(len(records), written, statistics.median(elapsed))
+
+
+def bench_record_encoding(config: BenchmarkConfig, record_encoding: str) -> Dict[str, Any]:
+    """
+    レコードの書き込み形式ごとに、書き込んだサイズと読み込み（デコード）の速さを測定する
+
+    マージせずに append_record で書き込み、iter_segment_records ですべてのレコードを
+    通常の形式に戻して読み込む時間を測る。
+
+    Args:
+        config: ベンチマークの設定
+        record_encoding: レコードの書き込み形式（RECORD_ENCODINGSのいずれか）
+
+    Returns:
+        指標名 → 値の辞書
+    """
+    records = _sample_records(config.records)
+    write_elapsed: List[float] = []
+    read_elapsed: List[float] = []
+    for _ in range(max(config.repeat, 1)):
+        with tempfile.TemporaryDirectory() as work_dir:
+            manager = JsonlManager(base_dir=Path(work_dir), record_encoding=record_encoding)
+            started = time.perf_counter()
+            for timestamp, window, text in records:
+                manager.append_record(
+                    manager.get_current_jsonl_path(timestamp), timestamp, window, text
+                )
+            write_elapsed.append(time.perf_counter() - started)
+            paths = sorted(manager.logs_dir.glob("*.jsonl"))
+            written = sum(path.stat().st_size for path in paths)
+
+            started = time.perf_counter()
+            decoded = sum(
+                1 for path in paths for record in iter_segment_records(path) if "text" in record
+            )
+            read_elapsed.append(time.perf_counter() - started)
+            if decoded != len(records):
+                raise RuntimeError(f"Decoded {decoded} of {len(records)} records")
+
+    return {
+        "records_per_second": len(records) / statistics.median(write_elapsed),
+        "decode_records_per_second": len(records) / statistics.median(read_elapsed),
+        "bytes_per_record": written / len(records),
+    }
+
+
+def calibrate(repeat: int = 1) -> float:
+    """
+    マシンの速さの目安として、決まった処理（JSONのシリアライズと文字列処理）の時間を測る
+
+    Args:
+        repeat: 測定する回数（中央値を採る）
+
+    Returns:
+        校正ループ1回の時間（ミリ秒）
+    """
+    record = {"timestamp": "2026-01-05T09:00:00", "window": "Editor"}
+    text = "\n".join(f"line {row} " + "lorem ipsum dolor " * 4 for row in range(8))
+    samples = []
+    for _ in range(max(repeat, 1)):
+        started = time.perf_counter()
+        for index in range(CALIBRATION_LOOPS):
+            json.dumps({**record, "text": text, "index": index}, ensure_ascii=False)
+            sum(len(word) for word in text.split())
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def add_speedups(scenarios: Dict[str, Any]) -> None:
+    """
+    書き込み方法ごとに、append_record を1件ずつ呼んだ場合との速さの比を加える
+
+    同じマシンで続けて測った処理量の比なので、処理量そのものよりマシンの速さに依存しにくい。
+
+    Args:
+        scenarios: run_benchmarks() の結果のシナリオ（その場で speedup を加える）
+    """
+    for name, reference in (
+        ("jsonl_writer", "jsonl"),
+        ("jsonl_writer_merge", "jsonl_merge"),
+        ("jsonl_batch", "jsonl"),
+        ("jsonl_batch_merge", "jsonl_merge"),
+    ):
+        if name in scenarios and reference in scenarios:
+            scenarios[name]["speedup"] = (
+                scenarios[name]["records_per_second"] / scenarios[reference]["records_per_second"]
+            )
+
+
+def run_benchmarks(
+    config: Optional[BenchmarkConfig] = None,
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    すべてのシナリオを実行する
+
+    Args:
+        config: ベンチマークの設定（Noneの場合は既定の設定）
+        progress: シナリオの開始時に名前を受け取る関数
+
+    Returns:
+        schema, environment, config, scenarios を持つ結果の辞書
+    """
+    config = config or BenchmarkConfig()
+    scenarios: Dict[str, Callable[[], Dict[str, Any]]] = {
+        "ticks": lambda: bench_ticks(config, None),
+        "ticks_merge": lambda: bench_ticks(config, config.merge_threshold),
+        "jsonl": lambda: bench_jsonl(config, None),
+        "jsonl_merge": lambda: bench_jsonl(config, config.merge_threshold),
+        "jsonl_writer": lambda: bench_jsonl(config, None, WRITER_FLUSH_POLICY),
+        "jsonl_writer_merge": lambda: bench_jsonl(
+            config, config.merge_threshold, WRITER_FLUSH_POLICY
+        ),
+        "jsonl_batch": lambda: bench_jsonl_batch(config, None),
+        "jsonl_batch_merge": lambda: bench_jsonl_batch(config, config.merge_threshold),
+        "encoding_full": lambda: bench_record_encoding(config, RECORD_ENCODING_FULL),
+        "encoding_compact": lambda: bench_record_encoding(config, RECORD_ENCODING_COMPACT),
+        "encoding_delta": lambda: bench_record_encoding(config, RECORD_ENCODING_DELTA),
+    }
+    results: Dict[str, Any] = {}
+    calibrations = []
+    for name, scenario in scenarios.items():
+        if progress is not None:
+            progress(name)
+        # 測定中の負荷の変化も補正に含めるよう、シナリオごとに校正ループを測る
+        calibrations.append(calibrate(1))
+        results[name] = scenario()
+    add_speedups(results)
+    return {
+        "schema": BENCHMARK_SCHEMA,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "calibration_ms": statistics.median(calibrations),
+        },
+        "config": asdict(config),
+        "scenarios": results,
+    }
+
+
+def flatten_metrics(results: Dict[str, Any]) -> Dict[str, float]:
+    """
+    結果のシナリオを "シナリオ.指標" をキーにした平らな辞書にする
+
+    Args:
+        results: run_benchmarks() の結果
+
+    Returns:
+        指標名 → 値の辞書
+    """
+    flat: Dict[str, float] = {}
+
+    def visit(prefix: str, value: Any) -> None:
+        if isinstance(value, dict):
+            for key, child in value.items():
+                visit(f"{prefix}.{key}" if prefix else key, child)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix] = float(value)
+
+    visit("", results.get("scenarios", {}))
+    return flat
+
+
+def compare_to_baseline(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = 0.3,
+    timing_tolerance: float = TIMING_TOLERANCE,
+    timings: bool = True,
+) -> List[Regression]:
+    """
+    ベースラインと比べて悪化した指標を求める
+
+    名前が "_per_second" と "speedup" で終わる指標は大きいほど良く、それ以外は小さいほど
+    良いとみなす。両方にある指標だけを比べる。時間と処理量の指標は、両方に校正ループの
+    時間がある場合はその比でマシンの速さの違いを補正した値を比べる。
+    小さい値のばらつきで失敗しないよう、小さいほど良い指標は MIN_DELTAS の量以下の増加を無視する。
+
+    Args:
+        results: run_benchmarks() の結果
+        baseline: ベースラインの結果
+        tolerance: バイト数・メモリ確保の指標で悪化とみなす変化の割合
+        timing_tolerance: 時間から求めた指標（TIMING_SUFFIXES）で悪化とみなす変化の割合
+        timings: Falseの場合は時間から求めた指標を比べない（バイト数・メモリ確保だけを比べる）
+
+    Returns:
+        悪化した指標のリスト
+
+    Raises:
+        ValueError: 結果の形式のバージョンが異なる場合
+    """
+    if results.get("schema") != baseline.get("schema"):
+        raise ValueError(
+            f"Benchmark schema mismatch: {results.get('schema')} != {baseline.get('schema')}"
+        )
+    current = flatten_metrics(results)
+    # このマシンがベースラインのマシンより何倍遅いか（校正ループの時間の比）
+    speed = _calibration_ratio(results, baseline)
+    regressions = []
+    for metric, base_value in flatten_metrics(baseline).items():
+        value = current.get(metric)
+        if value is None:
+            continue
+        limit = tolerance
+        if metric.endswith(TIMING_SUFFIXES):
+            if not timings:
+                continue
+            if metric.endswith("_per_second"):
+                value *= speed
+            elif metric.endswith("_ms"):
+                value /= speed
+            limit = timing_tolerance
+        if metric.endswith(("_per_second", "speedup")):
+            regressed = value < base_value * (1 - limit)
+        else:
+            min_delta = next(
+                (delta for suffix, delta in MIN_DELTAS.items() if metric.endswith(suffix)), 0.0
+            )
+            regressed = value > base_value * (1 + limit) and value - base_value > min_delta
+        if regressed:
+            regressions.append(Regression(metric, base_value, value))
+    return regressions
+
+
+def format_results(results: Dict[str, Any]) -> List[str]:
+    """結果の指標を1行ずつの文字列にする"""
+    return [f"{metric:<40} {value:>12.3f}" for metric, value in flatten_metrics(results).items()]
+
+
+def _calibration_ratio(results: Dict[str, Any], baseline: Dict[str, Any]) -> float:
+    """校正ループの時間の比（現在 / ベースライン、どちらかにない場合は 1.0）"""
+    current = results.get("environment", {}).get("calibration_ms")
+    base = baseline.get("environment", {}).get("calibration_ms")
+    if not current or not base:
+        return 1.0
+    return float(current) / float(base)
+
+
+def _throughput(records: int, written: int, elapsed: float) -> Dict[str, Any]:
+    """レコード数と書き込んだバイト数、かかった時間から処理量の指標を求める"""
+    return {
+        "records_per_second": records / elapsed,
+        "mb_per_second": written / elapsed / 1024 / 1024,
+    }
+
+
+def _checked_run(logger: ScreenOCRLogger) -> Any:
+    """1tickを実行する（失敗した場合は測定を続けない）"""
+    result = logger.run()
+    if not result.success:
+        raise RuntimeError(f"Benchmark tick failed: {result.error}")
+    return result
+
+
+def _jsonl_bytes(logger: ScreenOCRLogger) -> int:
+    """JSONLファイルの合計サイズ"""
+    return sum(path.stat().st_size for path in logger.jsonl_manager.logs_dir.glob("*.jsonl"))
+
+
+def _measure_allocations(action: Callable[[], Any], iterations: int) -> Tuple[float, int]:
+    """
+    tracemallocで1回あたりに残ったメモリブロック数と確保のピークを測定する
+
+    Args:
+        action: 測定する処理
+        iterations: 繰り返す回数
+
+    Returns:
+        (1回あたりに増えたブロック数, 確保したメモリのピーク（バイト）)
+    """
+    if iterations <= 0:
+        return 0.0, 0
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        for _ in range(iterations):
+            action()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return blocks / iterations, peak
+
+
+def _sample_records(count: int) -> List[Tuple[datetime, str, str]]:
+    """JSONLの書き込みの測定に使うレコード（同じウィンドウが続く間は似たテキスト）"""
+    start = datetime(2026, 1, 5, 9, 0, 0)
+    records = []
+    for index in range(count):
+        window = BENCHMARK_WINDOWS[index % len(BENCHMARK_WINDOWS)]
+        lines = [f"{window} line {row} " + "lorem ipsum dolor " * 4 for row in range(8)]
+        lines[index % 8] += f" changed {index % 3}"
+        records.append((start + timedelta(seconds=index * 60), window, "\n".join(lines)))
+    return records
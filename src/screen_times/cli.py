@@ -15,10 +15,17 @@ import time
 from datetime import datetime, timedelta
 from pathlib import Path
 
-from typing import Optional
+from typing import List, Optional, Tuple
 
 # ローカルモジュールをインポート
-from .jsonl_manager import JsonlManager, DEFAULT_VAULT_PATH
+from .jsonl_manager import (
+    COMPRESSED_SUFFIX,
+    DEFAULT_VAULT_PATH,
+    JsonlManager,
+    get_metadata_path,
+    iter_segment_records,
+    segment_base_path,
+)
 
 
 # 色定義
@@ -88,12 +95,24 @@ def check_launchd_status() -> bool:
         return False
 
 
-def start_agent():
-    """launchdエージェントを開始"""
+def start_agent(resident: bool = False, interval: int = 60, ocr_cache_mb: Optional[int] = None):
+    """launchdエージェントを開始
+
+    Args:
+        resident: Trueの場合、KeepAliveで常駐する `screenocr run` 用のplistを生成する
+        interval: 常駐モードでの実行間隔（秒）
+        ocr_cache_mb: OCR結果のディスクキャッシュの容量上限（MB、Noneの場合はキャッシュしない）。
+                      plistの環境変数 SCREENOCR_OCR_CACHE_MB として渡す
+    """
+    from .screen_ocr_logger import OCR_CACHE_MB_ENV
+
     log_info("ScreenOCR Logger を起動します...")
 
     project_root = get_project_root()
-    plist_template = project_root / "config" / "com.screenocr.logger.plist"
+    if resident:
+        plist_template = project_root / "config" / "com.screenocr.logger.resident.plist"
+    else:
+        plist_template = project_root / "config" / "com.screenocr.logger.plist"
     plist_dest = get_plist_path()
     main_script = project_root / "src" / "screen_times" / "screenshot_ocr.py"
     python_path = project_root / ".venv" / "bin" / "python"
@@ -133,11 +152,26 @@ def start_agent():
     # パスを置換
     plist_content = template_content.replace("{PYTHON_PATH}", str(python_path))
     plist_content = plist_content.replace("{SCRIPT_PATH}", str(main_script))
+    plist_content = plist_content.replace("{INTERVAL}", str(interval))
+    environment = ""
+    if ocr_cache_mb is not None:
+        environment = (
+            "<key>EnvironmentVariables</key>\n"
+            "        <dict>\n"
+            f"            <key>{OCR_CACHE_MB_ENV}</key>\n"
+            f"            <string>{ocr_cache_mb}</string>\n"
+            "        </dict>"
+        )
+    plist_content = plist_content.replace("{ENVIRONMENT_VARIABLES}", environment)
 
     with open(plist_dest, "w") as f:
         f.write(plist_content)
 
     log_info(f"plistファイルを生成しました: {plist_dest}")
+    if resident:
+        log_info(f"常駐モード: {interval}秒間隔で実行します")
+    if ocr_cache_mb is not None:
+        log_info(f"OCRキャッシュ: 容量上限 {ocr_cache_mb}MB")
 
     # launchdエージェントをロード
     log_info("launchdエージェントをロード中...")
@@ -324,6 +358,303 @@ def dry_run(merge_threshold: Optional[float] = None):
         sys.exit(1)
 
 
+def run_resident(
+    interval: int = 60,
+    merge_threshold: Optional[float] = None,
+    max_ticks: Optional[int] = None,
+    pipeline: bool = False,
+    queue_size: int = 2,
+    overflow: str = "drop_oldest",
+    frame_hash_threshold: Optional[int] = None,
+    incremental_ocr: bool = False,
+    ocr_cache_mb: Optional[int] = None,
+    ocr_worker: bool = False,
+    ocr_worker_max_jobs: Optional[int] = 200,
+    ocr_worker_max_rss_mb: Optional[int] = 1024,
+    tiered_ocr: bool = False,
+    tiered_min_confidence: float = 0.5,
+    preprocess_dpi: Optional[float] = None,
+    in_memory_capture: bool = False,
+    screenshot_persistence: str = "deferred",
+    screenshot_archive: bool = False,
+    archive_format: str = "png",
+    archive_quality: Optional[float] = None,
+    cleanup_interval: float = 600,
+    idle_detection: bool = False,
+    adaptive_interval: Optional[Tuple[float, float]] = None,
+    jsonl_flush_records: Optional[int] = 1,
+    jsonl_flush_seconds: Optional[float] = None,
+    jsonl_fsync: bool = False,
+    compress_segments: bool = False,
+    record_encoding: str = "full",
+):
+    """常駐モードで実行（1つのプロセスで定期的にOCR処理を繰り返す）
+
+    Args:
+        interval: 実行間隔（秒）
+        merge_threshold: マージのしきい値（0.0～1.0）
+        max_ticks: 最大実行回数（Noneの場合はシグナルで停止されるまで実行）
+        pipeline: Trueの場合、キャプチャ・OCR・書き込みを別ワーカーで実行する
+                  （OCRは常に監視付きワーカープロセスで実行する）
+        queue_size: パイプラインモードでのOCR待ちキューの最大長
+        overflow: OCR待ちキューが満杯のときのポリシー
+        frame_hash_threshold: 直前フレームとのハミング距離がこの値以下ならOCRを省略する
+        incremental_ocr: Trueの場合、前回フレームから変化したタイルだけをOCRする
+        ocr_cache_mb: OCR結果のディスクキャッシュの容量上限（MB、Noneの場合はキャッシュしない）
+        ocr_worker: Trueの場合、OCRを監視付きワーカープロセスで実行する
+        ocr_worker_max_jobs: ワーカーを入れ替えるまでのジョブ数
+        ocr_worker_max_rss_mb: ワーカーを入れ替えるRSSの上限（MB）
+        tiered_ocr: Trueの場合、高速パスを優先し必要な場合だけ高精度パスで再認識する
+        tiered_min_confidence: 高速パスでこの信頼度未満の行を高精度パスで再認識する
+        preprocess_dpi: OCR前にこのDPIまで縮小し、グレースケール化・余白除去する
+        in_memory_capture: Trueの場合、画面をメモリ上にキャプチャしてファイルを介さずにOCRする
+        screenshot_persistence: メモリ上でキャプチャした画像の保存方法（sync/deferred/never）
+        screenshot_archive: Trueの場合、スクリーンショットを重複を排除したアーカイブに保存する
+        archive_format: アーカイブのキーフレームの保存形式（png/jpeg/heic）
+        archive_quality: 非可逆形式の品質（0.0～1.0）
+        cleanup_interval: 古いスクリーンショットを削除する間隔（秒）
+        idle_detection: Trueの場合、画面ロック・無操作の間はOCRを省略してキャプチャを間引く
+        adaptive_interval: (最小, 最大) を指定した場合、活動量に応じてこの範囲で実行間隔を調整する
+                           （実行回数は interval の固定間隔の場合を超えない）
+        jsonl_flush_records: JSONLをこの件数ごとに書き出す（Noneの場合は件数では書き出さない）
+        jsonl_flush_seconds: JSONLを前回からこの秒数以上経ったら書き出す
+        jsonl_fsync: Trueの場合、JSONLを書き出すたびに fsync する
+        compress_segments: Trueの場合、書き込みが終わったJSONLファイルをクリーンアップのたびに圧縮する
+        record_encoding: JSONLのレコードの書き込み形式（"full"、"compact" または "delta"）
+    """
+    from .screen_ocr_logger import ScreenOCRLogger, ScreenOCRConfig, ocr_cache_max_bytes_from_env
+    from .jsonl_manager import FlushPolicy
+    from .resident import ResidentRunner
+    from .pipeline import PipelineRunner
+    from .adaptive_schedule import AdaptiveScheduler
+    from .preprocess import PreprocessConfig
+
+    if interval <= 0:
+        log_error("--interval には正の値を指定してください")
+        sys.exit(1)
+
+    log_info(f"常駐モードで実行します（間隔: {interval}秒）")
+    if merge_threshold is not None:
+        log_info(f"マージしきい値: {merge_threshold}")
+    if (jsonl_flush_records is not None and jsonl_flush_records <= 0) or (
+        jsonl_flush_seconds is not None and jsonl_flush_seconds <= 0
+    ):
+        log_error("--jsonl-flush-records と --jsonl-flush-seconds には正の値を指定してください")
+        sys.exit(1)
+    if incremental_ocr and tiered_ocr:
+        log_error("--incremental-ocr と --tiered-ocr は同時に指定できません")
+        sys.exit(1)
+    if pipeline and not ocr_worker:
+        # OCRステージはメインスレッド以外で動くためSIGALRMによるタイムアウトが効かない。
+        # 応答しないOCRでステージが止まらないよう、期限付きのワーカープロセスで実行する
+        log_info("パイプラインモードではOCRを監視付きワーカープロセスで実行します")
+        ocr_worker = True
+
+    config = ScreenOCRConfig(
+        verbose=True,
+        merge_threshold=merge_threshold,
+        frame_hash_threshold=frame_hash_threshold,
+        incremental_ocr=incremental_ocr,
+        ocr_cache_max_bytes=(
+            ocr_cache_mb * 1024 * 1024
+            if ocr_cache_mb is not None
+            else ocr_cache_max_bytes_from_env()
+        ),
+        ocr_worker=ocr_worker,
+        ocr_worker_max_jobs=ocr_worker_max_jobs,
+        ocr_worker_max_rss_bytes=(
+            ocr_worker_max_rss_mb * 1024 * 1024 if ocr_worker_max_rss_mb is not None else None
+        ),
+        tiered_ocr=tiered_ocr,
+        tiered_min_confidence=tiered_min_confidence,
+        preprocess=(
+            PreprocessConfig(target_dpi=preprocess_dpi) if preprocess_dpi is not None else None
+        ),
+        in_memory_capture=in_memory_capture,
+        screenshot_persistence=screenshot_persistence,
+        screenshot_archive=screenshot_archive,
+        archive_format=archive_format,
+        archive_quality=archive_quality,
+        cleanup_interval_seconds=cleanup_interval,
+        idle_detection=idle_detection,
+        idle_probe_seconds=interval,
+        jsonl_flush_policy=FlushPolicy(
+            every_records=jsonl_flush_records,
+            every_seconds=jsonl_flush_seconds,
+            fsync=jsonl_fsync,
+        ),
+        jsonl_compress_segments=compress_segments,
+        jsonl_record_encoding=record_encoding,
+    )
+    logger = ScreenOCRLogger(config)
+    scheduler: Optional[AdaptiveScheduler] = None
+    if adaptive_interval is not None:
+        min_interval, max_interval = adaptive_interval
+        if min_interval <= 0 or max_interval < min_interval:
+            log_error("--adaptive-interval には 0 < 最小 <= 最大 を指定してください")
+            sys.exit(1)
+        log_info(f"適応間隔: {min_interval}～{max_interval}秒（予算: {interval}秒間隔と同じ回数）")
+        scheduler = AdaptiveScheduler(min_interval, max_interval, budget_interval=interval)
+
+    runner: ResidentRunner
+    if pipeline:
+        log_info(f"パイプラインモード: OCRキュー長 {queue_size}, 溢れた場合 {overflow}")
+        runner = PipelineRunner(
+            logger,
+            interval_seconds=interval,
+            max_ticks=max_ticks,
+            queue_size=queue_size,
+            overflow=overflow,
+            scheduler=scheduler,
+        )
+    else:
+        runner = ResidentRunner(
+            logger, interval_seconds=interval, max_ticks=max_ticks, scheduler=scheduler
+        )
+    runner.install_signal_handlers()
+    runner.run()
+    log_info("常駐モードを終了しました")
+
+
+def bench_preprocess(images: List[Path], target_dpis: List[float]):
+    """前処理の設定ごとにOCR時間と精度を測定して表示する
+
+    Args:
+        images: 測定に使う画像
+        target_dpis: 比較する縮小後のDPI
+    """
+    import tempfile
+
+    from .ocr import perform_ocr
+    from .preprocess import PreprocessConfig, benchmark_preprocess
+
+    missing = [image for image in images if not image.exists()]
+    if missing:
+        log_error(f"画像が見つかりません: {', '.join(str(m) for m in missing)}")
+        sys.exit(1)
+
+    configs = [PreprocessConfig(target_dpi=None, trim_margins=True)]
+    configs += [PreprocessConfig(target_dpi=dpi) for dpi in target_dpis]
+
+    log_info(f"{len(images)} 枚の画像で前処理の設定を比較します")
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = benchmark_preprocess(
+            images, configs, lambda path: perform_ocr(path, 30), Path(work_dir)
+        )
+
+    print()
+    print(f"{'設定':<50} {'画素数':>8} {'前処理':>9} {'OCR':>9} {'類似度':>7}")
+    for result in results:
+        print(
+            f"{result.settings:<50} {result.pixel_ratio:>8.0%} "
+            f"{result.preprocess_seconds * 1000:>7.0f}ms {result.ocr_seconds:>8.2f}s "
+            f"{result.similarity:>7.1f}"
+        )
+
+
+def bench_window(iterations: int):
+    """ウィンドウ取得の実装ごとに1回の取得にかかる時間を測定して表示する
+
+    Args:
+        iterations: 実装ごとの測定回数
+    """
+    import statistics
+
+    from .window_provider import (
+        AppleScriptWindowProvider,
+        QuartzWindowProvider,
+        benchmark_window_providers,
+    )
+
+    if iterations <= 0:
+        log_error("--iterations には正の値を指定してください")
+        sys.exit(1)
+
+    log_info(f"ウィンドウ取得を {iterations} 回ずつ測定します")
+    results = benchmark_window_providers(
+        {"applescript": AppleScriptWindowProvider(), "quartz": QuartzWindowProvider()},
+        iterations,
+    )
+
+    print()
+    print(f"{'実装':<12} {'中央値':>10} {'最大':>10}")
+    for name, samples in results.items():
+        print(
+            f"{name:<12} {statistics.median(samples) * 1000:>8.1f}ms "
+            f"{max(samples) * 1000:>8.1f}ms"
+        )
+
+
+def bench(
+    ticks: int,
+    records: int,
+    output: Optional[Path],
+    baseline: Optional[Path],
+    tolerance: float,
+    update_baseline: bool,
+    timing_tolerance: float = 0.5,
+    timings: bool = True,
+):
+    """偽のバックエンドで記録の処理量を測定し、ベースラインと比較する
+
+    Args:
+        ticks: 処理量を測定するtick数
+        records: JSONLの書き込みを測定するレコード数
+        output: 結果のJSONの保存先（Noneの場合は保存しない）
+        baseline: 比較するベースラインのJSON（Noneの場合は比較しない）
+        tolerance: バイト数・メモリ確保の指標で悪化とみなす変化の割合
+        update_baseline: Trueの場合、比較せずに結果をベースラインとして保存する
+        timing_tolerance: 時間から求めた指標（処理量・レイテンシ・速さの比）で悪化とみなす変化の割合
+        timings: Falseの場合は時間から求めた指標を比較しない（別のマシンのベースラインと比べる場合）
+    """
+    from .benchmark import BenchmarkConfig, compare_to_baseline, format_results, run_benchmarks
+
+    if ticks <= 0 or records <= 0:
+        log_error("--ticks と --records には正の値を指定してください")
+        sys.exit(1)
+    if update_baseline and baseline is None:
+        log_error("--update-baseline には --baseline を指定してください")
+        sys.exit(1)
+
+    log_info(f"偽のバックエンドで {ticks} tick、{records} レコードを測定します")
+    results = run_benchmarks(
+        BenchmarkConfig(ticks=ticks, records=records),
+        progress=lambda name: print(f"  {name} ..."),
+    )
+    print()
+    for line in format_results(results):
+        print(line)
+    print()
+
+    if output is not None:
+        output.write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n")
+        log_info(f"結果を保存しました: {output}")
+
+    if baseline is None:
+        return
+    if update_baseline:
+        baseline.write_text(json.dumps(results, indent=2, ensure_ascii=False) + "\n")
+        log_info(f"ベースラインを更新しました: {baseline}")
+        return
+    if not baseline.exists():
+        log_error(f"ベースラインが見つかりません: {baseline}")
+        sys.exit(1)
+    regressions = compare_to_baseline(
+        results,
+        json.loads(baseline.read_text()),
+        tolerance=tolerance,
+        timing_tolerance=timing_tolerance,
+        timings=timings,
+    )
+    limits = f"{tolerance:.0%}（時間から求めた指標は {timing_tolerance:.0%}）"
+    if regressions:
+        log_error(f"ベースラインより {limits} 以上悪化した指標があります:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    log_info(f"ベースラインから {limits} 以上悪化した指標はありません")
+
+
 def show_status():
     """現在の状態を表示"""
     log_info("=== ScreenOCR Logger ステータス ===")
@@ -347,7 +678,11 @@ def show_status():
     log_dir = jsonl_manager.logs_dir
     if log_dir.exists():
         log_files = list(log_dir.glob("*.jsonl"))
-        print(f"  ログファイル: {len(log_files)} 個")
+        compressed_files = list(log_dir.glob(f"*.jsonl{COMPRESSED_SUFFIX}"))
+        print(f"  ログファイル: {len(log_files) + len(compressed_files)} 個")
+        if compressed_files:
+            compressed_kb = sum(f.stat().st_size for f in compressed_files) / 1024
+            print(f"    うち圧縮済み: {len(compressed_files)} 個 ({compressed_kb:.1f} KB)")
         print(f"    -> {log_dir}")
 
         # 今日のログファイル
@@ -359,6 +694,55 @@ def show_status():
     else:
         print("ログディレクトリ: 未作成")
 
+    # OCRキャッシュ
+    from .ocr_cache import OcrCache
+    from .screen_ocr_logger import ScreenOCRConfig
+
+    cache_dir = ScreenOCRConfig().screenshot_dir / "ocr_cache"
+    if cache_dir.exists():
+        cache_stats = OcrCache(cache_dir).stats()
+        print(
+            f"  OCRキャッシュ: ヒット {cache_stats['hits']} / ミス {cache_stats['misses']} "
+            f"(ヒット率 {cache_stats['hit_rate']:.0%}, "
+            f"節約 {cache_stats['saved_seconds']:.1f}秒, "
+            f"{cache_stats['total_bytes'] / 1024:.1f} KB)"
+        )
+
+    # スクリーンショットのアーカイブ
+    from .screenshot_archive import ScreenshotArchive
+
+    archive_dir = ScreenOCRConfig().screenshot_dir / "archive"
+    if archive_dir.exists():
+        frames, archive_bytes = ScreenshotArchive(archive_dir).disk_usage()
+        print(f"  アーカイブ: キーフレーム {frames} 個 ({archive_bytes / 1024 / 1024:.1f} MB)")
+
+    # tickごとの処理段階のメトリクス
+    from .metrics import MetricsLog, summarize
+
+    metrics_log = MetricsLog(ScreenOCRConfig().screenshot_dir / "metrics")
+    if metrics_log.path.exists():
+        now = datetime.now()
+        periods = (
+            ("直近1時間", timedelta(hours=1), 600),
+            ("直近1日", timedelta(days=1), 3600),
+        )
+        for label, period, bucket_seconds in periods:
+            summary = summarize(metrics_log.read(now - period))
+            print(
+                f"  処理時間（{label}）: {summary.ticks} tick, "
+                f"画像 {summary.image_bytes / 1024 / 1024:.1f} MB, "
+                f"JSONL {summary.jsonl_bytes / 1024:.1f} KB"
+            )
+            if summary.ticks:
+                for line in summary.format_lines():
+                    print(f"    {line}")
+            events = summary.format_events()
+            if events:
+                print(f"    OCRワーカー: {events}")
+            intervals = summary.format_intervals(bucket_seconds)
+            if intervals:
+                print(f"    実行間隔: {intervals}")
+
     print()
 
     # ヘルプメッセージ
@@ -464,18 +848,19 @@ def fetch_records(
     seen: set[Path] = set()
 
     for date_str in sorted(effective_dates):
-        # 実ファイル
-        for f in sorted(logs_dir.glob(f"{date_str}*.jsonl")):
-            if f not in seen:
-                target_files.append(f)
-                seen.add(f)
-        # iCloud プレースホルダー (.YYYY-MM-DD*.jsonl.icloud)
-        for placeholder in sorted(logs_dir.glob(f".{date_str}*.jsonl.icloud")):
-            original_name = placeholder.name[1:-6]  # 先頭の "." と末尾の ".icloud" を除去
-            original_path = logs_dir / original_name
-            if original_path not in seen:
-                target_files.append(original_path)
-                seen.add(original_path)
+        for pattern in (f"{date_str}*.jsonl", f"{date_str}*.jsonl{COMPRESSED_SUFFIX}"):
+            # 実ファイル（圧縮済みの .jsonl.gz を含む）
+            for f in sorted(logs_dir.glob(pattern)):
+                if f not in seen:
+                    target_files.append(f)
+                    seen.add(f)
+            # iCloud プレースホルダー (.YYYY-MM-DD*.jsonl.icloud / .YYYY-MM-DD*.jsonl.gz.icloud)
+            for placeholder in sorted(logs_dir.glob(f".{pattern}.icloud")):
+                original_name = placeholder.name[1:-7]  # 先頭の "." と末尾の ".icloud" を除去
+                original_path = logs_dir / original_name
+                if original_path not in seen:
+                    target_files.append(original_path)
+                    seen.add(original_path)
 
     if not target_files:
         log_warn(f"対象ファイルが見つかりません（ユーザー: {user}）")
@@ -493,16 +878,17 @@ def fetch_records(
             log_warn(f"スキップ（ダウンロード不可）: {filepath.name}")
             continue
 
-        with open(filepath, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    record = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-
+        # 既に記録があるファイルに追加したメタデータはサイドカーにある
+        # （圧縮前と圧縮後のファイルが両方ある場合は1回だけ読む）
+        sources = [filepath]
+        metadata_path = get_metadata_path(segment_base_path(filepath))
+        if metadata_path not in seen and ensure_icloud_downloaded(metadata_path):
+            sources.append(metadata_path)
+            seen.add(metadata_path)
+
+        # コンパクトな形式で書き込んだレコードも通常の形式に戻して読む
+        for source in sources:
+            for record in iter_segment_records(source):
                 ts_str = record.get("timestamp")
                 if not ts_str:
                     continue
@@ -521,6 +907,81 @@ def fetch_records(
         print(json.dumps(record, ensure_ascii=False))
 
 
+def _format_duration(seconds: float) -> str:
+    """秒数を H:MM:SS 形式で返す"""
+    total = int(round(seconds))
+    return f"{total // 3600}:{total % 3600 // 60:02d}:{total % 60:02d}"
+
+
+def show_stats(
+    user: Optional[str],
+    first_day: Optional[datetime],
+    last_day: Optional[datetime],
+    max_gap: float,
+    top: int,
+):
+    """実効日付ごとの列形式キャッシュからアプリ別・時間帯別の画面時間を表示
+
+    Args:
+        user: 対象 macOS アカウント名（None の場合は現在のユーザー）
+        first_day: 集計する最初の実効日付（None の場合は last_day と同じ日）
+        last_day: 集計する最後の実効日付（None の場合は今日の実効日付）
+        max_gap: レコードの終了時刻から次のレコードまでを同じ作業とみなす最大の秒数
+        top: 表示するアプリの数
+    """
+    from .analytics import AnalyticsCache, compute_stats, iter_days
+
+    if user is None:
+        user = getpass.getuser()
+    if last_day is None:
+        last_day = _get_effective_date(datetime.now())
+    if first_day is None:
+        first_day = last_day
+    if first_day > last_day:
+        log_error("--from には --to 以前の日付を指定してください")
+        sys.exit(1)
+
+    vault_path_str = os.environ.get("OBSIDIAN_VAULT_PATH")
+    vault_path = Path(vault_path_str) if vault_path_str else DEFAULT_VAULT_PATH
+    logs_dir = vault_path / "screenocr_logs" / user
+
+    started = time.perf_counter()
+    cache = AnalyticsCache(logs_dir, download=ensure_icloud_downloaded)
+    days = cache.load_days(iter_days(first_day.date(), last_day.date()))
+    stats = compute_stats(days, max_gap=max_gap)
+    elapsed = time.perf_counter() - started
+
+    log_info(f"ユーザー: {user}")
+    log_info(
+        f"期間: {first_day.strftime('%Y-%m-%d')} 〜 {last_day.strftime('%Y-%m-%d')} "
+        f"({stats.days}日, {stats.records}件)"
+    )
+    log_info(
+        f"集計時間: {elapsed * 1000:.0f}ms（キャッシュを作り直した日: {cache.rebuilt_days}日）"
+    )
+    print()
+
+    total = stats.total_seconds
+    if total <= 0:
+        log_warn("集計できるレコードがありません")
+        return
+
+    print(
+        f"アプリ別（合計 {_format_duration(total)}、アイドル {_format_duration(stats.idle_seconds)}）:"
+    )
+    for name, seconds, count in stats.top_apps(top):
+        print(f"  {_format_duration(seconds):>10}  {seconds / total:6.1%}  {count:6d}件  {name}")
+    print()
+
+    print("時間帯別:")
+    peak = max(stats.hour_seconds)
+    for hour, seconds in enumerate(stats.hour_seconds):
+        if seconds <= 0:
+            continue
+        bar = "#" * max(1, round(seconds / peak * 40))
+        print(f"  {hour:02d}:00  {_format_duration(seconds):>10}  {bar}")
+
+
 def main():
     """メイン処理"""
     parser = argparse.ArgumentParser(
@@ -534,13 +995,37 @@ def main():
   screenocr split --clear         # 日付ベースに戻す
   screenocr status                # 現在の状態を表示
   screenocr dry-run               # テスト実行（JSONLに保存せず結果表示）
+  screenocr run --interval 60     # 常駐モードで実行（フォアグラウンド）
+  screenocr start --resident      # 常駐モードのエージェントを開始
+  screenocr stats --from 2026-03-01 --to 2026-03-31  # 期間の画面時間を集計
         """,
     )
 
     subparsers = parser.add_subparsers(dest="command", help="実行するコマンド")
 
     # start コマンド
-    subparsers.add_parser("start", help="launchdエージェントを開始")
+    start_parser = subparsers.add_parser("start", help="launchdエージェントを開始")
+    start_parser.add_argument(
+        "--resident",
+        action="store_true",
+        help="毎分プロセスを起動せず、KeepAliveで常駐する run モードで登録する",
+    )
+    start_parser.add_argument(
+        "--interval",
+        type=int,
+        default=60,
+        metavar="SECONDS",
+        help="常駐モードでの実行間隔（秒、デフォルト: 60）",
+    )
+    start_parser.add_argument(
+        "--ocr-cache-mb",
+        type=int,
+        metavar="MB",
+        help=(
+            "同じ内容の画像のOCR結果をディスクにキャッシュする（容量上限、例: 50）。"
+            "毎分の起動をまたいで使われる"
+        ),
+    )
 
     # stop コマンド
     subparsers.add_parser("stop", help="launchdエージェントを停止")
@@ -570,6 +1055,272 @@ def main():
         help="類似レコードをマージするしきい値（0.0～1.0、デフォルト: マージしない）",
     )
 
+    # run コマンド
+    run_parser = subparsers.add_parser(
+        "run", help="常駐モードで実行（1プロセスで定期的にOCR処理を繰り返す）"
+    )
+    run_parser.add_argument(
+        "--interval",
+        type=int,
+        default=60,
+        metavar="SECONDS",
+        help="実行間隔（秒、デフォルト: 60）",
+    )
+    run_parser.add_argument(
+        "--merge-threshold",
+        type=float,
+        metavar="THRESHOLD",
+        help="類似レコードをマージするしきい値（0.0～1.0、デフォルト: マージしない）",
+    )
+    run_parser.add_argument(
+        "--max-ticks",
+        type=int,
+        metavar="N",
+        help="N回実行したら終了する（デフォルト: 停止されるまで実行）",
+    )
+    run_parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="キャプチャ・OCR・書き込みを別ワーカーで実行し、OCRの遅延でキャプチャを遅らせない",
+    )
+    run_parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=2,
+        metavar="N",
+        help="パイプラインモードでのOCR待ちキューの最大長（デフォルト: 2）",
+    )
+    run_parser.add_argument(
+        "--overflow",
+        choices=["block", "drop_newest", "drop_oldest", "coalesce"],
+        default="drop_oldest",
+        help="OCR待ちキューが満杯のときのポリシー（デフォルト: drop_oldest）",
+    )
+    run_parser.add_argument(
+        "--frame-hash-threshold",
+        type=int,
+        metavar="DISTANCE",
+        help="同じウィンドウの直前フレームとのハミング距離がこの値以下ならOCRを省略する（例: 4）",
+    )
+    run_parser.add_argument(
+        "--incremental-ocr",
+        action="store_true",
+        help="フレームをタイルに分割し、前回から変化したタイルだけをOCRする（--tiered-ocr とは併用不可）",
+    )
+    run_parser.add_argument(
+        "--ocr-cache-mb",
+        type=int,
+        metavar="MB",
+        help=(
+            "同じ内容の画像のOCR結果をディスクにキャッシュする（容量上限、例: 50。"
+            "省略した場合は環境変数 SCREENOCR_OCR_CACHE_MB）"
+        ),
+    )
+    run_parser.add_argument(
+        "--ocr-worker",
+        action="store_true",
+        help="OCRを監視付きワーカープロセスで実行し、期限を過ぎたら強制終了して再起動する"
+        "（--pipeline では常に有効）",
+    )
+    run_parser.add_argument(
+        "--ocr-worker-max-jobs",
+        type=int,
+        default=200,
+        metavar="N",
+        help="OCRワーカーをN件処理するごとに入れ替える（デフォルト: 200）",
+    )
+    run_parser.add_argument(
+        "--ocr-worker-max-rss-mb",
+        type=int,
+        default=1024,
+        metavar="MB",
+        help="OCRワーカーのRSSがこれを超えたら入れ替える（デフォルト: 1024）",
+    )
+    run_parser.add_argument(
+        "--tiered-ocr",
+        action="store_true",
+        help=(
+            "高速パスで認識し、信頼度やテキスト密度が低い場合だけ高精度パスで再認識する。"
+            "高速パスは英語のみのため、英語らしくない結果や日本語中心のウィンドウは"
+            "高精度パスで認識する（日本語が多い画面では効果が小さい）"
+        ),
+    )
+    run_parser.add_argument(
+        "--tiered-min-confidence",
+        type=float,
+        default=0.5,
+        metavar="CONFIDENCE",
+        help="高速パスでこの信頼度未満の行を高精度パスで再認識する（デフォルト: 0.5）",
+    )
+    run_parser.add_argument(
+        "--preprocess-dpi",
+        type=float,
+        metavar="DPI",
+        help="OCR前にこのDPIまで縮小し、グレースケール化と余白除去を行う（例: 96）",
+    )
+    run_parser.add_argument(
+        "--in-memory-capture",
+        action="store_true",
+        help="画面をメモリ上にキャプチャし、PNGの書き出しと読み直しをせずにOCRする",
+    )
+    run_parser.add_argument(
+        "--screenshot-persistence",
+        choices=["sync", "deferred", "never"],
+        default="deferred",
+        help="--in-memory-capture でのスクリーンショットの保存方法（デフォルト: deferred）",
+    )
+    run_parser.add_argument(
+        "--screenshot-archive",
+        action="store_true",
+        help="スクリーンショットを内容アドレスで重複を排除したアーカイブに保存する",
+    )
+    run_parser.add_argument(
+        "--archive-format",
+        choices=["png", "jpeg", "heic"],
+        default="png",
+        help="アーカイブのキーフレームの保存形式（デフォルト: png）",
+    )
+    run_parser.add_argument(
+        "--archive-quality",
+        type=float,
+        metavar="QUALITY",
+        help="jpeg/heic の品質（0.0～1.0）",
+    )
+    run_parser.add_argument(
+        "--cleanup-interval",
+        type=float,
+        default=600,
+        metavar="SECONDS",
+        help="古いスクリーンショットを削除する間隔（秒、デフォルト: 600）",
+    )
+    run_parser.add_argument(
+        "--adaptive-interval",
+        type=float,
+        nargs=2,
+        metavar=("MIN", "MAX"),
+        help="画面の変化量に応じて実行間隔を MIN～MAX 秒で調整する（回数は --interval 以下）",
+    )
+    run_parser.add_argument(
+        "--idle-detection",
+        action="store_true",
+        help="画面ロック・無操作の間はOCRを省略し、キャプチャを間引いて1件の期間レコードにまとめる",
+    )
+    run_parser.add_argument(
+        "--jsonl-flush-records",
+        type=int,
+        default=1,
+        metavar="N",
+        help="JSONLファイルを開いたまま追記し、N件ごとに書き出す（デフォルト: 1）",
+    )
+    run_parser.add_argument(
+        "--jsonl-flush-seconds",
+        type=float,
+        metavar="SECONDS",
+        help="前回の書き出しから SECONDS 秒以上経ったらJSONLを書き出す",
+    )
+    run_parser.add_argument(
+        "--jsonl-fsync",
+        action="store_true",
+        help="JSONLを書き出すたびに fsync してディスクへの書き込みを待つ",
+    )
+    run_parser.add_argument(
+        "--compress-segments",
+        action="store_true",
+        help="分割や日付の切り替えで書き込みが終わったJSONLファイルを gzip で圧縮する",
+    )
+    run_parser.add_argument(
+        "--record-encoding",
+        choices=["full", "compact", "delta"],
+        default="full",
+        help=(
+            "JSONLのレコードの書き込み形式。compact はウィンドウ名の辞書・短いキー・"
+            "状態コードで書き込み、delta はさらにテキストを同じウィンドウの直前の"
+            "レコードとの差分で書き込む（デフォルト: full）"
+        ),
+    )
+
+    # bench-preprocess コマンド
+    bench_preprocess_parser = subparsers.add_parser(
+        "bench-preprocess", help="OCR前処理の設定ごとにOCR時間と精度を比較する"
+    )
+    bench_preprocess_parser.add_argument(
+        "images",
+        nargs="*",
+        type=Path,
+        default=[Path("sample_screenshot.png")],
+        metavar="IMAGE",
+        help="測定に使う画像（デフォルト: sample_screenshot.png）",
+    )
+    bench_preprocess_parser.add_argument(
+        "--target-dpi",
+        type=float,
+        nargs="+",
+        default=[120.0, 96.0, 72.0],
+        metavar="DPI",
+        help="比較する縮小後のDPI（デフォルト: 120 96 72）",
+    )
+
+    # bench-window コマンド
+    bench_window_parser = subparsers.add_parser(
+        "bench-window", help="ウィンドウ取得の実装ごとに取得時間を比較する"
+    )
+    bench_window_parser.add_argument(
+        "--iterations",
+        type=int,
+        default=20,
+        metavar="N",
+        help="実装ごとの測定回数（デフォルト: 20）",
+    )
+
+    # bench コマンド
+    bench_parser = subparsers.add_parser(
+        "bench", help="偽のバックエンドで記録の処理量を測定し、ベースラインと比較する"
+    )
+    bench_parser.add_argument(
+        "--ticks", type=int, default=200, metavar="N", help="測定するtick数（デフォルト: 200）"
+    )
+    bench_parser.add_argument(
+        "--records",
+        type=int,
+        default=2000,
+        metavar="N",
+        help="JSONLの書き込みを測定するレコード数（デフォルト: 2000）",
+    )
+    bench_parser.add_argument(
+        "--output", type=Path, default=None, metavar="PATH", help="結果のJSONの保存先"
+    )
+    bench_parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="比較するベースラインのJSON（悪化した指標があれば終了コード1）",
+    )
+    bench_parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.3,
+        metavar="RATIO",
+        help="バイト数・メモリ確保の指標で悪化とみなす変化の割合（デフォルト: 0.3）",
+    )
+    bench_parser.add_argument(
+        "--timing-tolerance",
+        type=float,
+        default=0.5,
+        metavar="RATIO",
+        help="時間から求めた指標（校正で補正）で悪化とみなす変化の割合（デフォルト: 0.5）",
+    )
+    bench_parser.add_argument(
+        "--no-timings",
+        action="store_true",
+        help="時間から求めた指標を比較せず、バイト数・メモリ確保だけを比べる",
+    )
+    bench_parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="比較せずに結果を --baseline に保存する",
+    )
+
     # fetch コマンド
     fetch_parser = subparsers.add_parser(
         "fetch",
@@ -598,6 +1349,47 @@ def main():
         help="取得終了日時（例: '2026-03-08 18:00'）",
     )
 
+    # stats コマンド
+    stats_parser = subparsers.add_parser(
+        "stats",
+        help="アプリ別・時間帯別の画面時間を集計して表示",
+    )
+    stats_parser.add_argument(
+        "--user",
+        metavar="USERNAME",
+        help="対象 macOS アカウント名（デフォルト: 現在のユーザー）",
+    )
+    stats_parser.add_argument(
+        "--date",
+        metavar="YYYY-MM-DD",
+        help="対象の実効日付（例: 2026-03-08）。--from/--to と同時指定不可",
+    )
+    stats_parser.add_argument(
+        "--from",
+        dest="from_date",
+        metavar="YYYY-MM-DD",
+        help="集計する最初の実効日付（デフォルト: --to と同じ日）",
+    )
+    stats_parser.add_argument(
+        "--to",
+        dest="to_date",
+        metavar="YYYY-MM-DD",
+        help="集計する最後の実効日付（デフォルト: 今日）",
+    )
+    stats_parser.add_argument(
+        "--max-gap",
+        type=float,
+        default=90.0,
+        metavar="SECONDS",
+        help="レコードの終了から次のレコードまでを同じ作業とみなす最大の秒数（デフォルト: 90）",
+    )
+    stats_parser.add_argument(
+        "--top",
+        type=int,
+        default=20,
+        help="表示するアプリの数（デフォルト: 20）",
+    )
+
     args = parser.parse_args()
 
     # コマンドが指定されていない場合はヘルプを表示
@@ -607,7 +1399,10 @@ def main():
 
     # コマンドを実行
     if args.command == "start":
-        start_agent()
+        if args.ocr_cache_mb is not None and args.ocr_cache_mb <= 0:
+            log_error("--ocr-cache-mb には正の値を指定してください")
+            sys.exit(1)
+        start_agent(resident=args.resident, interval=args.interval, ocr_cache_mb=args.ocr_cache_mb)
     elif args.command == "stop":
         stop_agent()
     elif args.command == "split":
@@ -617,6 +1412,52 @@ def main():
     elif args.command == "dry-run":
         merge_threshold = getattr(args, "merge_threshold", None)
         dry_run(merge_threshold=merge_threshold)
+    elif args.command == "run":
+        run_resident(
+            interval=args.interval,
+            merge_threshold=args.merge_threshold,
+            max_ticks=args.max_ticks,
+            pipeline=args.pipeline,
+            queue_size=args.queue_size,
+            overflow=args.overflow,
+            frame_hash_threshold=args.frame_hash_threshold,
+            incremental_ocr=args.incremental_ocr,
+            ocr_cache_mb=args.ocr_cache_mb,
+            ocr_worker=args.ocr_worker,
+            ocr_worker_max_jobs=args.ocr_worker_max_jobs,
+            ocr_worker_max_rss_mb=args.ocr_worker_max_rss_mb,
+            tiered_ocr=args.tiered_ocr,
+            tiered_min_confidence=args.tiered_min_confidence,
+            preprocess_dpi=args.preprocess_dpi,
+            in_memory_capture=args.in_memory_capture,
+            screenshot_persistence=args.screenshot_persistence,
+            screenshot_archive=args.screenshot_archive,
+            archive_format=args.archive_format,
+            archive_quality=args.archive_quality,
+            cleanup_interval=args.cleanup_interval,
+            idle_detection=args.idle_detection,
+            adaptive_interval=args.adaptive_interval,
+            jsonl_flush_records=args.jsonl_flush_records,
+            jsonl_flush_seconds=args.jsonl_flush_seconds,
+            jsonl_fsync=args.jsonl_fsync,
+            compress_segments=args.compress_segments,
+            record_encoding=args.record_encoding,
+        )
+    elif args.command == "bench-preprocess":
+        bench_preprocess(args.images, args.target_dpi)
+    elif args.command == "bench-window":
+        bench_window(args.iterations)
+    elif args.command == "bench":
+        bench(
+            args.ticks,
+            args.records,
+            args.output,
+            args.baseline,
+            args.tolerance,
+            args.update_baseline,
+            timing_tolerance=args.timing_tolerance,
+            timings=not args.no_timings,
+        )
     elif args.command == "fetch":
         # --date と --from/--to の排他チェック
         if args.date and (args.from_dt or args.to_dt):
@@ -660,6 +1501,23 @@ def main():
                     sys.exit(1)
 
         fetch_records(user=args.user, from_dt=from_dt, to_dt=to_dt)
+    elif args.command == "stats":
+        if args.date and (args.from_date or args.to_date):
+            log_error("--date と --from/--to は同時に指定できません")
+            sys.exit(1)
+
+        days: List[Optional[datetime]] = []
+        for value in (args.date or args.from_date, args.date or args.to_date):
+            if value is None:
+                days.append(None)
+                continue
+            try:
+                days.append(datetime.strptime(value, "%Y-%m-%d"))
+            except ValueError:
+                log_error(f"無効な日付形式です（YYYY-MM-DD が必要）: {value}")
+                sys.exit(1)
+
+        show_stats(args.user, days[0], days[1], args.max_gap, args.top)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Frame Hash - 知覚ハッシュによるフレーム比較モジュール
+
+スクリーンショットの差分ハッシュ（dHash）を計算し、同じウィンドウの
+前回フレームとほぼ同一であればOCR結果を再利用できるようにする。
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from .image_utils import ImageSource, grayscale_thumbnail
+
+# デフォルトのハッシュサイズ（8x8 = 64ビット）
+DEFAULT_HASH_SIZE = 8
+
+
+def dhash(image_path: ImageSource, hash_size: int = DEFAULT_HASH_SIZE) -> int:
+    """
+    差分ハッシュ（dHash）を計算する
+
+    画像を (hash_size + 1) x hash_size のグレースケールに縮小し、
+    各行で隣り合う画素の明暗（左 < 右）をビットとして並べる。
+
+    Args:
+        image_path: 画像ファイルのパスまたはメモリ上の画像
+        hash_size: ハッシュの一辺のサイズ（ビット数は hash_size ** 2）
+
+    Returns:
+        ハッシュ値
+
+    Raises:
+        ImageLoadError: 画像を読み込めなかった場合
+    """
+    width = hash_size + 1
+    pixels = grayscale_thumbnail(image_path, width, hash_size)
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """
+    2つのハッシュのハミング距離を計算する
+
+    Args:
+        a: ハッシュ値
+        b: ハッシュ値
+
+    Returns:
+        異なるビットの数
+    """
+    return bin(a ^ b).count("1")
+
+
+def format_hash(value: int, hash_size: int = DEFAULT_HASH_SIZE) -> str:
+    """ハッシュ値をレコード保存用の16進文字列に変換する"""
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def parse_hash(value: str) -> int:
+    """16進文字列のハッシュ値を整数に戻す"""
+    return int(value, 16)
+
+
+@dataclass
+class FrameFingerprint:
+    """ウィンドウごとの直前フレームの情報"""
+
+    frame_hash: int
+    text: str
+
+
+class FrameFingerprinter:
+    """
+    ウィンドウごとに直前フレームのハッシュとOCR結果を保持し、
+    ほぼ同一のフレームでOCR結果を再利用できるか判定する
+
+    使用例:
+        >>> fingerprinter = FrameFingerprinter(max_distance=4)
+        >>> frame_hash = dhash(screenshot_path)
+        >>> text = fingerprinter.lookup("Chrome", frame_hash)
+        >>> if text is None:
+        ...     text = perform_ocr(screenshot_path)
+        ...     fingerprinter.remember("Chrome", frame_hash, text)
+    """
+
+    def __init__(self, max_distance: int = 4):
+        """
+        初期化
+
+        Args:
+            max_distance: 同一フレームとみなすハミング距離の上限
+        """
+        self.max_distance = max_distance
+        self._frames: Dict[str, FrameFingerprint] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, window: str, frame_hash: int) -> Optional[str]:
+        """
+        同じウィンドウの直前フレームとほぼ同一ならそのOCR結果を返す
+
+        Args:
+            window: ウィンドウ名
+            frame_hash: 今回のフレームのハッシュ
+
+        Returns:
+            再利用できるテキスト（再利用できない場合はNone）
+        """
+        previous = self._frames.get(window)
+        if previous is not None and (
+            hamming_distance(previous.frame_hash, frame_hash) <= self.max_distance
+        ):
+            self.hits += 1
+            return previous.text
+        self.misses += 1
+        return None
+
+    def remember(self, window: str, frame_hash: int, text: str) -> None:
+        """
+        OCRを実行したフレームの情報を記録する
+
+        Args:
+            window: ウィンドウ名
+            frame_hash: フレームのハッシュ
+            text: OCR結果
+        """
+        self._frames[window] = FrameFingerprint(frame_hash=frame_hash, text=text)
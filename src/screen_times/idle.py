@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Idle Detection - 画面ロック・無操作の検出とキャプチャの間引き
+
+画面ロックや無操作の間も毎分キャプチャとOCRを行うと、同じ空の画面を記録し続ける
+ことになる。ロック状態と最後の入力からの経過時間（アイドルシグナル）と、
+フレームの差分ハッシュが変化しないことからアイドルを確定し、確定後はOCRを行わない。
+アイドルが続く間は画面の変化を確認するキャプチャの間隔を指数的に延ばし、
+アイドルが終わったら開始と終了を持つ1件のレコードとして記録する。
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Protocol, Sequence, runtime_checkable
+
+from .frame_hash import hamming_distance
+
+# begin_tick の判定
+IDLE_ACTIVE = "active"  # アイドルではない（通常どおりキャプチャとOCRを行う）
+IDLE_SKIP = "skip"  # アイドルが続いている（キャプチャしない）
+IDLE_PROBE = "probe"  # アイドルが続いている（画面の変化を確認するためにキャプチャする）
+
+# アイドルの理由（レコードの idle_reason に保存する）
+IDLE_REASON_LOCKED = "locked"  # 画面がロックされている
+IDLE_REASON_IDLE = "idle"  # 入力がなく画面も変化しない
+
+
+@dataclass
+class IdleSignal:
+    """アイドルシグナル（OSから取得できる利用状況）"""
+
+    locked: bool = False
+    # 最後のキーボード・マウス入力からの経過時間（秒、取得できない場合はNone）
+    idle_seconds: Optional[float] = None
+
+
+@runtime_checkable
+class IdleSignalProvider(Protocol):
+    """アイドルシグナルを取得するプロトコル"""
+
+    def idle_signal(self) -> IdleSignal:
+        """現在のアイドルシグナルを取得する"""
+        ...
+
+
+class QuartzIdleSignalProvider:
+    """CGSession と CGEventSource からロック状態と無操作時間を取得する"""
+
+    def idle_signal(self) -> IdleSignal:
+        """現在のアイドルシグナルを取得する"""
+        from Quartz import (
+            CGEventSourceSecondsSinceLastEventType,
+            CGSessionCopyCurrentDictionary,
+            kCGAnyInputEventType,
+            kCGEventSourceStateHIDSystemState,
+        )
+
+        session = CGSessionCopyCurrentDictionary()
+        locked = bool(session and session.get("CGSSessionScreenIsLocked", False))
+        idle_seconds = CGEventSourceSecondsSinceLastEventType(
+            kCGEventSourceStateHIDSystemState, kCGAnyInputEventType
+        )
+        return IdleSignal(locked=locked, idle_seconds=float(idle_seconds))
+
+
+class NullIdleSignalProvider:
+    """アイドルシグナルを取得できない環境用（フレームの変化だけで判定する）"""
+
+    def idle_signal(self) -> IdleSignal:
+        """常に「不明」を返す"""
+        return IdleSignal()
+
+
+class FakeIdleSignalProvider:
+    """
+    テスト用のアイドルシグナル
+
+    呼び出されるたびに signals を順に返し、最後まで行ったら最後の値を返し続ける。
+    """
+
+    def __init__(self, signals: Sequence[IdleSignal]):
+        """
+        初期化
+
+        Args:
+            signals: 順に返すアイドルシグナル
+        """
+        if not signals:
+            raise ValueError("signals must not be empty")
+        self.signals = list(signals)
+        self.calls = 0
+
+    def idle_signal(self) -> IdleSignal:
+        """次のアイドルシグナルを返す"""
+        signal = self.signals[min(self.calls, len(self.signals) - 1)]
+        self.calls += 1
+        return signal
+
+
+def default_idle_signal_provider() -> IdleSignalProvider:
+    """
+    この環境で使う既定のアイドルシグナル
+
+    Returns:
+        pyobjc の Quartz が使える場合は QuartzIdleSignalProvider、それ以外は NullIdleSignalProvider
+    """
+    try:
+        import Quartz  # noqa: F401
+    except ImportError:
+        return NullIdleSignalProvider()
+    return QuartzIdleSignalProvider()
+
+
+@dataclass
+class IdleInterval:
+    """1回分のアイドル期間"""
+
+    start: datetime
+    end: datetime
+    reason: str
+    window: str
+    ticks: int  # アイドル期間中のtick数
+    captures: int  # アイドル期間中に画面の変化を確認したキャプチャ数
+
+    def record_fields(self) -> Dict[str, Any]:
+        """JSONLレコードに追加するフィールド"""
+        return {
+            "timestamp_end": self.end.isoformat(),
+            "idle_reason": self.reason,
+            "idle_ticks": self.ticks,
+        }
+
+
+@dataclass
+class _IdleRun:
+    """進行中のアイドル期間"""
+
+    start: datetime
+    last: datetime
+    reason: str
+    window: str
+    frame_hash: Optional[int]
+    backoff_seconds: float
+    next_probe: datetime
+    ticks: int = 1
+    captures: int = 0
+
+
+class IdleDetector:
+    """
+    アイドルの確定・継続・終了を判定する
+
+    アイドルの確定:
+    - 画面がロックされている、または
+    - 最後の入力から min_idle_seconds 以上経過し（取得できない場合は問わない）、
+      差分ハッシュの変化が max_distance 以下のフレームが confirm_frames 回続いた
+
+    アイドルの終了:
+    - 画面がロックされておらず、最後の入力から min_idle_seconds 未満になった、または
+    - 画面の変化を確認するキャプチャで差分ハッシュが変化した
+
+    画面の変化を確認するキャプチャは probe_seconds の2倍から始めて、確認するたびに
+    間隔を2倍にする（max_backoff_seconds まで）。ロック中は確認しない。
+
+    使用例:
+        >>> detector = IdleDetector(QuartzIdleSignalProvider(), probe_seconds=60)
+        >>> decision = detector.begin_tick(now)
+        >>> if decision == IDLE_ACTIVE and detector.observe(now, window, dhash(image)):
+        ...     pass  # アイドルが確定したのでOCRしない
+    """
+
+    def __init__(
+        self,
+        signal_provider: Optional[IdleSignalProvider] = None,
+        probe_seconds: float = 60,
+        confirm_frames: int = 3,
+        min_idle_seconds: float = 120,
+        max_backoff_seconds: float = 900,
+        max_distance: int = 0,
+    ):
+        """
+        初期化
+
+        Args:
+            signal_provider: アイドルシグナル（Noneの場合は環境の既定）
+            probe_seconds: 画面の変化を確認する間隔の基準（通常はキャプチャ間隔）
+            confirm_frames: アイドルを確定するのに必要な変化しないフレームの数
+            min_idle_seconds: アイドルとみなす最後の入力からの経過時間（秒）
+            max_backoff_seconds: 画面の変化を確認する間隔の上限（秒）
+            max_distance: 変化していないとみなす差分ハッシュのハミング距離の上限
+        """
+        if probe_seconds <= 0:
+            raise ValueError("probe_seconds must be positive")
+        if confirm_frames < 1:
+            raise ValueError("confirm_frames must be at least 1")
+        self.signal_provider = signal_provider or default_idle_signal_provider()
+        self.probe_seconds = probe_seconds
+        self.confirm_frames = confirm_frames
+        self.min_idle_seconds = min_idle_seconds
+        self.max_backoff_seconds = max(max_backoff_seconds, probe_seconds)
+        self.max_distance = max_distance
+        self._last_hash: Optional[int] = None
+        self._unchanged_frames = 0
+        self._run: Optional[_IdleRun] = None
+        self._finished: List[IdleInterval] = []
+        # 統計情報
+        self.skipped_captures = 0
+        self.probes = 0
+
+    @property
+    def idle(self) -> bool:
+        """アイドル期間中かどうか"""
+        return self._run is not None
+
+    @property
+    def reason(self) -> Optional[str]:
+        """進行中のアイドル期間の理由（アイドルでない場合はNone）"""
+        return self._run.reason if self._run is not None else None
+
+    @property
+    def window(self) -> Optional[str]:
+        """アイドルが確定したときのウィンドウ名（アイドルでない場合はNone）"""
+        return self._run.window if self._run is not None else None
+
+    def begin_tick(self, now: datetime) -> str:
+        """
+        tickの始めにアイドルが続いているか判定する
+
+        Args:
+            now: tickの時刻
+
+        Returns:
+            IDLE_ACTIVE, IDLE_SKIP, IDLE_PROBE のいずれか
+        """
+        run = self._run
+        if run is None:
+            return IDLE_ACTIVE
+
+        signal = self._poll()
+        if signal.locked:
+            run.reason = IDLE_REASON_LOCKED
+            self._extend(run, now)
+            self.skipped_captures += 1
+            return IDLE_SKIP
+        if signal.idle_seconds is not None and signal.idle_seconds < self.min_idle_seconds:
+            self._finish()
+            return IDLE_ACTIVE
+
+        if now < run.next_probe:
+            self._extend(run, now)
+            self.skipped_captures += 1
+            return IDLE_SKIP
+        return IDLE_PROBE
+
+    def probe(self, now: datetime, frame_hash: Optional[int]) -> bool:
+        """
+        画面の変化を確認するキャプチャの結果を反映する（begin_tick が IDLE_PROBE の場合）
+
+        Args:
+            now: キャプチャの時刻
+            frame_hash: キャプチャしたフレームの差分ハッシュ（計算できない場合はNone）
+
+        Returns:
+            アイドルが続いている場合True（Falseの場合はアイドル期間が終了した）
+        """
+        run = self._run
+        if run is None:
+            return False
+        self.probes += 1
+        run.captures += 1
+        if not self._unchanged(run.frame_hash, frame_hash):
+            self._finish()
+            return False
+        self._extend(run, now)
+        run.backoff_seconds = min(run.backoff_seconds * 2, self.max_backoff_seconds)
+        run.next_probe = now + timedelta(seconds=run.backoff_seconds)
+        return True
+
+    def observe(self, now: datetime, window: str, frame_hash: Optional[int]) -> bool:
+        """
+        アイドルでないときのフレームを観測し、アイドルが確定したか判定する
+
+        Args:
+            now: キャプチャの時刻
+            window: ウィンドウ名
+            frame_hash: フレームの差分ハッシュ（計算できない場合はNone）
+
+        Returns:
+            このフレームでアイドルが確定した場合True
+        """
+        if self._run is not None:
+            return True
+
+        signal = self._poll()
+        if self._unchanged(self._last_hash, frame_hash):
+            self._unchanged_frames += 1
+        else:
+            self._unchanged_frames = 1 if frame_hash is not None else 0
+        self._last_hash = frame_hash
+
+        if signal.locked:
+            self._start(now, window, frame_hash, IDLE_REASON_LOCKED)
+            return True
+        no_input = signal.idle_seconds is None or signal.idle_seconds >= self.min_idle_seconds
+        if no_input and self._unchanged_frames >= self.confirm_frames:
+            self._start(now, window, frame_hash, IDLE_REASON_IDLE)
+            return True
+        return False
+
+    def take_finished(self) -> List[IdleInterval]:
+        """
+        終了したアイドル期間を取り出す（記録したら再び返さない）
+
+        Returns:
+            終了したアイドル期間のリスト
+        """
+        finished, self._finished = self._finished, []
+        return finished
+
+    def close(self) -> List[IdleInterval]:
+        """
+        進行中のアイドル期間を終了して、記録していないアイドル期間を取り出す（終了時に呼ぶ）
+
+        Returns:
+            終了したアイドル期間のリスト
+        """
+        if self._run is not None:
+            self._finish()
+        return self.take_finished()
+
+    def _poll(self) -> IdleSignal:
+        """アイドルシグナルを取得する（失敗した場合は「不明」）"""
+        try:
+            return self.signal_provider.idle_signal()
+        except Exception:
+            return IdleSignal()
+
+    def _unchanged(self, previous: Optional[int], current: Optional[int]) -> bool:
+        """2つのフレームの差分ハッシュが変化していないとみなせるか"""
+        if previous is None or current is None:
+            return False
+        return hamming_distance(previous, current) <= self.max_distance
+
+    def _start(self, now: datetime, window: str, frame_hash: Optional[int], reason: str) -> None:
+        """アイドル期間を開始する"""
+        backoff = min(self.probe_seconds * 2, self.max_backoff_seconds)
+        self._run = _IdleRun(
+            start=now,
+            last=now,
+            reason=reason,
+            window=window,
+            frame_hash=frame_hash,
+            backoff_seconds=backoff,
+            next_probe=now + timedelta(seconds=backoff),
+        )
+
+    def _extend(self, run: _IdleRun, now: datetime) -> None:
+        """アイドル期間をこのtickまで延ばす"""
+        run.last = now
+        run.ticks += 1
+
+    def _finish(self) -> None:
+        """進行中のアイドル期間を終了する"""
+        run = self._run
+        if run is None:
+            return
+        self._finished.append(
+            IdleInterval(
+                start=run.start,
+                end=run.last,
+                reason=run.reason,
+                window=run.window,
+                ticks=run.ticks,
+                captures=run.captures,
+            )
+        )
+        self._run = None
+        self._last_hash = None
+        self._unchanged_frames = 0
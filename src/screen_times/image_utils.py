@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+画像ユーティリティモジュール
+
+フレームハッシュや差分検出、OCR前処理に使う縮小グレースケール画像を取得・作成する。
+画像はファイルのパスか、メモリ上の画像（ImageBuffer）で受け取る。
+macOSではQuartz（pyobjc）を使用し、利用できない環境ではPillowにフォールバックする。
+"""
+
+import hashlib
+import io
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+# 左, 上, 右, 下（右と下は含まない）のピクセル座標
+Box = Tuple[int, int, int, int]
+
+# 保存形式ごとのUTI（Quartz）とPillowのフォーマット名
+IMAGE_FORMATS: Dict[str, Tuple[str, Optional[str]]] = {
+    "png": ("public.png", "PNG"),
+    "jpeg": ("public.jpeg", "JPEG"),
+    "heic": ("public.heic", None),  # Quartzのみ
+}
+
+
+class ImageLoadError(Exception):
+    """画像の読み込みに失敗した"""
+
+    pass
+
+
+class ImageBuffer:
+    """
+    メモリ上の画像
+
+    CGImage（macOS）、PIL.Image（macOS以外の環境・テスト用）、PNGのバイト列の
+    いずれかを保持し、必要になった表現を遅延して作る。キャプチャした画像を
+    ファイルに書き出さずにOCRへ渡すために使う。
+    プロセス間で受け渡す場合はPNGにエンコードしてpickleする。
+
+    使用例:
+        >>> buffer = capture_image(window_bounds)
+        >>> text = perform_ocr(buffer)
+        >>> buffer.save(screenshot_dir / "screenshot.png")  # 保存が必要な場合だけ
+    """
+
+    def __init__(
+        self, cg_image: Any = None, pil_image: Any = None, encoded: Optional[bytes] = None
+    ):
+        """
+        初期化
+
+        Args:
+            cg_image: CGImage
+            pil_image: PIL.Image
+            encoded: PNGのバイト列
+        """
+        if cg_image is None and pil_image is None and encoded is None:
+            raise ValueError("ImageBuffer requires an image")
+        self._cg_image = cg_image
+        self._pil_image = pil_image
+        self._encoded = encoded
+        self._digest: Optional[str] = None
+        # 保存先のパス（保存しない場合はNone）
+        self.path: Optional[Path] = None
+
+    @classmethod
+    def from_encoded(cls, encoded: bytes, path: Optional[Path] = None) -> "ImageBuffer":
+        """PNGのバイト列から作成する"""
+        image = cls(encoded=encoded)
+        image.path = path
+        return image
+
+    def cg_image(self) -> Any:
+        """
+        CGImageを取得する
+
+        Raises:
+            ImportError: Quartzが利用できない場合
+            ImageLoadError: デコードに失敗した場合
+        """
+        if self._cg_image is None:
+            from Cocoa import NSData
+            from Quartz import CGImageSourceCreateImageAtIndex, CGImageSourceCreateWithData
+
+            data = self.encode_png()
+            image_source = CGImageSourceCreateWithData(
+                NSData.dataWithBytes_length_(data, len(data)), None
+            )
+            cg_image = CGImageSourceCreateImageAtIndex(image_source, 0, None)
+            if not cg_image:
+                raise ImageLoadError("Failed to decode image buffer")
+            self._cg_image = cg_image
+        return self._cg_image
+
+    def pil_image(self) -> Any:
+        """
+        PIL.Imageを取得する
+
+        Raises:
+            ImageLoadError: Pillowが利用できない、またはデコードに失敗した場合
+        """
+        if self._pil_image is None:
+            try:
+                from PIL import Image
+            except ImportError as import_error:
+                raise ImageLoadError(f"No image backend available: {import_error}")
+            try:
+                image = Image.open(io.BytesIO(self.encode_png()))
+                image.load()
+            except OSError as open_error:
+                raise ImageLoadError(f"Failed to decode image buffer: {open_error}")
+            self._pil_image = image
+        return self._pil_image
+
+    def encode_png(self) -> bytes:
+        """
+        PNGにエンコードする（エンコード済みの場合はそのまま返す）
+
+        Raises:
+            ImageLoadError: エンコードに失敗した場合
+        """
+        if self._encoded is None:
+            self._encoded = self.encode("png")
+        return self._encoded
+
+    def encode(self, image_format: str = "png", quality: Optional[float] = None) -> bytes:
+        """
+        指定した形式にエンコードする
+
+        Args:
+            image_format: 保存形式（IMAGE_FORMATSのいずれか）
+            quality: 非可逆形式の品質（0.0～1.0、Noneの場合は既定値）
+
+        Returns:
+            エンコードしたバイト列
+
+        Raises:
+            ImageLoadError: 未対応の形式の場合やエンコードに失敗した場合
+        """
+        if image_format not in IMAGE_FORMATS:
+            raise ImageLoadError(f"Unsupported image format: {image_format}")
+        if image_format == "png" and self._encoded is not None:
+            return self._encoded
+        uti, pil_format = IMAGE_FORMATS[image_format]
+        if self._cg_image is None and self._pil_image is None:
+            # PNGのバイト列しかない場合（pickleから復元した場合など）はデコードしてから変換する
+            try:
+                self.cg_image()
+            except ImportError:
+                self.pil_image()
+        if self._cg_image is not None:
+            return _encode_quartz(self._cg_image, uti, quality)
+
+        if pil_format is None:
+            raise ImageLoadError(f"Unsupported image format without Quartz: {image_format}")
+        image = self._pil_image
+        options: Dict[str, Any] = {}
+        if pil_format == "JPEG":
+            image = image.convert("L" if image.mode == "L" else "RGB")
+            options["quality"] = round((0.75 if quality is None else quality) * 100)
+            options["optimize"] = True
+        output = io.BytesIO()
+        try:
+            image.save(output, format=pil_format, **options)
+        except (OSError, ValueError) as encode_error:
+            raise ImageLoadError(f"Failed to encode image: {encode_error}")
+        return output.getvalue()
+
+    def save(self, path: Path) -> Path:
+        """
+        PNGファイルとして保存する
+
+        Args:
+            path: 保存先のパス
+
+        Returns:
+            保存先のパス
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(self.encode_png())
+        self.path = path
+        return path
+
+    def digest(self) -> str:
+        """
+        画素データのハッシュ（同じ画面かの判定やOCRキャッシュのキーに使う）
+
+        Returns:
+            SHA-256の16進文字列
+        """
+        if self._digest is None:
+            if self._cg_image is not None:
+                from Quartz import CGDataProviderCopyData, CGImageGetDataProvider
+
+                pixels = bytes(CGDataProviderCopyData(CGImageGetDataProvider(self._cg_image)))
+            elif self._pil_image is not None:
+                pixels = self._pil_image.tobytes()
+            else:
+                pixels = self.pil_image().tobytes()
+            self._digest = hashlib.sha256(pixels).hexdigest()
+        return self._digest
+
+    def __reduce__(self):
+        return (ImageBuffer.from_encoded, (self.encode_png(), self.path))
+
+
+# OCRや画像処理が受け取る画像（ファイルのパスまたはメモリ上の画像）
+ImageSource = Union[Path, ImageBuffer]
+
+
+def grayscale_thumbnail(image: ImageSource, width: int, height: int) -> bytes:
+    """
+    画像を指定サイズのグレースケールに縮小して画素値を取得する
+
+    Args:
+        image: 画像ファイルのパスまたはメモリ上の画像
+        width: 縮小後の幅
+        height: 縮小後の高さ
+
+    Returns:
+        上の行から順に並んだ width * height バイトの輝度値
+
+    Raises:
+        ImageLoadError: 画像を読み込めなかった場合
+    """
+    try:
+        return _grayscale_thumbnail_quartz(image, width, height)
+    except ImportError:
+        return _grayscale_thumbnail_pillow(image, width, height)
+
+
+def image_size(image: ImageSource) -> Tuple[int, int]:
+    """
+    画像のサイズを取得する
+
+    Args:
+        image: 画像ファイルのパスまたはメモリ上の画像
+
+    Returns:
+        (幅, 高さ)
+
+    Raises:
+        ImageLoadError: 画像を読み込めなかった場合
+    """
+    try:
+        from Quartz import CGImageGetHeight, CGImageGetWidth
+    except ImportError:
+        with _open_pil(image) as img:
+            width, height = img.size
+            return (int(width), int(height))
+
+    cg_image = _load_cg_image(image)
+    return (int(CGImageGetWidth(cg_image)), int(CGImageGetHeight(cg_image)))
+
+
+def image_dpi(image: ImageSource) -> Optional[float]:
+    """
+    画像に記録されている解像度（DPI）を取得する
+
+    Args:
+        image: 画像ファイルのパスまたはメモリ上の画像
+
+    Returns:
+        横方向のDPI（記録されていない場合やメモリ上の画像の場合はNone）
+    """
+    if isinstance(image, ImageBuffer):
+        return None
+    try:
+        from Cocoa import NSURL
+        from Quartz import CGImageSourceCopyPropertiesAtIndex, CGImageSourceCreateWithURL
+    except ImportError:
+        try:
+            with _open_pil(image) as img:
+                dpi = img.info.get("dpi")
+        except ImageLoadError:
+            return None
+        return float(dpi[0]) if dpi else None
+
+    image_source = CGImageSourceCreateWithURL(NSURL.fileURLWithPath_(str(image)), None)
+    if not image_source:
+        return None
+    properties = CGImageSourceCopyPropertiesAtIndex(image_source, 0, None) or {}
+    dpi = properties.get("DPIWidth")
+    return float(dpi) if dpi else None
+
+
+def grayscale_image(pixels: bytes, width: int, height: int, box: Box) -> ImageBuffer:
+    """
+    グレースケールの画素値の一部を切り出してメモリ上の画像にする
+
+    Args:
+        pixels: 上の行から順に並んだ width * height バイトの輝度値
+        width: 幅
+        height: 高さ
+        box: 切り出す範囲
+
+    Returns:
+        メモリ上の画像
+
+    Raises:
+        ImageLoadError: 画像の作成に失敗した場合
+    """
+    try:
+        return ImageBuffer(cg_image=_grayscale_cg_image(pixels, width, height, box))
+    except ImportError:
+        pass
+
+    try:
+        from PIL import Image
+    except ImportError as import_error:
+        raise ImageLoadError(f"No image backend available: {import_error}")
+    try:
+        return ImageBuffer(pil_image=Image.frombytes("L", (width, height), pixels).crop(box))
+    except ValueError as create_error:
+        raise ImageLoadError(f"Failed to create grayscale image: {create_error}")
+
+
+def _load_cg_image(image: ImageSource):
+    """QuartzでCGImageを読み込む"""
+    if isinstance(image, ImageBuffer):
+        return image.cg_image()
+
+    from Cocoa import NSURL
+    from Quartz import CGImageSourceCreateImageAtIndex, CGImageSourceCreateWithURL
+
+    url = NSURL.fileURLWithPath_(str(image))
+    image_source = CGImageSourceCreateWithURL(url, None)
+    if not image_source:
+        raise ImageLoadError(f"Failed to create image source: {image}")
+    cg_image = CGImageSourceCreateImageAtIndex(image_source, 0, None)
+    if not cg_image:
+        raise ImageLoadError(f"Failed to get CGImage: {image}")
+    return cg_image
+
+
+@contextmanager
+def _open_pil(image: ImageSource) -> Iterator[Any]:
+    """PillowでPIL.Imageを開く（メモリ上の画像はそのまま使う）"""
+    if isinstance(image, ImageBuffer):
+        yield image.pil_image()
+        return
+
+    try:
+        from PIL import Image
+    except ImportError as import_error:
+        raise ImageLoadError(f"No image backend available: {import_error}")
+    try:
+        img = Image.open(image)
+    except OSError as open_error:
+        raise ImageLoadError(f"Failed to open image: {open_error}")
+    with img:
+        yield img
+
+
+def _grayscale_thumbnail_quartz(image: ImageSource, width: int, height: int) -> bytes:
+    """Quartzのビットマップコンテキストに縮小描画して輝度値を取得する"""
+    from Quartz import (
+        CGBitmapContextCreate,
+        CGBitmapContextCreateImage,
+        CGColorSpaceCreateDeviceGray,
+        CGContextDrawImage,
+        CGContextSetInterpolationQuality,
+        CGDataProviderCopyData,
+        CGImageGetDataProvider,
+        CGRectMake,
+        kCGImageAlphaNone,
+        kCGInterpolationMedium,
+    )
+
+    cg_image = _load_cg_image(image)
+    context = CGBitmapContextCreate(
+        None, width, height, 8, width, CGColorSpaceCreateDeviceGray(), kCGImageAlphaNone
+    )
+    if not context:
+        raise ImageLoadError("Failed to create bitmap context")
+    CGContextSetInterpolationQuality(context, kCGInterpolationMedium)
+    CGContextDrawImage(context, CGRectMake(0, 0, width, height), cg_image)
+
+    # ビットマップコンテキストのメモリは上の行から順に並んでいる
+    thumbnail = CGBitmapContextCreateImage(context)
+    data = CGDataProviderCopyData(CGImageGetDataProvider(thumbnail))
+    return bytes(data)[: width * height]
+
+
+def _grayscale_thumbnail_pillow(image: ImageSource, width: int, height: int) -> bytes:
+    """Pillowで縮小して輝度値を取得する（macOS以外の環境・テスト用）"""
+    try:
+        from PIL import Image
+    except ImportError as import_error:
+        raise ImageLoadError(f"No image backend available: {import_error}")
+
+    with _open_pil(image) as img:
+        try:
+            gray = img.convert("L").resize((width, height), Image.Resampling.BILINEAR)
+        except OSError as open_error:
+            raise ImageLoadError(f"Failed to open image: {open_error}")
+        return bytes(gray.tobytes())
+
+
+def _grayscale_cg_image(pixels: bytes, width: int, height: int, box: Box) -> Any:
+    """グレースケールの画素値からCGImageを作り、指定範囲を切り出す"""
+    from Cocoa import NSData
+    from Quartz import (
+        CGColorSpaceCreateDeviceGray,
+        CGDataProviderCreateWithCFData,
+        CGImageCreate,
+        CGImageCreateWithImageInRect,
+        CGRectMake,
+        kCGImageAlphaNone,
+        kCGRenderingIntentDefault,
+    )
+
+    provider = CGDataProviderCreateWithCFData(NSData.dataWithBytes_length_(pixels, len(pixels)))
+    cg_image = CGImageCreate(
+        width,
+        height,
+        8,
+        8,
+        width,
+        CGColorSpaceCreateDeviceGray(),
+        kCGImageAlphaNone,
+        provider,
+        None,
+        False,
+        kCGRenderingIntentDefault,
+    )
+    if not cg_image:
+        raise ImageLoadError("Failed to create grayscale image")
+    left, top, right, bottom = box
+    return CGImageCreateWithImageInRect(cg_image, CGRectMake(left, top, right - left, bottom - top))
+
+
+def _encode_quartz(cg_image: Any, uti: str, quality: Optional[float]) -> bytes:
+    """CGImageを指定した形式（UTI）にエンコードする"""
+    from Cocoa import NSMutableData
+    from Quartz import (
+        CGImageDestinationAddImage,
+        CGImageDestinationCreateWithData,
+        CGImageDestinationFinalize,
+        kCGImageDestinationLossyCompressionQuality,
+    )
+
+    data = NSMutableData.data()
+    destination = CGImageDestinationCreateWithData(data, uti, 1, None)
+    if not destination:
+        raise ImageLoadError(f"Failed to create image destination: {uti}")
+    options = {kCGImageDestinationLossyCompressionQuality: quality} if quality is not None else None
+    CGImageDestinationAddImage(destination, cg_image, options)
+    if not CGImageDestinationFinalize(destination):
+        raise ImageLoadError("Failed to encode image")
+    return bytes(data)
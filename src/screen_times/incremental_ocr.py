@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Incremental OCR - タイル単位の差分OCRモジュール
+
+フレームをタイルに分割して同じウィンドウの前回フレームと比較し、
+変化したタイル（ダーティタイル）だけをOCRする。変化していない領域は
+前回の認識結果を再利用し、読み順に並べ直して全体のテキストを組み立てる。
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .image_utils import ImageSource, grayscale_thumbnail, image_size
+from .ocr import Region, TextObservation, recognize_text
+
+# 認識関数の型: (画像パスまたはメモリ上の画像, タイムアウト秒, 認識領域) -> 認識結果
+Recognizer = Callable[[ImageSource, int, Optional[Region]], List[TextObservation]]
+
+# タイル1枚あたりの比較用サムネイルのサイズ（ピクセル）
+TILE_THUMBNAIL_SIZE = 16
+
+
+def sort_reading_order(observations: List[TextObservation]) -> List[TextObservation]:
+    """
+    認識結果を読み順（上から下、同じ行は左から右）に並べる
+
+    縦方向の中心が前の行の高さの半分以内にあるものを同じ行とみなす。
+
+    Args:
+        observations: 認識結果
+
+    Returns:
+        読み順に並べた認識結果
+    """
+    remaining = sorted(observations, key=lambda o: o.center[1])
+    ordered: List[TextObservation] = []
+    line: List[TextObservation] = []
+    line_center = 0.0
+    line_height = 0.0
+
+    for observation in remaining:
+        center_y = observation.center[1]
+        if line and abs(center_y - line_center) > line_height / 2:
+            ordered.extend(sorted(line, key=lambda o: o.bbox[0]))
+            line = []
+        if not line:
+            line_center = center_y
+            line_height = observation.bbox[3]
+        line.append(observation)
+
+    ordered.extend(sorted(line, key=lambda o: o.bbox[0]))
+    return ordered
+
+
+def join_observations(observations: List[TextObservation]) -> str:
+    """認識結果を読み順に並べてテキストにする"""
+    return "\n".join(o.text for o in sort_reading_order(observations))
+
+
+def _intersects(a: Region, b: Region) -> bool:
+    """2つの矩形が重なっているか"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+def _union(a: Region, b: Region) -> Region:
+    """2つの矩形を囲む矩形"""
+    left = min(a[0], b[0])
+    top = min(a[1], b[1])
+    right = max(a[0] + a[2], b[0] + b[2])
+    bottom = max(a[1] + a[3], b[1] + b[3])
+    return (left, top, right - left, bottom - top)
+
+
+def _clamp(region: Region) -> Region:
+    """矩形を画像内（0.0～1.0）に収める"""
+    left = max(0.0, region[0])
+    top = max(0.0, region[1])
+    right = min(1.0, region[0] + region[2])
+    bottom = min(1.0, region[1] + region[3])
+    return (left, top, max(0.0, right - left), max(0.0, bottom - top))
+
+
+@dataclass
+class IncrementalOcrResult:
+    """差分OCRの結果"""
+
+    text: str
+    full_pass: bool
+    dirty_tiles: int
+    total_tiles: int
+    ocr_area: float  # OCRに渡した領域の面積（画像全体に対する割合）
+
+
+@dataclass
+class _WindowFrame:
+    """ウィンドウごとの前回フレームの情報"""
+
+    size: Tuple[int, int]
+    thumbnail: bytes
+    observations: List[TextObservation]
+
+
+class IncrementalOcr:
+    """
+    タイル単位の差分OCR
+
+    使用例:
+        >>> incremental = IncrementalOcr(rows=8, cols=4)
+        >>> result = incremental.recognize("Terminal", screenshot_path)
+        >>> print(result.text, result.dirty_tiles, result.total_tiles)
+    """
+
+    def __init__(
+        self,
+        recognizer: Recognizer = recognize_text,
+        rows: int = 8,
+        cols: int = 4,
+        diff_threshold: float = 4.0,
+        full_pass_ratio: float = 0.5,
+        timeout_seconds: int = 30,
+    ):
+        """
+        初期化
+
+        Args:
+            recognizer: 認識関数（デフォルトはVision Framework）
+            rows: タイルの行数
+            cols: タイルの列数
+            diff_threshold: タイルをダーティとみなす平均輝度差（0～255）
+            full_pass_ratio: ダーティタイルまたはOCR領域の割合がこれを超えたら全体をOCRする
+            timeout_seconds: OCRのタイムアウト（秒）
+        """
+        if rows <= 0 or cols <= 0:
+            raise ValueError("rows and cols must be positive")
+        self.recognizer = recognizer
+        self.rows = rows
+        self.cols = cols
+        self.diff_threshold = diff_threshold
+        self.full_pass_ratio = full_pass_ratio
+        self.timeout_seconds = timeout_seconds
+        self._frames: Dict[str, _WindowFrame] = {}
+
+    @property
+    def total_tiles(self) -> int:
+        """タイルの総数"""
+        return self.rows * self.cols
+
+    def tile_region(self, row: int, col: int) -> Region:
+        """タイルの矩形（正規化座標）"""
+        return (col / self.cols, row / self.rows, 1.0 / self.cols, 1.0 / self.rows)
+
+    def recognize(self, window: str, image_path: ImageSource) -> IncrementalOcrResult:
+        """
+        同じウィンドウの前回フレームとの差分だけをOCRする
+
+        Args:
+            window: ウィンドウ名
+            image_path: 画像ファイルのパスまたはメモリ上の画像
+
+        Returns:
+            差分OCRの結果
+
+        Raises:
+            ImageLoadError: 画像を読み込めなかった場合
+        """
+        size = image_size(image_path)
+        thumbnail = grayscale_thumbnail(
+            image_path, self.cols * TILE_THUMBNAIL_SIZE, self.rows * TILE_THUMBNAIL_SIZE
+        )
+        previous = self._frames.get(window)
+
+        if previous is None or previous.size != size:
+            return self._full_pass(window, image_path, size, thumbnail)
+
+        dirty = self.dirty_tiles(previous.thumbnail, thumbnail)
+        if len(dirty) > self.total_tiles * self.full_pass_ratio:
+            return self._full_pass(window, image_path, size, thumbnail, dirty_count=len(dirty))
+
+        observations = list(previous.observations)
+        regions = self._dirty_regions(dirty, observations)
+        ocr_area = sum(region[2] * region[3] for region in regions)
+        if ocr_area > self.full_pass_ratio:
+            # 行単位に広げた結果、大部分をOCRすることになる場合は一度で全体を処理する
+            return self._full_pass(window, image_path, size, thumbnail, dirty_count=len(dirty))
+
+        for region in regions:
+            observations = [o for o in observations if not _intersects(o.bbox, region)]
+            observations.extend(self.recognizer(image_path, self.timeout_seconds, region))
+
+        self._frames[window] = _WindowFrame(size, thumbnail, observations)
+        return IncrementalOcrResult(
+            text=join_observations(observations),
+            full_pass=False,
+            dirty_tiles=len(dirty),
+            total_tiles=self.total_tiles,
+            ocr_area=ocr_area,
+        )
+
+    def dirty_tiles(self, previous: bytes, current: bytes) -> Set[Tuple[int, int]]:
+        """
+        平均輝度差がしきい値を超えたタイルを求める
+
+        Args:
+            previous: 前回フレームのサムネイル
+            current: 今回フレームのサムネイル
+
+        Returns:
+            ダーティタイルの (行, 列) の集合
+        """
+        width = self.cols * TILE_THUMBNAIL_SIZE
+        pixels_per_tile = TILE_THUMBNAIL_SIZE * TILE_THUMBNAIL_SIZE
+        dirty = set()
+        for row in range(self.rows):
+            for col in range(self.cols):
+                total = 0
+                for y in range(row * TILE_THUMBNAIL_SIZE, (row + 1) * TILE_THUMBNAIL_SIZE):
+                    start = y * width + col * TILE_THUMBNAIL_SIZE
+                    end = start + TILE_THUMBNAIL_SIZE
+                    total += sum(
+                        abs(a - b) for a, b in zip(previous[start:end], current[start:end])
+                    )
+                if total / pixels_per_tile > self.diff_threshold:
+                    dirty.add((row, col))
+        return dirty
+
+    def _dirty_regions(
+        self, dirty: Set[Tuple[int, int]], observations: List[TextObservation]
+    ) -> List[Region]:
+        """
+        ダーティタイルをOCR領域にまとめる
+
+        連続する行のダーティタイルを1つの帯にまとめ、帯にかかる前回の認識結果の
+        矩形まで広げる（タイル境界で行が切れないようにするため）。
+        """
+        dirty_rows = sorted({row for row, _ in dirty})
+        bands: List[List[int]] = []
+        for row in dirty_rows:
+            if bands and row == bands[-1][-1] + 1:
+                bands[-1].append(row)
+            else:
+                bands.append([row])
+
+        regions = []
+        for band in bands:
+            cols = [col for row, col in dirty if row in band]
+            region = _union(
+                self.tile_region(band[0], min(cols)), self.tile_region(band[-1], max(cols))
+            )
+            # 帯にかかる既存の行を含むまで広げる
+            changed = True
+            while changed:
+                changed = False
+                for observation in observations:
+                    if _intersects(observation.bbox, region):
+                        expanded = _union(region, observation.bbox)
+                        if expanded != region:
+                            region = expanded
+                            changed = True
+            regions.append(_clamp(region))
+        return regions
+
+    def _full_pass(
+        self,
+        window: str,
+        image_path: ImageSource,
+        size: Tuple[int, int],
+        thumbnail: bytes,
+        dirty_count: Optional[int] = None,
+    ) -> IncrementalOcrResult:
+        """画像全体をOCRして状態を更新する"""
+        observations = self.recognizer(image_path, self.timeout_seconds, None)
+        self._frames[window] = _WindowFrame(size, thumbnail, observations)
+        return IncrementalOcrResult(
+            text=join_observations(observations),
+            full_pass=True,
+            dirty_tiles=self.total_tiles if dirty_count is None else dirty_count,
+            total_tiles=self.total_tiles,
+            ocr_area=1.0,
+        )
@@ -7,12 +7,26 @@ JSONL Manager - JSONLファイルの管理を行うモジュール
 """
 
 import getpass
+import gzip
 import json
 import os
+import shutil
+import sys
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import IO, Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Set
 
+from .metrics import count_bytes, stage
+from .record_codec import (
+    RECORD_ENCODING_DELTA,
+    RECORD_ENCODING_FULL,
+    RECORD_ENCODINGS,
+    CompactDecoder,
+    CompactEncoder,
+)
 from .record_merger import RecordMerger
 
 DEFAULT_VAULT_PATH = (
@@ -39,13 +53,420 @@ def get_default_logs_dir() -> Path:
     return vault_path / "screenocr_logs" / username
 
 
+# 既に記録があるJSONLファイルのメタデータを書き込むサイドカーの拡張子
+# （"*.jsonl" のglobに一致しないよう、JSONLファイル名の後ろに付ける）
+METADATA_SUFFIX = ".meta"
+
+
+def get_metadata_path(filepath: Path) -> Path:
+    """
+    JSONLファイルのメタデータのサイドカーのパス（例: 2025-12-28.jsonl.meta）
+
+    Args:
+        filepath: JSONLファイルのパス
+
+    Returns:
+        サイドカーのPath
+    """
+    return filepath.with_name(filepath.name + METADATA_SUFFIX)
+
+
+def read_metadata(filepath: Path) -> List[Dict[str, Any]]:
+    """
+    JSONLファイルのメタデータを読み込む
+
+    新しいファイルの1行目のメタデータと、サイドカーに追記したメタデータを書き込んだ順に返す。
+
+    Args:
+        filepath: JSONLファイルのパス
+
+    Returns:
+        メタデータのリスト（壊れた行は読み飛ばす）
+    """
+    lines: List[str] = []
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            lines.append(f.readline())
+    except FileNotFoundError:
+        pass
+    try:
+        with open(get_metadata_path(filepath), "r", encoding="utf-8") as f:
+            lines.extend(f.readlines())
+    except FileNotFoundError:
+        pass
+
+    metadata = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(record, dict) and record.get("type") == "task_metadata":
+            metadata.append(record)
+    return metadata
+
+
+# 書き込みが終わったJSONLファイルを圧縮したファイルの拡張子（2025-12-28.jsonl.gz）
+COMPRESSED_SUFFIX = ".gz"
+
+# 最後の書き込みからこの秒数が経つまでは圧縮しない（別のプロセスが書き込み中の場合に備える）
+COMPRESS_MIN_IDLE_SECONDS = 300
+
+
+def segment_base_path(path: Path) -> Path:
+    """
+    圧縮したJSONLファイルの場合は圧縮前のパスを返す
+
+    Args:
+        path: JSONLファイル（.jsonl または .jsonl.gz）のパス
+
+    Returns:
+        .jsonl のPath
+    """
+    if path.name.endswith(COMPRESSED_SUFFIX):
+        return path.with_name(path.name[: -len(COMPRESSED_SUFFIX)])
+    return path
+
+
+def open_segment(path: Path) -> IO[str]:
+    """
+    JSONLファイルを読み込み用に開く（.jsonl.gz は展開しながら読む）
+
+    Args:
+        path: JSONLファイル（.jsonl または .jsonl.gz）のパス
+
+    Returns:
+        テキストモードのファイルオブジェクト
+    """
+    if path.name.endswith(COMPRESSED_SUFFIX):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_segment_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    JSONLファイルのレコードを通常の形式で読み込む
+
+    コンパクトな形式（record_codec）で書き込んだ行は通常の形式に戻し、
+    ウィンドウ辞書の行と壊れた行は読み飛ばす。タスクのメタデータの行はそのまま返す。
+
+    Args:
+        path: JSONLファイル（.jsonl または .jsonl.gz）のパス
+
+    Returns:
+        レコード（ファイルの順）
+    """
+    decoder = CompactDecoder()
+    with open_segment(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict):
+                continue
+            record = decoder.decode(record)
+            if record is not None:
+                yield record
+
+
+def compress_segment(path: Path) -> Optional[Path]:
+    """
+    書き込みが終わったJSONLファイルを gzip で圧縮して .jsonl.gz に置き換える
+
+    一時ファイルに書き出してから置き換えるため、途中で終了しても元のファイルは残る。
+    既に .jsonl.gz がある場合（圧縮した後に同じ名前のファイルに追記された場合）は、
+    gzipのメンバーとして後ろに追加する（展開すると続けて読める）。
+
+    Args:
+        path: JSONLファイルのパス
+
+    Returns:
+        圧縮したファイルのPath（圧縮中に書き込まれた場合は圧縮せずNone）
+    """
+    target = path.with_name(path.name + COMPRESSED_SUFFIX)
+    temp = target.with_name(target.name + ".tmp")
+    before = os.stat(path)
+    try:
+        with open(temp, "wb") as out:
+            if target.exists():
+                with open(target, "rb") as existing:
+                    shutil.copyfileobj(existing, out)
+            with (
+                open(path, "rb") as source,
+                gzip.GzipFile(
+                    filename=path.name, mode="wb", fileobj=out, mtime=int(before.st_mtime)
+                ) as compressed,
+            ):
+                shutil.copyfileobj(source, compressed)
+        after = os.stat(path)
+        if (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns):
+            temp.unlink()
+            return None
+        os.utime(temp, ns=(before.st_atime_ns, before.st_mtime_ns))
+        os.replace(temp, target)
+    except BaseException:
+        temp.unlink(missing_ok=True)
+        raise
+    path.unlink()
+    return target
+
+
+# JsonlWriter でレコードをシリアライズするエンコーダー（json.dumps のように毎回作らない）
+_RECORD_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+@dataclass
+class FlushPolicy:
+    """
+    JsonlWriter がバッファをファイルに書き出す条件
+
+    every_records 件ごと、または前回から every_seconds 秒以上経った書き込みで書き出す
+    （どちらもNoneの場合はバッファが一杯になるか閉じるまで書き出さない）。
+    """
+
+    every_records: Optional[int] = 1
+    every_seconds: Optional[float] = None
+    # 書き出すたびに fsync してディスクへの書き込みを待つ
+    fsync: bool = False
+
+
+class JsonlWriter:
+    """
+    セグメントのファイルを開いたまま追記する長寿命のJSONLライター
+
+    レコードは1回だけバイト列にシリアライズし、セグメントのサイズはメモリ上で数える。
+    書き込み先が変わったら前のセグメントを書き出して閉じる。常駐実行のように
+    同じプロセスで書き込み続ける呼び出し元向けで、終了時には close() を呼ぶ。
+
+    使用例:
+        >>> writer = JsonlWriter(FlushPolicy(every_records=10, every_seconds=30))
+        >>> writer.write(path, record)
+        >>> writer.close()
+    """
+
+    def __init__(
+        self,
+        policy: Optional[FlushPolicy] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        初期化
+
+        Args:
+            policy: 書き出す条件（Noneの場合は1件ごと）
+            clock: 単調増加する時刻関数（テスト用に差し替え可能）
+        """
+        self.policy = policy or FlushPolicy()
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._file: Optional[BinaryIO] = None
+        self._path: Optional[Path] = None
+        self._size = 0
+        self._pending = 0
+        self._last_flush = clock()
+
+    @property
+    def path(self) -> Optional[Path]:
+        """開いているセグメントのパス"""
+        return self._path
+
+    @property
+    def size(self) -> int:
+        """開いているセグメントのサイズ（まだ書き出していない分を含む）"""
+        return self._size
+
+    def is_open(self, path: Path) -> bool:
+        """
+        指定したセグメントを開いているか
+
+        Args:
+            path: セグメントのパス
+
+        Returns:
+            開いている場合はTrue
+        """
+        # Path同士の比較は要素ごとに比べるため、キャッシュされる文字列表現で比べる
+        return self._path is not None and str(self._path) == str(path)
+
+    def write(self, path: Path, record: Dict[str, Any]) -> int:
+        """
+        レコードを1行追記する
+
+        Args:
+            path: 書き込み先のセグメント
+            record: レコード
+
+        Returns:
+            書き込んだバイト数
+        """
+        data = (_RECORD_ENCODER.encode(record) + "\n").encode("utf-8")
+        self.write_lines(path, data, 1)
+        return len(data)
+
+    def write_lines(self, path: Path, data: bytes, lines: int) -> None:
+        """
+        シリアライズ済みの複数行をまとめて追記する
+
+        Args:
+            path: 書き込み先のセグメント
+            data: 改行で終わるJSONLのバイト列
+            lines: data の行数（every_records の判定に使う）
+        """
+        with self._lock:
+            handle = self._open(path)
+            handle.write(data)
+            self._size += len(data)
+            self._pending += lines
+            if self._flush_due():
+                self._flush()
+
+    def sync(self) -> None:
+        """バッファを書き出し、policy.fsync によらず fsync する"""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._flush()
+
+    def flush_if_due(self) -> None:
+        """前回の書き出しから every_seconds 以上経っていれば書き出す"""
+        with self._lock:
+            if self._pending and self._flush_due():
+                self._flush()
+
+    def flush(self) -> None:
+        """バッファをファイルに書き出す"""
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        """バッファを書き出してセグメントを閉じる"""
+        with self._lock:
+            self._close()
+
+    def _open(self, path: Path) -> BinaryIO:
+        """書き込み先のセグメントを開く（開いているものと異なる場合は閉じてから開く）"""
+        if self._file is not None and self.is_open(path):
+            return self._file
+        self._close()
+        handle = open(path, "ab")
+        self._file = handle
+        self._path = path
+        self._size = os.fstat(handle.fileno()).st_size
+        return handle
+
+    def _flush_due(self) -> bool:
+        """書き出す条件を満たしているか"""
+        policy = self.policy
+        if policy.every_records is not None and self._pending >= policy.every_records:
+            return True
+        return (
+            policy.every_seconds is not None
+            and self.clock() - self._last_flush >= policy.every_seconds
+        )
+
+    def _flush(self) -> None:
+        """バッファを書き出す（ロックを取得して呼ぶ）"""
+        if self._file is not None:
+            self._file.flush()
+            if self.policy.fsync:
+                os.fsync(self._file.fileno())
+            if os.fstat(self._file.fileno()).st_nlink == 0:
+                # 書き込み中のセグメントが削除された場合は次の書き込みで開き直す
+                self._close()
+        self._pending = 0
+        self._last_flush = self.clock()
+
+    def _close(self) -> None:
+        """セグメントを閉じる（ロックを取得して呼ぶ）"""
+        handle, self._file, self._path = self._file, None, None
+        if handle is not None:
+            try:
+                handle.flush()
+                if self.policy.fsync:
+                    os.fsync(handle.fileno())
+            finally:
+                handle.close()
+        self._size = 0
+        self._pending = 0
+
+
+@dataclass
+class JsonlRecord:
+    """JsonlManager.append_records に渡す1件分のレコード"""
+
+    timestamp: datetime
+    window: str
+    text: str
+    status: str = "normal"
+    extra: Optional[Dict[str, Any]] = None
+
+
+def _stat_signature(path: Path) -> Optional[List[int]]:
+    """ファイルが変わったことを検出するための (inode, mtime, サイズ)（ない場合はNone）"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_ino, st.st_mtime_ns, st.st_size]
+
+
+@dataclass
+class SegmentState:
+    """
+    現在書き込んでいるセグメント（JSONLファイル）の状態
+
+    logs_dir/.segment_state に保存し、次回の起動時もディレクトリを走査せずに使う。
+    ファイルの mtime・サイズが保存時と異なる場合は stat した値で更新する（ファイルは読まない）。
+    """
+
+    path: Path
+    effective_date: str  # YYYY-MM-DD
+    size: int = 0  # バイト数
+    inode: Optional[int] = None  # セグメントがまだない場合はNone
+    mtime_ns: Optional[int] = None
+    # 解決したときの .current_jsonl の (inode, mtime, サイズ)（ない場合はNone）
+    task_signature: Optional[List[int]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """保存する辞書"""
+        return {
+            "path": str(self.path),
+            "effective_date": self.effective_date,
+            "size": self.size,
+            "inode": self.inode,
+            "mtime_ns": self.mtime_ns,
+            "task_signature": self.task_signature,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SegmentState":
+        """保存した辞書から復元する（形式が異なる場合は KeyError / TypeError / ValueError）"""
+        task_signature = data.get("task_signature")
+        return cls(
+            path=Path(data["path"]),
+            effective_date=str(data["effective_date"]),
+            size=int(data.get("size", 0)),
+            inode=None if data.get("inode") is None else int(data["inode"]),
+            mtime_ns=None if data.get("mtime_ns") is None else int(data["mtime_ns"]),
+            task_signature=None if task_signature is None else [int(v) for v in task_signature],
+        )
+
+
 class JsonlManager:
     """JSONLファイルの管理を行うクラス"""
 
     # ファイルサイズの上限（100KB = 約50Kトークン）
     MAX_FILE_SIZE_BYTES = 100 * 1024  # 100KB
 
-    def __init__(self, base_dir: Optional[Path] = None, merge_threshold: Optional[float] = None):
+    def __init__(
+        self,
+        base_dir: Optional[Path] = None,
+        merge_threshold: Optional[float] = None,
+        flush_policy: Optional[FlushPolicy] = None,
+        record_encoding: str = RECORD_ENCODING_FULL,
+    ):
         """
         初期化
 
@@ -54,17 +475,37 @@ class JsonlManager:
                      Noneの場合は get_default_logs_dir() を使用
             merge_threshold: 類似レコードをマージするしきい値（0.0～1.0）
                            Noneの場合はマージを行わない
+            flush_policy: 指定した場合はセグメントを開いたままにする JsonlWriter で書き込む
+                          （終了時に close() を呼ぶこと）。Noneの場合はレコードごとに開いて閉じる
+            record_encoding: レコードの書き込み形式（RECORD_ENCODINGSのいずれか）。
+                             RECORD_ENCODING_COMPACT の場合はセグメントごとのウィンドウ辞書と
+                             短いキーで書き込み、RECORD_ENCODING_DELTA の場合はさらにテキストを
+                             同じウィンドウの直前のレコードとの差分で書き込む
+                             （読み込みは iter_segment_records を使う）
         """
+        if record_encoding not in RECORD_ENCODINGS:
+            raise ValueError(f"Unknown record encoding: {record_encoding}")
         if base_dir is None:
             self.logs_dir = get_default_logs_dir()
         else:
             self.logs_dir = base_dir / "screenocr_logs"
         self.logs_dir.mkdir(parents=True, exist_ok=True)
         self.state_file = self.logs_dir / ".current_jsonl"
+        self.segment_state_file = self.logs_dir / ".segment_state"
+        # 現在のセグメントの状態（初回の get_current_jsonl_path() で segment_state_file から読む）
+        self._segment: Optional[SegmentState] = None
+        self._segment_loaded = False
         self.merge_threshold = merge_threshold
         self.merger: Optional[RecordMerger] = None
         if merge_threshold is not None:
             self.merger = RecordMerger(threshold=merge_threshold)
+        self.writer: Optional[JsonlWriter] = None
+        if flush_policy is not None:
+            self.writer = JsonlWriter(flush_policy)
+        self.record_encoding = record_encoding
+        # コンパクトな形式で書き込む場合の、現在のセグメントのウィンドウ辞書
+        self._encoder: Optional[CompactEncoder] = None
+        self._encoder_path: Optional[str] = None
 
     def get_effective_date(self, timestamp: datetime) -> datetime:
         """
@@ -130,7 +571,11 @@ class JsonlManager:
         self, filepath: Path, description: str, timestamp: Optional[datetime] = None
     ) -> None:
         """
-        メタデータをJSONLファイルの1行目に書き込む
+        メタデータを書き込む
+
+        新しい（空の）ファイルには1行目に書き込む。既に記録があるファイルは書き換えず、
+        サイドカー（get_metadata_path()）に1行追記する。どちらも書き込み量はファイルの
+        サイズによらないため、iCloudが記録全体を再アップロードすることもない。
 
         Args:
             filepath: JSONLファイルのパス
@@ -146,22 +591,23 @@ class JsonlManager:
             "description": description,
             "effective_date": self.get_effective_date(timestamp).strftime("%Y-%m-%d"),
         }
+        line = json.dumps(metadata, ensure_ascii=False) + "\n"
 
-        # ファイルが存在する場合は既存の内容を読み込む
-        existing_lines = []
-        if filepath.exists():
-            with open(filepath, "r", encoding="utf-8") as f:
-                existing_lines = f.readlines()
-
-        # メタデータを先頭に書き込み、その後に既存の内容を追加
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, ensure_ascii=False)
-            f.write("\n")
-            for line in existing_lines:
+        with open(filepath, "a", encoding="utf-8") as f:
+            if f.tell() == 0:
                 f.write(line)
+                return
+        with open(get_metadata_path(filepath), "a", encoding="utf-8") as f:
+            f.write(line)
 
     def append_record(
-        self, filepath: Path, timestamp: datetime, window: str, text: str, status: str = "normal"
+        self,
+        filepath: Path,
+        timestamp: datetime,
+        window: str,
+        text: str,
+        status: str = "normal",
+        extra: Optional[Dict[str, Any]] = None,
     ) -> Path:
         """
         レコードをJSONLファイルに追記
@@ -175,32 +621,17 @@ class JsonlManager:
             window: ウィンドウ名
             text: OCRテキスト
             status: 状態（"normal", "sleep", "error"など）
+            extra: レコードに追加するフィールド（frame_hashなど）
 
         Returns:
             実際に書き込んだファイルのPath（常に現在のファイルパスを返す）
         """
-        # レコードサイズの警告（10KB以上の場合）
-        record_size = len(text.encode("utf-8"))
-        if record_size > 10 * 1024:  # 10KB
-            import sys
-
-            print(
-                f"Warning: Large record detected ({record_size / 1024:.1f} KB) "
-                f"in window '{window}'. This may cause frequent file splits.",
-                file=sys.stderr,
-            )
-
-        record = {
-            "timestamp": timestamp.isoformat(),
-            "window": window,
-            "text": text,
-            "text_length": len(text),
-            "status": status,
-        }
+        record = self._make_record(timestamp, window, text, status, extra)
 
         # マージが有効な場合
         if self.merger:
-            output_record = self.merger.add_record(record)
+            with stage("merge"):
+                output_record = self.merger.add_record(record)
             if output_record:
                 # マージされなかったレコードを書き込む
                 self._write_record(filepath, output_record)
@@ -209,31 +640,257 @@ class JsonlManager:
             self._write_record(filepath, record)
 
         # レコード追記後にファイルサイズをチェック
-        if filepath.exists() and filepath.stat().st_size >= self.MAX_FILE_SIZE_BYTES:
+        if self._segment_size(filepath) >= self.MAX_FILE_SIZE_BYTES:
             # マージャーがある場合はフラッシュして書き込む
             if self.merger:
                 buffered_record = self.merger.flush()
                 if buffered_record:
                     self._write_record(filepath, buffered_record)
 
-            # 次回使用する新しいファイルパスを生成
-            new_filepath = self.get_jsonl_path(timestamp=timestamp, include_time=True)
+            # 次回から新しいファイルを使用する
+            self._start_next_segment(timestamp)
 
-            # メタデータを書き込む
-            description = (
-                f"Auto-split due to file size " f"exceeding {self.MAX_FILE_SIZE_BYTES} bytes"
-            )
-            self.write_metadata(
-                new_filepath,
-                description=description,
-                timestamp=timestamp,
+        return filepath
+
+    def append_records(self, records: Iterable[JsonlRecord], fsync: bool = False) -> List[Path]:
+        """
+        複数のレコードをまとめて追記する
+
+        バックフィルや圧縮など、複数のレコードを一度に書き込む呼び出し元向け。
+        マージが有効な場合はバッチ全体を RecordMerger でまとめてマージしてから
+        1回でシリアライズし、書き込み先のファイル（実効日付とサイズの上限で分割）ごとに
+        1回だけ書き込む（fsync も1回）。バッチの途中で上限（100KB）を超えた場合は、
+        append_record と同じく超えたレコードと、その時点でマージ中だった次のレコード
+        （バッチの最後で超えた場合はマージャーのバッファ）までを現在のファイルに書き、
+        残りを新しいファイルに書く。バッチ全体をまとめてマージするため、次のレコードには
+        分割後のレコードがマージされていることがある。分割しなかった場合、マージ中の
+        最後のレコードは append_record と同じくバッファに残る。
+
+        Args:
+            records: 追記するレコード（古い順）
+            fsync: Trueの場合、ファイルごとに書き込んだ後で fsync する
+
+        Returns:
+            書き込んだファイルのPath（書き込んだ順）
+        """
+        prepared = [
+            self._make_record(r.timestamp, r.window, r.text, r.status, r.extra) for r in records
+        ]
+        if self.merger:
+            with stage("merge"):
+                outputs = self.merger.add_records(prepared)
+        else:
+            outputs = prepared
+
+        written: List[Path] = []
+        filepath: Optional[Path] = None
+        effective_date: Optional[datetime] = None
+        encoder: Optional[CompactEncoder] = None
+        lines: List[bytes] = []
+        size = 0
+        # 上限を超えたレコードのタイムスタンプ（マージ中のレコードを書くまで分割を待つ）
+        split_at: Optional[datetime] = None
+        for record in outputs:
+            timestamp = datetime.fromisoformat(record["timestamp"])
+            record_date = self.get_effective_date(timestamp)
+            if split_at is None and (filepath is None or record_date != effective_date):
+                if filepath is not None:
+                    self._write_lines(filepath, lines, fsync, written)
+                filepath = self.get_current_jsonl_path(timestamp)
+                effective_date = record_date
+                encoder = self._compact_encoder(filepath)
+                lines = []
+                size = self._segment_size(filepath)
+            assert filepath is not None
+
+            for line in self._serialize(record, encoder):
+                lines.append(line)
+                size += len(line)
+            if split_at is None and size >= self.MAX_FILE_SIZE_BYTES and self.merger:
+                # append_record と同じく、マージ中だった次のレコードまで現在のファイルに書く
+                split_at = timestamp
+            elif split_at is not None or size >= self.MAX_FILE_SIZE_BYTES:
+                # 新しいファイルの名前は append_record と同じく最後に書いたレコードの時刻にする
+                filepath = self._split_batch(filepath, lines, fsync, written, timestamp)
+                split_at = None
+                encoder = self._compact_encoder(filepath)
+                lines = []
+                size = self._segment_size(filepath)
+
+        if filepath is not None and split_at is not None and self.merger:
+            # バッチの最後で超えた場合は、append_record と同じくバッファを現在のファイルに書く
+            buffered_record = self.merger.flush()
+            if buffered_record:
+                lines.extend(self._serialize(buffered_record, encoder))
+                split_at = datetime.fromisoformat(buffered_record["timestamp"])
+            self._split_batch(filepath, lines, fsync, written, split_at)
+        elif filepath is not None:
+            self._write_lines(filepath, lines, fsync, written)
+        return written
+
+    def _split_batch(
+        self,
+        filepath: Path,
+        lines: List[bytes],
+        fsync: bool,
+        written: List[Path],
+        timestamp: datetime,
+    ) -> Path:
+        """
+        append_records で、現在のファイルに残りの行を書いてから次のセグメントに切り替える
+
+        Args:
+            filepath: 現在のJSONLファイルのパス
+            lines: 現在のファイルに書く行
+            fsync: Trueの場合、書き込んだ後で fsync する
+            written: 書き込んだファイルを追加するリスト
+            timestamp: 新しいファイルの名前に使うタイムスタンプ
+
+        Returns:
+            新しいファイルのPath
+        """
+        self._write_lines(filepath, lines, fsync, written)
+        return self._start_next_segment(timestamp)
+
+    def _make_record(
+        self,
+        timestamp: datetime,
+        window: str,
+        text: str,
+        status: str,
+        extra: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        書き込むレコードを作成する（大きすぎるレコードは警告する）
+
+        Args:
+            timestamp: タイムスタンプ
+            window: ウィンドウ名
+            text: OCRテキスト
+            status: 状態
+            extra: レコードに追加するフィールド
+
+        Returns:
+            レコード
+        """
+        # レコードサイズの警告（10KB以上の場合。UTF-8は1文字4バイト以下なので短いテキストは数えない）
+        if len(text) * 4 > 10 * 1024 and len(text.encode("utf-8")) > 10 * 1024:
+            record_size = len(text.encode("utf-8"))
+            print(
+                f"Warning: Large record detected ({record_size / 1024:.1f} KB) "
+                f"in window '{window}'. This may cause frequent file splits.",
+                file=sys.stderr,
             )
 
-            # 状態ファイルを更新（次回からこのファイルを使用）
-            effective_date = self.get_effective_date(timestamp)
-            self._set_current_task_file(new_filepath, effective_date.strftime("%Y-%m-%d"))
+        record = {
+            "timestamp": timestamp.isoformat(),
+            "window": window,
+            "text": text,
+            "text_length": len(text),
+            "status": status,
+        }
+        if extra:
+            record.update(extra)
+        return record
 
-        return filepath
+    def _start_next_segment(self, timestamp: datetime) -> Path:
+        """
+        サイズの上限を超えたため、時刻付きの新しいファイルを次の書き込み先にする
+
+        Args:
+            timestamp: 上限を超えたレコードのタイムスタンプ
+
+        Returns:
+            新しいファイルのPath
+        """
+        new_filepath = self.get_jsonl_path(timestamp=timestamp, include_time=True)
+
+        # メタデータを書き込む
+        description = f"Auto-split due to file size exceeding {self.MAX_FILE_SIZE_BYTES} bytes"
+        self.write_metadata(new_filepath, description=description, timestamp=timestamp)
+
+        # 状態ファイルを更新（次回からこのファイルを使用）
+        date_str = self.get_effective_date(timestamp).strftime("%Y-%m-%d")
+        self._set_current_task_file(new_filepath, date_str)
+        self._remember_segment(new_filepath, date_str)
+        return new_filepath
+
+    def _write_lines(
+        self, filepath: Path, lines: List[bytes], fsync: bool, written: List[Path]
+    ) -> None:
+        """
+        シリアライズ済みの行を1回で書き込む
+
+        Args:
+            filepath: JSONLファイルのパス
+            lines: 改行で終わる行のバイト列
+            fsync: Trueの場合、書き込んだ後で fsync する
+            written: 書き込んだファイルを追加するリスト
+        """
+        if not lines:
+            return
+        data = b"".join(lines)
+        if self.writer is not None:
+            self.writer.write_lines(filepath, data, len(lines))
+            if fsync:
+                self.writer.sync()
+        else:
+            with open(filepath, "ab") as f:
+                f.write(data)
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+        count_bytes(jsonl=len(data))
+        segment = self._segment_for(filepath)
+        if segment is not None:
+            segment.size += len(data)
+        if not written or written[-1] != filepath:
+            written.append(filepath)
+
+    def _compact_encoder(self, filepath: Path) -> Optional[CompactEncoder]:
+        """
+        コンパクトな形式で書き込む場合、セグメントのウィンドウ辞書（と差分の元にするテキスト）を
+        持つエンコーダーを返す
+
+        書き込み先が変わった場合は既存のセグメントから辞書を読み込み、
+        セグメントが削除されていた場合は辞書を空にする。
+
+        Args:
+            filepath: JSONLファイルのパス
+
+        Returns:
+            エンコーダー（通常の形式で書き込む場合はNone）
+        """
+        if self.record_encoding == RECORD_ENCODING_FULL:
+            return None
+        if self._encoder is None or self._encoder_path != str(filepath):
+            self._encoder = CompactEncoder(delta=self.record_encoding == RECORD_ENCODING_DELTA)
+            self._encoder_path = str(filepath)
+            try:
+                with open(filepath, "r", encoding="utf-8") as f:
+                    self._encoder.load(f)
+            except FileNotFoundError:
+                pass
+        elif not filepath.exists() and not (
+            self.writer is not None and self.writer.is_open(filepath)
+        ):
+            self._encoder.reset()
+        return self._encoder
+
+    @staticmethod
+    def _serialize(record: dict, encoder: Optional[CompactEncoder]) -> List[bytes]:
+        """
+        レコードを書き込む行にする
+
+        Args:
+            record: 書き込むレコード
+            encoder: コンパクトな形式で書き込む場合のエンコーダー
+
+        Returns:
+            改行で終わる行のバイト列（コンパクトな形式ではウィンドウ辞書の行を含む）
+        """
+        objects = [record] if encoder is None else encoder.encode(record)
+        return [(_RECORD_ENCODER.encode(obj) + "\n").encode("utf-8") for obj in objects]
 
     def _write_record(self, filepath: Path, record: dict) -> None:
         """
@@ -243,9 +900,108 @@ class JsonlManager:
             filepath: JSONLファイルのパス
             record: 書き込むレコード
         """
-        with open(filepath, "a", encoding="utf-8") as f:
-            json.dump(record, f, ensure_ascii=False)
-            f.write("\n")
+        encoder = self._compact_encoder(filepath)
+        if encoder is not None:
+            self._write_lines(filepath, self._serialize(record, encoder), False, [])
+            return
+        if self.writer is not None:
+            written = self.writer.write(filepath, record)
+        else:
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            with open(filepath, "a", encoding="utf-8") as f:
+                f.write(line)
+            written = len(line.encode("utf-8"))
+        count_bytes(jsonl=written)
+        segment = self._segment_for(filepath)
+        if segment is not None:
+            segment.size += written
+
+    def _segment_size(self, filepath: Path) -> int:
+        """
+        セグメントのサイズ（JsonlWriterで開いている場合はメモリ上で数えたサイズ）
+
+        Args:
+            filepath: JSONLファイルのパス
+
+        Returns:
+            サイズ（バイト、ファイルがない場合は0）
+        """
+        if self.writer is not None and self.writer.is_open(filepath):
+            return self.writer.size
+        segment = self._segment_for(filepath)
+        if segment is not None:
+            return segment.size
+        try:
+            return filepath.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def flush_if_due(self) -> None:
+        """JsonlWriterを使う場合、書き出す時間が来ていればバッファを書き出す"""
+        if self.writer is not None:
+            self.writer.flush_if_due()
+
+    def close(self) -> None:
+        """
+        終了処理
+
+        JsonlWriterを使う場合はバッファを書き出してセグメントを閉じ、
+        セグメントの状態（サイズ）を保存する。
+        """
+        if self.writer is not None:
+            self.writer.close()
+        self._save_segment_state()
+
+    def compress_closed_segments(self, now: Optional[datetime] = None) -> List[Path]:
+        """
+        書き込みが終わったJSONLファイルを gzip で圧縮する
+
+        サイズの上限で分割されたファイルや前日までのファイルは二度と追記されないため、
+        compress_segment() で .jsonl.gz に置き換える。現在のセグメント（このインスタンスが
+        保持しているもの、状態ファイルが指すもの、今日の最新のファイル）と、最後の書き込みから
+        COMPRESS_MIN_IDLE_SECONDS が経っていないファイルは圧縮しない。
+        クリーンアップと同じくバックグラウンドスレッドから呼ぶことを想定し、
+        このインスタンスの状態は変更しない。
+
+        Args:
+            now: 現在時刻（Noneの場合は現在時刻）
+
+        Returns:
+            圧縮したファイルのPathのリスト
+        """
+        if now is None:
+            now = datetime.now()
+
+        date_str = self.get_effective_date(now).strftime("%Y-%m-%d")
+        segments = sorted(self.logs_dir.glob("*.jsonl"))
+        # 状態ファイルがない場合に get_current_jsonl_path() が選ぶ今日の最新のファイル
+        today = [path for path in segments if path.name.startswith(date_str)]
+        active: Set[str] = {str(today[-1])} if today else set()
+        segment = self._segment
+        if segment is not None:
+            active.add(str(segment.path))
+        for state_file in (self.state_file, self.segment_state_file):
+            try:
+                with open(state_file, "r", encoding="utf-8") as f:
+                    active.add(str(json.load(f)["path"]))
+            except (OSError, ValueError, KeyError, TypeError):
+                continue
+
+        cutoff = now.timestamp() - COMPRESS_MIN_IDLE_SECONDS
+        compressed: List[Path] = []
+        for path in segments:
+            if str(path) in active:
+                continue
+            try:
+                if path.stat().st_mtime > cutoff:
+                    continue
+                target = compress_segment(path)
+            except OSError as compress_error:
+                print(f"Warning: Failed to compress {path.name}: {compress_error}", file=sys.stderr)
+                continue
+            if target is not None:
+                compressed.append(target)
+        return compressed
 
     def flush_merger(self, filepath: Path) -> None:
         """
@@ -269,6 +1025,11 @@ class JsonlManager:
         日付が変わっていたら自動的に日付ベースのファイルに切り替える。
         同じ日付のファイルが複数ある場合は、最新のファイルを返す。
 
+        解決したセグメントは SegmentState として保持し、実効日付・状態ファイル
+        （.current_jsonl）・セグメントの inode が変わらない間は、状態ファイルと
+        セグメントを stat するだけで同じパスを返す。状態ファイルの読み込みと
+        ディレクトリの走査は、状態が一致しない場合と日付が変わった場合だけ行う。
+
         Args:
             timestamp: タイムスタンプ（Noneの場合は現在時刻）
 
@@ -278,6 +1039,25 @@ class JsonlManager:
         if timestamp is None:
             timestamp = datetime.now()
 
+        date_str = self.get_effective_date(timestamp).strftime("%Y-%m-%d")
+        segment = self._cached_segment(date_str)
+        if segment is not None:
+            return segment.path
+
+        filepath = self._resolve_current_jsonl_path(timestamp)
+        self._remember_segment(filepath, date_str)
+        return filepath
+
+    def _resolve_current_jsonl_path(self, timestamp: datetime) -> Path:
+        """
+        状態ファイルとディレクトリから現在使用すべきJSONLファイルのパスを求める
+
+        Args:
+            timestamp: タイムスタンプ
+
+        Returns:
+            JSONLファイルのPath
+        """
         current_effective_date = self.get_effective_date(timestamp)
 
         # 状態ファイルから現在のタスクファイル情報を取得
@@ -309,6 +1089,109 @@ class JsonlManager:
             # ファイルがない場合は日付ベースのファイルパスを返す
             return self.get_jsonl_path(timestamp=timestamp, task_id=None, include_time=False)
 
+    def _cached_segment(self, date_str: str) -> Optional[SegmentState]:
+        """
+        保持しているセグメントの状態がまだ有効なら返す
+
+        Args:
+            date_str: 実効日付（YYYY-MM-DD形式）
+
+        Returns:
+            有効なセグメントの状態（解決し直す必要がある場合はNone）
+        """
+        if not self._segment_loaded:
+            self._segment_loaded = True
+            self._segment = self._load_segment_state()
+        segment = self._segment
+        if segment is None or segment.effective_date != date_str:
+            return None
+        if segment.task_signature != _stat_signature(self.state_file):
+            return None
+        try:
+            st = os.stat(segment.path)
+        except FileNotFoundError:
+            # まだ作成していないセグメントはそのまま使い、削除された場合は解決し直す
+            return segment if segment.inode is None else None
+        if segment.inode is not None and st.st_ino != segment.inode:
+            return None
+        segment.inode = st.st_ino
+        if self.writer is None or not self.writer.is_open(segment.path):
+            # 他のプロセスが書き込んだ場合などはファイルのサイズに合わせる
+            segment.size = st.st_size
+        return segment
+
+    def _remember_segment(self, filepath: Path, date_str: str) -> None:
+        """
+        解決したセグメントの状態を保持して保存する
+
+        Args:
+            filepath: JSONLファイルのパス
+            date_str: 実効日付（YYYY-MM-DD形式）
+        """
+        if self.writer is not None and self.writer.is_open(filepath):
+            self.writer.flush()
+        segment = SegmentState(
+            path=filepath,
+            effective_date=date_str,
+            task_signature=_stat_signature(self.state_file),
+        )
+        try:
+            st = os.stat(filepath)
+        except FileNotFoundError:
+            pass
+        else:
+            segment.inode = st.st_ino
+            segment.size = st.st_size
+        self._segment = segment
+        self._save_segment_state()
+
+    def _load_segment_state(self) -> Optional[SegmentState]:
+        """
+        保存したセグメントの状態を読み込む
+
+        セグメントの inode が異なる場合は使わず、mtime・サイズは現在のファイルに合わせる。
+        状態は close() と解決し直したときにだけ保存するため、close() しない1回ごとの実行
+        （launchd）では保存時より大きくなっているのが普通で、stat だけで済ませる。
+
+        Returns:
+            セグメントの状態（ない場合や使えない場合はNone）
+        """
+        try:
+            with open(self.segment_state_file, "r", encoding="utf-8") as f:
+                segment = SegmentState.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+        signature = _stat_signature(segment.path)
+        if signature is None:
+            return segment if segment.inode is None else None
+        inode, mtime_ns, size = signature
+        if segment.inode is not None and inode != segment.inode:
+            return None
+        segment.inode, segment.mtime_ns, segment.size = inode, mtime_ns, size
+        return segment
+
+    def _save_segment_state(self) -> None:
+        """セグメントの状態を保存する（失敗しても次回の起動時に解決し直すだけなので無視する）"""
+        segment = self._segment
+        if segment is None:
+            return
+        signature = _stat_signature(segment.path)
+        segment.mtime_ns = signature[1] if signature is not None else None
+        temp_file = self.segment_state_file.with_name(self.segment_state_file.name + ".tmp")
+        try:
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(segment.to_dict(), f, ensure_ascii=False)
+            os.replace(temp_file, self.segment_state_file)
+        except OSError as save_error:
+            print(f"Warning: Failed to save segment state: {save_error}", file=sys.stderr)
+
+    def _segment_for(self, filepath: Path) -> Optional[SegmentState]:
+        """保持しているセグメントが filepath の場合はその状態を返す"""
+        segment = self._segment
+        if segment is not None and (segment.path is filepath or str(segment.path) == str(filepath)):
+            return segment
+        return None
+
     def _get_current_task_file(self) -> Optional[dict]:
         """
         状態ファイルから現在のタスクファイル情報を取得
@@ -335,6 +1218,7 @@ class JsonlManager:
             effective_date: 実効日付（YYYY-MM-DD形式）
         """
         task_info = {"path": str(filepath), "effective_date": effective_date}
+        self._segment = None
 
         with open(self.state_file, "w", encoding="utf-8") as f:
             json.dump(task_info, f, ensure_ascii=False)
@@ -343,5 +1227,6 @@ class JsonlManager:
         """
         状態ファイルをクリア（日付ベースのファイルに戻る）
         """
+        self._segment = None
         if self.state_file.exists():
             self.state_file.unlink()
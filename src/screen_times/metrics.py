@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Metrics - tickごとの処理段階の計測と記録
+
+1回のtickを処理段階（ウィンドウ取得・キャプチャ・前処理・OCR・スリープ検出・
+マージ・書き込み）ごとの経過時間とCPU時間、書き込んだ画像とJSONLのバイト数に
+分解し、1tick1行のコンパクトなJSONLとしてローテーションするファイルに追記する。
+OCRワーカーのタイムアウトや再起動などの出来事も、起きたtickの回数として記録する。
+常駐モードでは前回のtickからの実行間隔も記録し、適応的な間隔の推移を確認できる。
+計測はスレッドごとの「現在のtick」に記録するため、パイプラインのように
+ステージが別スレッドで動く場合も各ワーカーがジョブのtickを有効にすればよい。
+"""
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# 計測する処理段階（表示順）
+STAGES = ("window", "capture", "preprocess", "ocr", "sleep", "merge", "write")
+
+# 表示するパーセンタイル
+PERCENTILES = (50, 95, 99)
+
+# 回数を記録する出来事 → 表示名（表示順）
+EVENTS = {
+    "ocr_timeouts": "タイムアウト",
+    "ocr_errors": "エラー",
+    "ocr_crashes": "異常終了",
+    "ocr_restarts": "再起動",
+    "ocr_recycled": "入れ替え",
+}
+
+METRICS_FILENAME = "metrics.jsonl"
+ROTATED_METRICS_FILENAME = "metrics.1.jsonl"
+
+
+@dataclass
+class TickMetrics:
+    """1回のtickの計測結果"""
+
+    timestamp: datetime
+    wall: Dict[str, float] = field(default_factory=dict)  # 処理段階 → 経過時間（秒）
+    cpu: Dict[str, float] = field(default_factory=dict)  # 処理段階 → CPU時間（秒）
+    image_bytes: int = 0  # tick中に書き込んだスクリーンショットのバイト数
+    jsonl_bytes: int = 0  # tick中にJSONLに書き込んだバイト数
+    events: Dict[str, int] = field(default_factory=dict)  # 出来事 → 回数（EVENTS）
+    interval_seconds: Optional[float] = None  # 前回のtickからの実行間隔（常駐モードのみ）
+
+    def add(self, stage_name: str, wall_seconds: float, cpu_seconds: float) -> None:
+        """処理段階の時間を加算する（同じtickで複数回実行された場合は合計する）"""
+        self.wall[stage_name] = self.wall.get(stage_name, 0.0) + wall_seconds
+        self.cpu[stage_name] = self.cpu.get(stage_name, 0.0) + cpu_seconds
+
+    def to_record(self) -> Dict[str, Any]:
+        """
+        メトリクスファイルの1行分のレコード
+
+        キーを短くし、時間はミリ秒に丸める:
+        {"t": エポック秒, "s": {処理段階: [経過ms, CPUms]}, "ib": 画像バイト数, "jb": JSONLバイト数}
+        出来事があったtickだけ "ev": {出来事: 回数} を、
+        実行間隔が分かるtickだけ "iv": 間隔（秒）を加える
+        """
+        record: Dict[str, Any] = {
+            "t": round(self.timestamp.timestamp(), 1),
+            "s": {
+                name: [round(seconds * 1000, 2), round(self.cpu.get(name, 0.0) * 1000, 2)]
+                for name, seconds in self.wall.items()
+            },
+            "ib": self.image_bytes,
+            "jb": self.jsonl_bytes,
+        }
+        if self.events:
+            record["ev"] = dict(self.events)
+        if self.interval_seconds is not None:
+            record["iv"] = round(self.interval_seconds, 1)
+        return record
+
+
+_local = threading.local()
+
+
+def current_metrics() -> Optional[TickMetrics]:
+    """このスレッドで有効なtickの計測結果（計測していない場合はNone）"""
+    return getattr(_local, "metrics", None)
+
+
+@contextmanager
+def activate(metrics: Optional[TickMetrics]) -> Iterator[Optional[TickMetrics]]:
+    """
+    このスレッドで計測結果を記録するtickを有効にする
+
+    Args:
+        metrics: 記録先（Noneの場合は計測しない）
+    """
+    previous = (getattr(_local, "metrics", None), getattr(_local, "stack", None))
+    _local.metrics = metrics
+    _local.stack = []
+    try:
+        yield metrics
+    finally:
+        _local.metrics, _local.stack = previous
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    処理段階の経過時間とCPU時間を計測する
+
+    入れ子になった処理段階の時間は内側の段階にだけ計上する（外側からは差し引く）ため、
+    各段階の時間を合計してもtick全体の時間を超えない。CPU時間はこのスレッドの分だけで、
+    OCRワーカープロセスのCPU時間は含まない。
+
+    Args:
+        name: 処理段階の名前（STAGESのいずれか）
+    """
+    metrics = current_metrics()
+    if metrics is None:
+        yield
+        return
+    stack: List[List[float]] = _local.stack
+    children = [0.0, 0.0]  # 内側の段階の経過時間とCPU時間
+    stack.append(children)
+    wall_started = time.perf_counter()
+    cpu_started = time.thread_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_started
+        cpu = time.thread_time() - cpu_started
+        stack.pop()
+        metrics.add(name, max(wall - children[0], 0.0), max(cpu - children[1], 0.0))
+        if stack:
+            stack[-1][0] += wall
+            stack[-1][1] += cpu
+
+
+def count_bytes(image: int = 0, jsonl: int = 0) -> None:
+    """
+    このスレッドで有効なtickに書き込んだバイト数を加算する（計測していない場合は何もしない）
+
+    Args:
+        image: スクリーンショットのバイト数
+        jsonl: JSONLのバイト数
+    """
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.image_bytes += image
+        metrics.jsonl_bytes += jsonl
+
+
+def count_event(name: str, count: int = 1) -> None:
+    """
+    このスレッドで有効なtickに出来事の回数を加算する（計測していない場合は何もしない）
+
+    Args:
+        name: 出来事の名前（EVENTSのいずれか）
+        count: 回数
+    """
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.events[name] = metrics.events.get(name, 0) + count
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """
+    最近傍順位法によるパーセンタイル
+
+    Args:
+        values: 値（空でないこと）
+        q: パーセンタイル（0～100）
+
+    Returns:
+        パーセンタイルの値
+    """
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class StageSummary:
+    """処理段階ごとの集計（ミリ秒）"""
+
+    count: int
+    wall: Dict[int, float]  # パーセンタイル → 経過時間
+    cpu: Dict[int, float]  # パーセンタイル → CPU時間
+
+
+@dataclass
+class MetricsSummary:
+    """ある期間のメトリクスの集計"""
+
+    ticks: int = 0
+    image_bytes: int = 0
+    jsonl_bytes: int = 0
+    stages: Dict[str, StageSummary] = field(default_factory=dict)
+    events: Dict[str, int] = field(default_factory=dict)  # 出来事 → 期間中の回数
+    intervals: List[Tuple[float, float]] = field(default_factory=list)  # (エポック秒, 実行間隔)
+
+    def format_intervals(self, bucket_seconds: float) -> str:
+        """
+        一定時間ごとの平均実行間隔を1行にまとめる（記録がない場合は空文字列）
+
+        Args:
+            bucket_seconds: 集計する時間の幅（秒）
+        """
+        buckets: Dict[float, List[float]] = {}
+        for epoch, interval in self.intervals:
+            buckets.setdefault(epoch - epoch % bucket_seconds, []).append(interval)
+        return ", ".join(
+            f"{datetime.fromtimestamp(start):%H:%M} {sum(values) / len(values):.0f}s"
+            for start, values in sorted(buckets.items())
+        )
+
+    def format_events(self) -> str:
+        """出来事の回数を1行にまとめる（何もなかった場合は空文字列）"""
+        names = [name for name in EVENTS if self.events.get(name)]
+        names += sorted(name for name in self.events if name not in EVENTS and self.events[name])
+        return ", ".join(f"{EVENTS.get(name, name)} {self.events[name]}" for name in names)
+
+    def format_lines(self) -> List[str]:
+        """処理段階ごとのパーセンタイルの表（1行ずつ）"""
+        header = " / ".join(f"p{q}" for q in PERCENTILES)
+        lines = [f"{'stage':<11} {'wall ms ' + header:>28} {'cpu ms ' + header:>28}"]
+        names = [name for name in STAGES if name in self.stages]
+        names += sorted(name for name in self.stages if name not in STAGES)
+        for name in names:
+            summary = self.stages[name]
+            wall = " / ".join(f"{summary.wall[q]:.1f}" for q in PERCENTILES)
+            cpu = " / ".join(f"{summary.cpu[q]:.1f}" for q in PERCENTILES)
+            lines.append(f"{name:<11} {wall:>28} {cpu:>28}")
+        return lines
+
+
+def summarize(records: Sequence[Dict[str, Any]]) -> MetricsSummary:
+    """
+    メトリクスファイルのレコードを集計する
+
+    処理段階のパーセンタイルは、その段階を実行したtickだけを対象にする。
+
+    Args:
+        records: MetricsLog.read() が返すレコード
+
+    Returns:
+        集計結果
+    """
+    summary = MetricsSummary()
+    wall: Dict[str, List[float]] = {}
+    cpu: Dict[str, List[float]] = {}
+    for record in records:
+        summary.ticks += 1
+        summary.image_bytes += int(record.get("ib", 0))
+        summary.jsonl_bytes += int(record.get("jb", 0))
+        for name, count in record.get("ev", {}).items():
+            summary.events[name] = summary.events.get(name, 0) + int(count)
+        if "iv" in record:
+            summary.intervals.append((float(record["t"]), float(record["iv"])))
+        for name, (wall_ms, cpu_ms) in record.get("s", {}).items():
+            wall.setdefault(name, []).append(wall_ms)
+            cpu.setdefault(name, []).append(cpu_ms)
+    for name, values in wall.items():
+        summary.stages[name] = StageSummary(
+            count=len(values),
+            wall={q: percentile(values, q) for q in PERCENTILES},
+            cpu={q: percentile(cpu[name], q) for q in PERCENTILES},
+        )
+    return summary
+
+
+class MetricsLog:
+    """
+    tickのメトリクスを追記するローテーション付きのファイル
+
+    directory/metrics.jsonl に1tick1行で追記し、max_bytes を超えたら
+    metrics.1.jsonl に移して新しいファイルを始める（古い方は上書きする）。
+    1分間隔なら1日あたり200KB程度のため、既定の上限で直近1日以上を保持できる。
+
+    使用例:
+        >>> log = MetricsLog(Path("/tmp/screen-times/metrics"))
+        >>> log.append(tick_metrics)
+        >>> summary = summarize(log.read(datetime.now() - timedelta(hours=1)))
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = 1024 * 1024):
+        """
+        初期化
+
+        Args:
+            directory: メトリクスファイルを保存するディレクトリ
+            max_bytes: ローテーションするファイルサイズ（バイト）
+        """
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.path = directory / METRICS_FILENAME
+        self.rotated_path = directory / ROTATED_METRICS_FILENAME
+        self._lock = threading.Lock()
+
+    def append(self, metrics: TickMetrics) -> None:
+        """
+        1tick分のメトリクスを追記する
+
+        Args:
+            metrics: tickの計測結果
+        """
+        line = json.dumps(metrics.to_record(), separators=(",", ":")) + "\n"
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            try:
+                if self.path.stat().st_size >= self.max_bytes:
+                    self.path.replace(self.rotated_path)
+            except FileNotFoundError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def read(self, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        メトリクスを古い順に読み込む（壊れた行は読み飛ばす）
+
+        Args:
+            since: この時刻以降のtickだけを返す（Noneの場合はすべて）
+
+        Returns:
+            レコードのリスト
+        """
+        cutoff = since.timestamp() if since is not None else None
+        records: List[Dict[str, Any]] = []
+        for path in (self.rotated_path, self.path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                continue
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(record, dict) or "t" not in record:
+                    continue
+                if cutoff is None or record["t"] >= cutoff:
+                    records.append(record)
+        return records
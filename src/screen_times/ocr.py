@@ -7,7 +7,39 @@ Vision FrameworkでOCR処理を実行
 
 import signal
 import sys
-from pathlib import Path
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from .image_utils import ImageLoadError, ImageSource, _load_cg_image
+
+# 認識言語
+RECOGNITION_LANGUAGES = ["ja-JP", "en-US"]
+
+# 認識レベル
+RECOGNITION_LEVEL_FAST = "fast"
+RECOGNITION_LEVEL_ACCURATE = "accurate"
+
+# 高速モードの認識言語（Visionの高速モードは日本語に対応していないため英語のみ）
+FAST_RECOGNITION_LANGUAGES = ["en-US"]
+
+
+def recognition_settings(level: str = RECOGNITION_LEVEL_ACCURATE) -> str:
+    """
+    認識設定の識別子を返す（設定を変えた場合はOCRキャッシュが無効になるよう更新する）
+
+    Args:
+        level: 認識レベル（"fast" または "accurate"）
+
+    Returns:
+        認識設定の識別子
+    """
+    if level == RECOGNITION_LEVEL_FAST:
+        return "vision:fast:" + ",".join(FAST_RECOGNITION_LANGUAGES)
+    return "vision:accurate:" + ",".join(RECOGNITION_LANGUAGES) + ":correction"
+
+
+RECOGNITION_SETTINGS = recognition_settings()
 
 
 class TimeoutError(Exception):
@@ -16,93 +48,198 @@ class TimeoutError(Exception):
     pass
 
 
+class OcrError(Exception):
+    """OCRに失敗した（Vision Frameworkのエラー・画像の読み込み失敗など）
+
+    認識できるテキストがなかった場合とは区別する（失敗した結果はキャッシュしない）。
+    """
+
+    pass
+
+
+class OcrTimeoutError(Exception):
+    """OCRが期限内に終わらなかった"""
+
+    pass
+
+
 def timeout_handler(signum, frame):
     """タイムアウトハンドラ"""
     raise TimeoutError("OCR processing timeout")
 
 
-def perform_ocr(image_path: Path, timeout_seconds: int = 5) -> str:
+# 正規化座標の矩形 (x, y, width, height)。原点は画像の左上
+Region = Tuple[float, float, float, float]
+
+
+@dataclass
+class TextObservation:
+    """OCRで認識された1行分のテキスト"""
+
+    text: str
+    confidence: float
+    bbox: Region
+
+    @property
+    def center(self) -> Tuple[float, float]:
+        """矩形の中心座標"""
+        x, y, w, h = self.bbox
+        return (x + w / 2, y + h / 2)
+
+
+def perform_ocr(
+    image_path: ImageSource, timeout_seconds: int = 5, raise_errors: bool = False
+) -> str:
     """
     Vision FrameworkでOCR処理を実行
 
     Args:
-        image_path: 画像ファイルのパス
+        image_path: 画像ファイルのパスまたはメモリ上の画像
         timeout_seconds: タイムアウト時間（秒）
+        raise_errors: Trueの場合、失敗やタイムアウトを例外として伝える
+                      （Falseの場合はエラーを表示して空文字列を返す）
 
     Returns:
         認識されたテキスト
+
+    Raises:
+        OcrError: raise_errors=True でOCRに失敗した場合
+        OcrTimeoutError: raise_errors=True でタイムアウトした場合
+    """
+    try:
+        observations = recognize_text(image_path, timeout_seconds)
+    except (OcrError, OcrTimeoutError) as ocr_error:
+        if raise_errors:
+            raise
+        print(f"Error: {ocr_error}", file=sys.stderr)
+        return ""
+    return "\n".join(observation.text for observation in observations)
+
+
+def recognize_text(
+    image_path: ImageSource,
+    timeout_seconds: int = 5,
+    region: Optional[Region] = None,
+    level: str = RECOGNITION_LEVEL_ACCURATE,
+) -> List[TextObservation]:
+    """
+    Vision FrameworkでOCR処理を実行し、行ごとの認識結果を返す
+
+    Args:
+        image_path: 画像ファイルのパスまたはメモリ上の画像
+        timeout_seconds: タイムアウト時間（秒）
+        region: 認識対象の領域（正規化座標、左上原点）。Noneの場合は画像全体
+        level: 認識レベル。"fast" は言語補正なし・英語のみの高速モード
+
+    Returns:
+        認識結果のリスト（座標は画像全体に対する正規化座標、左上原点）。
+        テキストがない場合は空のリスト
+
+    Raises:
+        OcrError: pyobjcがない・画像を読み込めない・Vision Frameworkが失敗した場合
+        OcrTimeoutError: タイムアウトした場合（メインスレッドのみ）
     """
     # pyobjc imports (遅延インポート)
     try:
-        from Cocoa import NSURL
-        from Quartz import CGImageSourceCreateWithURL, CGImageSourceCreateImageAtIndex
         from Vision import (
             VNImageRequestHandler,
             VNRecognizeTextRequest,
             VNRequestTextRecognitionLevelAccurate,
+            VNRequestTextRecognitionLevelFast,
         )
     except ImportError as import_error:
-        print(f"Error: pyobjc frameworks not found: {import_error}", file=sys.stderr)
-        print("Install with: pip install -r requirements.txt", file=sys.stderr)
-        return ""
+        raise OcrError(
+            f"pyobjc frameworks not found: {import_error} "
+            "(install with: pip install -r requirements.txt)"
+        )
 
-    # タイムアウト設定
-    signal.signal(signal.SIGALRM, timeout_handler)
-    signal.alarm(timeout_seconds)
+    # タイムアウト設定（SIGALRMはメインスレッドでのみ使用可能）
+    use_alarm = threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        signal.signal(signal.SIGALRM, timeout_handler)
+        signal.alarm(timeout_seconds)
 
     try:
-        # 画像URLを作成
-        url = NSURL.fileURLWithPath_(str(image_path))
-
-        # CGImageを読み込み
-        image_source = CGImageSourceCreateWithURL(url, None)
-        if not image_source:
-            print("Error: Failed to create image source", file=sys.stderr)
-            return ""
-
-        cg_image = CGImageSourceCreateImageAtIndex(image_source, 0, None)
-        if not cg_image:
-            print("Error: Failed to get CGImage", file=sys.stderr)
-            return ""
+        # CGImageを読み込み（メモリ上の画像はそのまま使う）
+        try:
+            cg_image = _load_cg_image(image_path)
+        except ImageLoadError as load_error:
+            raise OcrError(str(load_error))
 
         # リクエスト作成
         request = VNRecognizeTextRequest.alloc().init()
 
-        # 日本語と英語を認識するように設定
-        request.setRecognitionLanguages_(["ja-JP", "en-US"])
+        if level == RECOGNITION_LEVEL_FAST:
+            # 高速モード（言語補正なし）
+            request.setRecognitionLanguages_(FAST_RECOGNITION_LANGUAGES)
+            request.setRecognitionLevel_(VNRequestTextRecognitionLevelFast)
+            request.setUsesLanguageCorrection_(False)
+        else:
+            # 日本語と英語を認識するように設定
+            request.setRecognitionLanguages_(RECOGNITION_LANGUAGES)
+
+            # 高精度モードを明示的に設定
+            request.setRecognitionLevel_(VNRequestTextRecognitionLevelAccurate)
 
-        # 高精度モードを明示的に設定
-        request.setRecognitionLevel_(VNRequestTextRecognitionLevelAccurate)
+            # 言語補正を有効化（誤認識を減らす）
+            request.setUsesLanguageCorrection_(True)
 
-        # 言語補正を有効化（誤認識を減らす）
-        request.setUsesLanguageCorrection_(True)
+        # 認識領域を設定（Visionの座標系は左下原点）
+        if region is not None:
+            x, y, w, h = region
+            request.setRegionOfInterest_(((x, 1.0 - y - h), (w, h)))
 
         # ハンドラ作成と実行
         handler = VNImageRequestHandler.alloc().initWithCGImage_options_(cg_image, {})
         success, error = handler.performRequests_error_([request], None)
 
         if not success or error:
-            print(f"Error: Vision Framework request failed: {error}", file=sys.stderr)
-            return ""
+            raise OcrError(f"Vision Framework request failed: {error}")
 
         # 結果取得
         results = request.results()
         if not results:
             print("Warning: No OCR results returned", file=sys.stderr)
-            return ""
+            return []
 
         print(f"Debug: Found {len(results)} text observations", file=sys.stderr)
 
-        # テキストを結合
-        text_lines = []
+        # 認識結果を変換
+        observations = []
         for observation in results:
             top_candidate = observation.topCandidates_(1)[0]
-            text_lines.append(top_candidate.string())
-
-        return "\n".join(text_lines)
-
+            observations.append(
+                TextObservation(
+                    text=top_candidate.string(),
+                    confidence=float(top_candidate.confidence()),
+                    bbox=_to_image_region(observation.boundingBox(), region),
+                )
+            )
+
+        return observations
+
+    except TimeoutError:
+        raise OcrTimeoutError(f"OCR did not finish within {timeout_seconds}s: {image_path}")
+    except OcrError:
+        raise
     except Exception as ocr_error:
-        print(f"Error: OCR processing failed: {ocr_error}", file=sys.stderr)
-        return ""
+        raise OcrError(f"OCR processing failed: {ocr_error}")
     finally:
-        signal.alarm(0)  # タイムアウトキャンセル
+        if use_alarm:
+            signal.alarm(0)  # タイムアウトキャンセル
+
+
+def _to_image_region(bounding_box, region: Optional[Region]) -> Region:
+    """
+    Visionの矩形（認識領域に対する正規化座標、左下原点）を
+    画像全体に対する正規化座標（左上原点）に変換する
+    """
+    ox, oy = bounding_box.origin.x, bounding_box.origin.y
+    ow, oh = bounding_box.size.width, bounding_box.size.height
+    rx, ry, rw, rh = region if region is not None else (0.0, 0.0, 1.0, 1.0)
+    return (
+        rx + ox * rw,
+        ry + (1.0 - oy - oh) * rh,
+        ow * rw,
+        oh * rh,
+    )
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+OCR Backend - 差し替え可能なOCRバックエンド
+
+ScreenOCRLoggerが使うOCR処理をプロトコルとして定義する。
+Vision Frameworkを使う本番用のバックエンド、テストやベンチマーク用の
+決定的なフェイクバックエンド、複数フレームのOCRを複数プロセスに
+振り分けるエグゼキューターを提供する。
+"""
+
+import hashlib
+import random
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Protocol, Tuple, runtime_checkable
+
+from .image_utils import ImageBuffer, ImageSource
+from .ocr import (
+    RECOGNITION_LEVEL_ACCURATE,
+    Region,
+    TextObservation,
+    recognition_settings,
+    recognize_text,
+)
+
+
+@runtime_checkable
+class OcrBackend(Protocol):
+    """
+    OCRバックエンドのプロトコル
+
+    settings はOCRキャッシュのキーに含める認識設定の識別子。
+    recognize は行ごとの認識結果を返す（座標は正規化座標、左上原点）。
+    失敗した場合は空のリストを返さず例外（OcrError など）を送出する。
+    プロセスプールで使う場合はpickle可能である必要がある。
+    """
+
+    settings: str
+
+    def recognize(
+        self, image_path: ImageSource, timeout_seconds: int, region: Optional[Region] = None
+    ) -> List[TextObservation]:
+        """画像（またはその一部の領域）のテキストを認識する"""
+        ...
+
+
+def ocr_text(backend: OcrBackend, image_path: ImageSource, timeout_seconds: int) -> str:
+    """
+    バックエンドで画像全体をOCRしてテキストを返す
+
+    Args:
+        backend: OCRバックエンド
+        image_path: 画像ファイルのパスまたはメモリ上の画像
+        timeout_seconds: タイムアウト時間（秒）
+
+    Returns:
+        認識されたテキスト（行を改行で連結したもの）
+    """
+    observations = backend.recognize(image_path, timeout_seconds, None)
+    return "\n".join(observation.text for observation in observations)
+
+
+class VisionOcrBackend:
+    """Vision Frameworkを使うOCRバックエンド"""
+
+    def __init__(self, level: str = RECOGNITION_LEVEL_ACCURATE):
+        """
+        初期化
+
+        Args:
+            level: 認識レベル（"fast" または "accurate"）
+        """
+        self.level = level
+        self.settings = recognition_settings(level)
+
+    def recognize(
+        self, image_path: ImageSource, timeout_seconds: int, region: Optional[Region] = None
+    ) -> List[TextObservation]:
+        """Vision FrameworkでOCRを実行する"""
+        return recognize_text(image_path, timeout_seconds, region, level=self.level)
+
+
+# フェイクバックエンドが生成するテキストの語彙
+_FAKE_VOCABULARY = [
+    "screen",
+    "times",
+    "ログ",
+    "記録",
+    "def",
+    "return",
+    "window",
+    "テスト",
+    "commit",
+    "merge",
+    "作業",
+    "report",
+]
+
+
+class FakeOcrBackend:
+    """
+    テスト・ベンチマーク用の決定的なOCRバックエンド
+
+    texts にファイル名が登録されていればそのテキストを返し、それ以外は
+    画像ファイルの内容（メモリ上の画像の場合は画素データ）のハッシュから
+    決まる疑似テキストを返す。
+    同じ内容の画像には常に同じ結果を返すため、キャッシュやフレームハッシュの
+    挙動を確認できる。
+
+    使用例:
+        >>> backend = FakeOcrBackend(texts={"a.png": "hello"}, delay_seconds=0.5)
+        >>> config = ScreenOCRConfig(ocr_backend=backend)
+    """
+
+    settings = "fake"
+
+    def __init__(
+        self,
+        texts: Optional[Dict[str, str]] = None,
+        lines: int = 5,
+        delay_seconds: float = 0.0,
+    ):
+        """
+        初期化
+
+        Args:
+            texts: ファイル名ごとに返すテキスト
+            lines: 疑似テキストの行数
+            delay_seconds: 1回の認識にかける時間（OCRの処理時間の模擬）
+        """
+        self.texts = dict(texts or {})
+        self.lines = lines
+        self.delay_seconds = delay_seconds
+
+    def recognize(
+        self, image_path: ImageSource, timeout_seconds: int, region: Optional[Region] = None
+    ) -> List[TextObservation]:
+        """画像に対応するテキストを行ごとの認識結果として返す"""
+        if self.delay_seconds > 0:
+            time.sleep(self.delay_seconds)
+
+        path = image_path.path if isinstance(image_path, ImageBuffer) else Path(image_path)
+        text = self.texts.get(path.name) if path is not None else None
+        if text is None:
+            text = self._generate_text(image_path)
+        rows = text.splitlines()
+        if not rows:
+            return []
+
+        height = 1.0 / len(rows)
+        observations = []
+        for index, row in enumerate(rows):
+            bbox = (0.0, index * height, 1.0, height)
+            observation = TextObservation(text=row, confidence=1.0, bbox=bbox)
+            if region is None or _contains(region, observation.center):
+                observations.append(observation)
+        return observations
+
+    def _generate_text(self, image_path: ImageSource) -> str:
+        """画像の内容から決まる疑似テキストを生成する"""
+        if isinstance(image_path, ImageBuffer):
+            digest = image_path.digest()
+        else:
+            digest = hashlib.sha256(Path(image_path).read_bytes()).hexdigest()
+        rng = random.Random(digest)
+        return "\n".join(
+            " ".join(rng.choice(_FAKE_VOCABULARY) for _ in range(rng.randint(3, 8)))
+            for _ in range(self.lines)
+        )
+
+
+def _contains(region: Region, point: Tuple[float, float]) -> bool:
+    """点が矩形に含まれるか"""
+    x, y, w, h = region
+    return x <= point[0] <= x + w and y <= point[1] <= y + h
+
+
+# ワーカープロセスで使うバックエンド（プロセスごとに1度だけ受け取る）
+_worker_backend: Optional[OcrBackend] = None
+
+
+def _init_worker(backend: OcrBackend) -> None:
+    """ワーカープロセスの初期化"""
+    global _worker_backend
+    _worker_backend = backend
+
+
+def _recognize_in_worker(
+    image_path: ImageSource, timeout_seconds: int, region: Optional[Region]
+) -> List[TextObservation]:
+    """ワーカープロセスでOCRを実行する"""
+    assert _worker_backend is not None
+    return _worker_backend.recognize(image_path, timeout_seconds, region)
+
+
+class ProcessPoolOcrExecutor:
+    """
+    OCRを複数のワーカープロセスに振り分けるエグゼキューター
+
+    バックフィルや複数ディスプレイのように複数フレームをまとめてOCRする場合に
+    全コアを使う。OcrBackendプロトコルも満たすため、ScreenOCRConfigの
+    ocr_backend にそのまま渡すこともできる。
+    pyobjcはfork後の利用が安全でないため、ワーカーはspawnで起動する。
+
+    使用例:
+        >>> with ProcessPoolOcrExecutor(VisionOcrBackend(), max_workers=4) as executor:
+        ...     texts = executor.recognize_many(screenshot_paths)
+    """
+
+    def __init__(self, backend: OcrBackend, max_workers: Optional[int] = None):
+        """
+        初期化
+
+        Args:
+            backend: ワーカープロセスで使うOCRバックエンド（pickle可能であること）
+            max_workers: ワーカープロセス数（Noneの場合はCPU数）
+        """
+        self.backend = backend
+        self.settings = backend.settings
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(backend,),
+        )
+
+    def submit(
+        self, image_path: ImageSource, timeout_seconds: int = 30, region: Optional[Region] = None
+    ) -> "Future[List[TextObservation]]":
+        """
+        OCRをワーカープロセスに投入する
+
+        Args:
+            image_path: 画像ファイルのパスまたはメモリ上の画像（PNGにエンコードして渡す）
+            timeout_seconds: タイムアウト時間（秒）
+            region: 認識対象の領域（Noneの場合は画像全体）
+
+        Returns:
+            認識結果のFuture
+        """
+        return self._pool.submit(_recognize_in_worker, image_path, timeout_seconds, region)
+
+    def recognize(
+        self, image_path: ImageSource, timeout_seconds: int, region: Optional[Region] = None
+    ) -> List[TextObservation]:
+        """ワーカープロセスでOCRを実行し、結果を待つ"""
+        return self.submit(image_path, timeout_seconds, region).result()
+
+    def recognize_many(
+        self, image_paths: Iterable[ImageSource], timeout_seconds: int = 30
+    ) -> List[str]:
+        """
+        複数の画像を並列にOCRする
+
+        Args:
+            image_paths: 画像ファイルのパス
+            timeout_seconds: 1枚あたりのタイムアウト時間（秒）
+
+        Returns:
+            画像ごとの認識テキスト（入力と同じ順序）
+        """
+        futures = [self.submit(path, timeout_seconds) for path in image_paths]
+        return [
+            "\n".join(observation.text for observation in future.result()) for future in futures
+        ]
+
+    def shutdown(self, wait: bool = True) -> None:
+        """ワーカープロセスを終了する"""
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self) -> "ProcessPoolOcrExecutor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+OCR Cache - 画像内容をキーにしたOCR結果のディスクキャッシュ
+
+同じタブに戻ったり同じ文書を開き直したりして全く同じフレームが
+再び現れた場合に、Vision FrameworkのOCRを省略する。
+キャッシュはディスクに保存されるため、launchdによる毎回の起動をまたいで有効。
+容量の上限を超えた場合は最も長く使われていないエントリから削除する（LRU）。
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .image_utils import ImageBuffer, ImageSource
+from .ocr import RECOGNITION_SETTINGS
+
+# デフォルトのキャッシュ容量（バイト）
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024  # 50MB
+
+# 容量超過時にこの割合まで削除する（削除処理の頻度を抑えるため）
+EVICTION_LOW_WATERMARK = 0.9
+
+
+class OcrCache:
+    """
+    OCR結果のディスクキャッシュ
+
+    キーは画像ファイルの内容と認識設定のハッシュ。エントリは
+    cache_dir/entries/<先頭2文字>/<キー>.json に保存し、
+    参照時に更新時刻を更新することでLRUの順序を表す。
+
+    使用例:
+        >>> cache = OcrCache(Path("/tmp/screen-times/ocr_cache"))
+        >>> key = cache.key_for(screenshot_path)
+        >>> text = cache.get(key)
+        >>> if text is None:
+        ...     text = perform_ocr(screenshot_path)
+        ...     cache.put(key, text, ocr_seconds=2.5)
+        >>> print(cache.stats())
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        settings: str = RECOGNITION_SETTINGS,
+    ):
+        """
+        初期化
+
+        Args:
+            cache_dir: キャッシュディレクトリ
+            max_bytes: キャッシュ容量の上限（バイト）
+            settings: 認識設定の識別子（キーに含める）
+        """
+        self.cache_dir = cache_dir
+        self.entries_dir = cache_dir / "entries"
+        self.stats_file = cache_dir / "stats.json"
+        self.max_bytes = max_bytes
+        self.settings = settings
+        self._stats = self._load_stats()
+
+    def key_for(self, image_path: ImageSource) -> str:
+        """
+        画像の内容と認識設定からキャッシュキーを計算する
+
+        メモリ上の画像の場合はファイルの内容の代わりに画素データのハッシュを使う。
+
+        Args:
+            image_path: 画像ファイルのパスまたはメモリ上の画像
+
+        Returns:
+            キャッシュキー（SHA-256の16進文字列）
+        """
+        digest = hashlib.sha256(self.settings.encode("utf-8"))
+        if isinstance(image_path, ImageBuffer):
+            digest.update(b"pixels:" + image_path.digest().encode("ascii"))
+            return digest.hexdigest()
+        with open(image_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        キャッシュからOCR結果を取得する
+
+        Args:
+            key: キャッシュキー
+
+        Returns:
+            OCR結果のテキスト（キャッシュにない場合はNone）
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            # LRUのために最終参照時刻として更新時刻を更新する
+            os.utime(entry_path, None)
+        except (OSError, json.JSONDecodeError):
+            self._stats["misses"] += 1
+            self._save_stats()
+            return None
+
+        self._stats["hits"] += 1
+        self._stats["saved_seconds"] += float(entry.get("ocr_seconds", 0.0))
+        self._save_stats()
+        return str(entry.get("text", ""))
+
+    def put(self, key: str, text: str, ocr_seconds: float = 0.0) -> None:
+        """
+        OCR結果をキャッシュに保存する
+
+        Args:
+            key: キャッシュキー
+            text: OCR結果のテキスト
+            ocr_seconds: OCRにかかった時間（ヒット時の節約時間として集計する）
+        """
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"text": text, "ocr_seconds": ocr_seconds}, ensure_ascii=False)
+        encoded = data.encode("utf-8")
+
+        previous_size = entry_path.stat().st_size if entry_path.exists() else 0
+        tmp_path = entry_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(encoded)
+        os.replace(tmp_path, entry_path)
+
+        self._stats["total_bytes"] += len(encoded) - previous_size
+        if self._stats["total_bytes"] > self.max_bytes:
+            self.evict()
+        self._save_stats()
+
+    def evict(self) -> int:
+        """
+        容量の上限を超えている場合、最も長く参照されていないエントリから削除する
+
+        Returns:
+            削除したエントリ数
+        """
+        entries = []
+        total = 0
+        if self.entries_dir.exists():
+            for bucket in os.scandir(self.entries_dir):
+                if not bucket.is_dir():
+                    continue
+                for entry in os.scandir(bucket.path):
+                    if not entry.name.endswith(".json"):
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        deleted = 0
+        if total > self.max_bytes:
+            target = self.max_bytes * EVICTION_LOW_WATERMARK
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+                deleted += 1
+
+        self._stats["total_bytes"] = total
+        self._stats["evictions"] += deleted
+        self._save_stats()
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        キャッシュの統計情報（起動をまたいで累積）
+
+        Returns:
+            hits, misses, hit_rate, saved_seconds, total_bytes, evictions を含む辞書
+        """
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+        }
+
+    def _entry_path(self, key: str) -> Path:
+        """キーに対応するエントリファイルのパス"""
+        return self.entries_dir / key[:2] / f"{key}.json"
+
+    def _load_stats(self) -> Dict[str, Any]:
+        """統計情報ファイルを読み込む"""
+        stats: Dict[str, Any] = {
+            "hits": 0,
+            "misses": 0,
+            "saved_seconds": 0.0,
+            "total_bytes": 0,
+            "evictions": 0,
+        }
+        try:
+            with open(self.stats_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                stats.update({k: data[k] for k in stats if k in data})
+        except (OSError, json.JSONDecodeError):
+            pass
+        return stats
+
+    def _save_stats(self) -> None:
+        """統計情報ファイルを保存する"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.stats_file, "w", encoding="utf-8") as f:
+                json.dump(self._stats, f)
+        except OSError:
+            pass
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+OCR Worker - 監視付きサブプロセスでのOCR実行
+
+SIGALRMによるタイムアウトはメインスレッドでしか使えず、Vision Frameworkの
+ネイティブ処理を確実に中断することもできない。このモジュールはOCRを
+監視付きのワーカープロセスで実行し、期限を過ぎたジョブはプロセスごと
+強制終了して次のジョブで起動し直す。pyobjcのautoreleaseによるメモリ増加に
+備え、一定数のジョブを処理した場合やRSSが上限を超えた場合もワーカーを入れ替える。
+"""
+
+import resource
+import sys
+import threading
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .image_utils import ImageBuffer, ImageSource
+from .metrics import count_event
+from .ocr import OcrTimeoutError, Region, TextObservation
+from .ocr_backend import OcrBackend, VisionOcrBackend
+
+# ワーカープロセスの起動を待つ時間（秒）。importにかかる時間を含む
+DEFAULT_STARTUP_TIMEOUT = 30.0
+
+# OCRの期限に加える猶予（秒）。プロセス間通信の遅延を吸収する
+DEADLINE_GRACE_SECONDS = 1.0
+
+
+class OcrWorkerError(Exception):
+    """OCRワーカープロセスが異常終了した"""
+
+    pass
+
+
+def _peak_rss_bytes() -> int:
+    """このプロセスのピークRSS（バイト）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOSはバイト、Linuxはキロバイト単位
+    return int(peak) if sys.platform == "darwin" else int(peak) * 1024
+
+
+def _worker_main(
+    backend: OcrBackend, conn: Connection, fast_backend: Optional[OcrBackend] = None
+) -> None:
+    """
+    ワーカープロセスのメインループ
+
+    (画像パスまたはメモリ上の画像, タイムアウト秒, 領域, 高速パスか) を受け取り、
+    高速パスの場合は fast_backend、それ以外は backend で認識して ("ok", 認識結果, RSS)、
+    ワーカー内のタイムアウト（SIGALRM）の場合は ("timeout", メッセージ, RSS)、
+    それ以外のエラーの場合は ("error", メッセージ, RSS) を返す。Noneを受け取ったら終了する。
+    """
+    conn.send(("ready", None, _peak_rss_bytes()))
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        image_path, timeout_seconds, region, fast = job
+        try:
+            job_backend = fast_backend if fast and fast_backend is not None else backend
+            observations = job_backend.recognize(image_path, timeout_seconds, region)
+            conn.send(("ok", observations, _peak_rss_bytes()))
+        except OcrTimeoutError as timeout_error:
+            conn.send(("timeout", str(timeout_error), _peak_rss_bytes()))
+        except Exception as error:
+            conn.send(("error", str(error), _peak_rss_bytes()))
+
+
+class SupervisedOcrBackend:
+    """
+    監視付きワーカープロセスでOCRを実行するバックエンド
+
+    OcrBackendプロトコルを満たすため、ScreenOCRConfigの ocr_backend に渡して使う。
+    期限切れは、ワーカー内のタイムアウト（SIGALRM）で先に中断された場合も含めて
+    OcrTimeoutError として呼び出し元に伝え、タイムアウトや
+    ワーカーの入れ替えの回数は stats() で確認できる。これらの回数は、OCRを呼び出した
+    スレッドで有効なtickのメトリクス（metrics.count_event）にも記録する。
+    fast_backend を指定した場合は、段階的OCRの高速パス（recognize_fast）も同じワーカーで
+    実行し、同じ期限と入れ替えの対象にする。
+
+    使用例:
+        >>> backend = SupervisedOcrBackend(max_jobs=200, max_rss_bytes=1024 ** 3)
+        >>> config = ScreenOCRConfig(ocr_backend=backend)
+        >>> ...
+        >>> print(backend.stats())
+        >>> backend.close()
+    """
+
+    def __init__(
+        self,
+        backend: Optional[OcrBackend] = None,
+        max_jobs: Optional[int] = 200,
+        max_rss_bytes: Optional[int] = 1024 * 1024 * 1024,
+        startup_timeout: float = DEFAULT_STARTUP_TIMEOUT,
+        fast_backend: Optional[OcrBackend] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            backend: ワーカープロセスで使うOCRバックエンド（Noneの場合はVision Framework）
+            max_jobs: この数のジョブを処理したらワーカーを入れ替える（Noneの場合は無制限）
+            max_rss_bytes: ワーカーのRSSがこれを超えたら入れ替える（Noneの場合は無制限）
+            startup_timeout: ワーカープロセスの起動を待つ時間（秒）
+            fast_backend: recognize_fast で使う高速パスのOCRバックエンド
+        """
+        self.backend = backend if backend is not None else VisionOcrBackend()
+        self.fast_backend = fast_backend
+        self.settings = self.backend.settings
+        self.max_jobs = max_jobs
+        self.max_rss_bytes = max_rss_bytes
+        self.startup_timeout = startup_timeout
+        self._context = get_context("spawn")
+        self._process: Optional[Any] = None
+        self._conn: Optional[Connection] = None
+        self._jobs_in_worker = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {
+            "jobs": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "crashes": 0,
+            "starts": 0,
+            "restarts": 0,
+            "recycled_jobs": 0,
+            "recycled_rss": 0,
+            "last_rss_bytes": 0,
+        }
+
+    def recognize(
+        self, image_path: ImageSource, timeout_seconds: int, region: Optional[Region] = None
+    ) -> List[TextObservation]:
+        """
+        ワーカープロセスでOCRを実行する
+
+        Args:
+            image_path: 画像ファイルのパスまたはメモリ上の画像（PNGにエンコードして渡す）
+            timeout_seconds: 期限（秒）。超えた場合はワーカーを強制終了する
+            region: 認識対象の領域（Noneの場合は画像全体）
+
+        Returns:
+            認識結果
+
+        Raises:
+            OcrTimeoutError: 期限内に終わらなかった、またはワーカー内でタイムアウトした場合
+            OcrWorkerError: ワーカーが異常終了した、または認識中にエラーが発生した場合
+        """
+        return self._run(image_path, timeout_seconds, region, fast=False)
+
+    def recognize_fast(
+        self, image_path: ImageSource, timeout_seconds: int, region: Optional[Region] = None
+    ) -> List[TextObservation]:
+        """
+        ワーカープロセスで fast_backend を使ってOCRを実行する（段階的OCRの高速パス）
+
+        引数・戻り値・例外は recognize と同じ。
+
+        Raises:
+            ValueError: fast_backend を指定していない場合
+        """
+        if self.fast_backend is None:
+            raise ValueError("fast_backend is not configured")
+        return self._run(image_path, timeout_seconds, region, fast=True)
+
+    def _run(
+        self,
+        image_path: ImageSource,
+        timeout_seconds: int,
+        region: Optional[Region],
+        fast: bool,
+    ) -> List[TextObservation]:
+        """ジョブをワーカーに送り、期限まで結果を待つ"""
+        with self._lock:
+            conn = self._ensure_worker()
+            self._stats["jobs"] += 1
+            self._jobs_in_worker += 1
+            try:
+                image = image_path if isinstance(image_path, ImageBuffer) else Path(image_path)
+                conn.send((image, timeout_seconds, region, fast))
+                if not conn.poll(timeout_seconds + DEADLINE_GRACE_SECONDS):
+                    self._count("timeouts", "ocr_timeouts")
+                    self._kill_worker()
+                    raise OcrTimeoutError(
+                        f"OCR did not finish within {timeout_seconds}s: {image_path}"
+                    )
+                kind, payload, rss = conn.recv()
+            except (EOFError, OSError) as worker_error:
+                self._count("crashes", "ocr_crashes")
+                self._kill_worker()
+                raise OcrWorkerError(f"OCR worker died: {worker_error}")
+
+            self._stats["last_rss_bytes"] = rss
+            self._recycle_if_needed(rss)
+            if kind == "timeout":
+                self._count("timeouts", "ocr_timeouts")
+                raise OcrTimeoutError(payload)
+            if kind == "error":
+                self._count("errors", "ocr_errors")
+                raise OcrWorkerError(f"OCR failed in worker: {payload}")
+            observations: List[TextObservation] = payload
+            return observations
+
+    def stats(self) -> Dict[str, int]:
+        """
+        ワーカーの統計情報
+
+        Returns:
+            jobs, timeouts, errors, crashes, starts, restarts,
+            recycled_jobs, recycled_rss, last_rss_bytes を含む辞書
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self) -> None:
+        """ワーカープロセスを終了する"""
+        with self._lock:
+            self._stop_worker()
+
+    def _ensure_worker(self) -> Connection:
+        """ワーカープロセスが起動していなければ起動する"""
+        if self._process is not None and self._conn is not None and self._process.is_alive():
+            return self._conn
+        if self._process is not None:
+            # 前回のワーカーが終了している（タイムアウト・異常終了・入れ替え）
+            self._kill_worker()
+
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main, args=(self.backend, child_conn, self.fast_backend), daemon=True
+        )
+        process.start()
+        child_conn.close()
+        if self._stats["starts"] > 0:
+            self._count("restarts", "ocr_restarts")
+        self._stats["starts"] += 1
+        self._process = process
+        self._conn = parent_conn
+        self._jobs_in_worker = 0
+
+        if not parent_conn.poll(self.startup_timeout):
+            self._kill_worker()
+            raise OcrWorkerError("OCR worker did not start in time")
+        try:
+            parent_conn.recv()
+        except EOFError:
+            self._kill_worker()
+            raise OcrWorkerError("OCR worker exited during startup")
+        return parent_conn
+
+    def _recycle_if_needed(self, rss: int) -> None:
+        """ジョブ数またはRSSが上限を超えたワーカーを入れ替える"""
+        if self.max_rss_bytes is not None and rss > self.max_rss_bytes:
+            self._count("recycled_rss", "ocr_recycled")
+            self._stop_worker()
+        elif self.max_jobs is not None and self._jobs_in_worker >= self.max_jobs:
+            self._count("recycled_jobs", "ocr_recycled")
+            self._stop_worker()
+
+    def _count(self, stat: str, event: str) -> None:
+        """統計情報とtickのメトリクスの回数を加算する"""
+        self._stats[stat] += 1
+        count_event(event)
+
+    def _stop_worker(self) -> None:
+        """ワーカーに終了を指示し、終わらなければ強制終了する"""
+        if self._conn is not None:
+            try:
+                self._conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        if self._process is not None:
+            self._process.join(timeout=5)
+        self._kill_worker()
+
+    def _kill_worker(self) -> None:
+        """ワーカープロセスを強制終了する"""
+        process, conn = self._process, self._conn
+        self._process = None
+        self._conn = None
+        if conn is not None:
+            conn.close()
+        if process is not None:
+            if process.is_alive():
+                process.kill()
+            process.join()
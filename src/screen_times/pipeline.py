@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Pipeline Runner - キャプチャ → OCR → 書き込みのパイプライン実行モジュール
+
+常駐モードで、キャプチャ・OCR・JSONL書き込みを別々のワーカーで実行し、
+有界キューで接続する。OCRが遅れてもキャプチャはスケジュール通りに実行され、
+キューが溢れた場合は設定されたポリシーに従ってフレームを破棄・統合する。
+アイドル検出が有効な場合、アイドル期間中のキャプチャの省略と画面の変化の確認は
+キャプチャステージで、アイドルの確定はOCRステージで行う。
+"""
+
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Generic, Optional, TypeVar
+
+from .adaptive_schedule import AdaptiveScheduler
+from .image_utils import ImageSource
+from .metrics import TickMetrics, activate
+from .resident import ResidentReport, ResidentRunner
+from .screen_ocr_logger import ScreenOCRLogger
+
+# キューが満杯のときのポリシー
+OVERFLOW_BLOCK = "block"  # 空きが出るまでキャプチャを待たせる
+OVERFLOW_DROP_NEWEST = "drop_newest"  # 新しいフレームを破棄
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # 最も古い待ちフレームを破棄
+OVERFLOW_COALESCE = "coalesce"  # 同じウィンドウの待ちフレームを新しいフレームで置き換える
+
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST, OVERFLOW_COALESCE)
+
+T = TypeVar("T")
+
+
+@dataclass
+class FrameJob:
+    """パイプラインを流れる1フレーム分のジョブ"""
+
+    timestamp: datetime
+    window_name: str
+    # 終わったアイドル期間のレコード（OCRを経ずに書き込む）の場合はNone
+    screenshot_path: Optional[ImageSource]
+    text: str = ""
+    status: str = "normal"
+    coalesced: int = 0
+    extra: Dict[str, Any] = field(default_factory=dict)
+    # 各ステージの処理段階の計測結果（書き込みステージで記録する）
+    metrics: Optional[TickMetrics] = None
+
+
+class StageQueue(Generic[T]):
+    """
+    オーバーフローポリシー付きの有界キュー
+
+    標準のqueue.Queueは満杯時にブロックか例外しか選べないため、
+    破棄・統合のポリシーを持つ専用のキューを用意する。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        policy: str = OVERFLOW_BLOCK,
+        coalesce: Optional[Callable[[T, T], Optional[T]]] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            name: ステージ名（レポート用）
+            maxsize: キューの最大長
+            policy: 満杯時のポリシー（OVERFLOW_POLICIESのいずれか）
+            coalesce: coalesceポリシーで待ちアイテムと新しいアイテムを統合する関数
+                      （統合できない場合はNoneを返す）
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.coalesce = coalesce
+        self._items: Deque[T] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        # 統計情報
+        self.max_depth = 0
+        self.enqueued = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    @property
+    def depth(self) -> int:
+        """現在のキュー長"""
+        with self._cond:
+            return len(self._items)
+
+    def put(self, item: T) -> bool:
+        """
+        アイテムを追加する
+
+        Args:
+            item: 追加するアイテム
+
+        Returns:
+            アイテムがキューに入った（または統合された）場合True、破棄された場合False
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"Queue '{self.name}' is closed")
+
+            if len(self._items) >= self.maxsize:
+                if self.policy == OVERFLOW_BLOCK:
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._cond.wait()
+                elif self.policy == OVERFLOW_DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                elif self.policy == OVERFLOW_DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                elif self.policy == OVERFLOW_COALESCE:
+                    merged = self.coalesce(self._items[-1], item) if self.coalesce else None
+                    if merged is not None:
+                        self._items[-1] = merged
+                        self.coalesced += 1
+                        self._cond.notify_all()
+                        return True
+                    self._items.popleft()
+                    self.dropped += 1
+
+            self._items.append(item)
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify_all()
+            return True
+
+    def get(self) -> Optional[T]:
+        """
+        アイテムを取り出す（空の場合は待機）
+
+        Returns:
+            アイテム（キューがクローズされ空になった場合はNone）
+        """
+        with self._cond:
+            while not self._items and not self._closed:
+                self._cond.wait()
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self) -> None:
+        """キューをクローズする（残りのアイテムは取り出し可能）"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        """キューの統計情報"""
+        with self._cond:
+            return {
+                "depth": len(self._items),
+                "max_depth": self.max_depth,
+                "maxsize": self.maxsize,
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+            }
+
+
+def coalesce_same_window(queued: FrameJob, new: FrameJob) -> Optional[FrameJob]:
+    """
+    同じウィンドウの待ちフレームを新しいフレームで置き換える
+
+    Args:
+        queued: キューで待っているフレーム
+        new: 新しくキャプチャしたフレーム
+
+    Returns:
+        統合後のフレーム（ウィンドウが異なる場合はNone）
+    """
+    if queued.window_name != new.window_name:
+        return None
+    new.coalesced = queued.coalesced + 1
+    return new
+
+
+class PipelineRunner(ResidentRunner):
+    """
+    キャプチャ・OCR・書き込みをパイプライン化した常駐ランナー
+
+    キャプチャはスケジュールに従ってメインスレッドで実行し、
+    OCRワーカーと書き込みワーカーはそれぞれ別スレッドで動作する。
+
+    使用例:
+        >>> runner = PipelineRunner(ScreenOCRLogger(), interval_seconds=60,
+        ...                         queue_size=2, overflow=OVERFLOW_COALESCE)
+        >>> runner.install_signal_handlers()
+        >>> runner.run()
+    """
+
+    def __init__(
+        self,
+        logger: ScreenOCRLogger,
+        interval_seconds: float = 60,
+        max_ticks: Optional[int] = None,
+        queue_size: int = 2,
+        overflow: str = OVERFLOW_DROP_OLDEST,
+        write_queue_size: int = 16,
+        clock: Callable[[], float] = time.monotonic,
+        scheduler: Optional[AdaptiveScheduler] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            logger: 常駐させるScreenOCRLogger
+            interval_seconds: キャプチャ間隔（秒）
+            max_ticks: 最大キャプチャ回数（Noneの場合は停止されるまで実行）
+            queue_size: OCR待ちキューの最大長
+            overflow: OCR待ちキューが満杯のときのポリシー
+            write_queue_size: 書き込み待ちキューの最大長（満杯時はブロック）
+            clock: 単調増加する時刻関数（テスト用に差し替え可能）
+            scheduler: 活動量に応じてキャプチャ間隔を調整するスケジューラ
+                       （OCRワーカーが認識結果を観測する）
+        """
+        super().__init__(logger, interval_seconds, max_ticks, clock, scheduler)
+        self.ocr_queue: StageQueue[FrameJob] = StageQueue(
+            "ocr", queue_size, overflow, coalesce=coalesce_same_window
+        )
+        self.write_queue: StageQueue[FrameJob] = StageQueue(
+            "write", write_queue_size, OVERFLOW_BLOCK
+        )
+        self.processed: Dict[str, int] = {"capture": 0, "ocr": 0, "write": 0}
+        self.failures: Dict[str, int] = {"capture": 0, "ocr": 0, "write": 0}
+        # アイドル期間中でキャプチャまたはOCRを省略したtickの数
+        self.idle_skipped: Dict[str, int] = {"capture": 0, "ocr": 0}
+        # アイドル検出はキャプチャステージとOCRステージの両方から使う
+        self._idle_lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._ocr_worker, name="screenocr-ocr", daemon=True),
+            threading.Thread(target=self._write_worker, name="screenocr-write", daemon=True),
+        ]
+
+    def run(self) -> ResidentReport:
+        """ワーカーを起動してからキャプチャループを実行する"""
+        for worker in self._workers:
+            worker.start()
+        return super().run()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        各ステージの統計情報（キュー長・処理数・失敗数）
+
+        Returns:
+            ステージ名 → 統計情報の辞書
+        """
+        return {
+            "capture": {
+                "processed": self.processed["capture"],
+                "failures": self.failures["capture"],
+                "idle_skipped": self.idle_skipped["capture"],
+            },
+            "ocr": {
+                **self.ocr_queue.stats(),
+                "processed": self.processed["ocr"],
+                "failures": self.failures["ocr"],
+                "idle_skipped": self.idle_skipped["ocr"],
+            },
+            "write": {
+                **self.write_queue.stats(),
+                "processed": self.processed["write"],
+                "failures": self.failures["write"],
+            },
+        }
+
+    def _execute_tick(self) -> bool:
+        """キャプチャステージ: ウィンドウ取得とスクリーンショットを行いOCRキューへ渡す"""
+        timestamp = datetime.now()
+        tick_metrics = TickMetrics(timestamp, interval_seconds=self.logger.tick_interval)
+        try:
+            with activate(tick_metrics):
+                if self.logger.idle_detector is not None and self._idle_tick(timestamp):
+                    self._tick_stages = dict(tick_metrics.wall)
+                    self.logger.record_metrics(tick_metrics)
+                    return True
+                window_name, window_bounds = self.logger._get_window()
+                screenshot_path = self.logger._capture(window_bounds)
+            self._tick_stages = dict(tick_metrics.wall)
+        except Exception as capture_error:
+            self.failures["capture"] += 1
+            print(f"Error: Capture failed: {capture_error}", file=sys.stderr)
+            self.logger.record_metrics(tick_metrics)
+            return False
+
+        self.processed["capture"] += 1
+        self.ocr_queue.put(FrameJob(timestamp, window_name, screenshot_path, metrics=tick_metrics))
+
+        if self.logger.config.verbose:
+            print(
+                f"[pipeline] ocr queue: {self.ocr_queue.depth}/{self.ocr_queue.maxsize} "
+                f"(dropped {self.ocr_queue.dropped}, coalesced {self.ocr_queue.coalesced}), "
+                f"write queue: {self.write_queue.depth}/{self.write_queue.maxsize}"
+            )
+        return True
+
+    def _idle_tick(self, timestamp: datetime) -> bool:
+        """
+        アイドル期間中か判定する（ScreenOCRLogger.run() の手順0と同じ）
+
+        終わったアイドル期間は書き込みキューへ渡し、書き込みワーカーで記録する。
+
+        Args:
+            timestamp: tickの時刻
+
+        Returns:
+            アイドルが続いている（このtickはOCRに渡さない）場合True
+        """
+        assert self.logger.idle_detector is not None
+        with self._idle_lock:
+            still_idle, _ = self.logger._idle_check(timestamp)
+            finished = self.logger.idle_detector.take_finished()
+            window = self.logger.idle_detector.window
+        for interval in finished:
+            self.write_queue.put(
+                FrameJob(
+                    interval.start,
+                    interval.window,
+                    None,
+                    status="sleep",
+                    extra=interval.record_fields(),
+                )
+            )
+        if not still_idle:
+            return False
+        self.idle_skipped["capture"] += 1
+        if self.scheduler is not None:
+            self.scheduler.observe(window or "Unknown", "", None, "sleep")
+        if self.logger.config.verbose:
+            print(f"[pipeline] idle: capture skipped ({self.idle_skipped['capture']} tick(s))")
+        return True
+
+    def _ocr_worker(self) -> None:
+        """OCRステージ: OCRとスリープ状態検出を行い書き込みキューへ渡す"""
+        while True:
+            job = self.ocr_queue.get()
+            if job is None:
+                break
+            assert job.screenshot_path is not None
+            try:
+                with activate(job.metrics):
+                    with self._idle_lock:
+                        idle = self.logger._confirm_idle(
+                            job.timestamp, job.window_name, job.screenshot_path
+                        )
+                    if idle:
+                        # アイドルが確定したフレームはOCRせず、アイドル期間の終了時に記録する
+                        self.idle_skipped["ocr"] += 1
+                        if self.scheduler is not None:
+                            self.scheduler.observe(job.window_name, "", None, "sleep")
+                        if job.metrics is not None:
+                            self.logger.record_metrics(job.metrics)
+                        continue
+                    recognition = self.logger._recognize(job.window_name, job.screenshot_path)
+                    job.text = recognition.text
+                    job.extra = recognition.record_fields()
+                    job.status = self.logger._status_for(recognition, job.screenshot_path)
+                    self.logger._archive_screenshot(job.screenshot_path, job.timestamp)
+                if self.scheduler is not None:
+                    self.scheduler.observe(
+                        job.window_name, job.text, job.extra.get("frame_hash"), job.status
+                    )
+            except Exception as ocr_error:
+                # run()と同様、OCRに失敗したフレームは記録しない
+                self.failures["ocr"] += 1
+                print(f"Error: OCR failed: {ocr_error}", file=sys.stderr)
+                if job.metrics is not None:
+                    self.logger.record_metrics(job.metrics)
+                continue
+            self.processed["ocr"] += 1
+            self.write_queue.put(job)
+        self.write_queue.close()
+
+    def _write_worker(self) -> None:
+        """書き込みステージ: JSONLへの保存、メトリクスの記録と古いスクリーンショットの削除"""
+        while True:
+            job = self.write_queue.get()
+            if job is None:
+                break
+            try:
+                with activate(job.metrics):
+                    self.logger._persist(
+                        job.timestamp, job.window_name, job.text, job.status, job.extra
+                    )
+                self.logger.jsonl_manager.flush_if_due()
+                self.processed["write"] += 1
+            except Exception as write_error:
+                self.failures["write"] += 1
+                print(f"Error: Write failed: {write_error}", file=sys.stderr)
+            if job.metrics is not None:
+                self.logger.record_metrics(job.metrics)
+            self.logger.schedule_cleanup()
+
+    def _finish(self) -> None:
+        """キューを閉じて残りのフレームを処理し終えてから終了する"""
+        self.ocr_queue.close()
+        for worker in self._workers:
+            if worker.is_alive():
+                worker.join()
+        if self.logger.config.verbose:
+            for stage, stage_stats in self.stats().items():
+                print(f"[pipeline] {stage}: {stage_stats}")
+        super()._finish()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Preprocess - OCR前の画像前処理
+
+Retinaディスプレイのスクリーンショットは画素数が多く、OCRの処理時間は
+画素数に比例して増える。OCRの前に目標の実効DPIまで縮小し、グレースケールに
+変換し、単色の枠や余白を切り落としてOCRに渡す画素数を減らす。
+"""
+
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .image_utils import (
+    Box,
+    ImageLoadError,
+    ImageSource,
+    grayscale_image,
+    grayscale_thumbnail,
+    image_dpi,
+    image_size,
+)
+
+# DPIが記録されていない場合に想定する元画像のDPI（Retinaのscreencapture）
+DEFAULT_SOURCE_DPI = 144.0
+
+
+@dataclass
+class PreprocessConfig:
+    """前処理の設定"""
+
+    # 縮小後の実効DPI（Noneの場合は縮小しない）
+    target_dpi: Optional[float] = 96.0
+    # 単色の枠や余白を切り落とす
+    trim_margins: bool = True
+    # 背景色とみなす輝度差（0～255）
+    trim_tolerance: int = 10
+    # 切り落とした後に残す余白（ピクセル）
+    trim_padding: int = 8
+
+    def settings(self) -> str:
+        """OCRキャッシュのキーに含める設定の識別子"""
+        return (
+            f"preprocess:dpi={self.target_dpi}:trim={self.trim_margins}"
+            f":tol={self.trim_tolerance}:pad={self.trim_padding}"
+        )
+
+
+@dataclass
+class PreprocessResult:
+    """前処理の結果"""
+
+    path: Optional[Path]  # 前処理後の画像の保存先（保存しない場合や画面が空白の場合はNone）
+    original_size: Tuple[int, int]
+    output_size: Tuple[int, int]
+    elapsed_seconds: float
+    # 前処理後の画像（保存した場合はそのパス、画面が空白の場合はNone）
+    image: Optional[ImageSource] = None
+
+    @property
+    def blank(self) -> bool:
+        """画面全体が背景色だったか（OCRの必要がない）"""
+        return self.image is None
+
+    @property
+    def pixel_ratio(self) -> float:
+        """元画像に対する画素数の割合"""
+        original = self.original_size[0] * self.original_size[1]
+        return self.output_size[0] * self.output_size[1] / original if original else 0.0
+
+
+def content_box(pixels: bytes, width: int, height: int, tolerance: int) -> Optional[Box]:
+    """
+    背景色（左上の画素の色）と異なる画素を囲む範囲を求める
+
+    Args:
+        pixels: 上の行から順に並んだ width * height バイトの輝度値
+        width: 幅
+        height: 高さ
+        tolerance: 背景色とみなす輝度差
+
+    Returns:
+        内容を囲む範囲（すべて背景色の場合はNone）
+    """
+    if not pixels:
+        return None
+    background = pixels[0]
+    # 背景色に近い画素を0、それ以外を1に変換して行ごとにC実装の検索を使う
+    table = bytes(0 if abs(value - background) <= tolerance else 1 for value in range(256))
+    mask = pixels.translate(table)
+
+    top: Optional[int] = None
+    bottom = 0
+    left = width
+    right = 0
+    for y in range(height):
+        start = y * width
+        end = start + width
+        row = mask[start:end]
+        first = row.find(1)
+        if first < 0:
+            continue
+        if top is None:
+            top = y
+        bottom = y + 1
+        left = min(left, first)
+        right = max(right, row.rfind(1) + 1)
+
+    if top is None:
+        return None
+    return (left, top, right, bottom)
+
+
+def preprocess_image(
+    image_path: ImageSource,
+    output_path: Optional[Path] = None,
+    config: Optional[PreprocessConfig] = None,
+) -> PreprocessResult:
+    """
+    画像を縮小・グレースケール化・余白除去する
+
+    Args:
+        image_path: 元画像のパスまたはメモリ上の画像
+        output_path: 前処理後の画像の保存先（Noneの場合は保存せずメモリ上の画像を返す）
+        config: 前処理の設定（Noneの場合はデフォルト設定）
+
+    Returns:
+        前処理の結果
+
+    Raises:
+        ImageLoadError: 画像の読み込みや保存に失敗した場合
+    """
+    config = config or PreprocessConfig()
+    started = time.perf_counter()
+    original_size = image_size(image_path)
+
+    scale = 1.0
+    if config.target_dpi is not None:
+        source_dpi = image_dpi(image_path) or DEFAULT_SOURCE_DPI
+        scale = min(1.0, config.target_dpi / source_dpi)
+    width = max(1, round(original_size[0] * scale))
+    height = max(1, round(original_size[1] * scale))
+    pixels = grayscale_thumbnail(image_path, width, height)
+
+    box: Box = (0, 0, width, height)
+    if config.trim_margins:
+        content = content_box(pixels, width, height, config.trim_tolerance)
+        if content is None:
+            return PreprocessResult(
+                path=None,
+                original_size=original_size,
+                output_size=(0, 0),
+                elapsed_seconds=time.perf_counter() - started,
+            )
+        pad = config.trim_padding
+        box = (
+            max(0, content[0] - pad),
+            max(0, content[1] - pad),
+            min(width, content[2] + pad),
+            min(height, content[3] + pad),
+        )
+
+    buffer = grayscale_image(pixels, width, height, box)
+    image: ImageSource = buffer
+    if output_path is not None:
+        try:
+            image = buffer.save(output_path)
+        except OSError as write_error:
+            raise ImageLoadError(f"Failed to write image: {write_error}")
+    return PreprocessResult(
+        path=output_path,
+        original_size=original_size,
+        output_size=(box[2] - box[0], box[3] - box[1]),
+        elapsed_seconds=time.perf_counter() - started,
+        image=image,
+    )
+
+
+@dataclass
+class PreprocessBenchmark:
+    """前処理設定ごとのベンチマーク結果"""
+
+    settings: str
+    pixel_ratio: float  # 元画像に対する画素数の割合（平均）
+    preprocess_seconds: float  # 前処理時間（平均）
+    ocr_seconds: float  # OCR時間（平均）
+    similarity: float  # 前処理なしのOCR結果との類似度（0～100、平均）
+
+
+def benchmark_preprocess(
+    images: Sequence[Path],
+    configs: Sequence[PreprocessConfig],
+    ocr: Callable[[Path], str],
+    work_dir: Path,
+) -> List[PreprocessBenchmark]:
+    """
+    前処理の設定ごとにOCR時間と精度を測定する
+
+    前処理なしのOCR結果を基準とし、各設定で前処理した画像のOCR結果との
+    類似度（rapidfuzzのratio）を精度の目安にする。
+
+    Args:
+        images: 測定に使う画像
+        configs: 比較する前処理の設定
+        ocr: 画像パスを受け取りテキストを返すOCR関数
+        work_dir: 前処理後の画像を保存する作業ディレクトリ
+
+    Returns:
+        前処理なし（先頭）と各設定の測定結果
+    """
+    from rapidfuzz import fuzz
+
+    baseline_texts = []
+    baseline_seconds = 0.0
+    for image in images:
+        started = time.perf_counter()
+        baseline_texts.append(ocr(image))
+        baseline_seconds += time.perf_counter() - started
+
+    count = max(1, len(images))
+    results = [
+        PreprocessBenchmark(
+            settings="none",
+            pixel_ratio=1.0,
+            preprocess_seconds=0.0,
+            ocr_seconds=baseline_seconds / count,
+            similarity=100.0,
+        )
+    ]
+
+    for index, config in enumerate(configs):
+        pixel_ratio = preprocess_seconds = ocr_seconds = similarity = 0.0
+        for image, baseline in zip(images, baseline_texts):
+            output_path = work_dir / f"{image.stem}.{index}.png"
+            result = preprocess_image(image, output_path, config)
+            pixel_ratio += result.pixel_ratio
+            preprocess_seconds += result.elapsed_seconds
+
+            started = time.perf_counter()
+            text = ocr(result.path) if result.path is not None else ""
+            ocr_seconds += time.perf_counter() - started
+            similarity += fuzz.ratio(text, baseline) if (text or baseline) else 100.0
+
+        results.append(
+            PreprocessBenchmark(
+                settings=config.settings(),
+                pixel_ratio=pixel_ratio / count,
+                preprocess_seconds=preprocess_seconds / count,
+                ocr_seconds=ocr_seconds / count,
+                similarity=similarity / count,
+            )
+        )
+    return results
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Record Codec - JSONLレコードのコンパクトな表現
+
+同じウィンドウ名や長いキー（timestamp, window, text_length, status）を1行ごとに
+繰り返さないように、レコードを次の形で書き込む。
+
+- ウィンドウ名はセグメント（JSONLファイル）ごとの辞書で整数IDに置き換える。辞書の項目は
+  そのウィンドウを初めて書き込む直前に `{"type": "window", "id": 0, "name": "Editor"}`
+  の1行として書く
+- キーを1文字にする（COMPACT_KEYS）
+- status は整数コード（STATUS_CODES）にし、"normal" は省略する
+- text_length は text の長さなので省略する
+
+RECORD_ENCODING_DELTA ではさらに、テキストを同じウィンドウの直前のレコード（テキストが
+空でないもの）に対する行単位の差分 `"d"` で書く。差分は残す行の範囲 `[開始, 終了]` と
+挿入する行のリスト `["行", ...]` を順に並べたもので、範囲に含まれない行は削除された行。
+差分が全文より大きくなる場合と、同じウィンドウで差分が KEYFRAME_INTERVAL 回続いた場合は
+全文（キーフレーム）を書く。
+
+読み込み側は CompactDecoder でセグメントを先頭から順にデコードすると、通常の形式の
+レコードに戻る。通常の形式の行とコンパクトな行が同じファイルに混在していてもよい。
+"""
+
+import json
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional
+
+RECORD_ENCODING_FULL = "full"  # 通常の形式（キーを省略しない）
+RECORD_ENCODING_COMPACT = "compact"  # ウィンドウ辞書・短いキー・整数の状態コード
+RECORD_ENCODING_DELTA = "delta"  # compact に加えてテキストを同じウィンドウとの差分で書く
+
+RECORD_ENCODINGS = (RECORD_ENCODING_FULL, RECORD_ENCODING_COMPACT, RECORD_ENCODING_DELTA)
+
+# 同じウィンドウで差分がこの回数続いたら全文（キーフレーム）を書く
+# （壊れた行があってもテキストを復元できなくなるのは次のキーフレームまでになる）
+KEYFRAME_INTERVAL = 10
+
+# ウィンドウ辞書の項目の行の type
+WINDOW_DEFINITION_TYPE = "window"
+
+# 通常の形式のキー → コンパクトな形式のキー
+COMPACT_KEYS = {
+    "timestamp": "t",
+    "timestamp_end": "e",
+    "window": "w",
+    "text": "x",
+    "text_length": "n",
+    "status": "s",
+    "merged_count": "m",
+}
+EXPANDED_KEYS = {short: key for key, short in COMPACT_KEYS.items()}
+
+# 差分で書いたテキストのキー
+DELTA_KEY = "d"
+
+# 通常の形式のレコードが持っているとコンパクトな形式で表せないキー
+_RESERVED_KEYS = frozenset(EXPANDED_KEYS) | {DELTA_KEY}
+
+# 状態 → 整数コード（ここにない状態は文字列のまま書く）
+STATUS_CODES = {"normal": 0, "sleep": 1, "error": 2}
+STATUS_NAMES = {code: status for status, code in STATUS_CODES.items()}
+DEFAULT_STATUS = "normal"
+
+
+def is_compact(record: Dict[str, Any]) -> bool:
+    """コンパクトな形式のレコードか判定する"""
+    return "t" in record and "timestamp" not in record
+
+
+def diff_lines(base: List[str], lines: List[str]) -> List[List[Any]]:
+    """
+    行単位の差分を求める
+
+    Args:
+        base: 元のテキストの行
+        lines: 新しいテキストの行
+
+    Returns:
+        残す元の行の範囲 `[開始, 終了]` と挿入する行のリストを順に並べたもの
+    """
+    ops: List[List[Any]] = []
+    matcher = SequenceMatcher(None, base, lines, autojunk=False)
+    for tag, base_start, base_end, start, end in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([base_start, base_end])
+        elif end > start:
+            ops.append(lines[start:end])
+    return ops
+
+
+def apply_diff(base: List[str], ops: List[List[Any]]) -> List[str]:
+    """
+    diff_lines() の差分を元の行に適用する
+
+    Args:
+        base: 元のテキストの行
+        ops: 差分
+
+    Returns:
+        新しいテキストの行
+    """
+    lines: List[str] = []
+    for op in ops:
+        if op and isinstance(op[0], int):
+            start, end = op
+            lines.extend(base[start:end])
+        else:
+            lines.extend(op)
+    return lines
+
+
+class CompactEncoder:
+    """
+    1つのセグメントに書き込むレコードをコンパクトな形式にするエンコーダー
+
+    セグメントのウィンドウ辞書を持つため、セグメントごとに作る（既存のセグメントに
+    追記する場合は load() で辞書を読み込む）。
+
+    使用例:
+        >>> encoder = CompactEncoder()
+        >>> encoder.encode({"timestamp": "2025-12-28T10:00:00", "window": "Editor", ...})
+        [{"type": "window", "id": 0, "name": "Editor"}, {"t": "2025-12-28T10:00:00", "w": 0, ...}]
+    """
+
+    def __init__(self, delta: bool = False):
+        """
+        初期化
+
+        Args:
+            delta: Trueの場合、テキストを同じウィンドウの直前のレコードとの差分で書く
+        """
+        self.delta = delta
+        self.window_ids: Dict[str, int] = {}
+        self._next_id = 0
+        # ウィンドウ名 → 差分の元にするテキストの行と、前回のキーフレームからの差分の数
+        self._base: Dict[str, List[str]] = {}
+        self._chain: Dict[str, int] = {}
+
+    def reset(self) -> None:
+        """辞書を空にする（セグメントが作り直された場合）"""
+        self.window_ids = {}
+        self._next_id = 0
+        self._base = {}
+        self._chain = {}
+
+    def load(self, lines: Iterable[str]) -> None:
+        """
+        既存のセグメントの行からウィンドウ辞書を読み込む
+
+        差分の元にするテキストは読み込まないため、各ウィンドウの次のレコードは全文で書く。
+
+        Args:
+            lines: セグメントの行（先頭から順に）
+        """
+        for line in lines:
+            if '"type"' not in line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(record, dict) or record.get("type") != WINDOW_DEFINITION_TYPE:
+                continue
+            window_id = int(record["id"])
+            self.window_ids[str(record["name"])] = window_id
+            self._next_id = max(self._next_id, window_id + 1)
+
+    def encode(self, record: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        レコードをコンパクトな形式にする
+
+        短いキーと同じ名前のフィールドを持つレコードなど、コンパクトな形式で
+        表せないレコードはそのまま返す。
+
+        Args:
+            record: 通常の形式のレコード
+
+        Returns:
+            書き込む行（新しいウィンドウの辞書の項目と、コンパクトな形式のレコード）
+        """
+        if "timestamp" not in record or any(key in _RESERVED_KEYS for key in record):
+            return [record]
+
+        lines: List[Dict[str, Any]] = []
+        compact: Dict[str, Any] = {}
+        text = record.get("text")
+        for key, value in record.items():
+            if key == "text_length" and isinstance(text, str) and value == len(text):
+                continue
+            if key == "window":
+                window_id = self.window_ids.get(value)
+                if window_id is None:
+                    window_id = self.window_ids[value] = self._next_id
+                    self._next_id += 1
+                    lines.append({"type": WINDOW_DEFINITION_TYPE, "id": window_id, "name": value})
+                value = window_id
+            elif key == "status":
+                if value == DEFAULT_STATUS:
+                    continue
+                value = STATUS_CODES.get(value, value)
+            elif key == "text" and self.delta and value and isinstance(value, str):
+                ops = self._encode_text(str(record.get("window", "")), value)
+                if ops is not None:
+                    compact[DELTA_KEY] = ops
+                    continue
+            compact[COMPACT_KEYS.get(key, key)] = value
+        lines.append(compact)
+        return lines
+
+    def _encode_text(self, window: str, text: str) -> Optional[List[List[Any]]]:
+        """
+        テキストを差分にする
+
+        Returns:
+            差分（全文で書く場合はNone）
+        """
+        text_lines = text.split("\n")
+        base = self._base.get(window)
+        self._base[window] = text_lines
+        chain = self._chain.get(window, 0)
+        if base is not None and chain < KEYFRAME_INTERVAL:
+            ops = diff_lines(base, text_lines)
+            # 範囲は数バイト、挿入する行は引用符と区切りの分だけ全文より大きくなる
+            size = sum(8 if op and isinstance(op[0], int) else 2 for op in ops)
+            size += sum(
+                len(line) + 3 for op in ops if op and not isinstance(op[0], int) for line in op
+            )
+            if size < len(text):
+                self._chain[window] = chain + 1
+                return ops
+        self._chain[window] = 0
+        return None
+
+
+class CompactDecoder:
+    """
+    セグメントの行を通常の形式のレコードに戻すデコーダー
+
+    ウィンドウ辞書を持つため、セグメントごとに作り、先頭から順に decode() を呼ぶ。
+    """
+
+    def __init__(self):
+        self.windows: Dict[int, str] = {}
+        # ウィンドウ名 → 差分の元にするテキストの行
+        self._base: Dict[str, List[str]] = {}
+
+    def decode(self, record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        1行分をデコードする
+
+        Args:
+            record: 行をJSONとして読んだもの
+
+        Returns:
+            通常の形式のレコード（ウィンドウ辞書の項目の行の場合はNone。
+            通常の形式の行はそのまま返す）
+        """
+        if record.get("type") == WINDOW_DEFINITION_TYPE:
+            self.windows[int(record["id"])] = str(record["name"])
+            return None
+        if not is_compact(record):
+            return record
+
+        window = self.windows.get(record.get("w", -1), "")
+        expanded: Dict[str, Any] = {}
+        for short, value in record.items():
+            key = EXPANDED_KEYS.get(short, short)
+            if key == "window":
+                value = window
+            elif key == "status":
+                value = STATUS_NAMES.get(value, value)
+            elif short == DELTA_KEY:
+                key = "text"
+                lines = apply_diff(self._base.get(window, []), value)
+                self._base[window] = lines
+                value = "\n".join(lines)
+            elif key == "text" and value and isinstance(value, str):
+                self._base[window] = value.split("\n")
+            expanded[key] = value
+            # 省略した text_length と status は元のレコードと同じ位置（text の直後）に戻す
+            if key == "text" and "n" not in record:
+                expanded["text_length"] = len(value)
+            if key == "text_length" or (key == "text" and "n" not in record):
+                if "s" not in record:
+                    expanded["status"] = DEFAULT_STATUS
+        expanded.setdefault("status", DEFAULT_STATUS)
+        return expanded
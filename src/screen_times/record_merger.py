@@ -5,7 +5,7 @@ Record Merger - 類似レコードのマージ処理
 連続するOCRレコードにおいて、テキスト内容がほぼ同一の場合にマージする。
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from rapidfuzz import fuzz
 
@@ -18,6 +18,9 @@ def should_merge(prev: Dict[str, Any], curr: Dict[str, Any], threshold: float =
     1. window が同一であること
     2. テキスト類似度が指定のしきい値以上であること
 
+    両方のレコードに同一の frame_hash がある場合は、画面が変化していないため
+    テキスト類似度を計算せずにマージ対象とする。
+
     Args:
         prev: 前のレコード
         curr: 現在のレコード
@@ -30,6 +33,11 @@ def should_merge(prev: Dict[str, Any], curr: Dict[str, Any], threshold: float =
     if prev.get("window") != curr.get("window"):
         return False
 
+    # フレームハッシュが一致する場合は同一画面とみなす
+    prev_hash = prev.get("frame_hash")
+    if prev_hash is not None and prev_hash == curr.get("frame_hash"):
+        return True
+
     prev_text = prev.get("text", "")
     curr_text = curr.get("text", "")
 
@@ -52,7 +60,7 @@ def merge_records(prev: Dict[str, Any], curr: Dict[str, Any]) -> Dict[str, Any]:
 
     マージ時は以下のルールで統合する：
     - timestamp: 最初のレコードの値を保持
-    - timestamp_end: 最後のレコードのtimestampを設定
+    - timestamp_end: 最後のレコードのtimestamp（期間を持つレコードの場合はその終了時刻）を設定
     - window: 保持
     - text: 最初のレコードの値を保持
     - text_length: 最初のレコードの値を保持
@@ -69,7 +77,7 @@ def merge_records(prev: Dict[str, Any], curr: Dict[str, Any]) -> Dict[str, Any]:
     merged = prev.copy()
 
     # timestamp_endを更新
-    merged["timestamp_end"] = curr["timestamp"]
+    merged["timestamp_end"] = curr.get("timestamp_end", curr["timestamp"])
 
     # merged_countを更新（prevに既にある場合は+1、ない場合は2）
     merged["merged_count"] = prev.get("merged_count", 1) + 1
@@ -123,6 +131,32 @@ class RecordMerger:
             self.buffer = record
             return output
 
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        複数のレコードをまとめて追加
+
+        add_record() を順に呼んだ場合と同じ結果になる。最後のレコード（またはマージ中の
+        レコード）はバッファに残る。
+
+        Args:
+            records: 追加するレコード（古い順）
+
+        Returns:
+            出力すべきレコードのリスト
+        """
+        outputs: List[Dict[str, Any]] = []
+        buffer = self.buffer
+        for record in records:
+            if buffer is None:
+                buffer = record
+            elif should_merge(buffer, record, self.threshold):
+                buffer = merge_records(buffer, record)
+            else:
+                outputs.append(buffer)
+                buffer = record
+        self.buffer = buffer
+        return outputs
+
     def flush(self) -> Optional[Dict[str, Any]]:
         """
         バッファに残っているレコードを取得
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Resident Runner - 常駐ループ実行モジュール
+
+launchdから毎分新しいプロセスを起動する代わりに、1つのScreenOCRLoggerを
+常駐させ、ドリフトしないスケジュールでrun()を繰り返し呼び出す。
+インタプリタ起動・pyobjcのインポート・JsonlManagerの構築は初回のみとなる。
+"""
+
+import signal
+import statistics
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from .adaptive_schedule import AdaptiveScheduler
+from .screen_ocr_logger import ScreenOCRLogger
+
+
+def next_tick_time(start: float, interval: float, now: float) -> float:
+    """
+    次回実行時刻を計算する
+
+    実行時刻は常に start + k * interval の格子上に置くため、処理時間や
+    スリープの誤差が累積しない。処理が1周期以上遅れた場合は、
+    取りこぼした時刻をまとめて実行せず、次の格子点まで読み飛ばす。
+
+    Args:
+        start: スケジュールの基準時刻（monotonic秒）
+        interval: 実行間隔（秒）
+        now: 現在時刻（monotonic秒）
+
+    Returns:
+        次回実行時刻（monotonic秒）
+    """
+    if interval <= 0:
+        raise ValueError("interval must be positive")
+    if now < start:
+        return start
+    elapsed_ticks = int((now - start) // interval)
+    return start + (elapsed_ticks + 1) * interval
+
+
+def format_stages(stages: Dict[str, float]) -> str:
+    """
+    処理段階ごとの経過時間を表示用の文字列にする
+
+    Args:
+        stages: 処理段階 → 経過時間（秒）
+
+    Returns:
+        "window 12.3ms, capture 45.6ms" 形式の文字列
+    """
+    return ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in stages.items())
+
+
+@dataclass
+class TickStats:
+    """1回分のtick計測結果"""
+
+    wall_seconds: float
+    cpu_seconds: float
+    success: bool
+    # 処理段階ごとの経過時間（秒）。ウィンドウ取得は "window"
+    stages: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class ResidentReport:
+    """常駐実行の計測レポート（コールドスタートと常駐tickの比較）"""
+
+    startup_cpu_seconds: float
+    ticks: List[TickStats] = field(default_factory=list)
+
+    @property
+    def cold_tick(self) -> Optional[TickStats]:
+        """初回tick（遅延インポートなどのコストを含む）"""
+        return self.ticks[0] if self.ticks else None
+
+    @property
+    def warm_ticks(self) -> List[TickStats]:
+        """2回目以降のtick"""
+        return self.ticks[1:]
+
+    def warm_median(self) -> Optional[TickStats]:
+        """常駐tickの中央値（wall/CPUそれぞれ）"""
+        warm = self.warm_ticks
+        if not warm:
+            return None
+        stage_names = dict.fromkeys(name for t in warm for name in t.stages)
+        return TickStats(
+            wall_seconds=statistics.median(t.wall_seconds for t in warm),
+            cpu_seconds=statistics.median(t.cpu_seconds for t in warm),
+            success=True,
+            stages={
+                name: statistics.median(t.stages[name] for t in warm if name in t.stages)
+                for name in stage_names
+            },
+        )
+
+    def summary(self) -> str:
+        """コールドスタートと常駐tickの差分を文字列で返す"""
+        cold = self.cold_tick
+        if cold is None:
+            return "No ticks executed"
+
+        cold_wall = cold.wall_seconds
+        cold_cpu = self.startup_cpu_seconds + cold.cpu_seconds
+        lines = [
+            f"Cold start: {cold_wall:.3f}s wall / {cold_cpu:.3f}s CPU "
+            f"(startup {self.startup_cpu_seconds:.3f}s CPU)",
+        ]
+        warm = self.warm_median()
+        if warm is not None:
+            lines.append(
+                f"Warm tick (median of {len(self.warm_ticks)}): "
+                f"{warm.wall_seconds:.3f}s wall / {warm.cpu_seconds:.3f}s CPU"
+            )
+            lines.append(
+                f"Saved per tick: {cold_wall - warm.wall_seconds:.3f}s wall / "
+                f"{cold_cpu - warm.cpu_seconds:.3f}s CPU"
+            )
+            if warm.stages:
+                lines.append("Warm stages (median): " + format_stages(warm.stages))
+        return "\n".join(lines)
+
+
+class ResidentRunner:
+    """
+    ScreenOCRLoggerを常駐させて定期実行するランナー
+
+    使用例:
+        >>> runner = ResidentRunner(ScreenOCRLogger(), interval_seconds=60)
+        >>> runner.install_signal_handlers()
+        >>> report = runner.run()
+        >>> print(report.summary())
+    """
+
+    def __init__(
+        self,
+        logger: ScreenOCRLogger,
+        interval_seconds: float = 60,
+        max_ticks: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        scheduler: Optional[AdaptiveScheduler] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            logger: 常駐させるScreenOCRLogger
+            interval_seconds: 実行間隔（秒）
+            max_ticks: 最大実行回数（Noneの場合は停止されるまで実行）
+            clock: 単調増加する時刻関数（テスト用に差し替え可能）
+            scheduler: 活動量に応じて実行間隔を調整するスケジューラ
+                       （Noneの場合は interval_seconds の固定間隔）
+        """
+        if interval_seconds <= 0:
+            raise ValueError("interval_seconds must be positive")
+        self.logger = logger
+        self.interval_seconds = interval_seconds
+        self.max_ticks = max_ticks
+        self.clock = clock
+        self.scheduler = scheduler
+        self.report = ResidentReport(startup_cpu_seconds=time.process_time())
+        self._stop_event = threading.Event()
+        # _execute_tick が記録する処理段階ごとの経過時間
+        self._tick_stages: Dict[str, float] = {}
+
+    def install_signal_handlers(self) -> None:
+        """SIGTERM/SIGINTで安全に停止するようにシグナルハンドラを登録する"""
+
+        def _handle(signum, frame):
+            self.stop()
+
+        signal.signal(signal.SIGTERM, _handle)
+        signal.signal(signal.SIGINT, _handle)
+
+    def stop(self) -> None:
+        """ループを停止する（次の待機で抜ける）"""
+        self._stop_event.set()
+
+    @property
+    def stopped(self) -> bool:
+        """停止要求済みかどうか"""
+        return self._stop_event.is_set()
+
+    def run(self) -> ResidentReport:
+        """
+        停止されるまでtickを繰り返す
+
+        Returns:
+            計測レポート
+        """
+        start = self.clock()
+        try:
+            while not self.stopped:
+                tick_started = self.clock()
+                if self.scheduler is not None:
+                    self.scheduler.record_capture()
+                self.tick()
+
+                if self.max_ticks is not None and len(self.report.ticks) >= self.max_ticks:
+                    break
+
+                if self.scheduler is not None:
+                    # 前回の実行開始から、活動量に応じた間隔を空ける
+                    delay = self.scheduler.next_delay()
+                    deadline = tick_started + delay
+                    if self.logger.config.verbose:
+                        print(
+                            f"[schedule] next tick in {delay:.1f}s "
+                            f"(activity {self.scheduler.activity:.2f})"
+                        )
+                else:
+                    delay = self.interval_seconds
+                    deadline = next_tick_time(start, self.interval_seconds, self.clock())
+                # 次のtickのメトリクスに実行間隔を記録する（status で推移を確認できる）
+                self.logger.tick_interval = delay
+                self._stop_event.wait(max(0.0, deadline - self.clock()))
+        finally:
+            self._finish()
+
+        if self.logger.config.verbose:
+            print(self.report.summary())
+            if self.scheduler is not None:
+                print(self.scheduler.summary())
+                for bucket_start, interval in self.scheduler.timeline():
+                    print(f"  {bucket_start:%H:%M} mean interval {interval:.1f}s")
+        return self.report
+
+    def tick(self) -> TickStats:
+        """
+        1回分の処理を実行して計測する
+
+        Returns:
+            計測結果
+        """
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        self._tick_stages = {}
+
+        success = self._execute_tick()
+
+        stats = TickStats(
+            wall_seconds=time.perf_counter() - wall_start,
+            cpu_seconds=time.process_time() - cpu_start,
+            success=success,
+            stages=self._tick_stages,
+        )
+        self.report.ticks.append(stats)
+
+        if self.logger.config.verbose:
+            stages = f" ({format_stages(stats.stages)})" if stats.stages else ""
+            print(
+                f"[tick {len(self.report.ticks)}] "
+                f"{stats.wall_seconds:.3f}s wall, {stats.cpu_seconds:.3f}s CPU{stages}"
+            )
+            if len(self.report.ticks) == 2:
+                # 最初の常駐tickの時点でコールドスタートとの差を一度表示する
+                print(self.report.summary())
+
+        return stats
+
+    def _execute_tick(self) -> bool:
+        """
+        tickの本体（run と、間隔が空いた場合のバックグラウンドでのクリーンアップ）
+
+        Returns:
+            処理が成功したかどうか
+        """
+        result = self.logger.run()
+        self._tick_stages = result.timings
+        if self.scheduler is not None and result.success:
+            self.scheduler.observe(
+                result.window_name, result.text, result.frame_hash, result.status
+            )
+        self.logger.schedule_cleanup()
+
+        if self.logger.config.verbose:
+            print(result)
+        if not result.success:
+            print(f"Error: {result.error}", file=sys.stderr)
+        return result.success
+
+    def _finish(self) -> None:
+        """ループ終了時の後処理"""
+        self.logger.shutdown()
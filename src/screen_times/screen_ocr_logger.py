@@ -5,16 +5,48 @@ ScreenOCRLogger - ファサードクラス
 ScreenOCRシステムの複雑な一連の処理を単一のシンプルなインターフェースで提供する。
 """
 
+import fnmatch
+import os
+import shutil
 import sys
+import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from .screenshot import get_active_window, take_screenshot
+from .screenshot import (
+    CaptureBackend,
+    capture_image,
+    get_active_window,
+    parse_bucket,
+    screenshot_bucket,
+    take_screenshot,
+)
 from .ocr import perform_ocr
-from .jsonl_manager import JsonlManager
+from .jsonl_manager import FlushPolicy, JsonlManager
+from .frame_hash import FrameFingerprinter, dhash, format_hash
+from .incremental_ocr import IncrementalOcr, Recognizer
+from .image_utils import ImageBuffer, ImageLoadError, ImageSource
+from .ocr_cache import OcrCache
+from .ocr_backend import OcrBackend, VisionOcrBackend, ocr_text
+from .ocr_worker import OcrTimeoutError, SupervisedOcrBackend
+from .ocr import RECOGNITION_LEVEL_FAST, RECOGNITION_SETTINGS, recognition_settings
+from .tiered_ocr import TieredOcr
+from .preprocess import PreprocessConfig, preprocess_image
+from .screenshot_archive import ScreenshotArchive
+from .screenshot_writer import PERSIST_DEFERRED, ScreenshotWriter
+from .window_provider import WindowProvider
+from .idle import IDLE_PROBE, IDLE_SKIP, IdleDetector, IdleInterval, IdleSignalProvider
+from .metrics import MetricsLog, TickMetrics, activate, count_bytes, stage
+
+# 前回のクリーンアップの時刻を更新時刻で記録するファイル
+CLEANUP_MARKER = ".last_cleanup"
+
+# OCRキャッシュの容量上限（MB）を指定する環境変数。launchdから毎分起動される場合は
+# コマンドライン引数を渡せないため、plistの EnvironmentVariables で指定する
+OCR_CACHE_MB_ENV = "SCREENOCR_OCR_CACHE_MB"
 
 
 @dataclass
@@ -24,9 +56,101 @@ class ScreenOCRConfig:
     screenshot_dir: Path = Path("/tmp/screen-times")
     timeout_seconds: int = 30
     screenshot_retention_hours: int = 72
+    # スクリーンショットを1時間ごとのバケットディレクトリに保存する
+    # （保持期間による削除は期限切れのバケットだけを対象にする）
+    screenshot_buckets: bool = True
+    # schedule_cleanup() でクリーンアップを実行する間隔（秒）
+    cleanup_interval_seconds: float = 600
     verbose: bool = False
     dry_run: bool = False
     merge_threshold: Optional[float] = None
+    # 同じウィンドウの直前フレームとのハミング距離がこの値以下ならOCRを省略する
+    # （Noneの場合はフレームハッシュを計算しない）
+    frame_hash_threshold: Optional[int] = None
+    # 前回フレームから変化したタイルだけをOCRする
+    incremental_ocr: bool = False
+    # 画像内容をキーにしたOCR結果のディスクキャッシュの容量上限（バイト）
+    # （Noneの場合はキャッシュしない）
+    ocr_cache_max_bytes: Optional[int] = None
+    # OCRバックエンド（Noneの場合はVision Frameworkで直接OCRする）
+    ocr_backend: Optional[OcrBackend] = None
+    # OCRを監視付きワーカープロセスで実行する（期限切れはプロセスごと強制終了）
+    ocr_worker: bool = False
+    # ワーカーを入れ替えるまでのジョブ数（Noneの場合は無制限）
+    ocr_worker_max_jobs: Optional[int] = 200
+    # ワーカーのRSSがこれを超えたら入れ替える（バイト、Noneの場合は無制限）
+    ocr_worker_max_rss_bytes: Optional[int] = 1024 * 1024 * 1024
+    # 高速パスで認識し、信頼度やテキスト密度が低い場合だけ高精度パスで再認識する
+    tiered_ocr: bool = False
+    # 高速パスでこの信頼度未満の行を高精度パスで再認識する
+    tiered_min_confidence: float = 0.5
+    # 高速パスで認識した行の面積の割合がこれ未満なら全体を高精度パスで再認識する
+    tiered_min_coverage: float = 0.01
+    # 高速パスに渡す画像の縮小率（1.0の場合は元の解像度のまま認識する）
+    tiered_fast_scale: float = 0.5
+    # 高速パスのOCRバックエンド（Noneの場合はVision Frameworkの高速モード）
+    fast_ocr_backend: Optional[OcrBackend] = None
+    # OCR前の前処理（縮小・グレースケール化・余白除去。Noneの場合は前処理しない）
+    preprocess: Optional[PreprocessConfig] = None
+    # 画面をメモリ上にキャプチャし、ファイルを介さずにOCRする
+    in_memory_capture: bool = False
+    # メモリ上へのキャプチャ（Noneの場合は capture_image。指定した場合は in_memory_capture と同様に
+    # メモリ上でキャプチャする）
+    capture_backend: Optional[CaptureBackend] = None
+    # メモリ上でキャプチャした画像の保存方法（"sync", "deferred", "never"）
+    screenshot_persistence: str = PERSIST_DEFERRED
+    # スクリーンショットを screenshot_dir/archive に重複を排除して保存する
+    screenshot_archive: bool = False
+    # 直前のキーフレームとのハミング距離がこの値以下のフレームは保存せず参照する
+    archive_keyframe_distance: int = 4
+    # アーカイブのキーフレームの保存形式（"png", "jpeg", "heic"）と非可逆形式の品質
+    archive_format: str = "png"
+    archive_quality: Optional[float] = None
+    # アクティブウィンドウの取得（Noneの場合は get_active_window の既定の実装）
+    window_provider: Optional[WindowProvider] = None
+    # JSONLファイルを保存するベースディレクトリ（Noneの場合は get_default_logs_dir()）
+    jsonl_base_dir: Optional[Path] = None
+    # 指定した場合はJSONLのセグメントを開いたまま追記し、この条件で書き出す
+    # （Noneの場合はレコードごとにファイルを開いて閉じる）
+    jsonl_flush_policy: Optional[FlushPolicy] = None
+    # クリーンアップのたびに、書き込みが終わったJSONLファイルを gzip で圧縮する
+    jsonl_compress_segments: bool = False
+    # JSONLのレコードの書き込み形式（"full"、"compact" または "delta"。record_codec を参照）
+    jsonl_record_encoding: str = "full"
+    # 画面ロック・無操作を検出し、アイドル中はOCRを省略してキャプチャを間引く
+    idle_detection: bool = False
+    # アイドルシグナル（Noneの場合は環境の既定）
+    idle_signal_provider: Optional[IdleSignalProvider] = None
+    # アイドル中に画面の変化を確認する間隔の基準（秒、通常はキャプチャ間隔）と上限
+    idle_probe_seconds: float = 60
+    idle_max_backoff_seconds: float = 900
+    # アイドルを確定するのに必要な変化しないフレームの数と、最後の入力からの経過時間（秒）
+    idle_confirm_frames: int = 3
+    idle_min_seconds: float = 120
+    # tickごとの処理段階の時間とバイト数を screenshot_dir/metrics に記録する
+    metrics: bool = True
+    # メトリクスファイルをローテーションするサイズ（バイト）
+    metrics_max_bytes: int = 1024 * 1024
+
+
+@dataclass
+class RecognitionResult:
+    """1フレーム分の認識結果"""
+
+    text: str
+    frame_hash: Optional[str] = None
+    ocr_skipped: bool = False
+    ocr_timed_out: bool = False
+    ocr_pass: Optional[str] = None
+
+    def record_fields(self) -> Dict[str, Any]:
+        """JSONLレコードに追加するフィールド"""
+        fields: Dict[str, Any] = {}
+        if self.frame_hash is not None:
+            fields["frame_hash"] = self.frame_hash
+        if self.ocr_pass is not None:
+            fields["ocr_pass"] = self.ocr_pass
+        return fields
 
 
 @dataclass
@@ -42,6 +166,10 @@ class ScreenOCRResult:
     jsonl_path: Optional[Path]
     status: str = "normal"
     error: Optional[str] = None
+    frame_hash: Optional[str] = None
+    ocr_skipped: bool = False
+    # 処理段階ごとの経過時間（秒）。キーは metrics.STAGES のうち実行した段階
+    timings: Dict[str, float] = field(default_factory=dict)
 
     def __str__(self) -> str:
         """結果の文字列表現"""
@@ -84,72 +212,208 @@ class ScreenOCRLogger:
 
         Args:
             config: 設定オブジェクト（Noneの場合はデフォルト設定）
+
+        Raises:
+            ValueError: 差分OCRと段階的OCRを同時に指定した場合
         """
         self.config = config or ScreenOCRConfig()
-        self.jsonl_manager = JsonlManager(merge_threshold=self.config.merge_threshold)
-        # スリープ状態検出用の状態
-        self._last_screenshot_size: Optional[int] = None
+        if self.config.incremental_ocr and self.config.tiered_ocr:
+            # 差分OCRが有効な場合は段階的OCRが使われないため、黙って無視せずにエラーにする
+            raise ValueError("incremental_ocr and tiered_ocr cannot be used together")
+        if (
+            self.config.incremental_ocr
+            and self.config.preprocess is not None
+            and self.config.preprocess.trim_margins
+        ):
+            # 余白除去は内容によって画像のサイズと位置を変え、差分OCRが毎回全体をOCRしてしまう。
+            # 差分OCRが有効な場合はフレームの大きさを保つため余白除去を無効にする
+            self.config = replace(
+                self.config, preprocess=replace(self.config.preprocess, trim_margins=False)
+            )
+        self.jsonl_manager = JsonlManager(
+            base_dir=self.config.jsonl_base_dir,
+            merge_threshold=self.config.merge_threshold,
+            flush_policy=self.config.jsonl_flush_policy,
+            record_encoding=self.config.jsonl_record_encoding,
+        )
+        # スリープ状態検出用の状態（前回のファイルサイズまたは画素データのハッシュ）
+        self._last_frame_signature: Optional[Any] = None
         self._consecutive_empty_count: int = 0
+        # フレームハッシュによるOCR省略用の状態
+        self.fingerprinter: Optional[FrameFingerprinter] = None
+        if self.config.frame_hash_threshold is not None:
+            self.fingerprinter = FrameFingerprinter(self.config.frame_hash_threshold)
+        # OCRバックエンド（監視付きワーカーを使う場合はそれで包む）
+        self.ocr_backend: Optional[OcrBackend] = self.config.ocr_backend
+        self.ocr_worker: Optional[SupervisedOcrBackend] = None
+        if self.config.ocr_worker:
+            # 段階的OCRの高速パスも同じワーカーで実行し、期限と入れ替えの対象にする
+            worker_fast_backend: Optional[OcrBackend] = None
+            if self.config.tiered_ocr:
+                worker_fast_backend = self.config.fast_ocr_backend or VisionOcrBackend(
+                    RECOGNITION_LEVEL_FAST
+                )
+            self.ocr_worker = SupervisedOcrBackend(
+                self.config.ocr_backend,
+                max_jobs=self.config.ocr_worker_max_jobs,
+                max_rss_bytes=self.config.ocr_worker_max_rss_bytes,
+                fast_backend=worker_fast_backend,
+            )
+            self.ocr_backend = self.ocr_worker
+        # タイル単位の差分OCR
+        self.incremental_ocr: Optional[IncrementalOcr] = None
+        if self.config.incremental_ocr:
+            if self.ocr_backend is not None:
+                self.incremental_ocr = IncrementalOcr(
+                    recognizer=self.ocr_backend.recognize,
+                    timeout_seconds=self.config.timeout_seconds,
+                )
+            else:
+                self.incremental_ocr = IncrementalOcr(timeout_seconds=self.config.timeout_seconds)
+        # 高速パス優先の段階的OCR
+        self.tiered_ocr: Optional[TieredOcr] = None
+        if self.config.tiered_ocr:
+            fast_backend = self.config.fast_ocr_backend
+            fast: Optional[Recognizer] = None
+            if self.ocr_worker is not None:
+                fast = self.ocr_worker.recognize_fast
+            elif fast_backend is not None:
+                fast = fast_backend.recognize
+            self.tiered_ocr = TieredOcr(
+                fast=fast,
+                accurate=self.ocr_backend.recognize if self.ocr_backend is not None else None,
+                min_confidence=self.config.tiered_min_confidence,
+                min_coverage=self.config.tiered_min_coverage,
+                fast_scale=self.config.tiered_fast_scale,
+                timeout_seconds=self.config.timeout_seconds,
+            )
+        # OCR結果のディスクキャッシュ（プロセスの起動をまたいで共有する）
+        self.ocr_cache: Optional[OcrCache] = None
+        if self.config.ocr_cache_max_bytes is not None:
+            self.ocr_cache = OcrCache(
+                self.config.screenshot_dir / "ocr_cache",
+                self.config.ocr_cache_max_bytes,
+                settings=self._recognition_settings(),
+            )
+        # 重複を排除したスクリーンショットのアーカイブ
+        self.screenshot_archive: Optional[ScreenshotArchive] = None
+        if self.config.screenshot_archive:
+            self.screenshot_archive = ScreenshotArchive(
+                self.config.screenshot_dir / "archive",
+                keyframe_distance=self.config.archive_keyframe_distance,
+                image_format=self.config.archive_format,
+                quality=self.config.archive_quality,
+            )
+        # メモリ上でキャプチャした画像の保存とアーカイブへの移動
+        self.screenshot_writer: Optional[ScreenshotWriter] = None
+        self.in_memory_capture = (
+            self.config.in_memory_capture or self.config.capture_backend is not None
+        )
+        if self.in_memory_capture or self.screenshot_archive is not None:
+            self.screenshot_writer = ScreenshotWriter(
+                self.config.screenshot_dir,
+                self.config.screenshot_persistence,
+                archive=self.screenshot_archive,
+                bucketed=self.config.screenshot_buckets,
+            )
+        # 次のtickのメトリクスに記録する実行間隔（常駐モードで ResidentRunner が設定する）
+        self.tick_interval: Optional[float] = None
+        # バックグラウンドで実行中のクリーンアップ
+        self._cleanup_thread: Optional[threading.Thread] = None
+        # tickごとの処理段階のメトリクス
+        self.metrics_log: Optional[MetricsLog] = None
+        if self.config.metrics:
+            self.metrics_log = MetricsLog(
+                self.config.screenshot_dir / "metrics", self.config.metrics_max_bytes
+            )
+        # 画面ロック・無操作の検出
+        self.idle_detector: Optional[IdleDetector] = None
+        if self.config.idle_detection:
+            self.idle_detector = IdleDetector(
+                self.config.idle_signal_provider,
+                probe_seconds=self.config.idle_probe_seconds,
+                confirm_frames=self.config.idle_confirm_frames,
+                min_idle_seconds=self.config.idle_min_seconds,
+                max_backoff_seconds=self.config.idle_max_backoff_seconds,
+            )
 
     def run(self) -> ScreenOCRResult:
         """
         メイン処理を実行
 
         スクリーンショット取得 → OCR → JSONL保存の一連の処理を実行する。
+        処理段階ごとの経過時間とCPU時間はメトリクスファイルに記録する。
 
         Returns:
             実行結果（ScreenOCRResult）
         """
         timestamp = datetime.now()
+        tick_metrics = TickMetrics(timestamp, interval_seconds=self.tick_interval)
+        with activate(tick_metrics):
+            result = self._run_tick(timestamp)
+        self.jsonl_manager.flush_if_due()
+        result.timings = dict(tick_metrics.wall)
+        self.record_metrics(tick_metrics)
+        return result
+
+    def _run_tick(self, timestamp: datetime) -> ScreenOCRResult:
+        """
+        1回分のtickを処理する
+
+        Args:
+            timestamp: tickの時刻
+
+        Returns:
+            実行結果（ScreenOCRResult）
+        """
         window_name = "Unknown"
-        screenshot_path = None
+        screenshot: Optional[ImageSource] = None
         text = ""
         jsonl_path = None
         error = None
 
         try:
+            # 0. アイドル期間中はキャプチャとOCRを省略する
+            if self.idle_detector is not None:
+                idle_result = self._idle_tick(timestamp)
+                if idle_result is not None:
+                    return idle_result
+
             # 1. アクティブウィンドウ取得
-            window_name, window_bounds = get_active_window()
-            if self.config.verbose:
-                print(f"Active window: {window_name}")
-                if window_bounds:
-                    print(f"Window bounds: {window_bounds}")
+            window_name, window_bounds = self._get_window()
 
             # 2. スクリーンショット取得
-            screenshot_path = take_screenshot(self.config.screenshot_dir, window_bounds)
-            if self.config.verbose:
-                print(f"Screenshot saved: {screenshot_path}")
+            screenshot = self._capture(window_bounds)
 
-            # 3. OCR処理
-            text = perform_ocr(screenshot_path, self.config.timeout_seconds)
-            if self.config.verbose:
-                print(f"OCR completed: {len(text)} characters")
+            # アイドルが確定したフレームはOCRしない
+            if self._confirm_idle(timestamp, window_name, screenshot):
+                return self._idle_result(timestamp, screenshot)
+
+            # 3. OCR処理（直前と同じフレームならOCR結果を再利用）
+            recognition = self._recognize(window_name, screenshot)
+            text = recognition.text
 
             # 4. スリープ状態検出
-            status = self._detect_sleep_state(text, screenshot_path)
-            if self.config.verbose:
-                print(f"Status detected: {status}")
+            status = self._status_for(recognition, screenshot)
+            self._archive_screenshot(screenshot, timestamp)
 
             # 5. JSONL保存（dry-runモードではスキップ）
-            if not self.config.dry_run:
-                jsonl_path = self._save_to_jsonl(timestamp, window_name, text, status)
-                if self.config.verbose:
-                    print(f"Log saved to: {jsonl_path}")
-            else:
-                jsonl_path = None
-                if self.config.verbose:
-                    print("[DRY RUN] JSONL保存をスキップしました")
+            jsonl_path = self._persist(
+                timestamp, window_name, text, status, recognition.record_fields()
+            )
 
             # 6. 成功結果を返す
             return ScreenOCRResult(
                 success=True,
                 timestamp=timestamp,
                 window_name=window_name,
-                screenshot_path=screenshot_path,
+                screenshot_path=screenshot_path_of(screenshot),
                 text=text,
                 text_length=len(text),
                 jsonl_path=jsonl_path,
                 status=status,
+                frame_hash=recognition.frame_hash,
+                ocr_skipped=recognition.ocr_skipped,
             )
 
         except Exception as e:
@@ -163,7 +427,7 @@ class ScreenOCRLogger:
                 success=False,
                 timestamp=timestamp,
                 window_name=window_name,
-                screenshot_path=screenshot_path,
+                screenshot_path=screenshot_path_of(screenshot),
                 text=text,
                 text_length=len(text),
                 jsonl_path=jsonl_path,
@@ -171,11 +435,31 @@ class ScreenOCRLogger:
                 error=error,
             )
 
+    def record_metrics(self, tick_metrics: TickMetrics) -> None:
+        """
+        1tick分のメトリクスをメトリクスファイルに追記する（無効な場合やdry-runでは何もしない）
+
+        記録に失敗しても処理は続けるため、警告のみ表示する。
+
+        Args:
+            tick_metrics: tickの計測結果
+        """
+        if self.metrics_log is None or self.config.dry_run:
+            return
+        try:
+            self.metrics_log.append(tick_metrics)
+        except OSError as metrics_error:
+            if self.config.verbose:
+                print(f"Warning: Failed to record metrics: {metrics_error}", file=sys.stderr)
+
     def cleanup(self) -> int:
         """
         古いスクリーンショットを削除
 
         設定で指定された保持期間を超えたスクリーンショットファイルを削除する。
+        バケットディレクトリは期限切れのものだけをディレクトリごと削除するため、
+        保持期間内のファイルは列挙しない。バケット導入前の screenshot_*.png も削除する。
+        アーカイブを使う場合は保持期間を超えたキーフレームとマニフェストも削除する。
 
         Returns:
             削除したファイル数
@@ -189,20 +473,34 @@ class ScreenOCRLogger:
             if not self.config.screenshot_dir.exists():
                 return 0
 
-            for screenshot in self.config.screenshot_dir.glob(pattern):
+            for entry in os.scandir(self.config.screenshot_dir):
                 try:
-                    # ファイルの最終更新時刻を確認
-                    if screenshot.stat().st_mtime < cutoff_time:
-                        screenshot.unlink()
-                        deleted_count += 1
+                    if entry.is_dir(follow_symlinks=False):
+                        bucket_start = parse_bucket(entry.name)
+                        # バケットの終わり（開始の1時間後）が保持期間より前なら削除する
+                        if bucket_start is not None and (
+                            bucket_start.timestamp() + 3600 <= cutoff_time
+                        ):
+                            deleted_count += _remove_bucket(entry.path)
+                    elif fnmatch.fnmatch(entry.name, pattern):
+                        # ファイルの最終更新時刻を確認
+                        if entry.stat().st_mtime < cutoff_time:
+                            os.unlink(entry.path)
+                            deleted_count += 1
                 except Exception as file_error:
                     # 個別のファイル削除エラーは無視して続行
                     if self.config.verbose:
                         print(
-                            f"Warning: Failed to delete {screenshot}: {file_error}", file=sys.stderr
+                            f"Warning: Failed to delete {entry.path}: {file_error}",
+                            file=sys.stderr,
                         )
                     continue
 
+            if self.screenshot_archive is not None:
+                deleted_count += self.screenshot_archive.prune(
+                    self.config.screenshot_retention_hours
+                )
+
             if self.config.verbose and deleted_count > 0:
                 print(f"Cleaned up {deleted_count} old screenshot(s)")
 
@@ -213,18 +511,603 @@ class ScreenOCRLogger:
                 print(f"Warning: Screenshot cleanup failed: {cleanup_error}", file=sys.stderr)
             return 0
 
-    def _detect_sleep_state(self, text: str, screenshot_path: Path) -> str:
+    def schedule_cleanup(self, background: bool = True) -> bool:
+        """
+        前回から cleanup_interval_seconds 以上経っていればクリーンアップを実行する
+
+        jsonl_compress_segments が有効な場合は、書き込みが終わったJSONLファイルの圧縮も行う。
+        前回の実行時刻は screenshot_dir/.last_cleanup の更新時刻に記録するため、
+        launchdで毎回起動する場合も間隔が保たれる。常駐実行ではtickの処理時間に
+        含めないようバックグラウンドスレッドで実行する。
+
+        Args:
+            background: Trueの場合、バックグラウンドスレッドで実行する
+
+        Returns:
+            クリーンアップを開始した場合True
+        """
+        if self._cleanup_thread is not None and self._cleanup_thread.is_alive():
+            return False
+
+        marker = self.config.screenshot_dir / CLEANUP_MARKER
+        try:
+            last_cleanup = marker.stat().st_mtime
+        except OSError:
+            last_cleanup = 0.0
+        if time.time() - last_cleanup < self.config.cleanup_interval_seconds:
+            return False
+        try:
+            self.config.screenshot_dir.mkdir(parents=True, exist_ok=True)
+            marker.touch()
+        except OSError as marker_error:
+            if self.config.verbose:
+                print(f"Warning: Failed to record cleanup time: {marker_error}", file=sys.stderr)
+
+        if background:
+            self._cleanup_thread = threading.Thread(
+                target=self._run_cleanup, name="screenshot-cleanup", daemon=True
+            )
+            self._cleanup_thread.start()
+        else:
+            self._run_cleanup()
+        return True
+
+    def _run_cleanup(self) -> None:
+        """古いスクリーンショットを削除し、設定されていればJSONLファイルを圧縮する"""
+        self.cleanup()
+        if self.config.jsonl_compress_segments and not self.config.dry_run:
+            self.compress_jsonl()
+
+    def compress_jsonl(self) -> int:
+        """
+        書き込みが終わったJSONLファイルを gzip で圧縮する
+
+        Returns:
+            圧縮したファイル数
+        """
+        try:
+            compressed = self.jsonl_manager.compress_closed_segments()
+        except Exception as compress_error:
+            print(f"Warning: JSONL compression failed: {compress_error}", file=sys.stderr)
+            return 0
+        if self.config.verbose and compressed:
+            print(f"Compressed {len(compressed)} JSONL file(s)")
+        return len(compressed)
+
+    def _idle_tick(self, timestamp: datetime) -> Optional[ScreenOCRResult]:
+        """
+        アイドル期間中のtickを処理する
+
+        ロック中や画面の変化を確認する時刻の前はキャプチャしない。確認する時刻には
+        キャプチャして差分ハッシュだけを比較し、OCRは行わない。
+
+        Args:
+            timestamp: tickの時刻
+
+        Returns:
+            アイドルが続いている場合は実行結果、アイドルでない（終わった）場合はNone
+        """
+        assert self.idle_detector is not None
+        still_idle, screenshot = self._idle_check(timestamp)
+
+        # 終わったアイドル期間を1件のレコードとして記録する
+        self._persist_idle_intervals(self.idle_detector.take_finished())
+        if still_idle:
+            return self._idle_result(timestamp, screenshot)
+        return None
+
+    def _idle_check(self, timestamp: datetime) -> Tuple[bool, Optional[ImageSource]]:
+        """
+        アイドルが続いているか判定する（画面の変化を確認する時刻ならキャプチャして比較する）
+
+        終わったアイドル期間は記録しないため、呼び出し元が take_finished() で取り出す。
+
+        Args:
+            timestamp: tickの時刻
+
+        Returns:
+            (アイドルが続いているか, 画面の変化の確認に使ったスクリーンショット または None)
+        """
+        assert self.idle_detector is not None
+        decision = self.idle_detector.begin_tick(timestamp)
+        screenshot: Optional[ImageSource] = None
+        still_idle = decision == IDLE_SKIP
+        if decision == IDLE_PROBE:
+            _, window_bounds = self._get_window()
+            screenshot = self._capture(window_bounds)
+            with stage("sleep"):
+                still_idle = self.idle_detector.probe(timestamp, self._idle_hash(screenshot))
+        return still_idle, screenshot
+
+    def _confirm_idle(self, timestamp: datetime, window_name: str, screenshot: ImageSource) -> bool:
+        """
+        フレームを観測し、アイドルが確定したか判定する（アイドル検出が無効な場合はFalse）
+
+        Args:
+            timestamp: 撮影時刻
+            window_name: ウィンドウ名
+            screenshot: スクリーンショットのパスまたはメモリ上の画像
+
+        Returns:
+            このフレームでアイドルが確定した場合True
+        """
+        if self.idle_detector is None:
+            return False
+        with stage("sleep"):
+            confirmed = self.idle_detector.observe(
+                timestamp, window_name, self._idle_hash(screenshot)
+            )
+        if not confirmed:
+            return False
+        if self.config.verbose:
+            print(f"Idle confirmed ({self.idle_detector.reason}): OCR skipped until activity")
+        return True
+
+    def _idle_result(
+        self,
+        timestamp: datetime,
+        screenshot: Optional[ImageSource],
+    ) -> ScreenOCRResult:
+        """アイドル期間中のtickの実行結果（レコードはアイドル期間の終了時に書き込む）"""
+        assert self.idle_detector is not None
+        if self.config.verbose:
+            print(
+                f"Idle ({self.idle_detector.reason}): "
+                f"{self.idle_detector.skipped_captures} capture(s) skipped, "
+                f"{self.idle_detector.probes} probe(s)"
+            )
+        return ScreenOCRResult(
+            success=True,
+            timestamp=timestamp,
+            window_name=self.idle_detector.window or "Unknown",
+            screenshot_path=screenshot_path_of(screenshot),
+            text="",
+            text_length=0,
+            jsonl_path=None,
+            status="sleep",
+            ocr_skipped=True,
+        )
+
+    def _idle_hash(self, screenshot: ImageSource) -> Optional[int]:
+        """アイドル判定用の差分ハッシュ（計算できない場合はNone）"""
+        try:
+            return dhash(screenshot)
+        except ImageLoadError as hash_error:
+            if self.config.verbose:
+                print(f"Warning: Failed to compute frame hash: {hash_error}", file=sys.stderr)
+            return None
+
+    def _persist_idle_intervals(self, intervals: List[IdleInterval]) -> None:
+        """
+        終わったアイドル期間をそれぞれ1件のレコードとして保存する
+
+        レコードの timestamp は開始時刻、timestamp_end は終了時刻、status は "sleep"。
+        """
+        for interval in intervals:
+            jsonl_path = self._persist(
+                interval.start, interval.window, "", "sleep", interval.record_fields()
+            )
+            if self.config.verbose:
+                print(
+                    f"Idle interval ({interval.reason}): {interval.start.isoformat()} - "
+                    f"{interval.end.isoformat()}, {interval.ticks} tick(s), "
+                    f"{interval.captures} probe(s) -> {jsonl_path}"
+                )
+
+    def _get_window(self) -> tuple[str, Optional[tuple[int, int, int, int]]]:
+        """
+        アクティブウィンドウ名と位置を取得する
+
+        Returns:
+            (ウィンドウ名, ウィンドウ位置 または None)
+        """
+        with stage("window"):
+            if self.config.window_provider is not None:
+                window_name, window_bounds = self.config.window_provider.active_window()
+            else:
+                window_name, window_bounds = get_active_window()
+        if self.config.verbose:
+            print(f"Active window: {window_name}")
+            if window_bounds:
+                print(f"Window bounds: {window_bounds}")
+        return window_name, window_bounds
+
+    def _capture(self, window_bounds: Optional[tuple[int, int, int, int]]) -> ImageSource:
+        """
+        スクリーンショットを取得する
+
+        メモリ上でキャプチャする場合、画像の保存は設定された保存方法に従う。
+
+        Args:
+            window_bounds: ウィンドウ位置（Noneの場合は画面全体）
+
+        Returns:
+            スクリーンショットのパス、またはメモリ上の画像
+        """
+        if self.screenshot_writer is None or not self.in_memory_capture:
+            screenshot_dir = self.config.screenshot_dir
+            if self.config.screenshot_buckets:
+                screenshot_dir = screenshot_bucket(screenshot_dir, datetime.now())
+            with stage("capture"):
+                screenshot_path = take_screenshot(screenshot_dir, window_bounds)
+            try:
+                count_bytes(image=screenshot_path.stat().st_size)
+            except OSError:
+                pass
+            if self.config.verbose:
+                print(f"Screenshot saved: {screenshot_path}")
+            return screenshot_path
+
+        with stage("capture"):
+            if self.config.capture_backend is not None:
+                image = self.config.capture_backend.capture(window_bounds)
+            else:
+                image = capture_image(window_bounds)
+            saved_path = self.screenshot_writer.persist(image, datetime.now())
+        if self.config.verbose:
+            print(f"Screenshot captured in memory (persistence: {self.screenshot_writer.policy})")
+            if saved_path is not None:
+                print(f"Screenshot saved: {saved_path}")
+        return image
+
+    def _archive_screenshot(self, screenshot: ImageSource, timestamp: datetime) -> None:
+        """
+        screencaptureで保存したスクリーンショットをOCRの後にアーカイブへ移す
+
+        Args:
+            screenshot: スクリーンショットのパスまたはメモリ上の画像
+            timestamp: 撮影時刻
+        """
+        if self.screenshot_archive is None or self.screenshot_writer is None:
+            return
+        if not isinstance(screenshot, ImageBuffer):
+            with stage("write"):
+                self.screenshot_writer.archive_file(screenshot, timestamp)
+
+    def _recognize(self, window_name: str, screenshot_path: ImageSource) -> RecognitionResult:
+        """
+        スクリーンショットをOCR処理する（処理時間は "ocr" 段階として計測する）
+
+        Args:
+            window_name: ウィンドウ名
+            screenshot_path: スクリーンショットのパスまたはメモリ上の画像
+
+        Returns:
+            認識結果
+        """
+        with stage("ocr"):
+            return self._recognize_frame(window_name, screenshot_path)
+
+    def _recognize_frame(self, window_name: str, screenshot_path: ImageSource) -> RecognitionResult:
+        """
+        スクリーンショットをOCR処理する
+
+        フレームハッシュが有効な場合、同じウィンドウの直前フレームと
+        ほぼ同一であればOCRを省略して前回のテキストを再利用する。
+        OCRキャッシュが有効な場合、同じ内容の画像のOCR結果があれば再利用する。
+
+        Args:
+            window_name: ウィンドウ名
+            screenshot_path: スクリーンショットのパスまたはメモリ上の画像
+
+        Returns:
+            認識結果
+        """
+        frame_hash = self._compute_frame_hash(screenshot_path)
+        if self.fingerprinter is not None and frame_hash is not None:
+            cached_text = self.fingerprinter.lookup(window_name, frame_hash)
+            if cached_text is not None:
+                if self.config.verbose:
+                    print(f"OCR skipped: frame unchanged ({len(cached_text)} characters reused)")
+                return RecognitionResult(
+                    text=cached_text, frame_hash=format_hash(frame_hash), ocr_skipped=True
+                )
+
+        cache_key = self._cache_key(screenshot_path)
+        text = self.ocr_cache.get(cache_key) if self.ocr_cache and cache_key else None
+        if text is not None:
+            if self.config.verbose:
+                print(f"OCR skipped: cache hit ({len(text)} characters reused)")
+            ocr_skipped = True
+            ocr_pass = None
+        else:
+            started = time.monotonic()
+            try:
+                text, ocr_pass = self._preprocess_and_ocr(window_name, screenshot_path)
+            except OcrTimeoutError as timeout_error:
+                # 空文字列として扱わず、タイムアウトとして記録する
+                if self.config.verbose:
+                    print(f"Warning: {timeout_error}", file=sys.stderr)
+                    if self.ocr_worker is not None:
+                        stats = self.ocr_worker.stats()
+                        print(
+                            f"OCR worker: {stats['timeouts']} timeout(s), "
+                            f"{stats['restarts']} restart(s)",
+                            file=sys.stderr,
+                        )
+                return RecognitionResult(
+                    text="",
+                    frame_hash=format_hash(frame_hash) if frame_hash is not None else None,
+                    ocr_timed_out=True,
+                )
+            # OCRの失敗（OcrError など）はここまで来ないため、キャッシュするのは成功した結果だけ
+            if self.ocr_cache is not None and cache_key is not None:
+                self.ocr_cache.put(cache_key, text, time.monotonic() - started)
+            if self.config.verbose:
+                print(f"OCR completed: {len(text)} characters")
+            ocr_skipped = False
+
+        if self.fingerprinter is not None and frame_hash is not None:
+            self.fingerprinter.remember(window_name, frame_hash, text)
+        return RecognitionResult(
+            text=text,
+            frame_hash=format_hash(frame_hash) if frame_hash is not None else None,
+            ocr_skipped=ocr_skipped,
+            ocr_pass=ocr_pass,
+        )
+
+    def _preprocess_and_ocr(
+        self, window_name: str, screenshot_path: ImageSource
+    ) -> Tuple[str, Optional[str]]:
+        """
+        前処理が有効な場合は前処理した画像をOCRする
+
+        前処理した画像はOCR後に削除する（メモリ上の画像の場合はファイルに保存しない）。
+        画面全体が空白の場合はOCRを省略する。
+
+        Args:
+            window_name: ウィンドウ名
+            screenshot_path: スクリーンショットのパスまたはメモリ上の画像
+
+        Returns:
+            (認識されたテキスト, 認識パス または None)
+        """
+        if self.config.preprocess is None:
+            return self._perform_ocr(window_name, screenshot_path)
+
+        output_path: Optional[Path] = None
+        if not isinstance(screenshot_path, ImageBuffer):
+            output_path = screenshot_path.with_name(f"{screenshot_path.stem}.ocr.png")
+        try:
+            with stage("preprocess"):
+                result = preprocess_image(screenshot_path, output_path, self.config.preprocess)
+        except ImageLoadError as preprocess_error:
+            if self.config.verbose:
+                print(f"Warning: Preprocessing failed: {preprocess_error}", file=sys.stderr)
+            return self._perform_ocr(window_name, screenshot_path)
+
+        if self.config.verbose:
+            print(
+                f"Preprocessed: {result.original_size[0]}x{result.original_size[1]} -> "
+                f"{result.output_size[0]}x{result.output_size[1]} "
+                f"({result.elapsed_seconds * 1000:.0f}ms)"
+            )
+        if result.image is None:
+            # 画面全体が背景色ならOCRするまでもなくテキストはない
+            return "", None
+        try:
+            return self._perform_ocr(window_name, result.image)
+        finally:
+            if result.path is not None:
+                result.path.unlink(missing_ok=True)
+
+    def _perform_ocr(
+        self, window_name: str, screenshot_path: ImageSource
+    ) -> Tuple[str, Optional[str]]:
+        """
+        OCRを実行する
+
+        差分OCRが有効な場合は変化したタイルのみ、段階的OCRが有効な場合は
+        高速パスを優先して認識する。
+
+        Args:
+            window_name: ウィンドウ名
+            screenshot_path: スクリーンショットのパスまたはメモリ上の画像
+
+        Returns:
+            (認識されたテキスト, 認識パス または None)
+        """
+        if self.incremental_ocr is not None:
+            try:
+                result = self.incremental_ocr.recognize(window_name, screenshot_path)
+                if self.config.verbose:
+                    mode = "full" if result.full_pass else "incremental"
+                    print(
+                        f"OCR pass: {mode} ({result.dirty_tiles}/{result.total_tiles} "
+                        f"tiles dirty, {result.ocr_area:.0%} of frame)"
+                    )
+                return result.text, None
+            except ImageLoadError as tile_error:
+                if self.config.verbose:
+                    print(f"Warning: Incremental OCR unavailable: {tile_error}", file=sys.stderr)
+
+        if self.tiered_ocr is not None:
+            tiered = self.tiered_ocr.recognize(screenshot_path, window_name)
+            if self.config.verbose:
+                print(
+                    f"OCR pass: {tiered.ocr_pass} (confidence {tiered.mean_confidence:.2f}, "
+                    f"coverage {tiered.coverage:.1%}, escalated {tiered.escalated_area:.0%})"
+                )
+            return tiered.text, tiered.ocr_pass
+
+        if self.ocr_backend is not None:
+            return ocr_text(self.ocr_backend, screenshot_path, self.config.timeout_seconds), None
+        return perform_ocr(screenshot_path, self.config.timeout_seconds, raise_errors=True), None
+
+    def _recognition_settings(self) -> str:
+        """OCRキャッシュのキーに含める認識設定の識別子"""
+        accurate = (
+            self.ocr_backend.settings if self.ocr_backend is not None else RECOGNITION_SETTINGS
+        )
+        settings = accurate
+        if self.tiered_ocr is not None:
+            fast_backend = self.config.fast_ocr_backend
+            fast = (
+                fast_backend.settings
+                if fast_backend is not None
+                else recognition_settings(RECOGNITION_LEVEL_FAST)
+            )
+            settings = (
+                f"tiered:{fast}|{accurate}|{self.config.tiered_min_confidence}"
+                f"|{self.config.tiered_min_coverage}|{self.tiered_ocr.min_plausibility}"
+                f"|scale={self.config.tiered_fast_scale}"
+            )
+        if self.config.preprocess is not None:
+            settings = f"{self.config.preprocess.settings()}|{settings}"
+        return settings
+
+    def _status_for(self, recognition: RecognitionResult, screenshot_path: ImageSource) -> str:
+        """
+        レコードの状態を決める（OCRのタイムアウトはスリープ判定の対象にしない）
+
+        Args:
+            recognition: 認識結果
+            screenshot_path: スクリーンショットのパスまたはメモリ上の画像
+
+        Returns:
+            状態を表す文字列（"normal", "sleep", "ocr_timeout"など）
+        """
+        if recognition.ocr_timed_out:
+            status = "ocr_timeout"
+        else:
+            with stage("sleep"):
+                status = self._detect_sleep_state(recognition.text, screenshot_path)
+        if self.config.verbose:
+            print(f"Status detected: {status}")
+        return status
+
+    def ocr_worker_stats(self) -> Optional[Dict[str, int]]:
+        """
+        OCRワーカーの統計情報（ワーカーを使っていない場合はNone）
+
+        Returns:
+            ジョブ数・タイムアウト数・再起動数などを含む辞書
+        """
+        return self.ocr_worker.stats() if self.ocr_worker is not None else None
+
+    def _cache_key(self, screenshot_path: ImageSource) -> Optional[str]:
+        """
+        OCRキャッシュのキーを計算する（無効な場合や画像を読めない場合はNone）
+
+        Args:
+            screenshot_path: スクリーンショットのパスまたはメモリ上の画像
+
+        Returns:
+            キャッシュキー
+        """
+        if self.ocr_cache is None:
+            return None
+        try:
+            return self.ocr_cache.key_for(screenshot_path)
+        except (OSError, ImageLoadError) as key_error:
+            if self.config.verbose:
+                print(f"Warning: Failed to read screenshot for cache: {key_error}", file=sys.stderr)
+            return None
+
+    def _compute_frame_hash(self, screenshot_path: ImageSource) -> Optional[int]:
+        """
+        フレームハッシュを計算する（無効な場合や計算できない場合はNone）
+
+        Args:
+            screenshot_path: スクリーンショットのパスまたはメモリ上の画像
+
+        Returns:
+            ハッシュ値
+        """
+        if self.fingerprinter is None:
+            return None
+        try:
+            return dhash(screenshot_path)
+        except ImageLoadError as hash_error:
+            if self.config.verbose:
+                print(f"Warning: Failed to compute frame hash: {hash_error}", file=sys.stderr)
+            return None
+
+    def _persist(
+        self,
+        timestamp: datetime,
+        window_name: str,
+        text: str,
+        status: str,
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Path]:
+        """
+        レコードをJSONLに保存する（dry-runモードではスキップ）
+
+        Args:
+            timestamp: タイムスタンプ
+            window_name: ウィンドウ名
+            text: OCRテキスト
+            status: 状態
+            extra: レコードに追加するフィールド（frame_hashなど）
+
+        Returns:
+            保存先のJSONLファイルパス（dry-runの場合はNone）
+        """
+        if self.config.dry_run:
+            if self.config.verbose:
+                print("[DRY RUN] JSONL保存をスキップしました")
+            return None
+
+        with stage("write"):
+            jsonl_path = self._save_to_jsonl(timestamp, window_name, text, status, extra)
+        if self.config.verbose:
+            print(f"Log saved to: {jsonl_path}")
+        return jsonl_path
+
+    def shutdown(self) -> None:
+        """
+        終了処理
+
+        常駐実行の終了時に呼び出す。マージャーのバッファに残っているレコードと
+        進行中のアイドル期間を現在のJSONLファイルに書き込んでから閉じ、
+        実行中のクリーンアップと保存待ちのスクリーンショットの書き込みを待って、
+        OCRワーカーを終了する。
+        """
+        if self.idle_detector is not None:
+            try:
+                self._persist_idle_intervals(self.idle_detector.close())
+            except Exception as idle_error:
+                print(f"Warning: Failed to write idle interval: {idle_error}", file=sys.stderr)
+
+        if not self.config.dry_run and self.jsonl_manager.merger is not None:
+            try:
+                jsonl_path = self.jsonl_manager.get_current_jsonl_path()
+                self.jsonl_manager.flush_merger(jsonl_path)
+            except Exception as flush_error:
+                print(f"Warning: Failed to flush merger: {flush_error}", file=sys.stderr)
+
+        try:
+            self.jsonl_manager.close()
+        except Exception as close_error:
+            print(f"Warning: Failed to close JSONL file: {close_error}", file=sys.stderr)
+
+        if self._cleanup_thread is not None:
+            self._cleanup_thread.join()
+
+        if self.screenshot_writer is not None:
+            self.screenshot_writer.close()
+            if self.config.verbose:
+                print(f"Screenshot writer stats: {self.screenshot_writer.stats()}")
+
+        if self.ocr_worker is not None:
+            if self.config.verbose:
+                print(f"OCR worker stats: {self.ocr_worker.stats()}")
+            self.ocr_worker.close()
+
+    def _detect_sleep_state(self, text: str, screenshot_path: ImageSource) -> str:
         """
         スリープ/ロック状態を検出する
 
         以下の条件でスリープ状態を判定：
         - テキストが空（text_length = 0）
-        - スクリーンショットのファイルサイズが前回と同じ
+        - スクリーンショットのファイルサイズ（メモリ上の画像の場合は画素データのハッシュ）が
+          前回と同じ
         - 連続して空のテキストが3回以上記録される
 
         Args:
             text: OCRで抽出されたテキスト
-            screenshot_path: スクリーンショットファイルのパス
+            screenshot_path: スクリーンショットファイルのパスまたはメモリ上の画像
 
         Returns:
             状態を表す文字列（"normal", "sleep", "lock"）
@@ -232,38 +1115,46 @@ class ScreenOCRLogger:
         # テキストが空でない場合は通常状態
         if text.strip():
             self._consecutive_empty_count = 0
-            self._last_screenshot_size = None
+            self._last_frame_signature = None
             return "normal"
 
         # テキストが空の場合、連続カウントを増加
         self._consecutive_empty_count += 1
 
-        # スクリーンショットのファイルサイズを確認
+        # スクリーンショットのファイルサイズ（メモリ上の画像は画素データのハッシュ）を確認
         try:
-            current_size = screenshot_path.stat().st_size
-        except (OSError, FileNotFoundError):
+            if isinstance(screenshot_path, ImageBuffer):
+                current_signature: Any = screenshot_path.digest()
+            else:
+                current_signature = screenshot_path.stat().st_size
+        except (OSError, FileNotFoundError, ImageLoadError):
             # ファイルアクセスエラーの場合は通常状態として扱う
             return "normal"
 
         # 初回の場合はサイズを記録して通常状態とする
-        if self._last_screenshot_size is None:
-            self._last_screenshot_size = current_size
+        if self._last_frame_signature is None:
+            self._last_frame_signature = current_signature
             return "normal"
 
-        # ファイルサイズが同じで、連続して空のテキストが3回以上の場合はスリープ状態
-        if current_size == self._last_screenshot_size and self._consecutive_empty_count >= 3:
+        # サイズが同じで、連続して空のテキストが3回以上の場合はスリープ状態
+        if current_signature == self._last_frame_signature and self._consecutive_empty_count >= 3:
             return "sleep"
 
-        # ファイルサイズが変わった場合は、サイズを更新
-        if current_size != self._last_screenshot_size:
-            self._last_screenshot_size = current_size
+        # サイズが変わった場合は、サイズを更新
+        if current_signature != self._last_frame_signature:
+            self._last_frame_signature = current_signature
             # サイズが変わったということは画面が変化しているため、カウントをリセット
             self._consecutive_empty_count = 1
 
         return "normal"
 
     def _save_to_jsonl(
-        self, timestamp: datetime, window: str, text: str, status: str = "normal"
+        self,
+        timestamp: datetime,
+        window: str,
+        text: str,
+        status: str = "normal",
+        extra: Optional[Dict[str, Any]] = None,
     ) -> Path:
         """
         JSONL形式でログを保存（日付ベースで自動分割）
@@ -273,6 +1164,7 @@ class ScreenOCRLogger:
             window: ウィンドウ名
             text: OCRテキスト
             status: 状態（"normal", "sleep", "error"など）
+            extra: レコードに追加するフィールド
 
         Returns:
             保存先のJSONLファイルパス
@@ -284,7 +1176,7 @@ class ScreenOCRLogger:
             jsonl_path = self.jsonl_manager.get_current_jsonl_path(timestamp)
             # append_recordは実際に書き込んだファイルパスを返す（サイズ超過時は新ファイル）
             actual_path = self.jsonl_manager.append_record(
-                jsonl_path, timestamp, window, text, status
+                jsonl_path, timestamp, window, text, status, extra=extra
             )
             return actual_path
         except Exception as e:
@@ -293,9 +1185,57 @@ class ScreenOCRLogger:
             raise
 
 
+def _remove_bucket(path: str) -> int:
+    """
+    バケットディレクトリを削除する
+
+    Args:
+        path: バケットディレクトリのパス
+
+    Returns:
+        削除したファイル数
+    """
+    count = sum(len(files) for _, _, files in os.walk(path))
+    shutil.rmtree(path)
+    return count
+
+
+def screenshot_path_of(screenshot: Optional[ImageSource]) -> Optional[Path]:
+    """
+    スクリーンショットの保存先のパス
+
+    Args:
+        screenshot: スクリーンショットのパスまたはメモリ上の画像
+
+    Returns:
+        保存先のパス（保存しないメモリ上の画像の場合はNone）
+    """
+    if isinstance(screenshot, ImageBuffer):
+        return screenshot.path
+    return screenshot
+
+
+def ocr_cache_max_bytes_from_env() -> Optional[int]:
+    """
+    環境変数 SCREENOCR_OCR_CACHE_MB からOCRキャッシュの容量上限を読み込む
+
+    Returns:
+        容量上限（バイト）。環境変数がない、または空の場合はNone（キャッシュしない）
+
+    Raises:
+        ValueError: 正の整数でない場合
+    """
+    value = os.environ.get(OCR_CACHE_MB_ENV, "").strip()
+    if not value:
+        return None
+    if not value.isdigit() or int(value) <= 0:
+        raise ValueError(f"Invalid {OCR_CACHE_MB_ENV}: {value!r} (expected a positive integer)")
+    return int(value) * 1024 * 1024
+
+
 def main():
     """モジュールとして実行された時のエントリーポイント"""
-    logger = ScreenOCRLogger()
+    logger = ScreenOCRLogger(ScreenOCRConfig(ocr_cache_max_bytes=ocr_cache_max_bytes_from_env()))
     result = logger.run()
 
     # マージャーをフラッシュ（バッファに残っているレコードを書き込む）
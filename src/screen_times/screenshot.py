@@ -5,85 +5,80 @@
 アクティブウィンドウの検出とスクリーンショット撮影を担当
 """
 
+import random
 import subprocess
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, List, Optional, Protocol, Tuple, runtime_checkable
 
+from .image_utils import ImageBuffer
+from .window_provider import default_window_provider
 
-def get_active_window() -> tuple[str, Optional[tuple[int, int, int, int]]]:
+
+class ScreenCaptureError(Exception):
+    """画面のキャプチャに失敗した"""
+
+    pass
+
+
+# 1時間ごとのバケットディレクトリ名（保持期間による削除はバケット単位で行う）
+SCREENSHOT_BUCKET_FORMAT = "%Y%m%d_%H"
+
+
+def screenshot_bucket(screenshot_dir: Path, timestamp: datetime) -> Path:
     """
-    AppleScript経由でアクティブウィンドウ名と位置を取得
+    撮影時刻のバケットディレクトリ
+
+    Args:
+        screenshot_dir: スクリーンショット保存先ディレクトリ
+        timestamp: 撮影時刻
 
     Returns:
-        (アプリケーション名, ウィンドウ位置 (x, y, width, height) または None)
+        screenshot_dir/<YYYYMMDD_HH>
+    """
+    return screenshot_dir / timestamp.strftime(SCREENSHOT_BUCKET_FORMAT)
+
+
+def parse_bucket(name: str) -> Optional[datetime]:
     """
-    script_path = Path(__file__).parent / "resources" / "screenshot_window.applescript"
+    バケットディレクトリ名から開始時刻を求める
+
+    Args:
+        name: ディレクトリ名
 
+    Returns:
+        バケットの開始時刻（バケットの名前でない場合はNone）
+    """
     try:
-        result = subprocess.run(
-            ["osascript", str(script_path)], capture_output=True, text=True, timeout=3, check=True
-        )
-        app_name = result.stdout.strip() or "Unknown"
-
-        # PyObjCでウィンドウ情報を取得
-        try:
-            from Quartz import (
-                CGWindowListCopyWindowInfo,
-                kCGWindowListOptionOnScreenOnly,
-                kCGNullWindowID,
-            )
-
-            # 画面上の全ウィンドウ情報を取得
-            window_list = CGWindowListCopyWindowInfo(
-                kCGWindowListOptionOnScreenOnly, kCGNullWindowID
-            )
-
-            # アクティブなアプリのウィンドウを探す
-            # 正規化して比較用の文字列を作成
-            normalized_app_name = app_name.lower().replace("-", "").replace(" ", "")
-
-            for window in window_list:
-                owner_name = window.get("kCGWindowOwnerName", "")
-                layer = window.get("kCGWindowLayer", 0)
-
-                # レイヤー0（通常のウィンドウ）のみ対象
-                if layer != 0:
-                    continue
-
-                # 正規化して比較
-                normalized_owner = owner_name.lower().replace("-", "").replace(" ", "")
-
-                # 部分一致または完全一致で判定
-                # (例: "wezterm-gui" と "WezTerm"、"Electron" と "Code")
-                if (
-                    normalized_app_name in normalized_owner
-                    or normalized_owner in normalized_app_name
-                    or normalized_app_name == normalized_owner
-                ):
-                    bounds = window.get("kCGWindowBounds", {})
-                    if bounds:
-                        x = int(bounds["X"])
-                        y = int(bounds["Y"])
-                        w = int(bounds["Width"])
-                        h = int(bounds["Height"])
-                        print(
-                            f"Debug: Matched window - Owner: {owner_name}, "
-                            f"Bounds: ({x}, {y}, {w}, {h})",
-                            file=sys.stderr,
-                        )
-                        return (app_name, (x, y, w, h))
-
-            return (app_name, None)
-
-        except Exception as bounds_error:
-            print(f"Warning: Could not get window bounds: {bounds_error}", file=sys.stderr)
-            return (app_name, None)
-
-    except (subprocess.TimeoutExpired, subprocess.CalledProcessError) as get_window_error:
-        print(f"Warning: Failed to get active window: {get_window_error}", file=sys.stderr)
-        return ("Unknown", None)
+        return datetime.strptime(name, SCREENSHOT_BUCKET_FORMAT)
+    except ValueError:
+        return None
+
+
+def screenshot_filename(timestamp: datetime) -> str:
+    """
+    スクリーンショットのファイル名（保持期間による削除はこの名前で対象を探す）
+
+    Args:
+        timestamp: 撮影時刻
+
+    Returns:
+        screenshot_%Y%m%d_%H%M%S.png 形式のファイル名
+    """
+    return f"screenshot_{timestamp.strftime('%Y%m%d_%H%M%S')}.png"
+
+
+def get_active_window() -> tuple[str, Optional[tuple[int, int, int, int]]]:
+    """
+    アクティブウィンドウ名と位置を取得
+
+    既定のウィンドウ取得（pyobjcが使える場合はプロセス内、それ以外はAppleScript経由）を使う。
+
+    Returns:
+        (アプリケーション名, ウィンドウ位置 (x, y, width, height) または None)
+    """
+    return default_window_provider().active_window()
 
 
 def take_screenshot(
@@ -102,8 +97,7 @@ def take_screenshot(
     # ディレクトリが存在しない場合は作成
     screenshot_dir.mkdir(parents=True, exist_ok=True)
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    screenshot_path = screenshot_dir / f"screenshot_{timestamp}.png"
+    screenshot_path = screenshot_dir / screenshot_filename(datetime.now())
 
     try:
         if window_bounds:
@@ -127,3 +121,114 @@ def take_screenshot(
     ) as screenshot_error:
         print(f"Error: Failed to take screenshot: {screenshot_error}", file=sys.stderr)
         raise
+
+
+def capture_image(window_bounds: Optional[tuple[int, int, int, int]] = None) -> ImageBuffer:
+    """
+    画面をメモリ上にキャプチャする（ファイルへの書き出しと読み直しを行わない）
+
+    Args:
+        window_bounds: ウィンドウの位置とサイズ (x, y, w, h)。Noneの場合は画面全体
+
+    Returns:
+        キャプチャした画像
+
+    Raises:
+        ScreenCaptureError: キャプチャに失敗した場合
+    """
+    try:
+        from Quartz import (
+            CGRectInfinite,
+            CGRectMake,
+            CGWindowListCreateImage,
+            kCGNullWindowID,
+            kCGWindowImageDefault,
+            kCGWindowListOptionOnScreenOnly,
+        )
+    except ImportError as import_error:
+        raise ScreenCaptureError(f"Quartz is not available: {import_error}")
+
+    if window_bounds:
+        x, y, w, h = window_bounds
+        rect = CGRectMake(x, y, w, h)
+    else:
+        rect = CGRectInfinite
+
+    cg_image = CGWindowListCreateImage(
+        rect, kCGWindowListOptionOnScreenOnly, kCGNullWindowID, kCGWindowImageDefault
+    )
+    if not cg_image:
+        error = ScreenCaptureError("CGWindowListCreateImage returned no image")
+        print(f"Error: Failed to take screenshot: {error}", file=sys.stderr)
+        raise error
+    return ImageBuffer(cg_image=cg_image)
+
+
+@runtime_checkable
+class CaptureBackend(Protocol):
+    """画面をメモリ上にキャプチャするプロトコル"""
+
+    def capture(self, window_bounds: Optional[tuple[int, int, int, int]] = None) -> ImageBuffer:
+        """
+        画面をキャプチャする
+
+        Args:
+            window_bounds: ウィンドウの位置とサイズ (x, y, w, h)。Noneの場合は画面全体
+
+        Returns:
+            キャプチャした画像
+        """
+        ...
+
+
+class FakeCaptureBackend:
+    """
+    テスト・ベンチマーク用のキャプチャ（Pillowで描いた画像を返す）
+
+    frames 枚の異なる画像をあらかじめ描いておき、change_every 回ごとに次の画像に
+    切り替えて順に返す。描画の時間はキャプチャの時間に含めない。
+
+    使用例:
+        >>> backend = FakeCaptureBackend(size=(1280, 800), frames=8)
+        >>> config = ScreenOCRConfig(capture_backend=backend)
+    """
+
+    def __init__(
+        self,
+        size: Tuple[int, int] = (800, 600),
+        frames: int = 4,
+        change_every: int = 1,
+        seed: int = 0,
+    ):
+        """
+        初期化
+
+        Args:
+            size: 画像のサイズ（幅, 高さ）
+            frames: 異なる画像の数
+            change_every: 同じ画像を返す回数
+            seed: 描画に使う乱数のシード
+        """
+        if frames < 1 or change_every < 1:
+            raise ValueError("frames and change_every must be at least 1")
+        from PIL import Image, ImageDraw
+
+        rng = random.Random(seed)
+        width, height = size
+        self._frames: List[Any] = []
+        for _ in range(frames):
+            image = Image.new("RGB", size, color="white")
+            draw = ImageDraw.Draw(image)
+            # テキストの行に見立てた横長の矩形を描く
+            for row in range(12, height - 12, 24):
+                length = rng.randint(width // 8, width - 24)
+                draw.rectangle([12, row, 12 + length, row + 10], fill="black")
+            self._frames.append(image)
+        self.change_every = change_every
+        self.calls = 0
+
+    def capture(self, window_bounds: Optional[tuple[int, int, int, int]] = None) -> ImageBuffer:
+        """次の画像を返す（window_bounds は無視する）"""
+        frame = self._frames[(self.calls // self.change_every) % len(self._frames)]
+        self.calls += 1
+        return ImageBuffer(pil_image=frame)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Screenshot Archive - 内容アドレスで重複を排除したスクリーンショットの保存
+
+画面が変化しない時間帯は、毎分のスクリーンショットの大半が同一またはほぼ同一になる。
+アーカイブでは画像を画素データのハッシュをファイル名にして保存し（内容アドレス）、
+直前のキーフレームと差分ハッシュ（dHash）がほぼ同じフレームは新たに保存せず
+キーフレームを参照する。撮影時刻とフレームの対応は日ごとのマニフェストに記録する。
+
+    archive_dir/
+        objects/<先頭2文字>/<ハッシュ>.<形式>   # キーフレーム
+        manifests/<YYYY-MM-DD>.jsonl            # 1撮影1行（時刻 → フレーム）
+
+フレームを参照するたびにファイルの更新時刻を更新するため、保持期間を過ぎた
+フレームは更新時刻だけで判定して削除できる。
+"""
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .frame_hash import dhash, format_hash, hamming_distance
+from .image_utils import IMAGE_FORMATS, ImageBuffer, ImageLoadError, ImageSource
+
+# フレームの種類（マニフェストの kind に保存する）
+FRAME_KEYFRAME = "keyframe"  # 新たに保存したフレーム
+FRAME_DUPLICATE = "duplicate"  # 同じ画素データのフレームが保存済み
+FRAME_REFERENCE = "reference"  # 直前のキーフレームとほぼ同じため参照のみ
+
+
+@dataclass
+class ArchivedFrame:
+    """アーカイブに追加したフレーム"""
+
+    path: Path  # フレームの画像ファイル
+    kind: str
+    digest: str
+
+
+class ScreenshotArchive:
+    """
+    内容アドレスで重複を排除したスクリーンショットのアーカイブ
+
+    使用例:
+        >>> archive = ScreenshotArchive(Path("/tmp/screen-times/archive"), image_format="png")
+        >>> frame = archive.add(image, datetime.now())
+        >>> archive.resolve(datetime(2026, 1, 2, 9, 30))  # その時刻に表示されていたフレーム
+        >>> archive.prune(retention_hours=72)
+    """
+
+    def __init__(
+        self,
+        archive_dir: Path,
+        keyframe_distance: int = 4,
+        image_format: str = "png",
+        quality: Optional[float] = None,
+    ):
+        """
+        初期化
+
+        Args:
+            archive_dir: アーカイブのディレクトリ
+            keyframe_distance: 直前のキーフレームとのハミング距離がこの値以下なら参照のみにする
+                               （負の値の場合は画素データが同一のフレームだけを重複とみなす）
+            image_format: キーフレームの保存形式（"png", "jpeg", "heic"）
+            quality: 非可逆形式の品質（0.0～1.0、Noneの場合は既定値）
+        """
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        self.archive_dir = archive_dir
+        self.objects_dir = archive_dir / "objects"
+        self.manifests_dir = archive_dir / "manifests"
+        self.keyframe_distance = keyframe_distance
+        self.image_format = image_format
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._last_keyframe: Optional[Tuple[int, str]] = None  # (dHash, 画素データのハッシュ)
+        self._stats: Dict[str, int] = {
+            "frames": 0,
+            "keyframes": 0,
+            "duplicates": 0,
+            "references": 0,
+            "bytes_written": 0,
+        }
+
+    def add(self, image: ImageSource, timestamp: datetime) -> ArchivedFrame:
+        """
+        フレームをアーカイブに追加する
+
+        Args:
+            image: スクリーンショットのパスまたはメモリ上の画像
+            timestamp: 撮影時刻
+
+        Returns:
+            追加したフレーム
+
+        Raises:
+            ImageLoadError: 画像の読み込みやエンコードに失敗した場合
+            OSError: 書き込みに失敗した場合
+        """
+        buffer = image if isinstance(image, ImageBuffer) else _read_buffer(image)
+        digest = buffer.digest()
+        frame_hash = dhash(buffer)
+
+        with self._lock:
+            last = self._last_keyframe
+            if (
+                last is not None
+                and hamming_distance(last[0], frame_hash) <= self.keyframe_distance
+                and self._object_path(last[1]).exists()
+            ):
+                kind = FRAME_REFERENCE
+                digest = last[1]
+                object_path = self._object_path(digest)
+                os.utime(object_path, None)
+            else:
+                object_path = self._object_path(digest)
+                if object_path.exists():
+                    kind = FRAME_DUPLICATE
+                    os.utime(object_path, None)
+                else:
+                    kind = FRAME_KEYFRAME
+                    self._write_object(object_path, buffer.encode(self.image_format, self.quality))
+                self._last_keyframe = (frame_hash, digest)
+
+            self._append_manifest(
+                timestamp,
+                {
+                    "timestamp": timestamp.isoformat(),
+                    "frame": digest,
+                    "kind": kind,
+                    "frame_hash": format_hash(frame_hash),
+                },
+            )
+            self._stats["frames"] += 1
+            self._stats[_STAT_FOR_KIND[kind]] += 1
+        return ArchivedFrame(path=object_path, kind=kind, digest=digest)
+
+    def resolve(self, timestamp: datetime) -> Optional[Path]:
+        """
+        指定した時刻に表示されていたフレーム（その時刻以前の最後の撮影）を探す
+
+        Args:
+            timestamp: 時刻
+
+        Returns:
+            フレームの画像ファイル（見つからない場合や削除済みの場合はNone）
+        """
+        manifest_path = self._manifest_path(timestamp)
+        frame: Optional[str] = None
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        taken = datetime.fromisoformat(entry["timestamp"])
+                    except (json.JSONDecodeError, KeyError, ValueError):
+                        continue
+                    if taken > timestamp:
+                        break
+                    frame = entry.get("frame")
+        except OSError:
+            return None
+        if frame is None:
+            return None
+        path = self._object_path(frame)
+        return path if path.exists() else None
+
+    def prune(self, retention_hours: float) -> int:
+        """
+        保持期間を過ぎたフレームとマニフェストを削除する
+
+        フレームは参照されるたびに更新時刻が更新されるため、更新時刻が保持期間より
+        古いフレームは保持期間内のどの撮影からも参照されていない。
+
+        Args:
+            retention_hours: 保持期間（時間）
+
+        Returns:
+            削除したファイル数
+        """
+        cutoff = datetime.now() - timedelta(hours=retention_hours)
+        cutoff_time = cutoff.timestamp()
+        deleted = 0
+        with self._lock:
+            if self.objects_dir.exists():
+                for bucket in os.scandir(self.objects_dir):
+                    if not bucket.is_dir():
+                        continue
+                    for entry in os.scandir(bucket.path):
+                        try:
+                            if entry.stat().st_mtime < cutoff_time:
+                                os.unlink(entry.path)
+                                deleted += 1
+                        except OSError:
+                            continue
+            if self.manifests_dir.exists():
+                # 日の終わりが保持期間より前のマニフェストを削除する
+                oldest_day = cutoff.date().isoformat()
+                for entry in os.scandir(self.manifests_dir):
+                    day = entry.name.split(".", 1)[0]
+                    if entry.name.endswith(".jsonl") and day < oldest_day:
+                        try:
+                            os.unlink(entry.path)
+                            deleted += 1
+                        except OSError:
+                            continue
+            if (
+                self._last_keyframe is not None
+                and not self._object_path(self._last_keyframe[1]).exists()
+            ):
+                self._last_keyframe = None
+        return deleted
+
+    def stats(self) -> Dict[str, int]:
+        """
+        このインスタンスで追加したフレームの統計情報
+
+        Returns:
+            frames, keyframes, duplicates, references, bytes_written を含む辞書
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def disk_usage(self) -> Tuple[int, int]:
+        """
+        保存されているキーフレームの数と合計サイズ
+
+        Returns:
+            (ファイル数, バイト数)
+        """
+        count = 0
+        total = 0
+        if self.objects_dir.exists():
+            for bucket in os.scandir(self.objects_dir):
+                if not bucket.is_dir():
+                    continue
+                for entry in os.scandir(bucket.path):
+                    try:
+                        total += entry.stat().st_size
+                    except OSError:
+                        continue
+                    count += 1
+        return count, total
+
+    def _object_path(self, digest: str) -> Path:
+        """画素データのハッシュに対応するフレームのパス"""
+        return self.objects_dir / digest[:2] / f"{digest}.{self.image_format}"
+
+    def _manifest_path(self, timestamp: datetime) -> Path:
+        """撮影日のマニフェストのパス"""
+        return self.manifests_dir / f"{timestamp.date().isoformat()}.jsonl"
+
+    def _write_object(self, object_path: Path, data: bytes) -> None:
+        """フレームを書き込む（書き込み途中のファイルが残らないよう一時ファイルから置き換える）"""
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = object_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, object_path)
+        self._stats["bytes_written"] += len(data)
+
+    def _append_manifest(self, timestamp: datetime, entry: Dict[str, str]) -> None:
+        """マニフェストに1行追加する"""
+        manifest_path = self._manifest_path(timestamp)
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(manifest_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+# フレームの種類ごとの統計情報のキー
+_STAT_FOR_KIND = {
+    FRAME_KEYFRAME: "keyframes",
+    FRAME_DUPLICATE: "duplicates",
+    FRAME_REFERENCE: "references",
+}
+
+
+def _read_buffer(image_path: Path) -> ImageBuffer:
+    """スクリーンショットのファイルをメモリ上の画像として読み込む"""
+    try:
+        return ImageBuffer.from_encoded(image_path.read_bytes(), image_path)
+    except OSError as read_error:
+        raise ImageLoadError(f"Failed to read screenshot: {read_error}")
@@ -11,8 +11,7 @@ JSONL形式でログを記録するメインスクリプト。
 import sys
 from pathlib import Path
 
-from .screen_ocr_logger import ScreenOCRLogger, ScreenOCRConfig
-
+from .screen_ocr_logger import ScreenOCRLogger, ScreenOCRConfig, ocr_cache_max_bytes_from_env
 
 # 設定
 SCREENSHOT_DIR = Path("/tmp/screen-times")
@@ -28,6 +27,8 @@ def main():
             screenshot_dir=SCREENSHOT_DIR,
             timeout_seconds=TIMEOUT_SECONDS,
             screenshot_retention_hours=SCREENSHOT_RETENTION_HOURS,
+            # 起動をまたいで使うOCRキャッシュ（環境変数 SCREENOCR_OCR_CACHE_MB で有効化）
+            ocr_cache_max_bytes=ocr_cache_max_bytes_from_env(),
             verbose=True,  # 詳細ログを出力
         )
 
@@ -44,8 +45,8 @@ def main():
             print(f"Fatal error: {result.error}", file=sys.stderr)
             sys.exit(1)
 
-        # 古いスクリーンショットをクリーンアップ
-        logger.cleanup()
+        # 古いスクリーンショットをクリーンアップ（前回から間隔が空いた場合のみ）
+        logger.schedule_cleanup(background=False)
 
     except Exception as main_error:
         print(f"Fatal error: {main_error}", file=sys.stderr)
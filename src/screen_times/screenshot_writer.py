@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Screenshot Writer - メモリ上でキャプチャした画像の保存
+
+メモリ上でキャプチャした画像はOCRにそのまま渡し、ファイルへの保存は
+OCRとは別の任意の処理として行う。保存方法は次のいずれか。
+
+- sync: キャプチャ直後に保存する
+- deferred: バックグラウンドスレッドで保存する（tickの処理時間に含めない）
+- never: 保存しない（SSDへの書き込みをなくす）
+
+保存先は screencapture と同じ1時間ごとのバケットディレクトリ、ファイル名も同じ
+screenshot_%Y%m%d_%H%M%S.png のため、保持期間による削除（ScreenOCRLogger.cleanup）は
+そのまま機能する。
+アーカイブ（ScreenshotArchive）を指定した場合は、重複を排除してアーカイブに保存する。
+"""
+
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Dict, Optional, Tuple
+
+from .image_utils import ImageBuffer, ImageLoadError, ImageSource
+from .metrics import count_bytes
+from .screenshot import screenshot_bucket, screenshot_filename
+from .screenshot_archive import FRAME_KEYFRAME, ScreenshotArchive
+
+# 保存方法
+PERSIST_SYNC = "sync"
+PERSIST_DEFERRED = "deferred"
+PERSIST_NEVER = "never"
+
+PERSISTENCE_POLICIES = (PERSIST_SYNC, PERSIST_DEFERRED, PERSIST_NEVER)
+
+
+class ScreenshotWriter:
+    """
+    キャプチャした画像をポリシーに従って保存する
+
+    deferredの場合、保存待ちが max_pending を超えたら最も古い画像を破棄する
+    （保存はOCRの記録に必須ではないため、メモリの増加を優先して防ぐ）。
+
+    使用例:
+        >>> writer = ScreenshotWriter(Path("/tmp/screen-times"), PERSIST_DEFERRED)
+        >>> path = writer.persist(image, datetime.now())
+        >>> writer.close()  # 保存待ちの画像を書き込んでから終了する
+    """
+
+    def __init__(
+        self,
+        screenshot_dir: Path,
+        policy: str = PERSIST_DEFERRED,
+        max_pending: int = 8,
+        archive: Optional[ScreenshotArchive] = None,
+        bucketed: bool = True,
+    ):
+        """
+        初期化
+
+        Args:
+            screenshot_dir: スクリーンショット保存先ディレクトリ
+            policy: 保存方法（PERSISTENCE_POLICIESのいずれか）
+            max_pending: deferredで保存待ちにできる画像の最大数
+            archive: 保存先のアーカイブ（Noneの場合は screenshot_dir に1枚ずつ保存する）
+            bucketed: Trueの場合、1時間ごとのバケットディレクトリに保存する
+        """
+        if policy not in PERSISTENCE_POLICIES:
+            raise ValueError(f"Unknown screenshot persistence policy: {policy}")
+        if max_pending <= 0:
+            raise ValueError("max_pending must be positive")
+        self.screenshot_dir = screenshot_dir
+        self.policy = policy
+        self.max_pending = max_pending
+        self.archive = archive
+        self.bucketed = bucketed
+        self._pending: Deque[Tuple[ImageSource, datetime]] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._writing = False
+        self._closed = False
+        self._stats: Dict[str, int] = {"written": 0, "dropped": 0, "failed": 0, "bytes": 0}
+
+    def persist(self, image: ImageBuffer, timestamp: datetime) -> Optional[Path]:
+        """
+        画像をポリシーに従って保存する
+
+        Args:
+            image: キャプチャした画像
+            timestamp: 撮影時刻（ファイル名に使う）
+
+        Returns:
+            保存先のパス（保存しない場合や保存に失敗した場合はNone）。
+            deferredの場合は常にNoneで、書き込みに成功した時点で image.path が設定される
+            （保存待ちから破棄された場合や失敗した場合は設定されない）
+        """
+        if self.policy == PERSIST_NEVER:
+            return None
+        if self.policy == PERSIST_SYNC:
+            return self._write(image, timestamp)
+        self._enqueue(image, timestamp)
+        return None
+
+    def archive_file(self, screenshot_path: Path, timestamp: datetime) -> None:
+        """
+        screencaptureで保存したスクリーンショットをアーカイブに移す（OCRの後に呼ぶ）
+
+        アーカイブを使わない場合やneverの場合は何もしない（ファイルは保持期間で削除される）。
+
+        Args:
+            screenshot_path: スクリーンショットのパス
+            timestamp: 撮影時刻
+        """
+        if self.archive is None or self.policy == PERSIST_NEVER:
+            return
+        if self.policy == PERSIST_SYNC:
+            self._write(screenshot_path, timestamp)
+        else:
+            self._enqueue(screenshot_path, timestamp)
+
+    def flush(self) -> None:
+        """保存待ちの画像がすべて書き込まれるまで待つ"""
+        with self._cond:
+            while self._pending or self._writing:
+                self._cond.wait()
+
+    def close(self) -> None:
+        """保存待ちの画像を書き込んでからバックグラウンドスレッドを終了する"""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        保存の統計情報
+
+        Returns:
+            written, dropped, failed, bytes を含む辞書
+        """
+        with self._cond:
+            return dict(self._stats)
+
+    def _flat_path(self, timestamp: datetime) -> Path:
+        """アーカイブを使わない場合の保存先"""
+        directory = self.screenshot_dir
+        if self.bucketed:
+            directory = screenshot_bucket(self.screenshot_dir, timestamp)
+        return directory / screenshot_filename(timestamp)
+
+    def _enqueue(self, image: ImageSource, timestamp: datetime) -> None:
+        """保存待ちに追加する（溢れた場合は最も古い画像を破棄する）"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ScreenshotWriter is closed")
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self._stats["dropped"] += 1
+            self._pending.append((image, timestamp))
+            self._ensure_thread()
+            self._cond.notify_all()
+
+    def _ensure_thread(self) -> None:
+        """バックグラウンドスレッドが起動していなければ起動する"""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._loop, name="screenshot-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _loop(self) -> None:
+        """保存待ちの画像を順に書き込む"""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                image, timestamp = self._pending.popleft()
+                self._writing = True
+            try:
+                self._write(image, timestamp)
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+    def _write(self, image: ImageSource, timestamp: datetime) -> Optional[Path]:
+        """
+        画像を保存する（失敗しても記録は続けるため警告のみ）
+
+        Returns:
+            保存先のパス（失敗した場合はNone）
+        """
+        try:
+            if self.archive is not None:
+                frame = self.archive.add(image, timestamp)
+                path = frame.path
+                size = path.stat().st_size if frame.kind == FRAME_KEYFRAME else 0
+                if isinstance(image, ImageBuffer):
+                    image.path = path
+                else:
+                    # アーカイブに移したので元のファイルは不要
+                    image.unlink(missing_ok=True)
+            else:
+                assert isinstance(image, ImageBuffer)
+                path = image.save(self._flat_path(timestamp))
+                size = path.stat().st_size
+        except (OSError, ImageLoadError) as write_error:
+            print(f"Warning: Failed to save screenshot: {write_error}", file=sys.stderr)
+            with self._cond:
+                self._stats["failed"] += 1
+            return None
+        with self._cond:
+            self._stats["written"] += 1
+            self._stats["bytes"] += size
+        count_bytes(image=size)
+        return path
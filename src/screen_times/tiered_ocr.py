@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Tiered OCR - 高速パス優先の段階的OCR
+
+まず縮小した画像を高速モード（言語補正なし）で認識し、行ごとの信頼度を確認する。
+信頼度やテキスト密度が低い場合だけ元の解像度の画像を高精度モードで再認識する。
+信頼度の低い行が画像の一部に限られる場合は、その領域だけを再認識する。
+認識結果の座標は画像に対する正規化座標のため、縮小した画像で求めた領域を
+そのまま元の画像に使える。
+
+Visionの高速モードは日本語を認識できず、日本語の画面でも英字の近似を高い信頼度で
+返すことがある。そのため、高速パスの結果が英語の文字列らしくない場合（script_plausibility）と、
+直前の高精度パスの結果が日本語（CJK）中心だったウィンドウでは、信頼度によらず
+画像全体を高精度パスで認識する。
+"""
+
+import re
+from dataclasses import dataclass
+from functools import partial
+from typing import Dict, List, Optional
+
+from .image_utils import (
+    ImageLoadError,
+    ImageSource,
+    grayscale_image,
+    grayscale_thumbnail,
+    image_size,
+)
+from .incremental_ocr import Recognizer, _clamp, _intersects, _union, join_observations
+from .ocr import RECOGNITION_LEVEL_FAST, Region, TextObservation, recognize_text
+
+# 認識パスの種類（レコードの ocr_pass に保存する）
+PASS_FAST = "fast"
+PASS_ACCURATE = "accurate"
+PASS_ACCURATE_REGIONS = "fast+accurate_regions"
+
+# 英語の文字列らしさの判定に使う、単語らしい部分（2文字以上の英字の並びと数字）
+_WORD_PATTERN = re.compile(r"[A-Za-z]{2,}|[0-9]+")
+
+# 英語の文字列らしさを判定する最小の文字数（これより短いテキストは判定しない）
+MIN_PLAUSIBILITY_CHARS = 20
+
+# ひらがな・カタカナ・CJK統合漢字・全角形
+_CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+
+# 高速パスの画像を縮小する下限の幅（ピクセル）。これより狭くすると小さな文字が潰れる
+MIN_FAST_WIDTH = 1280
+
+# ウィンドウごとに覚えておく、直前の高精度パスが日本語中心だったかどうかの件数の上限
+MAX_REMEMBERED_WINDOWS = 256
+
+
+@dataclass
+class TieredOcrResult:
+    """段階的OCRの結果"""
+
+    text: str
+    ocr_pass: str
+    mean_confidence: float  # 高速パスの平均信頼度
+    coverage: float  # 高速パスで認識した行が画像に占める割合
+    escalated_area: float  # 高精度パスに渡した領域の面積（画像全体に対する割合）
+
+
+def text_coverage(observations: List[TextObservation]) -> float:
+    """
+    認識された行の矩形が画像に占める割合（テキスト密度の目安）
+
+    Args:
+        observations: 認識結果
+
+    Returns:
+        矩形の面積の合計（0.0～1.0に丸める）
+    """
+    return min(1.0, sum(o.bbox[2] * o.bbox[3] for o in observations))
+
+
+def script_plausibility(text: str) -> float:
+    """
+    英語の文字列らしさ（高速パスの結果が日本語などを英字として誤認識したものでないかの目安）
+
+    日本語を高速モードで認識すると "O)" や "I-" のような記号混じりの短い断片になるため、
+    空白以外の文字のうち、単語らしい部分（2文字以上の英字の並びと数字）の割合を返す。
+
+    Args:
+        text: 高速パスで認識したテキスト
+
+    Returns:
+        0.0～1.0（空のテキストは1.0）
+    """
+    chars = sum(len(token) for token in text.split())
+    if chars == 0:
+        return 1.0
+    return sum(len(word) for word in _WORD_PATTERN.findall(text)) / chars
+
+
+def cjk_ratio(text: str) -> float:
+    """
+    空白以外の文字のうち日本語（ひらがな・カタカナ・漢字・全角文字）の割合
+
+    Args:
+        text: テキスト
+
+    Returns:
+        0.0～1.0（空のテキストは0.0）
+    """
+    chars = sum(len(token) for token in text.split())
+    if chars == 0:
+        return 0.0
+    return len(_CJK_PATTERN.findall(text)) / chars
+
+
+class TieredOcr:
+    """
+    高速パス優先の段階的OCR
+
+    使用例:
+        >>> tiered = TieredOcr(min_confidence=0.5, min_coverage=0.01)
+        >>> result = tiered.recognize(screenshot_path)
+        >>> print(result.ocr_pass, result.text)
+    """
+
+    def __init__(
+        self,
+        fast: Optional[Recognizer] = None,
+        accurate: Optional[Recognizer] = None,
+        min_confidence: float = 0.5,
+        min_coverage: float = 0.01,
+        max_region_ratio: float = 0.3,
+        region_padding: float = 0.01,
+        timeout_seconds: int = 30,
+        min_plausibility: float = 0.4,
+        cjk_window_ratio: float = 0.3,
+        fast_scale: float = 0.5,
+    ):
+        """
+        初期化
+
+        Args:
+            fast: 高速パスの認識関数（Noneの場合はVision Frameworkの高速モード）
+            accurate: 高精度パスの認識関数（Noneの場合はVision Frameworkの高精度モード）
+            min_confidence: これ未満の信頼度の行を高精度パスで再認識する
+            min_coverage: 高速パスで認識した行の面積の割合がこれ未満なら全体を再認識する
+            max_region_ratio: 再認識する領域の割合がこれを超えたら全体を再認識する
+            region_padding: 再認識する行の矩形に加える余白（正規化座標）
+            timeout_seconds: OCRのタイムアウト（秒）
+            min_plausibility: 高速パスのテキストの英語の文字列らしさがこれ未満なら
+                              全体を再認識する（script_plausibility）
+            cjk_window_ratio: 高精度パスのテキストの日本語の割合がこれ以上だったウィンドウは、
+                              次から高速パスを使わずに高精度パスで認識する
+            fast_scale: 高速パスに渡す画像の縮小率（幅は MIN_FAST_WIDTH 未満にしない。
+                        1.0の場合は縮小しない）
+        """
+        if not 0 < fast_scale <= 1:
+            raise ValueError("fast_scale must be in (0, 1]")
+        self.fast: Recognizer = fast or partial(recognize_text, level=RECOGNITION_LEVEL_FAST)
+        self.accurate: Recognizer = accurate or recognize_text
+        self.min_confidence = min_confidence
+        self.min_coverage = min_coverage
+        self.max_region_ratio = max_region_ratio
+        self.region_padding = region_padding
+        self.timeout_seconds = timeout_seconds
+        self.min_plausibility = min_plausibility
+        self.cjk_window_ratio = cjk_window_ratio
+        self.fast_scale = fast_scale
+        # ウィンドウ名 → 直前の高精度パスの結果が日本語中心だったか
+        self._cjk_windows: Dict[str, bool] = {}
+
+    def recognize(self, image_path: ImageSource, window: Optional[str] = None) -> TieredOcrResult:
+        """
+        高速パスで認識し、必要な場合だけ高精度パスで再認識する
+
+        Args:
+            image_path: 画像ファイルのパスまたはメモリ上の画像
+            window: ウィンドウ名（指定した場合、日本語中心のウィンドウでは高速パスを省略する）
+
+        Returns:
+            段階的OCRの結果
+        """
+        if window is not None and self._cjk_windows.get(window):
+            return self._accurate_pass(image_path, 0.0, 0.0, window)
+
+        observations = self.fast(self._fast_image(image_path), self.timeout_seconds, None)
+        coverage = text_coverage(observations)
+        mean_confidence = (
+            sum(o.confidence for o in observations) / len(observations) if observations else 0.0
+        )
+
+        # テキストがほとんど認識できなかった場合は高速パスで取りこぼしている可能性がある
+        if coverage < self.min_coverage:
+            return self._accurate_pass(image_path, mean_confidence, coverage, window)
+
+        # 英語の文字列らしくない場合は日本語などを英字として誤認識している可能性がある
+        fast_text = "\n".join(o.text for o in observations)
+        if (
+            sum(len(token) for token in fast_text.split()) >= MIN_PLAUSIBILITY_CHARS
+            and script_plausibility(fast_text) < self.min_plausibility
+        ):
+            return self._accurate_pass(image_path, mean_confidence, coverage, window)
+
+        low_confidence = [o for o in observations if o.confidence < self.min_confidence]
+        if not low_confidence:
+            return TieredOcrResult(
+                text=fast_text,
+                ocr_pass=PASS_FAST,
+                mean_confidence=mean_confidence,
+                coverage=coverage,
+                escalated_area=0.0,
+            )
+
+        regions = self._escalation_regions(low_confidence)
+        escalated_area = sum(region[2] * region[3] for region in regions)
+        if escalated_area > self.max_region_ratio:
+            return self._accurate_pass(image_path, mean_confidence, coverage, window)
+
+        for region in regions:
+            observations = [o for o in observations if not _intersects(o.bbox, region)]
+            observations.extend(self.accurate(image_path, self.timeout_seconds, region))
+
+        # 一部の領域だけの結果ではウィンドウ全体が日本語中心かは判断しない
+        return TieredOcrResult(
+            text=join_observations(observations),
+            ocr_pass=PASS_ACCURATE_REGIONS,
+            mean_confidence=mean_confidence,
+            coverage=coverage,
+            escalated_area=escalated_area,
+        )
+
+    def _fast_image(self, image_path: ImageSource) -> ImageSource:
+        """
+        高速パスに渡す、縮小したグレースケールの画像
+
+        縮小する必要がない場合や画像を読み込めない場合は元の画像をそのまま返す
+        （読み込めない場合のエラーは認識関数に任せる）。
+        """
+        if self.fast_scale >= 1:
+            return image_path
+        try:
+            width, height = image_size(image_path)
+            scale = min(1.0, max(self.fast_scale, MIN_FAST_WIDTH / width))
+            if scale >= 1:
+                return image_path
+            fast_width = max(1, round(width * scale))
+            fast_height = max(1, round(height * scale))
+            pixels = grayscale_thumbnail(image_path, fast_width, fast_height)
+            return grayscale_image(pixels, fast_width, fast_height, (0, 0, fast_width, fast_height))
+        except ImageLoadError:
+            return image_path
+
+    def _escalation_regions(self, observations: List[TextObservation]) -> List[Region]:
+        """信頼度の低い行を余白付きの矩形にし、重なるものをまとめる"""
+        pad = self.region_padding
+        regions: List[Region] = []
+        for observation in sorted(observations, key=lambda o: o.bbox[1]):
+            x, y, w, h = observation.bbox
+            region = _clamp((x - pad, y - pad, w + pad * 2, h + pad * 2))
+            merged = True
+            while merged:
+                merged = False
+                for index, existing in enumerate(regions):
+                    if _intersects(existing, region):
+                        region = _union(regions.pop(index), region)
+                        merged = True
+                        break
+            regions.append(region)
+        return regions
+
+    def _accurate_pass(
+        self,
+        image_path: ImageSource,
+        mean_confidence: float,
+        coverage: float,
+        window: Optional[str] = None,
+    ) -> TieredOcrResult:
+        """画像全体を高精度パスで認識し、ウィンドウが日本語中心かを覚えておく"""
+        observations = self.accurate(image_path, self.timeout_seconds, None)
+        text = "\n".join(o.text for o in observations)
+        if window is not None and observations:
+            self._cjk_windows.pop(window, None)
+            self._cjk_windows[window] = cjk_ratio(text) >= self.cjk_window_ratio
+            if len(self._cjk_windows) > MAX_REMEMBERED_WINDOWS:
+                del self._cjk_windows[next(iter(self._cjk_windows))]
+        return TieredOcrResult(
+            text=text,
+            ocr_pass=PASS_ACCURATE,
+            mean_confidence=mean_confidence,
+            coverage=coverage,
+            escalated_area=1.0,
+        )
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Window Provider - 差し替え可能なアクティブウィンドウの取得
+
+アクティブウィンドウのアプリケーション名と位置の取得をプロトコルとして定義する。
+毎回 osascript を起動する従来の実装（0.5～1秒かかる）に加えて、NSWorkspace と
+CGWindowList をプロセス内で呼び出す実装と、テスト用のフェイクを提供する。
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Protocol, Sequence, Tuple, runtime_checkable
+
+# ウィンドウの位置とサイズ (x, y, width, height)
+WindowBounds = Tuple[int, int, int, int]
+
+
+@runtime_checkable
+class WindowProvider(Protocol):
+    """
+    アクティブウィンドウを取得するプロトコル
+
+    active_window はアプリケーション名とウィンドウ位置を返す。
+    位置が分からない場合は None を返し、呼び出し側は画面全体をキャプチャする。
+    """
+
+    def active_window(self) -> Tuple[str, Optional[WindowBounds]]:
+        """アクティブウィンドウのアプリケーション名と位置を取得する"""
+        ...
+
+
+def normalize_owner_name(name: str) -> str:
+    """
+    アプリケーション名とウィンドウの所有者名を比較するために正規化する
+
+    Args:
+        name: アプリケーション名またはウィンドウの所有者名
+
+    Returns:
+        小文字にしてハイフンと空白を除いた名前
+    """
+    return name.lower().replace("-", "").replace(" ", "")
+
+
+def owner_names_match(normalized_app_name: str, normalized_owner: str) -> bool:
+    """
+    正規化した名前が同じアプリケーションを指すか判定する
+
+    部分一致または完全一致で判定する
+    (例: "wezterm-gui" と "WezTerm"、"Electron" と "Code")。
+    """
+    return (
+        normalized_app_name in normalized_owner
+        or normalized_owner in normalized_app_name
+        or normalized_app_name == normalized_owner
+    )
+
+
+def _window_bounds(window) -> Optional[WindowBounds]:
+    """CGWindowListの要素からウィンドウ位置を取り出す"""
+    bounds = window.get("kCGWindowBounds", {})
+    if not bounds:
+        return None
+    return (
+        int(bounds["X"]),
+        int(bounds["Y"]),
+        int(bounds["Width"]),
+        int(bounds["Height"]),
+    )
+
+
+class AppleScriptWindowProvider:
+    """
+    osascript でアプリケーション名を取得する従来の実装
+
+    毎回 osascript のプロセスを起動するため遅い。pyobjc の AppKit が
+    使えない環境でのフォールバックとして残している。
+    """
+
+    def __init__(self, script_path: Optional[Path] = None):
+        """
+        初期化
+
+        Args:
+            script_path: アプリケーション名を返すAppleScript（Noneの場合は同梱のスクリプト）
+        """
+        self.script_path = script_path or (
+            Path(__file__).parent / "resources" / "screenshot_window.applescript"
+        )
+
+    def active_window(self) -> Tuple[str, Optional[WindowBounds]]:
+        """AppleScript経由でアクティブウィンドウ名と位置を取得する"""
+        try:
+            result = subprocess.run(
+                ["osascript", str(self.script_path)],
+                capture_output=True,
+                text=True,
+                timeout=3,
+                check=True,
+            )
+            app_name = result.stdout.strip() or "Unknown"
+
+            # PyObjCでウィンドウ情報を取得
+            try:
+                from Quartz import (
+                    CGWindowListCopyWindowInfo,
+                    kCGWindowListOptionOnScreenOnly,
+                    kCGNullWindowID,
+                )
+
+                # 画面上の全ウィンドウ情報を取得
+                window_list = CGWindowListCopyWindowInfo(
+                    kCGWindowListOptionOnScreenOnly, kCGNullWindowID
+                )
+
+                # アクティブなアプリのウィンドウを探す
+                normalized_app_name = normalize_owner_name(app_name)
+                for window in window_list:
+                    # レイヤー0（通常のウィンドウ）のみ対象
+                    if window.get("kCGWindowLayer", 0) != 0:
+                        continue
+                    owner_name = window.get("kCGWindowOwnerName", "")
+                    if owner_names_match(normalized_app_name, normalize_owner_name(owner_name)):
+                        bounds = _window_bounds(window)
+                        if bounds:
+                            print(
+                                f"Debug: Matched window - Owner: {owner_name}, Bounds: {bounds}",
+                                file=sys.stderr,
+                            )
+                            return (app_name, bounds)
+
+                return (app_name, None)
+
+            except Exception as bounds_error:
+                print(f"Warning: Could not get window bounds: {bounds_error}", file=sys.stderr)
+                return (app_name, None)
+
+        except (subprocess.TimeoutExpired, subprocess.CalledProcessError) as get_window_error:
+            print(f"Warning: Failed to get active window: {get_window_error}", file=sys.stderr)
+            return ("Unknown", None)
+
+
+class QuartzWindowProvider:
+    """
+    NSWorkspace と CGWindowList をプロセス内で呼び出す実装
+
+    最前面のアプリケーションは NSWorkspace から取得し、そのプロセスIDが所有する
+    最前面の通常ウィンドウの位置を CGWindowList から探す（リストは前面から順に並ぶ）。
+    プロセスIDが一致しない場合だけ名前で照合し、所有者名の正規化結果は
+    キャッシュして毎回の文字列処理を省く。
+
+    アプリケーション名には、従来の System Events のプロセス名と揃えるため
+    実行ファイル名を使う（取得できない場合は表示名）。
+    """
+
+    def __init__(self, max_cached_names: int = 512):
+        """
+        初期化
+
+        Args:
+            max_cached_names: 正規化した所有者名をキャッシュする最大数（超えたら作り直す）
+        """
+        self.max_cached_names = max_cached_names
+        self._normalized_names: Dict[str, str] = {}
+
+    def active_window(self) -> Tuple[str, Optional[WindowBounds]]:
+        """アクティブウィンドウ名と位置を取得する"""
+        try:
+            app_name, pid = self._frontmost_application()
+        except Exception as get_window_error:
+            print(f"Warning: Failed to get active window: {get_window_error}", file=sys.stderr)
+            return ("Unknown", None)
+
+        try:
+            return (app_name, self._find_bounds(app_name, pid))
+        except Exception as bounds_error:
+            print(f"Warning: Could not get window bounds: {bounds_error}", file=sys.stderr)
+            return (app_name, None)
+
+    def _frontmost_application(self) -> Tuple[str, Optional[int]]:
+        """最前面のアプリケーション名とプロセスIDを取得する"""
+        from AppKit import NSWorkspace
+        from Foundation import NSDate, NSRunLoop
+
+        # GUIを持たないプロセスでは frontmostApplication の更新がランループで
+        # 通知されるため、取得前にランループを一度回して古い値を避ける
+        NSRunLoop.currentRunLoop().runUntilDate_(NSDate.date())
+
+        app = NSWorkspace.sharedWorkspace().frontmostApplication()
+        if app is None:
+            return ("Unknown", None)
+        executable = app.executableURL()
+        name = executable.lastPathComponent() if executable is not None else None
+        name = name or app.localizedName() or "Unknown"
+        return (str(name), int(app.processIdentifier()))
+
+    def _find_bounds(self, app_name: str, pid: Optional[int]) -> Optional[WindowBounds]:
+        """アプリケーションの最前面の通常ウィンドウの位置を探す"""
+        from Quartz import (
+            CGWindowListCopyWindowInfo,
+            kCGNullWindowID,
+            kCGWindowListExcludeDesktopElements,
+            kCGWindowListOptionOnScreenOnly,
+        )
+
+        window_list = CGWindowListCopyWindowInfo(
+            kCGWindowListOptionOnScreenOnly | kCGWindowListExcludeDesktopElements,
+            kCGNullWindowID,
+        )
+        # レイヤー0（通常のウィンドウ）のみ対象
+        windows: List = [window for window in window_list if window.get("kCGWindowLayer", 0) == 0]
+
+        if pid is not None:
+            for window in windows:
+                if window.get("kCGWindowOwnerPID") == pid:
+                    bounds = _window_bounds(window)
+                    if bounds:
+                        return bounds
+
+        normalized_app_name = self._normalized(app_name)
+        for window in windows:
+            owner = self._normalized(window.get("kCGWindowOwnerName", ""))
+            if owner_names_match(normalized_app_name, owner):
+                bounds = _window_bounds(window)
+                if bounds:
+                    return bounds
+        return None
+
+    def _normalized(self, name: str) -> str:
+        """正規化した名前（キャッシュ済みならそれを返す）"""
+        normalized = self._normalized_names.get(name)
+        if normalized is None:
+            if len(self._normalized_names) >= self.max_cached_names:
+                self._normalized_names.clear()
+            normalized = normalize_owner_name(name)
+            self._normalized_names[name] = normalized
+        return normalized
+
+
+class FakeWindowProvider:
+    """
+    テスト・ベンチマーク用のウィンドウ取得
+
+    呼び出されるたびに windows を順に返し、最後まで行ったら先頭に戻る。
+
+    使用例:
+        >>> provider = FakeWindowProvider([("Editor", (0, 0, 800, 600)), ("Browser", None)])
+        >>> config = ScreenOCRConfig(window_provider=provider)
+    """
+
+    def __init__(
+        self,
+        windows: Sequence[Tuple[str, Optional[WindowBounds]]] = (("FakeApp", None),),
+        delay_seconds: float = 0.0,
+    ):
+        """
+        初期化
+
+        Args:
+            windows: 順に返すアプリケーション名とウィンドウ位置
+            delay_seconds: 1回の取得にかける時間（取得の処理時間の模擬）
+        """
+        if not windows:
+            raise ValueError("windows must not be empty")
+        self.windows = list(windows)
+        self.delay_seconds = delay_seconds
+        self.calls = 0
+
+    def active_window(self) -> Tuple[str, Optional[WindowBounds]]:
+        """次のウィンドウを返す"""
+        if self.delay_seconds > 0:
+            time.sleep(self.delay_seconds)
+        window = self.windows[self.calls % len(self.windows)]
+        self.calls += 1
+        return window
+
+
+_default_provider: Optional[WindowProvider] = None
+
+
+def default_window_provider() -> WindowProvider:
+    """
+    この環境で使う既定のウィンドウ取得（プロセス内で共有する）
+
+    pyobjc の AppKit と Quartz が使える場合はプロセス内で取得し、
+    使えない場合は osascript にフォールバックする。
+
+    Returns:
+        ウィンドウ取得
+    """
+    global _default_provider
+    if _default_provider is None:
+        try:
+            import AppKit  # noqa: F401
+            import Quartz  # noqa: F401
+
+            _default_provider = QuartzWindowProvider()
+        except ImportError:
+            _default_provider = AppleScriptWindowProvider()
+    return _default_provider
+
+
+def benchmark_window_providers(
+    providers: Dict[str, WindowProvider], iterations: int = 20
+) -> Dict[str, List[float]]:
+    """
+    ウィンドウ取得ごとに1回の取得にかかる時間を測定する
+
+    Args:
+        providers: 名前 → ウィンドウ取得
+        iterations: 1つのウィンドウ取得あたりの測定回数
+
+    Returns:
+        名前 → 1回ごとの経過時間（秒）のリスト
+    """
+    if iterations <= 0:
+        raise ValueError("iterations must be positive")
+    results: Dict[str, List[float]] = {}
+    for name, provider in providers.items():
+        samples: List[float] = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            provider.active_window()
+            samples.append(time.perf_counter() - started)
+        results[name] = samples
+    return results
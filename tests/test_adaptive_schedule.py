@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+AdaptiveScheduler（適応キャプチャ間隔）のユニットテスト
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from screen_times.adaptive_schedule import AdaptiveScheduler
+
+START = datetime(2026, 1, 2, 9, 0, 0)
+
+
+def simulate(scheduler, duration_minutes, is_busy):
+    """
+    スケジューラの間隔に従ってキャプチャした場合のキャプチャ時刻を返す
+
+    is_busy(経過分) が True の時間帯は毎回ウィンドウが切り替わり、
+    それ以外は同じウィンドウの同じテキストが続く。
+    """
+    now = START
+    end = START + timedelta(minutes=duration_minutes)
+    captures = []
+    while now < end:
+        minutes = (now - START).total_seconds() / 60
+        scheduler.record_capture(now)
+        if is_busy(minutes):
+            scheduler.observe(f"window-{len(captures) % 3}", f"text {len(captures)}")
+        else:
+            scheduler.observe("Editor", "static text")
+        captures.append(minutes)
+        now += timedelta(seconds=scheduler.next_delay())
+    return captures
+
+
+class TestAdaptiveScheduler:
+    """AdaptiveSchedulerのテスト"""
+
+    def test_window_switch_shortens_interval(self):
+        """ウィンドウの切り替えが続くと最小間隔に近づく"""
+        scheduler = AdaptiveScheduler(20, 180)
+        for i in range(5):
+            scheduler.observe(f"window-{i}", "text")
+
+        assert scheduler.activity > 0.8
+        assert scheduler.next_delay() < 30
+
+    def test_static_screen_lengthens_interval(self):
+        """同じ画面が続くと最大間隔に近づく"""
+        scheduler = AdaptiveScheduler(20, 180)
+        for _ in range(6):
+            scheduler.observe("Editor", "same text", "00000000000000ff")
+
+        assert scheduler.activity == pytest.approx(0.0)
+        assert scheduler.next_delay() == pytest.approx(180)
+
+    def test_text_and_frame_change(self):
+        """テキストの変化量とフレームの変化の平均を活動量とする"""
+        scheduler = AdaptiveScheduler(20, 180)
+        scheduler.observe("Editor", "abcd", "0000000000000000")
+
+        assert scheduler.observe("Editor", "abcd", "ffffffffffffffff") == pytest.approx(0.5)
+        assert scheduler.observe("Editor", "abcd", "ffffffffffffffff") == pytest.approx(0.0)
+        assert scheduler.observe("Editor", "wxyz") == pytest.approx(1.0)
+
+    def test_sleep_counts_as_no_activity(self):
+        """スリープ中の記録は活動量0"""
+        scheduler = AdaptiveScheduler(20, 180)
+        scheduler.observe("Editor", "text")
+
+        assert scheduler.observe("loginwindow", "", status="sleep") == 0.0
+
+    def test_budget_limits_captures(self):
+        """予算を使い切ったら予算の間隔まで延ばす"""
+        scheduler = AdaptiveScheduler(10, 60, budget_interval=60, budget_burst=1)
+        for i in range(5):
+            scheduler.observe(f"window-{i}", "text")
+
+        scheduler.record_capture(START)
+        assert scheduler.next_delay() == pytest.approx(60)
+
+    def test_busy_period_coverage_within_budget(self):
+        """同じOCR予算で、活発な時間帯をより密にキャプチャする"""
+        scheduler = AdaptiveScheduler(20, 180, budget_interval=60)
+
+        def busy(minutes):
+            return 120 <= minutes < 180
+
+        captures = simulate(scheduler, 8 * 60, busy)
+        fixed = [float(m) for m in range(0, 8 * 60)]
+
+        busy_captures = [m for m in captures if busy(m)]
+        assert len(captures) <= len(fixed)
+        assert len(busy_captures) > len([m for m in fixed if busy(m)])
+
+    def test_fresh_scheduler_does_not_burst(self):
+        """起動直後は予算を貯めていないため、活発でも固定間隔の回数を超えない"""
+        scheduler = AdaptiveScheduler(10, 60, budget_interval=60)
+
+        captures = simulate(scheduler, 30, lambda minutes: True)
+
+        assert len(captures) <= 30
+        assert captures[1] == pytest.approx(1.0)
+
+    def test_reports_effective_interval_over_time(self):
+        """キャプチャ間隔を時間帯ごとに集計できる"""
+        scheduler = AdaptiveScheduler(20, 180)
+        simulate(scheduler, 60, lambda minutes: minutes < 30)
+
+        timeline = scheduler.timeline(bucket_seconds=1800)
+        assert [start for start, _ in timeline] == [START, START + timedelta(minutes=30)]
+        assert timeline[0][1] < timeline[1][1]
+        assert "Adaptive interval: mean" in scheduler.summary()
+
+    def test_invalid_arguments(self):
+        """不正な設定はエラー"""
+        with pytest.raises(ValueError):
+            AdaptiveScheduler(0, 60)
+        with pytest.raises(ValueError):
+            AdaptiveScheduler(60, 30)
+        with pytest.raises(ValueError):
+            AdaptiveScheduler(20, 60, budget_interval=0)
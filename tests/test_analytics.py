@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+列形式キャッシュと画面時間の集計のユニットテスト
+"""
+
+import json
+import os
+from datetime import date, datetime
+
+import pytest
+
+from screen_times.analytics import (
+    AnalyticsCache,
+    DayColumns,
+    build_day_columns,
+    compute_stats,
+    interval_ends,
+    iter_days,
+    to_epoch,
+)
+from screen_times.jsonl_manager import JsonlManager, compress_segment
+
+DAY = "2025-12-28"
+
+
+def write_lines(path, records):
+    """レコードをJSONLとして追記する"""
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def record(hour, minute, window, text="text", second=0, **fields):
+    """2025-12-28 の hour:minute:second のレコード"""
+    timestamp = datetime(2025, 12, 28, hour, minute, second).isoformat()
+    return {"timestamp": timestamp, "window": window, "text": text, "status": "normal", **fields}
+
+
+class TestDayColumns:
+    """1日分の列の作成と保存のテスト"""
+
+    def test_build_sorts_and_encodes(self, tmp_path):
+        """タスクのメタデータを除き、開始時刻の順に並べてウィンドウ名と状態を辞書で置き換える"""
+        write_lines(
+            tmp_path / f"{DAY}_task.jsonl",
+            [
+                {"type": "task_metadata", "timestamp": "2025-12-28T10:00:30", "description": "x"},
+                record(10, 1, "Browser", "abc"),
+            ],
+        )
+        write_lines(
+            tmp_path / f"{DAY}.jsonl",
+            [
+                record(10, 0, "Editor", "hello", text_length=5),
+                record(10, 2, "Editor", "", status="sleep", timestamp_end="2025-12-28T10:10:00"),
+                "not json",
+            ],
+        )
+        (tmp_path / "2025-12-29.jsonl").write_text(json.dumps(record(11, 0, "Other")) + "\n")
+
+        columns = build_day_columns(tmp_path, DAY)
+
+        assert len(columns) == 3
+        assert [columns.windows[i] for i in columns.window_ids] == ["Editor", "Browser", "Editor"]
+        assert [columns.statuses[i] for i in columns.status_ids] == ["normal", "normal", "sleep"]
+        assert list(columns.text_lengths) == [5, 3, 0]
+        assert columns.starts[0] == to_epoch(datetime(2025, 12, 28, 10, 0))
+        assert columns.ends[2] == to_epoch(datetime(2025, 12, 28, 10, 10))
+        assert list(columns.sources) == [f"{DAY}.jsonl", f"{DAY}_task.jsonl"]
+
+    def test_bytes_round_trip(self, tmp_path):
+        """保存した内容から同じ列を復元できる"""
+        write_lines(tmp_path / f"{DAY}.jsonl", [record(10, 0, "エディタ"), record(10, 1, "B")])
+        columns = build_day_columns(tmp_path, DAY)
+
+        restored = DayColumns.from_bytes(columns.to_bytes())
+
+        assert restored == columns
+        with pytest.raises(ValueError):
+            DayColumns.from_bytes(columns.to_bytes()[:-1])
+
+    def test_reads_compressed_segments(self, tmp_path):
+        """圧縮済みの .jsonl.gz も読み込む"""
+        manager = JsonlManager(base_dir=tmp_path)
+        path = tmp_path / f"{DAY}.jsonl"
+        manager.append_record(path, datetime(2025, 12, 28, 10, 0), "Editor", "hello")
+        compress_segment(path)
+
+        columns = build_day_columns(tmp_path, DAY)
+
+        assert list(columns.sources) == [f"{DAY}.jsonl.gz"]
+        assert columns.windows == ["Editor"]
+
+    def test_reads_compact_records(self, tmp_path):
+        """コンパクトな形式で書き込んだセグメントも同じ列になる"""
+        for encoding in ("full", "compact"):
+            manager = JsonlManager(base_dir=tmp_path / encoding, record_encoding=encoding)
+            path = manager.logs_dir / f"{DAY}.jsonl"
+            manager.append_record(path, datetime(2025, 12, 28, 10, 0), "Editor", "hello")
+            manager.append_record(path, datetime(2025, 12, 28, 10, 1), "Browser", "", "sleep")
+
+        full = build_day_columns(tmp_path / "full" / "screenocr_logs", DAY)
+        compact = build_day_columns(tmp_path / "compact" / "screenocr_logs", DAY)
+
+        assert len(compact) == 2
+        assert (compact.starts, compact.windows, compact.statuses, compact.text_lengths) == (
+            full.starts,
+            full.windows,
+            full.statuses,
+            full.text_lengths,
+        )
+
+
+class TestAnalyticsCache:
+    """セグメントが変わった日だけ作り直すキャッシュのテスト"""
+
+    def test_reuses_cache_until_segment_changes(self, tmp_path):
+        """セグメントが変わらなければJSONLを読まず、追記されたら作り直す"""
+        logs_dir = tmp_path / "logs"
+        logs_dir.mkdir()
+        segment = logs_dir / f"{DAY}.jsonl"
+        write_lines(segment, [record(10, 0, "Editor")])
+        cache = AnalyticsCache(logs_dir, cache_dir=tmp_path / "cache")
+
+        assert len(cache.load_day(DAY)) == 1
+        assert len(cache.load_day(DAY)) == 1
+        assert cache.rebuilt_days == 1
+        assert cache.cache_path(DAY).exists()
+
+        write_lines(segment, [record(10, 1, "Editor")])
+        assert len(AnalyticsCache(logs_dir, cache_dir=tmp_path / "cache").load_day(DAY)) == 2
+
+    def test_rebuilds_broken_cache(self, tmp_path):
+        """壊れたキャッシュは作り直す"""
+        write_lines(tmp_path / f"{DAY}.jsonl", [record(10, 0, "Editor")])
+        cache = AnalyticsCache(tmp_path, cache_dir=tmp_path / "cache")
+        cache.load_day(DAY)
+        cache.cache_path(DAY).write_bytes(b"broken")
+
+        assert len(cache.load_day(DAY)) == 1
+        assert cache.rebuilt_days == 2
+
+    def test_icloud_placeholder(self, tmp_path):
+        """iCloudに退避されただけなら作り直さず、作り直すときはダウンロードする"""
+        logs_dir = tmp_path / "logs"
+        logs_dir.mkdir()
+        segment = logs_dir / f"{DAY}.jsonl"
+        write_lines(segment, [record(10, 0, "Editor")])
+        content = segment.read_bytes()
+        AnalyticsCache(logs_dir, cache_dir=tmp_path / "cache").load_day(DAY)
+
+        segment.rename(logs_dir / f".{DAY}.jsonl.icloud")
+        cache = AnalyticsCache(logs_dir, cache_dir=tmp_path / "cache")
+        assert len(cache.load_day(DAY)) == 1
+        assert cache.rebuilt_days == 0
+
+        downloaded = []
+
+        def download(path):
+            downloaded.append(path.name)
+            path.write_bytes(content)
+            return True
+
+        cache = AnalyticsCache(logs_dir, cache_dir=tmp_path / "other", download=download)
+        assert len(cache.load_day(DAY)) == 1
+        assert downloaded == [f"{DAY}.jsonl"]
+
+    def test_missing_day_is_empty(self, tmp_path):
+        """記録のない日は空の列になる"""
+        cache = AnalyticsCache(tmp_path, cache_dir=tmp_path / "cache")
+
+        assert len(cache.load_day(DAY)) == 0
+        assert [
+            c.day for c in map(cache.load_day, iter_days(date(2025, 12, 30), date(2026, 1, 1)))
+        ] == [
+            "2025-12-30",
+            "2025-12-31",
+            "2026-01-01",
+        ]
+
+
+class TestComputeStats:
+    """アプリ別・時間帯別の集計のテスト"""
+
+    def build(self, tmp_path, records):
+        write_lines(tmp_path / f"{DAY}.jsonl", records)
+        return build_day_columns(tmp_path, DAY)
+
+    def test_interval_ends(self, tmp_path):
+        """次のレコードまでを期間とし、離れている場合は終了時刻 + max_gap で打ち切る"""
+        columns = self.build(
+            tmp_path,
+            [
+                record(10, 0, "A", timestamp_end="2025-12-28T10:03:00"),
+                record(10, 4, "B"),
+                record(11, 0, "A"),
+            ],
+        )
+        start = to_epoch(datetime(2025, 12, 28, 10, 0))
+
+        assert [end - start for end in interval_ends(columns, max_gap=90)] == [
+            240.0,
+            330.0,
+            3690.0,
+        ]
+
+    def test_app_and_hour_durations(self, tmp_path):
+        """アイドル期間を除いてアプリ別に集計し、時をまたぐ期間は時ごとに分ける"""
+        columns = self.build(
+            tmp_path,
+            [
+                record(9, 58, "Editor"),
+                record(9, 59, "Editor", timestamp_end="2025-12-28T10:01:00"),
+                record(10, 2, "Browser"),
+                record(10, 3, "", status="sleep", timestamp_end="2025-12-28T10:30:00"),
+                record(10, 30, "Editor", second=30),
+            ],
+        )
+
+        stats = compute_stats([columns, DayColumns(day="2025-12-29")], max_gap=60)
+
+        assert stats.days == 2
+        assert stats.records == 5
+        assert stats.app_seconds == {"Editor": 300.0, "Browser": 60.0}
+        assert stats.app_records == {"Editor": 3, "Browser": 1}
+        assert stats.idle_seconds == 27 * 60 + 30
+        assert stats.hour_seconds[9] == 120.0
+        assert stats.hour_seconds[10] == 240.0
+        assert sum(stats.hour_seconds) == stats.total_seconds
+        assert stats.top_apps(1) == [("Editor", 300.0, 3)]
+
+
+def test_stats_command(tmp_path, monkeypatch, capsys):
+    """screenocr stats はキャッシュを作って集計を表示する"""
+    from screen_times import analytics
+    from screen_times.cli import show_stats
+
+    monkeypatch.setenv("OBSIDIAN_VAULT_PATH", str(tmp_path))
+    monkeypatch.setattr(analytics, "DEFAULT_CACHE_DIR", tmp_path / "cache")
+    logs_dir = tmp_path / "screenocr_logs" / "alice"
+    logs_dir.mkdir(parents=True)
+    write_lines(logs_dir / f"{DAY}.jsonl", [record(10, 0, "Editor"), record(10, 1, "Browser")])
+
+    show_stats("alice", datetime(2025, 12, 27), datetime(2025, 12, 28), 90.0, 20)
+
+    output = capsys.readouterr().out
+    assert "0:01:00   40.0%       1件  Editor" in output
+    assert "10:00" in output
+    assert len(os.listdir(next((tmp_path / "cache").iterdir()))) == 2
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク（benchmark）のユニットテスト
+"""
+
+import pytest
+
+from screen_times.benchmark import (
+    BENCHMARK_SCHEMA,
+    BenchmarkConfig,
+    compare_to_baseline,
+    flatten_metrics,
+    run_benchmarks,
+)
+
+
+def results_with(calibration_ms=None, **scenarios):
+    """指定したシナリオを持つ結果の辞書"""
+    results = {"schema": BENCHMARK_SCHEMA, "scenarios": scenarios}
+    if calibration_ms is not None:
+        results["environment"] = {"calibration_ms": calibration_ms}
+    return results
+
+
+class TestRunBenchmarks:
+    """run_benchmarksのテスト"""
+
+    def test_measures_all_scenarios(self):
+        """マージの有無それぞれでtickとJSONLの書き込みを測定する"""
+        pytest.importorskip("PIL")
+        config = BenchmarkConfig(ticks=10, warmup_ticks=1, allocation_ticks=2, records=50)
+        results = run_benchmarks(config)
+
+        assert set(results["scenarios"]) == {
+            "ticks",
+            "ticks_merge",
+            "jsonl",
+            "jsonl_merge",
+            "jsonl_writer",
+            "jsonl_writer_merge",
+            "jsonl_batch",
+            "jsonl_batch_merge",
+            "encoding_full",
+            "encoding_compact",
+            "encoding_delta",
+        }
+        ticks = results["scenarios"]["ticks"]
+        assert ticks["ticks_per_second"] > 0
+        assert {"window", "capture", "ocr", "write"} <= set(ticks["stages"])
+        assert ticks["jsonl_bytes_per_tick"] > 0
+        assert "merge" in results["scenarios"]["ticks_merge"]["stages"]
+        assert results["scenarios"]["jsonl"]["records_per_second"] > 0
+        assert results["scenarios"]["jsonl_writer"]["mb_per_second"] > 0
+        assert results["scenarios"]["jsonl_batch_merge"]["records_per_second"] > 0
+        encodings = [results["scenarios"][f"encoding_{name}"] for name in ("full", "delta")]
+        assert all(encoding["decode_records_per_second"] > 0 for encoding in encodings)
+        assert encodings[1]["bytes_per_record"] < encodings[0]["bytes_per_record"]
+        assert results["config"]["ticks"] == 10
+        assert results["environment"]["calibration_ms"] > 0
+        assert results["scenarios"]["jsonl_batch"]["speedup"] > 0
+
+
+class TestCompareToBaseline:
+    """compare_to_baselineのテスト"""
+
+    def test_flatten_metrics(self):
+        """シナリオと指標を . でつないだ名前にする"""
+        results = results_with(ticks={"tick_p50_ms": 2, "stages": {"ocr": {"p50_ms": 1.5}}})
+        assert flatten_metrics(results) == {
+            "ticks.tick_p50_ms": 2.0,
+            "ticks.stages.ocr.p50_ms": 1.5,
+        }
+
+    def test_detects_regressions_by_direction(self):
+        """処理量は減少、レイテンシは増加を悪化とみなす"""
+        baseline = results_with(ticks={"ticks_per_second": 100.0, "tick_p50_ms": 10.0})
+        faster = results_with(ticks={"ticks_per_second": 150.0, "tick_p50_ms": 5.0})
+        slower = results_with(ticks={"ticks_per_second": 60.0, "tick_p50_ms": 20.0})
+
+        assert compare_to_baseline(faster, baseline) == []
+        regressions = compare_to_baseline(slower, baseline, timing_tolerance=0.3)
+        assert [r.metric for r in regressions] == ["ticks.ticks_per_second", "ticks.tick_p50_ms"]
+        assert "-40%" in str(regressions[0])
+
+    def test_ignores_small_absolute_increase(self):
+        """小さい値のばらつきは悪化とみなさない"""
+        baseline = results_with(ticks={"tick_p50_ms": 0.1, "alloc_blocks_per_tick": 1.0})
+        current = results_with(ticks={"tick_p50_ms": 0.4, "alloc_blocks_per_tick": 5.0})
+
+        assert compare_to_baseline(current, baseline) == []
+
+    def test_timing_metrics_use_wider_tolerance(self):
+        """時間から求めた指標は、バイト数などより広いしきい値で比べる"""
+        baseline = results_with(
+            jsonl_batch={"records_per_second": 100.0, "speedup": 2.0},
+            ticks={"jsonl_bytes_per_tick": 100.0},
+        )
+        current = results_with(
+            jsonl_batch={"records_per_second": 60.0, "speedup": 1.2},
+            ticks={"jsonl_bytes_per_tick": 140.0},
+        )
+
+        regressions = compare_to_baseline(current, baseline, tolerance=0.3, timing_tolerance=0.5)
+        assert [r.metric for r in regressions] == ["ticks.jsonl_bytes_per_tick"]
+        regressions = compare_to_baseline(current, baseline, timing_tolerance=0.3)
+        assert [r.metric for r in regressions] == [
+            "jsonl_batch.records_per_second",
+            "jsonl_batch.speedup",
+            "ticks.jsonl_bytes_per_tick",
+        ]
+
+    def test_normalizes_by_calibration(self):
+        """校正ループの時間の比でマシンの速さの違いを補正する"""
+        baseline = results_with(10.0, ticks={"ticks_per_second": 100.0, "tick_p50_ms": 10.0})
+        slower_machine = results_with(20.0, ticks={"ticks_per_second": 50.0, "tick_p50_ms": 20.0})
+        regressed = results_with(10.0, ticks={"ticks_per_second": 40.0, "tick_p50_ms": 25.0})
+
+        assert compare_to_baseline(slower_machine, baseline) == []
+        regressions = compare_to_baseline(regressed, baseline)
+        assert [r.metric for r in regressions] == ["ticks.ticks_per_second", "ticks.tick_p50_ms"]
+
+    def test_without_timings(self):
+        """timings=False ではバイト数・メモリ確保の指標だけを比べる"""
+        baseline = results_with(
+            ticks={"ticks_per_second": 100.0, "tick_p50_ms": 10.0, "jsonl_bytes_per_tick": 100.0},
+            jsonl_batch={"speedup": 2.0},
+        )
+        current = results_with(
+            ticks={"ticks_per_second": 10.0, "tick_p50_ms": 100.0, "jsonl_bytes_per_tick": 200.0},
+            jsonl_batch={"speedup": 0.5},
+        )
+
+        regressions = compare_to_baseline(current, baseline, timings=False)
+        assert [r.metric for r in regressions] == ["ticks.jsonl_bytes_per_tick"]
+
+    def test_schema_mismatch(self):
+        """結果の形式が異なるベースラインとは比較しない"""
+        with pytest.raises(ValueError):
+            compare_to_baseline(results_with(), {"schema": BENCHMARK_SCHEMA + 1})
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+frame_hashモジュールのテスト
+"""
+
+import tempfile
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw
+
+from screen_times.frame_hash import (
+    FrameFingerprinter,
+    dhash,
+    format_hash,
+    hamming_distance,
+    parse_hash,
+)
+from screen_times.image_utils import ImageLoadError
+
+
+def create_document_image(path: Path, lines: int, offset: int = 0) -> Path:
+    """テキスト行のような横縞を持つテスト画像を生成"""
+    img = Image.new("RGB", (800, 600), color="white")
+    draw = ImageDraw.Draw(img)
+    for i in range(lines):
+        y = 20 + i * 30
+        draw.rectangle([40 + offset, y, 40 + offset + 300 + (i * 37) % 400, y + 12], fill="black")
+    img.save(path)
+    return path
+
+
+class TestDhash:
+    """dhash関数のテスト"""
+
+    def test_identical_images_have_same_hash(self):
+        """同一画像は同じハッシュになる"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            a = create_document_image(Path(tmpdir) / "a.png", lines=10)
+            b = create_document_image(Path(tmpdir) / "b.png", lines=10)
+            assert dhash(a) == dhash(b)
+
+    def test_tiny_change_has_small_distance(self):
+        """数ピクセルの変化（カーソル点滅など）はハミング距離が小さい"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            a = create_document_image(Path(tmpdir) / "a.png", lines=10)
+            b_path = Path(tmpdir) / "b.png"
+            create_document_image(b_path, lines=10)
+            with Image.open(b_path) as img:
+                ImageDraw.Draw(img).rectangle([700, 500, 702, 512], fill="black")
+                img.save(b_path)
+            assert hamming_distance(dhash(a), dhash(b_path)) <= 4
+
+    def test_different_content_has_large_distance(self):
+        """内容が大きく変わるとハミング距離が大きい"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            a = create_document_image(Path(tmpdir) / "a.png", lines=3)
+            b = create_document_image(Path(tmpdir) / "b.png", lines=18, offset=200)
+            assert hamming_distance(dhash(a), dhash(b)) > 4
+
+    def test_hash_bit_length(self):
+        """ハッシュは hash_size ** 2 ビットに収まる"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            a = create_document_image(Path(tmpdir) / "a.png", lines=10)
+            assert dhash(a, hash_size=8) < 2**64
+            assert dhash(a, hash_size=4) < 2**16
+
+    def test_unreadable_image_raises(self):
+        """画像として読めないファイルはImageLoadError"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            broken = Path(tmpdir) / "broken.png"
+            broken.write_text("not an image")
+            with pytest.raises(ImageLoadError):
+                dhash(broken)
+
+
+class TestHashHelpers:
+    """ハッシュ補助関数のテスト"""
+
+    def test_hamming_distance(self):
+        assert hamming_distance(0b1010, 0b1010) == 0
+        assert hamming_distance(0b1010, 0b0101) == 4
+
+    def test_format_and_parse_roundtrip(self):
+        value = 0x0123456789ABCDEF
+        formatted = format_hash(value)
+        assert formatted == "0123456789abcdef"
+        assert parse_hash(formatted) == value
+        assert len(format_hash(1)) == 16
+
+
+class TestFrameFingerprinter:
+    """FrameFingerprinterのテスト"""
+
+    def test_lookup_reuses_text_for_same_window(self):
+        """同じウィンドウでハッシュが近ければテキストを再利用"""
+        fingerprinter = FrameFingerprinter(max_distance=2)
+        fingerprinter.remember("Editor", 0b1111, "hello")
+
+        assert fingerprinter.lookup("Editor", 0b1110) == "hello"
+        assert fingerprinter.hits == 1
+
+    def test_lookup_misses_on_large_distance(self):
+        """ハッシュが離れていれば再利用しない"""
+        fingerprinter = FrameFingerprinter(max_distance=2)
+        fingerprinter.remember("Editor", 0b1111, "hello")
+
+        assert fingerprinter.lookup("Editor", 0b0000) is None
+        assert fingerprinter.misses == 1
+
+    def test_lookup_is_per_window(self):
+        """別ウィンドウのフレームは再利用しない"""
+        fingerprinter = FrameFingerprinter(max_distance=2)
+        fingerprinter.remember("Editor", 0b1111, "hello")
+        fingerprinter.remember("Browser", 0b0000, "world")
+
+        assert fingerprinter.lookup("Browser", 0b1111) is None
+        assert fingerprinter.lookup("Editor", 0b1111) == "hello"
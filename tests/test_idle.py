@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+アイドル検出（idle）のユニットテスト
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from screen_times.idle import (
+    IDLE_ACTIVE,
+    IDLE_PROBE,
+    IDLE_REASON_IDLE,
+    IDLE_REASON_LOCKED,
+    IDLE_SKIP,
+    FakeIdleSignalProvider,
+    IdleDetector,
+    IdleSignal,
+)
+
+START = datetime(2026, 1, 2, 3, 0, 0)
+AWAY = IdleSignal(locked=False, idle_seconds=600)
+ACTIVE = IdleSignal(locked=False, idle_seconds=1)
+LOCKED = IdleSignal(locked=True, idle_seconds=600)
+
+
+def minute(n: int) -> datetime:
+    """START から n 分後"""
+    return START + timedelta(minutes=n)
+
+
+class TestIdleDetector:
+    """IdleDetectorのテスト"""
+
+    def test_confirms_after_unchanged_frames_without_input(self):
+        """入力がなく画面が変化しないフレームが続いたらアイドルを確定する"""
+        detector = IdleDetector(FakeIdleSignalProvider([AWAY]), confirm_frames=3)
+
+        assert not detector.observe(minute(0), "Editor", 0xAB)
+        assert not detector.observe(minute(1), "Editor", 0xAB)
+        assert detector.observe(minute(2), "Editor", 0xAB)
+        assert detector.idle
+        assert detector.reason == IDLE_REASON_IDLE
+
+    def test_recent_input_prevents_idle(self):
+        """画面が変化しなくても入力があればアイドルにしない（読んでいるだけの場合）"""
+        detector = IdleDetector(FakeIdleSignalProvider([ACTIVE]), confirm_frames=2)
+
+        assert not any(detector.observe(minute(n), "Editor", 0xAB) for n in range(5))
+
+    def test_changed_frame_resets_confirmation(self):
+        """画面が変化したらアイドルの確定までのカウントをやり直す"""
+        detector = IdleDetector(FakeIdleSignalProvider([AWAY]), confirm_frames=2)
+
+        assert not detector.observe(minute(0), "Editor", 0x01)
+        assert not detector.observe(minute(1), "Editor", 0xFF)
+        assert detector.observe(minute(2), "Editor", 0xFF)
+
+    def test_locked_confirms_immediately_and_skips_capture(self):
+        """ロック中は即座にアイドルを確定し、ロックが続く間はキャプチャしない"""
+        detector = IdleDetector(FakeIdleSignalProvider([LOCKED]))
+
+        assert detector.observe(minute(0), "loginwindow", None)
+        assert [detector.begin_tick(minute(n)) for n in range(1, 30)] == [IDLE_SKIP] * 29
+        assert detector.reason == IDLE_REASON_LOCKED
+        assert detector.probes == 0
+
+    def test_probe_interval_backs_off_exponentially(self):
+        """無操作の間は画面を確認する間隔を倍々に延ばす"""
+        detector = IdleDetector(
+            FakeIdleSignalProvider([AWAY]),
+            probe_seconds=60,
+            confirm_frames=1,
+            max_backoff_seconds=480,
+        )
+        assert detector.observe(minute(0), "Editor", 0xAB)
+
+        probes = []
+        for n in range(1, 30):
+            if detector.begin_tick(minute(n)) == IDLE_PROBE:
+                assert detector.probe(minute(n), 0xAB)
+                probes.append(n)
+
+        # 2分後, +4分, +8分, 以降は上限の8分ごと
+        assert probes == [2, 6, 14, 22]
+        assert detector.skipped_captures == 29 - len(probes)
+
+    def test_single_interval_for_idle_run(self):
+        """アイドル期間は開始と終了を持つ1件の期間として取り出される"""
+        signals = FakeIdleSignalProvider([LOCKED] * 6 + [ACTIVE])
+        detector = IdleDetector(signals)
+        assert detector.observe(minute(0), "loginwindow", None)
+        for n in range(1, 6):
+            assert detector.begin_tick(minute(n)) == IDLE_SKIP
+        assert detector.take_finished() == []
+
+        assert detector.begin_tick(minute(6)) == IDLE_ACTIVE
+        (interval,) = detector.take_finished()
+        assert (interval.start, interval.end) == (minute(0), minute(5))
+        assert interval.ticks == 6
+        assert interval.record_fields() == {
+            "timestamp_end": minute(5).isoformat(),
+            "idle_reason": IDLE_REASON_LOCKED,
+            "idle_ticks": 6,
+        }
+        assert not detector.idle
+
+    def test_changed_probe_ends_idle(self):
+        """入力が取得できなくても、確認のキャプチャで画面が変化していたらアイドルを終える"""
+        detector = IdleDetector(
+            FakeIdleSignalProvider([IdleSignal()]), probe_seconds=60, confirm_frames=2
+        )
+        detector.observe(minute(0), "Editor", 0xAB)
+        assert detector.observe(minute(1), "Editor", 0xAB)
+
+        assert detector.begin_tick(minute(2)) == IDLE_SKIP
+        assert detector.begin_tick(minute(3)) == IDLE_PROBE
+        assert not detector.probe(minute(3), 0xCD)
+
+        (interval,) = detector.take_finished()
+        assert (interval.start, interval.end) == (minute(1), minute(2))
+
+    def test_close_finishes_running_interval(self):
+        """終了時には進行中のアイドル期間も取り出される"""
+        detector = IdleDetector(FakeIdleSignalProvider([LOCKED]))
+        detector.observe(minute(0), "loginwindow", None)
+        detector.begin_tick(minute(1))
+
+        (interval,) = detector.close()
+        assert interval.end == minute(1)
+        assert detector.close() == []
+
+    def test_invalid_arguments(self):
+        """不正な設定はエラー"""
+        with pytest.raises(ValueError):
+            IdleDetector(FakeIdleSignalProvider([AWAY]), probe_seconds=0)
+        with pytest.raises(ValueError):
+            IdleDetector(FakeIdleSignalProvider([AWAY]), confirm_frames=0)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+incremental_ocrモジュールのテスト
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw
+from rapidfuzz import fuzz
+
+from screen_times.incremental_ocr import IncrementalOcr, join_observations, sort_reading_order
+from screen_times.ocr import Region, TextObservation
+
+WIDTH, HEIGHT = 800, 640
+
+# 1行分の描画内容: (x, y, 幅, テキスト)
+Line = Tuple[int, int, int, str]
+
+
+class FakeDocumentRecognizer:
+    """
+    テスト用の認識関数
+
+    画像ごとに描画した行の情報を覚えておき、指定領域に中心がある行だけを返す。
+    """
+
+    def __init__(self):
+        self.lines: Dict[Path, List[Line]] = {}
+        self.regions: List[Optional[Region]] = []
+
+    def render(self, path: Path, lines: List[Line]) -> Path:
+        """行を黒い帯として描画した画像を保存"""
+        img = Image.new("RGB", (WIDTH, HEIGHT), color="white")
+        draw = ImageDraw.Draw(img)
+        for x, y, w, _ in lines:
+            draw.rectangle([x, y, x + w, y + 14], fill="black")
+        img.save(path)
+        self.lines[path] = lines
+        return path
+
+    def __call__(
+        self, image_path: Path, timeout_seconds: int, region: Optional[Region]
+    ) -> List[TextObservation]:
+        self.regions.append(region)
+        rx, ry, rw, rh = region if region is not None else (0.0, 0.0, 1.0, 1.0)
+        observations = []
+        for x, y, w, text in self.lines[image_path]:
+            bbox = (x / WIDTH, y / HEIGHT, w / WIDTH, 14 / HEIGHT)
+            cx, cy = bbox[0] + bbox[2] / 2, bbox[1] + bbox[3] / 2
+            if rx <= cx <= rx + rw and ry <= cy <= ry + rh:
+                observations.append(TextObservation(text=text, confidence=0.9, bbox=bbox))
+        return observations
+
+
+def document(version: Dict[int, str]) -> List[Line]:
+    """20行の文書。versionで指定した行だけ内容を変える"""
+    lines = []
+    for i in range(20):
+        text = version.get(i, f"line {i} unchanged content")
+        lines.append((20, 20 + i * 30, 200 + len(text) * 8, text))
+    return lines
+
+
+class TestReadingOrder:
+    """読み順ソートのテスト"""
+
+    def test_sort_top_to_bottom_left_to_right(self):
+        observations = [
+            TextObservation("right", 0.9, (0.6, 0.1, 0.2, 0.05)),
+            TextObservation("second", 0.9, (0.1, 0.3, 0.2, 0.05)),
+            TextObservation("left", 0.9, (0.1, 0.11, 0.2, 0.05)),
+        ]
+        ordered = sort_reading_order(observations)
+        assert [o.text for o in ordered] == ["left", "right", "second"]
+        assert join_observations(observations) == "left\nright\nsecond"
+
+
+class TestIncrementalOcr:
+    """IncrementalOcrのテスト"""
+
+    def test_first_frame_is_full_pass(self):
+        """初回フレームは全体をOCRする"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            recognizer = FakeDocumentRecognizer()
+            frame = recognizer.render(Path(tmpdir) / "a.png", document({}))
+            incremental = IncrementalOcr(recognizer=recognizer)
+
+            result = incremental.recognize("Terminal", frame)
+
+            assert result.full_pass is True
+            assert recognizer.regions == [None]
+            assert result.text.splitlines()[0] == "line 0 unchanged content"
+
+    def test_unchanged_frame_needs_no_ocr(self):
+        """変化がなければOCRを呼ばずに前回の結果を返す"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            recognizer = FakeDocumentRecognizer()
+            a = recognizer.render(Path(tmpdir) / "a.png", document({}))
+            b = recognizer.render(Path(tmpdir) / "b.png", document({}))
+            incremental = IncrementalOcr(recognizer=recognizer)
+
+            first = incremental.recognize("Terminal", a)
+            second = incremental.recognize("Terminal", b)
+
+            assert len(recognizer.regions) == 1
+            assert second.dirty_tiles == 0
+            assert second.text == first.text
+
+    def test_only_dirty_tiles_are_recognized(self):
+        """最後の数行だけ変化した場合、その領域だけをOCRし、全体OCRと同じ結果になる"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            recognizer = FakeDocumentRecognizer()
+            a = recognizer.render(Path(tmpdir) / "a.png", document({}))
+            changed = {18: "$ make test", 19: "42 passed in 1.23s and a much longer line"}
+            b = recognizer.render(Path(tmpdir) / "b.png", document(changed))
+            incremental = IncrementalOcr(recognizer=recognizer, rows=8, cols=4)
+
+            incremental.recognize("Terminal", a)
+            result = incremental.recognize("Terminal", b)
+
+            assert result.full_pass is False
+            assert 0 < result.dirty_tiles < result.total_tiles
+            # OCRに渡したのは画像の一部だけ
+            assert recognizer.regions[-1] is not None
+            assert result.ocr_area < 0.3
+
+            full_text = join_observations(recognizer(b, 30, None))
+            assert fuzz.ratio(result.text, full_text) >= 95
+            assert "42 passed in 1.23s and a much longer line" in result.text
+            assert "line 19 unchanged content" not in result.text
+
+    def test_frames_are_tracked_per_window(self):
+        """ウィンドウが異なれば前回フレームを共有しない"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            recognizer = FakeDocumentRecognizer()
+            a = recognizer.render(Path(tmpdir) / "a.png", document({}))
+            incremental = IncrementalOcr(recognizer=recognizer)
+
+            incremental.recognize("Terminal", a)
+            result = incremental.recognize("Editor", a)
+
+            assert result.full_pass is True
+
+    def test_large_change_falls_back_to_full_pass(self):
+        """大部分が変化した場合は全体をOCRする"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            recognizer = FakeDocumentRecognizer()
+            a = recognizer.render(Path(tmpdir) / "a.png", document({}))
+            b = recognizer.render(
+                Path(tmpdir) / "b.png", [(20, 20 + i * 30, 700, f"new {i}") for i in range(20)]
+            )
+            incremental = IncrementalOcr(recognizer=recognizer)
+
+            incremental.recognize("Terminal", a)
+            result = incremental.recognize("Terminal", b)
+
+            assert result.full_pass is True
+            assert result.text.splitlines()[0] == "new 0"
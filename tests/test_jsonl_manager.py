@@ -4,12 +4,28 @@ JSONL Manager のユニットテスト
 """
 
 import json
+import os
 import tempfile
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from unittest.mock import patch
 
-from screen_times.jsonl_manager import JsonlManager, get_default_logs_dir
+import pytest
+
+from screen_times.jsonl_manager import (
+    FlushPolicy,
+    JsonlManager,
+    JsonlRecord,
+    JsonlWriter,
+    compress_segment,
+    get_default_logs_dir,
+    get_metadata_path,
+    iter_segment_records,
+    open_segment,
+    read_metadata,
+    segment_base_path,
+)
+from screen_times.record_codec import CompactEncoder
 
 
 class TestJsonlManager:
@@ -133,16 +149,60 @@ class TestJsonlManager:
             timestamp = datetime(2025, 12, 28, 10, 0, 0)
             manager.write_metadata(test_file, "新しいタスク", timestamp)
 
-            # メタデータが1行目に、既存の内容が2行目に存在することを確認
+            # 既存のファイルは書き換えず、メタデータはサイドカーに書き込まれることを確認
             with open(test_file, "r", encoding="utf-8") as f:
                 lines = f.readlines()
 
-            assert len(lines) == 2
-            metadata = json.loads(lines[0])
-            existing = json.loads(lines[1])
+            assert len(lines) == 1
+            assert json.loads(lines[0])["window"] == "Test"
 
+            metadata_lines = get_metadata_path(test_file).read_text(encoding="utf-8").splitlines()
+            assert len(metadata_lines) == 1
+            metadata = json.loads(metadata_lines[0])
             assert metadata["type"] == "task_metadata"
-            assert existing["window"] == "Test"
+            assert metadata["description"] == "新しいタスク"
+
+    def test_read_metadata_from_header_and_sidecar(self, tmp_path):
+        """1行目のメタデータとサイドカーのメタデータを書き込んだ順に読み込むことをテスト"""
+        manager = JsonlManager(base_dir=tmp_path)
+        test_file = tmp_path / "2025-12-28.jsonl"
+        timestamp = datetime(2025, 12, 28, 10, 0, 0)
+
+        manager.write_metadata(test_file, "最初のタスク", timestamp)
+        manager.append_record(test_file, timestamp, "Editor", "text")
+        manager.write_metadata(test_file, "2番目のタスク", timestamp.replace(hour=11))
+        manager.write_metadata(test_file, "3番目のタスク", timestamp.replace(hour=12))
+
+        assert [m["description"] for m in read_metadata(test_file)] == [
+            "最初のタスク",
+            "2番目のタスク",
+            "3番目のタスク",
+        ]
+        assert len(test_file.read_text(encoding="utf-8").splitlines()) == 2
+        assert read_metadata(tmp_path / "missing.jsonl") == []
+
+    def test_fetch_includes_sidecar_metadata(self, tmp_path, monkeypatch, capsys):
+        """fetchでサイドカーのメタデータも時刻順に出力されることをテスト"""
+        from screen_times.cli import fetch_records
+
+        monkeypatch.setenv("OBSIDIAN_VAULT_PATH", str(tmp_path))
+        manager = JsonlManager(base_dir=tmp_path)
+        logs_dir = tmp_path / "screenocr_logs" / "alice"
+        logs_dir.mkdir(parents=True)
+        test_file = logs_dir / "2025-12-28.jsonl"
+        manager.append_record(test_file, datetime(2025, 12, 28, 10, 0, 0), "Editor", "before")
+        manager.write_metadata(test_file, "途中からのタスク", datetime(2025, 12, 28, 10, 30, 0))
+        manager.append_record(test_file, datetime(2025, 12, 28, 11, 0, 0), "Editor", "after")
+
+        fetch_records("alice", datetime(2025, 12, 28, 9, 0), datetime(2025, 12, 28, 12, 0))
+
+        stdout = capsys.readouterr().out.splitlines()
+        output = [json.loads(line) for line in stdout if line.startswith("{")]
+        assert [r.get("text", r.get("description")) for r in output] == [
+            "before",
+            "途中からのタスク",
+            "after",
+        ]
 
     def test_append_record(self):
         """レコードの追記をテスト"""
@@ -508,3 +568,639 @@ class TestJsonlManagerInit:
             manager = JsonlManager(base_dir=deep_path)
             assert manager.logs_dir == deep_path / "screenocr_logs"
             assert manager.logs_dir.exists()
+
+
+class FakeClock:
+    """手動で進める時刻関数"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def read_lines(path: Path) -> list:
+    """ファイルに書き出された行"""
+    return path.read_text(encoding="utf-8").splitlines()
+
+
+class TestJsonlWriter:
+    """JsonlWriterのテスト"""
+
+    def test_flush_every_records(self, tmp_path):
+        """every_records件ごとにファイルに書き出す"""
+        path = tmp_path / "log.jsonl"
+        writer = JsonlWriter(FlushPolicy(every_records=3))
+
+        writer.write(path, {"n": 1})
+        writer.write(path, {"n": 2})
+        assert read_lines(path) == []
+        writer.write(path, {"n": 3})
+        assert [json.loads(line)["n"] for line in read_lines(path)] == [1, 2, 3]
+        writer.close()
+
+    def test_flush_every_seconds(self, tmp_path):
+        """前回の書き出しからevery_seconds以上経ったら書き出す"""
+        path = tmp_path / "log.jsonl"
+        clock = FakeClock()
+        writer = JsonlWriter(FlushPolicy(every_records=None, every_seconds=30), clock=clock)
+
+        writer.write(path, {"n": 1})
+        clock.now = 10
+        writer.flush_if_due()
+        assert read_lines(path) == []
+
+        clock.now = 30
+        writer.flush_if_due()
+        assert len(read_lines(path)) == 1
+
+        writer.write(path, {"n": 2})
+        clock.now = 60
+        writer.write(path, {"n": 3})
+        assert len(read_lines(path)) == 3
+        writer.close()
+
+    def test_fsync(self, tmp_path):
+        """fsyncを指定した場合は書き出すたびに fsync する"""
+        path = tmp_path / "log.jsonl"
+        writer = JsonlWriter(FlushPolicy(every_records=2, fsync=True))
+        with patch("screen_times.jsonl_manager.os.fsync") as mock_fsync:
+            writer.write(path, {"n": 1})
+            assert mock_fsync.call_count == 0
+            writer.write(path, {"n": 2})
+            assert mock_fsync.call_count == 1
+            writer.close()
+            assert mock_fsync.call_count == 2
+
+    def test_size_matches_file(self, tmp_path):
+        """メモリ上で数えたサイズが既存の内容を含めてファイルのサイズと一致する"""
+        path = tmp_path / "log.jsonl"
+        path.write_text('{"type": "task_metadata"}\n', encoding="utf-8")
+        writer = JsonlWriter(FlushPolicy(every_records=None))
+
+        written = writer.write(path, {"text": "日本語のテキスト"})
+        written += writer.write(path, {"text": "second"})
+        size = writer.size
+        writer.close()
+
+        assert size == path.stat().st_size
+        assert written == size - len('{"type": "task_metadata"}\n')
+        assert json.loads(read_lines(path)[1])["text"] == "日本語のテキスト"
+
+    def test_switches_segment(self, tmp_path):
+        """書き込み先が変わったら前のセグメントを書き出して閉じる"""
+        first, second = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+        writer = JsonlWriter(FlushPolicy(every_records=None))
+
+        writer.write(first, {"n": 1})
+        writer.write(second, {"n": 2})
+
+        assert len(read_lines(first)) == 1
+        assert writer.path == second
+        writer.close()
+        assert writer.path is None
+        assert len(read_lines(second)) == 1
+
+    def test_reopens_deleted_segment(self, tmp_path):
+        """書き込み中のセグメントが削除された場合は次の書き込みで作り直す"""
+        path = tmp_path / "log.jsonl"
+        writer = JsonlWriter()
+
+        writer.write(path, {"n": 1})
+        path.unlink()
+        writer.write(path, {"n": 2})
+        writer.write(path, {"n": 3})
+        writer.close()
+
+        assert [json.loads(line)["n"] for line in read_lines(path)] == [3]
+
+
+class TestJsonlManagerWithWriter:
+    """JsonlWriterを使うJsonlManagerのテスト"""
+
+    def test_split_uses_in_memory_size(self, tmp_path):
+        """書き出していない分も含めたサイズで上限を判定して分割する"""
+        manager = JsonlManager(base_dir=tmp_path, flush_policy=FlushPolicy(every_records=None))
+        text = "x" * 30 * 1024
+        timestamp = datetime(2025, 12, 28, 10, 0, 0)
+
+        paths = []
+        for minute in range(5):
+            path = manager.get_current_jsonl_path(timestamp.replace(minute=minute))
+            manager.append_record(path, timestamp.replace(minute=minute), "Editor", text)
+            paths.append(path)
+        manager.close()
+
+        first = manager.logs_dir / "2025-12-28.jsonl"
+        assert paths[:4] == [first] * 4
+        assert paths[4] != first
+        assert len(read_lines(first)) == 4
+        assert first.stat().st_size >= manager.MAX_FILE_SIZE_BYTES
+        assert len(read_lines(paths[4])) == 2
+
+    def test_close_flushes_merger_records(self, tmp_path):
+        """close() するまでバッファしていたレコードもファイルに残る"""
+        manager = JsonlManager(
+            base_dir=tmp_path, merge_threshold=0.9, flush_policy=FlushPolicy(every_records=100)
+        )
+        timestamp = datetime(2025, 12, 28, 10, 0, 0)
+        path = manager.get_current_jsonl_path(timestamp)
+        manager.append_record(path, timestamp, "Editor", "first")
+        manager.append_record(path, timestamp.replace(minute=1), "Browser", "second")
+        manager.flush_merger(path)
+        manager.close()
+
+        windows = [json.loads(line).get("window") for line in read_lines(path)]
+        assert windows[-2:] == ["Editor", "Browser"]
+
+
+class TestSegmentResolution:
+    """get_current_jsonl_pathのセグメントの状態のテスト"""
+
+    TIMESTAMP = datetime(2025, 12, 28, 10, 0, 0)
+
+    def test_resolves_once_while_state_is_valid(self, tmp_path):
+        """状態が変わらない間は状態ファイルの読み込みとディレクトリの走査を行わない"""
+        manager = JsonlManager(base_dir=tmp_path)
+        with patch.object(
+            manager, "_resolve_current_jsonl_path", wraps=manager._resolve_current_jsonl_path
+        ) as mock_resolve:
+            for minute in range(5):
+                timestamp = self.TIMESTAMP.replace(minute=minute)
+                path = manager.get_current_jsonl_path(timestamp)
+                manager.append_record(path, timestamp, "Editor", f"text {minute}")
+
+        assert mock_resolve.call_count == 1
+        assert path.name == "2025-12-28.jsonl"
+        assert manager._segment is not None
+        assert manager._segment.size == path.stat().st_size
+
+    def test_resolves_again_on_date_change(self, tmp_path):
+        """実効日付が変わったら次の日付のファイルに切り替える"""
+        manager = JsonlManager(base_dir=tmp_path)
+        path = manager.get_current_jsonl_path(self.TIMESTAMP)
+        manager.append_record(path, self.TIMESTAMP, "Editor", "text")
+
+        next_day = datetime(2025, 12, 29, 5, 0, 0)
+        assert manager.get_current_jsonl_path(next_day).name == "2025-12-29.jsonl"
+
+    def test_detects_split_by_another_process(self, tmp_path):
+        """別のプロセスが状態ファイルを更新したら解決し直す"""
+        manager = JsonlManager(base_dir=tmp_path)
+        path = manager.get_current_jsonl_path(self.TIMESTAMP)
+        manager.append_record(path, self.TIMESTAMP, "Editor", "text")
+
+        other = JsonlManager(base_dir=tmp_path)
+        task_file = other.get_jsonl_path(self.TIMESTAMP, task_id="review")
+        other.write_metadata(task_file, "レビュー", self.TIMESTAMP)
+        other._set_current_task_file(task_file, "2025-12-28")
+
+        assert manager.get_current_jsonl_path(self.TIMESTAMP) == task_file
+
+    def test_resolves_again_when_segment_deleted(self, tmp_path):
+        """書き込んでいたセグメントが削除されたら解決し直す"""
+        manager = JsonlManager(base_dir=tmp_path)
+        logs_dir = tmp_path / "screenocr_logs"
+        (logs_dir / "2025-12-28.jsonl").touch()
+        split_file = logs_dir / "2025-12-28_100000.jsonl"
+        split_file.touch()
+
+        assert manager.get_current_jsonl_path(self.TIMESTAMP) == split_file
+        split_file.unlink()
+        assert manager.get_current_jsonl_path(self.TIMESTAMP).name == "2025-12-28.jsonl"
+
+    def test_restores_persisted_state(self, tmp_path):
+        """保存した状態を次の起動時に使い、ファイルが変わっていればサイズを合わせる"""
+        manager = JsonlManager(base_dir=tmp_path)
+        path = manager.get_current_jsonl_path(self.TIMESTAMP)
+        for minute in range(3):
+            manager.append_record(path, self.TIMESTAMP.replace(minute=minute), "Editor", "text")
+        manager.close()
+
+        restored = JsonlManager(base_dir=tmp_path)
+        with patch.object(restored, "_resolve_current_jsonl_path") as mock_resolve:
+            assert restored.get_current_jsonl_path(self.TIMESTAMP) == path
+        mock_resolve.assert_not_called()
+        assert restored._segment is not None
+        assert restored._segment.size == path.stat().st_size
+
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"timestamp": "2025-12-28T10:05:00"}\n')
+        restarted = JsonlManager(base_dir=tmp_path)
+        restarted.get_current_jsonl_path(self.TIMESTAMP)
+        assert restarted._segment is not None
+        assert restarted._segment.size == path.stat().st_size
+
+    def test_per_run_process_does_not_read_segment(self, tmp_path):
+        """close() しない1回ごとの実行（launchd）でも、起動時にセグメントを読み直さない"""
+        path = None
+        for minute in range(3):
+            manager = JsonlManager(base_dir=tmp_path)
+            timestamp = self.TIMESTAMP.replace(minute=minute)
+            with patch("builtins.open", wraps=open) as mock_open:
+                path = manager.get_current_jsonl_path(timestamp)
+            opened = [call.args[0] for call in mock_open.call_args_list]
+            assert all(Path(name) != path for name in opened)
+            assert manager._segment is not None
+            assert manager._segment.size == (path.stat().st_size if path.exists() else 0)
+            manager.append_record(path, timestamp, "Editor", f"text {minute}")
+
+    def test_ignores_broken_persisted_state(self, tmp_path):
+        """壊れた状態ファイルは無視して解決し直す"""
+        manager = JsonlManager(base_dir=tmp_path)
+        manager.segment_state_file.write_text("{broken", encoding="utf-8")
+
+        assert manager.get_current_jsonl_path(self.TIMESTAMP).name == "2025-12-28.jsonl"
+        assert json.loads(manager.segment_state_file.read_text(encoding="utf-8"))["path"]
+
+
+class TestAppendRecords:
+    """append_recordsのテスト"""
+
+    @staticmethod
+    def make_records(count, start=datetime(2025, 12, 28, 10, 0, 0), text_size=1000):
+        """1分ごとのレコード（ウィンドウを交互に切り替えてマージさせない）"""
+        return [
+            JsonlRecord(
+                start + timedelta(minutes=index),
+                "Editor" if index % 2 else "Browser",
+                f"{index} " + "x" * text_size,
+            )
+            for index in range(count)
+        ]
+
+    @staticmethod
+    def read_dir(logs_dir):
+        """ファイル名 → 内容"""
+        return {
+            path.name: path.read_text(encoding="utf-8")
+            for path in sorted(logs_dir.iterdir())
+            if not path.name.startswith(".")
+        }
+
+    def test_matches_append_record(self, tmp_path):
+        """分割と日付の切り替えを含めて、append_recordを順に呼んだ場合と同じファイルになる"""
+        records = self.make_records(250, start=datetime(2025, 12, 29, 2, 0, 0))
+
+        one_by_one = JsonlManager(base_dir=tmp_path / "one")
+        for r in records:
+            path = one_by_one.get_current_jsonl_path(r.timestamp)
+            one_by_one.append_record(path, r.timestamp, r.window, r.text)
+
+        batch = JsonlManager(base_dir=tmp_path / "batch")
+        written = batch.append_records(records)
+
+        expected = self.read_dir(one_by_one.logs_dir)
+        assert self.read_dir(batch.logs_dir) == expected
+        assert [path.name for path in written] == sorted(expected)
+        assert len(written) >= 3  # 2025-12-28・分割・2025-12-29
+        assert batch.get_current_jsonl_path(records[-1].timestamp) == written[-1]
+
+    @pytest.mark.parametrize("batch_size", [1, 7, 250])
+    def test_matches_append_record_with_merge(self, tmp_path, batch_size):
+        """マージが有効な場合も、分割時にマージ中のレコードを現在のファイルに書く"""
+        records = self.make_records(250)
+
+        one_by_one = JsonlManager(base_dir=tmp_path / "one", merge_threshold=0.9)
+        for r in records:
+            path = one_by_one.get_current_jsonl_path(r.timestamp)
+            one_by_one.append_record(path, r.timestamp, r.window, r.text)
+        one_by_one.flush_merger(one_by_one.get_current_jsonl_path(records[-1].timestamp))
+
+        batch = JsonlManager(base_dir=tmp_path / "batch", merge_threshold=0.9)
+        for start in range(0, len(records), batch_size):
+            batch.append_records(records[start:][:batch_size])
+        batch.flush_merger(batch.get_current_jsonl_path(records[-1].timestamp))
+
+        assert self.read_dir(batch.logs_dir) == self.read_dir(one_by_one.logs_dir)
+
+    def test_one_write_per_segment(self, tmp_path):
+        """ファイルごとに1回だけ書き込み、fsyncも1回だけ行う"""
+        manager = JsonlManager(base_dir=tmp_path)
+        records = self.make_records(150)
+        with patch("screen_times.jsonl_manager.os.fsync") as mock_fsync:
+            written = manager.append_records(records, fsync=True)
+
+        assert len(written) == 2
+        assert mock_fsync.call_count == 2
+        first, second = (path.read_text(encoding="utf-8").splitlines() for path in written)
+        assert manager._segment_size(written[0]) >= manager.MAX_FILE_SIZE_BYTES
+        assert json.loads(second[0])["type"] == "task_metadata"
+        assert len(first) + len(second) - 1 == 150
+
+    def test_merges_batch(self, tmp_path):
+        """マージが有効な場合はバッチ全体をマージし、最後のレコードはバッファに残す"""
+        manager = JsonlManager(base_dir=tmp_path, merge_threshold=0.9)
+        start = datetime(2025, 12, 28, 10, 0, 0)
+        records = [JsonlRecord(start + timedelta(minutes=i), "Editor", "same") for i in range(3)]
+        records.append(JsonlRecord(start + timedelta(minutes=3), "Browser", "other"))
+
+        [path] = manager.append_records(records)
+        lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+        assert len(lines) == 1
+        assert lines[0]["merged_count"] == 3
+        assert manager.merger is not None
+        assert manager.merger.buffer is not None
+        assert manager.merger.buffer["window"] == "Browser"
+
+    def test_uses_writer(self, tmp_path):
+        """JsonlWriterを使う場合も同じ内容を書き込む"""
+        records = self.make_records(150)
+        plain = JsonlManager(base_dir=tmp_path / "plain")
+        plain.append_records(records)
+        buffered = JsonlManager(
+            base_dir=tmp_path / "buffered", flush_policy=FlushPolicy(every_records=None)
+        )
+        buffered.append_records(records[:70])
+        buffered.append_records(records[70:])
+        buffered.close()
+
+        assert self.read_dir(buffered.logs_dir) == self.read_dir(plain.logs_dir)
+
+    def test_empty_batch(self, tmp_path):
+        """空のバッチは何も書き込まない"""
+        manager = JsonlManager(base_dir=tmp_path)
+        assert manager.append_records([]) == []
+
+
+class TestCompression:
+    """書き込みが終わったJSONLファイルの圧縮のテスト"""
+
+    NOW = datetime(2025, 12, 29, 12, 0, 0)
+
+    @staticmethod
+    def write_segment(manager, name, count, start=datetime(2025, 12, 28, 10, 0, 0)):
+        """count件のレコードを書き込み、最後の書き込みを1時間前にする"""
+        path = manager.logs_dir / name
+        for minute in range(count):
+            timestamp = start + timedelta(minutes=minute)
+            manager.append_record(path, timestamp, "Editor", f"line {minute} " + "x" * 200)
+        past = (TestCompression.NOW - timedelta(hours=1)).timestamp()
+        os.utime(path, (past, past))
+        return path
+
+    def test_compress_segment(self, tmp_path):
+        """圧縮したファイルは展開すると元と同じ内容で、元のファイルは削除される"""
+        manager = JsonlManager(base_dir=tmp_path)
+        path = self.write_segment(manager, "2025-12-28.jsonl", 50)
+        original = path.read_text(encoding="utf-8")
+
+        target = compress_segment(path)
+
+        assert target == manager.logs_dir / "2025-12-28.jsonl.gz"
+        assert not path.exists()
+        assert target.stat().st_size * 5 < len(original.encode("utf-8"))
+        with open_segment(target) as f:
+            assert f.read() == original
+        assert segment_base_path(target) == path
+
+    def test_appends_member_to_existing_archive(self, tmp_path):
+        """圧縮した後に同じ名前のファイルに追記された場合は後ろに追加する"""
+        manager = JsonlManager(base_dir=tmp_path)
+        path = self.write_segment(manager, "2025-12-28.jsonl", 3)
+        first = path.read_text(encoding="utf-8")
+        compress_segment(path)
+        path = self.write_segment(manager, "2025-12-28.jsonl", 2)
+        second = path.read_text(encoding="utf-8")
+
+        target = compress_segment(path)
+
+        assert target is not None
+        with open_segment(target) as f:
+            assert f.read() == first + second
+
+    def test_compress_closed_segments(self, tmp_path):
+        """前日のファイルと分割済みのファイルだけを圧縮し、現在のファイルは残す"""
+        manager = JsonlManager(base_dir=tmp_path)
+        previous_day = self.write_segment(manager, "2025-12-28.jsonl", 5)
+        split = self.write_segment(manager, "2025-12-29.jsonl", 5, start=self.NOW)
+        current = manager.get_jsonl_path(self.NOW, include_time=True)
+        manager.write_metadata(current, "Auto-split", self.NOW)
+        manager._set_current_task_file(current, "2025-12-29")
+        recent = self.write_segment(manager, "2025-12-27_task_100000.jsonl", 1)
+        os.utime(recent, None)  # 書き込まれたばかり
+
+        compressed = manager.compress_closed_segments(self.NOW)
+
+        assert sorted(p.name for p in compressed) == [
+            previous_day.name + ".gz",
+            split.name + ".gz",
+        ]
+        assert current.exists()
+        assert recent.exists()
+        assert manager.get_current_jsonl_path(self.NOW) == current
+
+    def test_fetch_reads_compressed_segments(self, tmp_path, monkeypatch, capsys):
+        """fetchは圧縮前と同じ内容を出力する"""
+        from screen_times.cli import fetch_records
+
+        monkeypatch.setenv("OBSIDIAN_VAULT_PATH", str(tmp_path))
+        manager = JsonlManager(base_dir=tmp_path)
+        manager.logs_dir = tmp_path / "screenocr_logs" / "alice"
+        manager.logs_dir.mkdir(parents=True)
+        path = self.write_segment(manager, "2025-12-28.jsonl", 5)
+        manager.write_metadata(path, "タスク", datetime(2025, 12, 28, 10, 2, 30))
+
+        def fetch():
+            fetch_records("alice", datetime(2025, 12, 28, 9, 0), datetime(2025, 12, 28, 12, 0))
+            return [line for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+
+        expected = fetch()
+        compress_segment(path)
+        assert fetch() == expected
+        assert len(expected) == 6
+
+        # 圧縮した後に追記されたレコードも読む
+        manager.append_record(path, datetime(2025, 12, 28, 11, 0), "Editor", "after")
+        assert len(fetch()) == 7
+
+
+class TestLoggerCompression:
+    """ScreenOCRLoggerのクリーンアップでの圧縮のテスト"""
+
+    def test_cleanup_compresses_when_enabled(self, tmp_path):
+        """jsonl_compress_segments が有効な場合はクリーンアップで圧縮する"""
+        from screen_times.screen_ocr_logger import ScreenOCRConfig, ScreenOCRLogger
+
+        for enabled in (False, True):
+            config = ScreenOCRConfig(
+                screenshot_dir=tmp_path / f"shots-{enabled}",
+                jsonl_base_dir=tmp_path / f"logs-{enabled}",
+                jsonl_compress_segments=enabled,
+            )
+            logger = ScreenOCRLogger(config)
+            path = TestCompression.write_segment(logger.jsonl_manager, "2020-01-01.jsonl", 2)
+            old = datetime(2020, 1, 1).timestamp()
+            os.utime(path, (old, old))
+
+            assert logger.schedule_cleanup(background=False)
+            assert path.exists() is not enabled
+            assert (path.parent / "2020-01-01.jsonl.gz").exists() is enabled
+
+
+class TestCompactRecordEncoding:
+    """record_encoding="compact" / "delta" での書き込みと読み込みのテスト"""
+
+    START = datetime(2025, 12, 28, 10, 0, 0)
+
+    def write(self, manager, count=20):
+        """ウィンドウを切り替えながらアイドル期間を含むレコードを書き込む"""
+        windows = ["Editor", "Editor", "Browser", "ターミナル"]
+        path = manager.get_current_jsonl_path(self.START)
+        for minute in range(count):
+            timestamp = self.START + timedelta(minutes=minute)
+            window = windows[minute % len(windows)]
+            if minute % 7 == 6:
+                extra = {"timestamp_end": (timestamp + timedelta(seconds=50)).isoformat()}
+                manager.append_record(path, timestamp, window, "", "sleep", extra)
+            else:
+                text = f"{window} {minute // 3}\n" + "本文 " * 20
+                manager.append_record(path, timestamp, window, text, extra={"frame_hash": "ab"})
+        manager.flush_merger(path)
+        manager.close()
+        return path
+
+    def test_reads_back_same_records(self, tmp_path):
+        """通常の形式と同じレコードとして読み込める（マージあり・なし）"""
+        for threshold in (None, 0.9):
+            full = JsonlManager(base_dir=tmp_path / f"full-{threshold}", merge_threshold=threshold)
+            full_path = self.write(full)
+            expected = [json.loads(line) for line in read_lines(full_path)]
+            assert list(iter_segment_records(full_path)) == expected
+
+            for encoding in ("compact", "delta"):
+                manager = JsonlManager(
+                    base_dir=tmp_path / f"{encoding}-{threshold}",
+                    merge_threshold=threshold,
+                    record_encoding=encoding,
+                )
+                path = self.write(manager)
+                assert list(iter_segment_records(path)) == expected
+                assert path.stat().st_size < full_path.stat().st_size
+
+    def test_delta_shrinks_similar_texts(self, tmp_path):
+        """同じウィンドウのテキストが少しずつ変わる場合、delta は compact より小さくなり、圧縮しても読める"""
+        sizes = {}
+        for encoding in ("compact", "delta"):
+            manager = JsonlManager(base_dir=tmp_path / encoding, record_encoding=encoding)
+            path = manager.get_current_jsonl_path(self.START)
+            lines = [f"{row}行目 " + "本文 " * 10 for row in range(20)]
+            for minute in range(30):
+                lines[minute % len(lines)] = f"{minute}分に変更"
+                window = "Editor" if minute % 5 else "Browser"
+                manager.append_record(
+                    path, self.START + timedelta(minutes=minute), window, "\n".join(lines)
+                )
+            manager.close()
+            sizes[encoding] = path.stat().st_size
+            records = list(iter_segment_records(path))
+
+        assert sizes["delta"] * 2 < sizes["compact"]
+        assert records[-1]["text"] == "\n".join(lines)
+        compress_segment(path)
+        assert list(iter_segment_records(path.with_suffix(".jsonl.gz"))) == records
+
+    def test_per_record_overhead_shrinks(self, tmp_path):
+        """テキストを除いたレコードあたりのバイト数が4割以上減る"""
+        overheads = []
+        for encoding in ("full", "compact"):
+            manager = JsonlManager(base_dir=tmp_path / encoding, record_encoding=encoding)
+            path = self.write(manager, count=100)
+            records = list(iter_segment_records(path))
+            text_bytes = sum(len(json.dumps(r["text"], ensure_ascii=False)) for r in records)
+            text_bytes += sum(len(r["text"].encode("utf-8")) - len(r["text"]) for r in records)
+            overheads.append((path.stat().st_size - text_bytes) / len(records))
+
+        assert overheads[1] < overheads[0] * 0.6
+
+    def test_existing_full_file_round_trip(self, tmp_path):
+        """既存の通常の形式のファイルを変換しても同じレコードに戻り、混在していても読める"""
+        full_path = self.write(JsonlManager(base_dir=tmp_path / "full", merge_threshold=0.9))
+        expected = [json.loads(line) for line in read_lines(full_path)]
+
+        encoder = CompactEncoder()
+        converted = tmp_path / "converted.jsonl"
+        with open(converted, "w", encoding="utf-8") as f:
+            for record in expected:
+                for obj in encoder.encode(record):
+                    f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+            f.write(json.dumps(expected[0], ensure_ascii=False) + "\n")
+        assert list(iter_segment_records(converted)) == expected + expected[:1]
+
+        compress_segment(converted)
+        assert (
+            list(iter_segment_records(tmp_path / "converted.jsonl.gz")) == expected + expected[:1]
+        )
+
+    def test_appends_with_existing_dictionary(self, tmp_path):
+        """別のプロセスで追記する場合は既存の辞書を読み込み、同じウィンドウを定義し直さない"""
+        for encoding in ("compact", "delta"):
+            base_dir = tmp_path / encoding
+            path = self.write(JsonlManager(base_dir=base_dir, record_encoding=encoding), count=4)
+            manager = JsonlManager(base_dir=base_dir, record_encoding=encoding)
+            manager.append_record(path, self.START + timedelta(hours=1), "Editor", "again")
+            manager.append_record(path, self.START + timedelta(hours=2), "Mail", "new")
+
+            definitions = [line for line in read_lines(path) if '"type": "window"' in line]
+            records = list(iter_segment_records(path))
+            assert len(definitions) == 4
+            assert [(r["window"], r["text"]) for r in records[-2:]] == [
+                ("Editor", "again"),
+                ("Mail", "new"),
+            ]
+
+    def test_deleted_segment_redefines_windows(self, tmp_path):
+        """書き込み中のセグメントが削除された場合は辞書を書き直す"""
+        manager = JsonlManager(base_dir=tmp_path, record_encoding="compact")
+        path = tmp_path / "log.jsonl"
+        manager.append_record(path, self.START, "Editor", "first")
+        path.unlink()
+        manager.append_record(path, self.START + timedelta(minutes=1), "Editor", "second")
+
+        assert [r["window"] for r in iter_segment_records(path)] == ["Editor"]
+
+    def test_append_records_with_writer(self, tmp_path):
+        """append_records と JsonlWriter でも同じレコードとして読み込める"""
+        records = TestAppendRecords.make_records(250, text_size=100)
+        full = JsonlManager(base_dir=tmp_path / "full")
+        full.append_records(records)
+
+        def read_all(manager):
+            paths = sorted(manager.logs_dir.glob("*.jsonl"))
+            return [r for path in paths for r in iter_segment_records(path)]
+
+        for encoding in ("compact", "delta"):
+            manager = JsonlManager(
+                base_dir=tmp_path / encoding,
+                flush_policy=FlushPolicy(every_records=10),
+                record_encoding=encoding,
+            )
+            manager.append_records(records[:100])
+            manager.append_records(records[100:])
+            manager.close()
+            assert read_all(manager) == read_all(full)
+
+    def test_fetch_output_matches_full(self, tmp_path, monkeypatch, capsys):
+        """fetchの出力は通常の形式の場合と同じ"""
+        from screen_times.cli import fetch_records
+
+        outputs = []
+        for encoding in ("full", "compact", "delta"):
+            vault = tmp_path / encoding
+            monkeypatch.setenv("OBSIDIAN_VAULT_PATH", str(vault))
+            manager = JsonlManager(base_dir=vault, merge_threshold=0.9, record_encoding=encoding)
+            manager.logs_dir = vault / "screenocr_logs" / "alice"
+            manager.logs_dir.mkdir(parents=True)
+            self.write(manager)
+            fetch_records("alice", datetime(2025, 12, 28, 9, 0), datetime(2025, 12, 28, 12, 0))
+            stdout = capsys.readouterr().out.splitlines()
+            outputs.append([line for line in stdout if line.startswith("{")])
+
+        assert outputs[0] and outputs[1] == outputs[0] and outputs[2] == outputs[0]
+
+    def test_unknown_encoding(self, tmp_path):
+        """未知の形式は指定できない"""
+        with pytest.raises(ValueError):
+            JsonlManager(base_dir=tmp_path, record_encoding="binary")
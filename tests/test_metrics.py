@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+処理段階のメトリクス（metrics）のユニットテスト
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from screen_times.metrics import (
+    MetricsLog,
+    TickMetrics,
+    activate,
+    count_bytes,
+    count_event,
+    current_metrics,
+    percentile,
+    stage,
+    summarize,
+)
+
+NOW = datetime(2026, 1, 2, 9, 0, 0)
+
+
+class TestStage:
+    """stage・activateのテスト"""
+
+    def test_nested_stage_is_exclusive(self):
+        """入れ子の処理段階の時間は内側の段階にだけ計上する"""
+        metrics = TickMetrics(NOW)
+        with activate(metrics):
+            with stage("ocr"):
+                with stage("preprocess"):
+                    time.sleep(0.02)
+
+        assert metrics.wall["preprocess"] >= 0.02
+        assert metrics.wall["ocr"] < 0.02
+        assert set(metrics.cpu) == {"ocr", "preprocess"}
+
+    def test_repeated_stage_accumulates(self):
+        """同じtickで同じ処理段階を複数回実行した場合は合計する"""
+        metrics = TickMetrics(NOW)
+        metrics.add("write", 0.5, 0.1)
+        metrics.add("write", 0.25, 0.1)
+
+        assert metrics.wall["write"] == pytest.approx(0.75)
+        assert metrics.cpu["write"] == pytest.approx(0.2)
+
+    def test_without_active_metrics(self):
+        """tickが有効でない場合は何も記録しない"""
+        with stage("ocr"):
+            count_bytes(image=10)
+        assert current_metrics() is None
+
+    def test_activate_is_per_thread(self):
+        """有効なtickはスレッドごとで、終了時に元に戻る"""
+        outer, inner = TickMetrics(NOW), TickMetrics(NOW)
+        seen = []
+        with activate(outer):
+            thread = threading.Thread(target=lambda: seen.append(current_metrics()))
+            thread.start()
+            thread.join()
+            with activate(inner):
+                count_bytes(jsonl=5)
+            count_bytes(image=7)
+            assert current_metrics() is outer
+
+        assert seen == [None]
+        assert (inner.image_bytes, inner.jsonl_bytes) == (0, 5)
+        assert (outer.image_bytes, outer.jsonl_bytes) == (7, 0)
+
+    def test_to_record(self):
+        """短いキーとミリ秒で1行分のレコードにする"""
+        metrics = TickMetrics(NOW, image_bytes=3, jsonl_bytes=4)
+        metrics.add("window", 0.0123, 0.001)
+
+        assert metrics.to_record() == {
+            "t": NOW.timestamp(),
+            "s": {"window": [12.3, 1.0]},
+            "ib": 3,
+            "jb": 4,
+        }
+
+    def test_count_event(self):
+        """出来事の回数は有効なtickにだけ加算し、あったtickのレコードにだけ書く"""
+        count_event("ocr_timeouts")
+        metrics = TickMetrics(NOW)
+        with activate(metrics):
+            count_event("ocr_timeouts")
+            count_event("ocr_restarts")
+            count_event("ocr_restarts")
+
+        assert metrics.to_record()["ev"] == {"ocr_timeouts": 1, "ocr_restarts": 2}
+        assert "ev" not in TickMetrics(NOW).to_record()
+
+    def test_interval_in_record(self):
+        """実行間隔が分かるtickだけ "iv" を書く"""
+        assert TickMetrics(NOW, interval_seconds=42.34).to_record()["iv"] == 42.3
+        assert "iv" not in TickMetrics(NOW).to_record()
+
+
+class TestMetricsLog:
+    """MetricsLogのテスト"""
+
+    def test_reads_since(self, tmp_path):
+        """指定した時刻以降のtickだけを読み込む"""
+        log = MetricsLog(tmp_path)
+        for minutes in (120, 30, 5):
+            log.append(TickMetrics(NOW - timedelta(minutes=minutes)))
+
+        assert len(log.read()) == 3
+        assert len(log.read(NOW - timedelta(hours=1))) == 2
+
+    def test_rotates_and_keeps_previous_file(self, tmp_path):
+        """上限を超えたら1世代前のファイルに移し、両方から読み込む"""
+        log = MetricsLog(tmp_path, max_bytes=100)
+        for seconds in range(6):
+            metrics = TickMetrics(NOW + timedelta(seconds=seconds))
+            metrics.add("ocr", 0.1, 0.1)
+            log.append(metrics)
+
+        assert log.rotated_path.exists()
+        assert log.path.stat().st_size < 200
+        timestamps = [record["t"] for record in log.read()]
+        assert timestamps == sorted(timestamps)
+        assert timestamps[-1] == (NOW + timedelta(seconds=5)).timestamp()
+
+    def test_skips_broken_lines(self, tmp_path):
+        """壊れた行は読み飛ばす"""
+        log = MetricsLog(tmp_path)
+        log.append(TickMetrics(NOW))
+        with open(log.path, "a", encoding="utf-8") as f:
+            f.write('{"t": 1\n[]\n')
+
+        assert len(log.read()) == 1
+
+
+class TestSummarize:
+    """summarize・percentileのテスト"""
+
+    def test_percentile(self):
+        """最近傍順位法"""
+        values = [float(n) for n in range(1, 101)]
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile([3.0], 99) == 3.0
+
+    def test_summarize_per_stage(self):
+        """処理段階ごとに、その段階を実行したtickだけでパーセンタイルを求める"""
+        records = [
+            {"t": 0, "s": {"ocr": [float(n), 1.0], "window": [2.0, 1.0]}, "ib": 10, "jb": 1}
+            for n in range(1, 101)
+        ]
+        records.append({"t": 0, "s": {"window": [4.0, 2.0]}, "ib": 0, "jb": 0})
+
+        summary = summarize(records)
+        assert summary.ticks == 101
+        assert (summary.image_bytes, summary.jsonl_bytes) == (1000, 100)
+        assert summary.stages["ocr"].count == 100
+        assert summary.stages["ocr"].wall == {50: 50.0, 95: 95.0, 99: 99.0}
+        assert summary.stages["window"].wall[99] == 2.0
+
+        lines = summary.format_lines()
+        assert [line.split()[0] for line in lines[1:]] == ["window", "ocr"]
+
+    def test_summarize_events(self):
+        """出来事の回数を期間で合計し、表示順に1行にまとめる"""
+        records = [
+            {"t": 0, "s": {}, "ib": 0, "jb": 0, "ev": {"ocr_restarts": 1, "ocr_timeouts": 1}},
+            {"t": 1, "s": {}, "ib": 0, "jb": 0},
+            {"t": 2, "s": {}, "ib": 0, "jb": 0, "ev": {"ocr_timeouts": 2}},
+        ]
+
+        summary = summarize(records)
+        assert summary.events == {"ocr_timeouts": 3, "ocr_restarts": 1}
+        assert summary.format_events() == "タイムアウト 3, 再起動 1"
+        assert summarize(records[1:2]).format_events() == ""
+
+    def test_summarize_intervals(self):
+        """実行間隔を時間帯ごとに平均して1行にまとめる"""
+        start = datetime(2026, 1, 2, 9, 0, 0).timestamp()
+        records = [
+            {"t": start, "s": {}, "ib": 0, "jb": 0},
+            {"t": start + 60, "s": {}, "ib": 0, "jb": 0, "iv": 60.0},
+            {"t": start + 80, "s": {}, "ib": 0, "jb": 0, "iv": 20.0},
+            {"t": start + 3600, "s": {}, "ib": 0, "jb": 0, "iv": 180.0},
+        ]
+
+        summary = summarize(records)
+        assert summary.intervals == [(start + 60, 60.0), (start + 80, 20.0), (start + 3600, 180.0)]
+        assert summary.format_intervals(3600) == "09:00 40s, 10:00 180s"
+        assert summarize(records[:1]).format_intervals(3600) == ""
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+ocr_backendモジュールのテスト
+"""
+
+import tempfile
+from pathlib import Path
+
+from screen_times.ocr_backend import (
+    FakeOcrBackend,
+    OcrBackend,
+    ProcessPoolOcrExecutor,
+    VisionOcrBackend,
+    ocr_text,
+)
+
+
+class TestFakeOcrBackend:
+    """FakeOcrBackendのテスト"""
+
+    def test_satisfies_protocol(self):
+        """OcrBackendプロトコルを満たす"""
+        assert isinstance(FakeOcrBackend(), OcrBackend)
+        assert isinstance(VisionOcrBackend(), OcrBackend)
+
+    def test_returns_registered_text(self):
+        """ファイル名に登録したテキストを返す"""
+        backend = FakeOcrBackend(texts={"a.png": "first line\nsecond line"})
+
+        assert ocr_text(backend, Path("/nonexistent/a.png"), 30) == "first line\nsecond line"
+
+    def test_generated_text_is_deterministic(self):
+        """同じ内容の画像には同じ疑似テキストを返す"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            a = Path(tmpdir) / "a.png"
+            b = Path(tmpdir) / "b.png"
+            c = Path(tmpdir) / "c.png"
+            a.write_bytes(b"pixels")
+            b.write_bytes(b"pixels")
+            c.write_bytes(b"other pixels")
+            backend = FakeOcrBackend(lines=3)
+
+            text = ocr_text(backend, a, 30)
+            assert len(text.splitlines()) == 3
+            assert ocr_text(backend, b, 30) == text
+            assert ocr_text(backend, c, 30) != text
+
+    def test_accepts_image_buffer(self):
+        """メモリ上の画像は画素データから疑似テキストを決め、プロセス間でも同じ結果を返す"""
+        from PIL import Image
+
+        from screen_times.image_utils import ImageBuffer
+
+        buffer = ImageBuffer(pil_image=Image.new("RGB", (8, 8), color="white"))
+        backend = FakeOcrBackend(lines=2)
+        text = ocr_text(backend, buffer, 30)
+
+        assert len(text.splitlines()) == 2
+        with ProcessPoolOcrExecutor(backend, max_workers=1) as executor:
+            assert ocr_text(executor, buffer, 30) == text
+
+    def test_region_limits_observations(self):
+        """領域を指定した場合はその領域の行だけを返す"""
+        backend = FakeOcrBackend(texts={"a.png": "top\nmiddle\nbottom"})
+
+        observations = backend.recognize(Path("a.png"), 30, (0.0, 0.5, 1.0, 0.5))
+
+        assert [o.text for o in observations] == ["middle", "bottom"]
+
+
+class TestProcessPoolOcrExecutor:
+    """ProcessPoolOcrExecutorのテスト"""
+
+    def test_recognize_many_preserves_order(self):
+        """複数プロセスでOCRしても入力と同じ順序で結果を返す"""
+        texts = {f"{i}.png": f"frame {i}" for i in range(6)}
+        with ProcessPoolOcrExecutor(FakeOcrBackend(texts=texts), max_workers=2) as executor:
+            results = executor.recognize_many([Path(name) for name in texts])
+
+        assert results == [f"frame {i}" for i in range(6)]
+
+    def test_can_be_used_as_backend(self):
+        """エグゼキューター自体をバックエンドとして使える"""
+        with ProcessPoolOcrExecutor(FakeOcrBackend(texts={"a.png": "hello"}), 1) as executor:
+            assert isinstance(executor, OcrBackend)
+            assert executor.settings == "fake"
+            assert ocr_text(executor, Path("a.png"), 30) == "hello"
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+ocr_cacheモジュールのテスト
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from screen_times.ocr_cache import OcrCache
+
+
+def write_image(path: Path, content: bytes) -> Path:
+    """テスト用の画像ファイル（内容だけが意味を持つ）を作成"""
+    path.write_bytes(content)
+    return path
+
+
+class TestOcrCacheKey:
+    """キャッシュキーのテスト"""
+
+    def test_same_content_same_key(self):
+        """ファイル名が異なっても内容が同じなら同じキー"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = OcrCache(Path(tmpdir) / "cache")
+            a = write_image(Path(tmpdir) / "a.png", b"pixels")
+            b = write_image(Path(tmpdir) / "b.png", b"pixels")
+            c = write_image(Path(tmpdir) / "c.png", b"other pixels")
+
+            assert cache.key_for(a) == cache.key_for(b)
+            assert cache.key_for(a) != cache.key_for(c)
+
+    def test_settings_change_key(self):
+        """認識設定が異なれば別のキー"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            image = write_image(Path(tmpdir) / "a.png", b"pixels")
+            fast = OcrCache(Path(tmpdir) / "cache", settings="fast")
+            accurate = OcrCache(Path(tmpdir) / "cache", settings="accurate")
+
+            assert fast.key_for(image) != accurate.key_for(image)
+
+
+class TestOcrCache:
+    """OcrCacheのテスト"""
+
+    def test_get_and_put(self):
+        """保存した結果を取得でき、ヒット・ミスと節約時間が集計される"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = OcrCache(Path(tmpdir))
+
+            assert cache.get("ab" * 32) is None
+            cache.put("ab" * 32, "こんにちは", ocr_seconds=1.5)
+            assert cache.get("ab" * 32) == "こんにちは"
+
+            stats = cache.stats()
+            assert stats["hits"] == 1
+            assert stats["misses"] == 1
+            assert stats["hit_rate"] == 0.5
+            assert stats["saved_seconds"] == 1.5
+            assert stats["total_bytes"] > 0
+
+    def test_persists_across_instances(self):
+        """別のインスタンス（別プロセスの起動）でも結果と統計が引き継がれる"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            OcrCache(Path(tmpdir)).put("cd" * 32, "text", ocr_seconds=2.0)
+
+            cache = OcrCache(Path(tmpdir))
+            assert cache.get("cd" * 32) == "text"
+            assert OcrCache(Path(tmpdir)).stats()["saved_seconds"] == 2.0
+
+    def test_evicts_least_recently_used(self):
+        """容量を超えたら最も長く参照されていないエントリから削除する"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = OcrCache(Path(tmpdir), max_bytes=250)
+            keys = [f"{i:02d}" * 32 for i in range(3)]
+            for i, key in enumerate(keys[:2]):
+                cache.put(key, "x" * 80)
+                # 参照時刻の順序を明確にする
+                path = cache._entry_path(key)
+                os.utime(path, (1000 + i, 1000 + i))
+
+            # 古い方を参照して最近使ったことにする
+            assert cache.get(keys[0]) is not None
+            cache.put(keys[2], "x" * 80)
+
+            assert cache.get(keys[0]) is not None
+            assert cache.get(keys[1]) is None
+            assert cache.get(keys[2]) is not None
+            assert cache.stats()["evictions"] == 1
+            assert cache.stats()["total_bytes"] <= 250
+
+    def test_corrupted_entry_is_miss(self):
+        """壊れたエントリはミスとして扱う"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = OcrCache(Path(tmpdir))
+            cache.put("ef" * 32, "text")
+            cache._entry_path("ef" * 32).write_text("{broken")
+
+            assert cache.get("ef" * 32) is None
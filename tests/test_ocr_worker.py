@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+ocr_workerモジュールのテスト
+"""
+
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from screen_times.metrics import TickMetrics, activate
+from screen_times.ocr import Region, TextObservation
+from screen_times.ocr_backend import FakeOcrBackend
+from screen_times.ocr_worker import OcrTimeoutError, OcrWorkerError, SupervisedOcrBackend
+
+
+class SlowBackend:
+    """ファイル名が slow で始まる画像だけ時間がかかるバックエンド"""
+
+    settings = "slow"
+
+    def recognize(
+        self, image_path: Path, timeout_seconds: int, region: Optional[Region] = None
+    ) -> List[TextObservation]:
+        if image_path.name.startswith("slow"):
+            time.sleep(30)
+        if image_path.name.startswith("fail"):
+            raise RuntimeError("broken image")
+        if image_path.name.startswith("alarm"):
+            # recognize_text のSIGALRMによるタイムアウトと同じ例外
+            raise OcrTimeoutError(f"OCR timed out after {timeout_seconds}s")
+        return [TextObservation(text=f"pid {os.getpid()}", confidence=1.0, bbox=(0, 0, 1, 1))]
+
+
+def worker_pid(backend: SupervisedOcrBackend, name: str = "a.png") -> str:
+    """ワーカーのプロセスIDを含む認識結果を取得"""
+    return backend.recognize(Path(name), 5)[0].text
+
+
+class TestSupervisedOcrBackend:
+    """SupervisedOcrBackendのテスト"""
+
+    def test_recognize_in_worker(self):
+        """ワーカープロセスで認識し、同じワーカーを使い回す"""
+        backend = SupervisedOcrBackend(FakeOcrBackend(texts={"a.png": "hello"}))
+        try:
+            assert backend.recognize(Path("a.png"), 5)[0].text == "hello"
+            assert backend.recognize(Path("a.png"), 5)[0].text == "hello"
+            stats = backend.stats()
+            assert stats["jobs"] == 2
+            assert stats["starts"] == 1
+            assert stats["restarts"] == 0
+        finally:
+            backend.close()
+
+    def test_fast_pass_in_same_worker(self):
+        """recognize_fast は同じワーカーで高速パスのバックエンドを使う"""
+        backend = SupervisedOcrBackend(
+            FakeOcrBackend(texts={"a.png": "accurate"}),
+            fast_backend=FakeOcrBackend(texts={"a.png": "fast"}),
+        )
+        try:
+            assert backend.recognize_fast(Path("a.png"), 5)[0].text == "fast"
+            assert backend.recognize(Path("a.png"), 5)[0].text == "accurate"
+            stats = backend.stats()
+            assert (stats["jobs"], stats["starts"]) == (2, 1)
+        finally:
+            backend.close()
+
+        with pytest.raises(ValueError):
+            SupervisedOcrBackend(FakeOcrBackend()).recognize_fast(Path("a.png"), 5)
+
+    def test_timeout_kills_and_respawns_worker(self):
+        """期限を過ぎたらワーカーを強制終了し、次のジョブで再起動する"""
+        backend = SupervisedOcrBackend(SlowBackend())
+        try:
+            first_pid = worker_pid(backend)
+            started = time.monotonic()
+            with pytest.raises(OcrTimeoutError):
+                backend.recognize(Path("slow.png"), 0)
+            assert time.monotonic() - started < 10
+
+            metrics = TickMetrics(datetime.now())
+            with activate(metrics):
+                assert worker_pid(backend) != first_pid
+            stats = backend.stats()
+            assert stats["timeouts"] == 1
+            assert stats["restarts"] == 1
+            # タイムアウトはtickの外、再起動は有効なtickのメトリクスに記録される
+            assert metrics.events == {"ocr_restarts": 1}
+        finally:
+            backend.close()
+
+    def test_timeout_inside_worker_is_reported_as_timeout(self):
+        """ワーカー内で起きたタイムアウトもエラーではなく OcrTimeoutError として伝える"""
+        backend = SupervisedOcrBackend(SlowBackend())
+        try:
+            metrics = TickMetrics(datetime.now())
+            with activate(metrics), pytest.raises(OcrTimeoutError):
+                backend.recognize(Path("alarm.png"), 5)
+            stats = backend.stats()
+            assert (stats["timeouts"], stats["errors"]) == (1, 0)
+            assert metrics.events == {"ocr_timeouts": 1}
+            # ワーカーは応答しているので引き続き使える
+            worker_pid(backend)
+            assert backend.stats()["restarts"] == 0
+        finally:
+            backend.close()
+
+    def test_recycle_after_max_jobs(self):
+        """指定した件数を処理したらワーカーを入れ替える"""
+        backend = SupervisedOcrBackend(SlowBackend(), max_jobs=2)
+        try:
+            pids = [worker_pid(backend) for _ in range(3)]
+            assert pids[0] == pids[1]
+            assert pids[2] != pids[1]
+            assert backend.stats()["recycled_jobs"] == 1
+        finally:
+            backend.close()
+
+    def test_recycle_when_rss_exceeds_limit(self):
+        """RSSが上限を超えたらワーカーを入れ替える"""
+        backend = SupervisedOcrBackend(SlowBackend(), max_rss_bytes=1)
+        try:
+            assert worker_pid(backend) != worker_pid(backend)
+            assert backend.stats()["recycled_rss"] == 2
+        finally:
+            backend.close()
+
+    def test_error_in_worker_is_reported(self):
+        """認識中のエラーは空文字列ではなく例外として伝える"""
+        backend = SupervisedOcrBackend(SlowBackend())
+        try:
+            with pytest.raises(OcrWorkerError):
+                backend.recognize(Path("fail.png"), 5)
+            assert backend.stats()["errors"] == 1
+            # ワーカーは引き続き使える
+            worker_pid(backend)
+            assert backend.stats()["restarts"] == 0
+        finally:
+            backend.close()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+PipelineRunner（パイプラインモード）のユニットテスト
+"""
+
+import json
+import tempfile
+import types
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from screen_times.jsonl_manager import JsonlManager
+from screen_times.pipeline import (
+    OVERFLOW_BLOCK,
+    OVERFLOW_COALESCE,
+    OVERFLOW_DROP_NEWEST,
+    OVERFLOW_DROP_OLDEST,
+    FrameJob,
+    PipelineRunner,
+    StageQueue,
+    coalesce_same_window,
+)
+from screen_times.screen_ocr_logger import ScreenOCRConfig, ScreenOCRLogger
+
+
+def make_job(window: str, index: int) -> FrameJob:
+    """テスト用のジョブを生成"""
+    return FrameJob(
+        timestamp=datetime(2025, 12, 28, 10, index, 0),
+        window_name=window,
+        screenshot_path=Path(f"/tmp/screenshot_{index}.png"),
+    )
+
+
+class TestStageQueue:
+    """StageQueueのテスト"""
+
+    def test_fifo_order(self):
+        """先入れ先出しで取り出される"""
+        queue: StageQueue[int] = StageQueue("test", 3)
+        for i in range(3):
+            queue.put(i)
+        assert [queue.get(), queue.get(), queue.get()] == [0, 1, 2]
+        assert queue.stats()["max_depth"] == 3
+
+    def test_drop_newest(self):
+        """drop_newest: 満杯時は新しいアイテムを破棄"""
+        queue: StageQueue[int] = StageQueue("test", 2, OVERFLOW_DROP_NEWEST)
+        assert queue.put(1) and queue.put(2)
+        assert queue.put(3) is False
+        assert queue.dropped == 1
+        assert [queue.get(), queue.get()] == [1, 2]
+
+    def test_drop_oldest(self):
+        """drop_oldest: 満杯時は最も古いアイテムを破棄"""
+        queue: StageQueue[int] = StageQueue("test", 2, OVERFLOW_DROP_OLDEST)
+        for i in range(3):
+            queue.put(i)
+        assert queue.dropped == 1
+        assert [queue.get(), queue.get()] == [1, 2]
+
+    def test_coalesce_same_window(self):
+        """coalesce: 同じウィンドウの待ちフレームは新しいフレームで置き換える"""
+        queue: StageQueue[FrameJob] = StageQueue(
+            "ocr", 1, OVERFLOW_COALESCE, coalesce=coalesce_same_window
+        )
+        queue.put(make_job("Editor", 0))
+        queue.put(make_job("Editor", 1))
+        queue.put(make_job("Editor", 2))
+
+        assert queue.coalesced == 2
+        assert queue.dropped == 0
+        job = queue.get()
+        assert job is not None
+        assert job.screenshot_path == Path("/tmp/screenshot_2.png")
+        assert job.coalesced == 2
+
+    def test_coalesce_different_window_drops_oldest(self):
+        """coalesce: ウィンドウが異なる場合は最も古いフレームを破棄"""
+        queue: StageQueue[FrameJob] = StageQueue(
+            "ocr", 1, OVERFLOW_COALESCE, coalesce=coalesce_same_window
+        )
+        queue.put(make_job("Editor", 0))
+        queue.put(make_job("Browser", 1))
+
+        assert queue.dropped == 1
+        job = queue.get()
+        assert job is not None
+        assert job.window_name == "Browser"
+
+    def test_block_waits_for_consumer(self):
+        """block: 空きが出るまで待機する"""
+        queue: StageQueue[int] = StageQueue("test", 1, OVERFLOW_BLOCK)
+        queue.put(1)
+
+        def consume():
+            time.sleep(0.05)
+            queue.get()
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        queue.put(2)
+        consumer.join()
+
+        assert queue.dropped == 0
+        assert queue.get() == 2
+
+    def test_close_drains_then_returns_none(self):
+        """クローズ後も残りのアイテムは取り出せる"""
+        queue: StageQueue[int] = StageQueue("test", 2)
+        queue.put(1)
+        queue.close()
+        assert queue.get() == 1
+        assert queue.get() is None
+        with pytest.raises(RuntimeError):
+            queue.put(2)
+
+    def test_invalid_policy(self):
+        """未知のポリシーはエラー"""
+        with pytest.raises(ValueError):
+            StageQueue("test", 1, "unknown")
+
+
+class TestPipelineRunner:
+    """PipelineRunnerのテスト"""
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_all_frames_written(self, mock_get_window, mock_take_screenshot, mock_perform_ocr):
+        """OCRが間に合う場合はすべてのフレームが書き込まれる"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_path = Path(tmpdir) / "screenshot.png"
+            screenshot_path.write_text("dummy")
+            mock_get_window.return_value = ("TestApp", None)
+            mock_take_screenshot.return_value = screenshot_path
+            mock_perform_ocr.return_value = "Hello"
+
+            logger = ScreenOCRLogger(ScreenOCRConfig(screenshot_dir=Path(tmpdir)))
+            logger.jsonl_manager = JsonlManager(base_dir=Path(tmpdir))
+            runner = PipelineRunner(
+                logger, interval_seconds=0.001, max_ticks=3, queue_size=8, overflow=OVERFLOW_BLOCK
+            )
+
+            runner.run()
+
+            stats = runner.stats()
+            assert stats["capture"]["processed"] == 3
+            assert stats["ocr"]["processed"] == 3
+            assert stats["write"]["processed"] == 3
+            jsonl_files = list((Path(tmpdir) / "screenocr_logs").glob("*.jsonl"))
+            lines = jsonl_files[0].read_text(encoding="utf-8").splitlines()
+            assert len(lines) == 3
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_capture_not_delayed_by_slow_ocr(
+        self, mock_get_window, mock_take_screenshot, mock_perform_ocr
+    ):
+        """OCRが遅くてもキャプチャはスケジュール通りに進み、溢れたフレームは統合される"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_path = Path(tmpdir) / "screenshot.png"
+            screenshot_path.write_text("dummy")
+            mock_get_window.return_value = ("TestApp", None)
+            mock_take_screenshot.return_value = screenshot_path
+
+            def slow_ocr(path, timeout, raise_errors=False):
+                time.sleep(0.1)
+                return "Hello"
+
+            mock_perform_ocr.side_effect = slow_ocr
+
+            logger = ScreenOCRLogger(ScreenOCRConfig(screenshot_dir=Path(tmpdir), dry_run=True))
+            runner = PipelineRunner(
+                logger,
+                interval_seconds=0.01,
+                max_ticks=10,
+                queue_size=1,
+                overflow=OVERFLOW_COALESCE,
+            )
+
+            start = time.monotonic()
+            runner.run()
+            elapsed = time.monotonic() - start
+
+            stats = runner.stats()
+            assert stats["capture"]["processed"] == 10
+            # OCRは10回分（1秒）かからず、待ちフレームは統合される
+            assert stats["ocr"]["processed"] < 10
+            assert stats["ocr"]["coalesced"] > 0
+            assert stats["ocr"]["max_depth"] == 1
+            assert elapsed < 1.0
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_idle_detection(self, mock_get_window, mock_take_screenshot, mock_perform_ocr):
+        """ロック中はキャプチャもOCRもせず、アイドル期間を1件のレコードとして書き込む"""
+        from PIL import Image
+
+        from screen_times.idle import FakeIdleSignalProvider, IdleSignal
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_path = Path(tmpdir) / "screenshot.png"
+            Image.new("RGB", (64, 48), color="black").save(screenshot_path)
+            mock_get_window.return_value = ("loginwindow", None)
+            mock_take_screenshot.return_value = screenshot_path
+            mock_perform_ocr.return_value = "text"
+            locked = IdleSignal(locked=True, idle_seconds=600)
+            signals = FakeIdleSignalProvider([IdleSignal(idle_seconds=1)] + [locked] * 5)
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir), idle_detection=True, idle_signal_provider=signals
+            )
+            logger = ScreenOCRLogger(config)
+            logger.jsonl_manager = JsonlManager(base_dir=Path(tmpdir))
+            # OCRステージがアイドルを確定してから次のキャプチャを行う間隔
+            runner = PipelineRunner(logger, interval_seconds=0.1, max_ticks=5, queue_size=4)
+
+            runner.run()
+
+            stats = runner.stats()
+            assert mock_take_screenshot.call_count == 2
+            assert mock_perform_ocr.call_count == 1
+            assert stats["capture"]["idle_skipped"] == 3
+            assert stats["ocr"]["idle_skipped"] == 1
+            jsonl_files = list((Path(tmpdir) / "screenocr_logs").glob("*.jsonl"))
+            records = [json.loads(line) for line in jsonl_files[0].read_text().splitlines()]
+            assert [r["status"] for r in records] == ["normal", "sleep"]
+            assert records[1]["idle_reason"] == "locked"
+            assert records[1]["idle_ticks"] == 4
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_idle_interval_ends_while_running(
+        self, mock_get_window, mock_take_screenshot, mock_perform_ocr
+    ):
+        """ロックが解除されたら、アイドル期間のレコードを書き込んでからOCRを再開する"""
+        from PIL import Image
+
+        from screen_times.idle import FakeIdleSignalProvider, IdleSignal
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_path = Path(tmpdir) / "screenshot.png"
+            Image.new("RGB", (64, 48), color="black").save(screenshot_path)
+            mock_get_window.return_value = ("Editor", None)
+            mock_take_screenshot.return_value = screenshot_path
+            mock_perform_ocr.return_value = "text"
+            active = IdleSignal(idle_seconds=1)
+            locked = IdleSignal(locked=True, idle_seconds=600)
+            signals = FakeIdleSignalProvider([active, locked, locked, active])
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir), idle_detection=True, idle_signal_provider=signals
+            )
+            logger = ScreenOCRLogger(config)
+            logger.jsonl_manager = JsonlManager(base_dir=Path(tmpdir))
+            runner = PipelineRunner(logger, interval_seconds=0.1, max_ticks=5, queue_size=4)
+
+            runner.run()
+
+            assert mock_take_screenshot.call_count == 4
+            assert mock_perform_ocr.call_count == 3
+            jsonl_files = list((Path(tmpdir) / "screenocr_logs").glob("*.jsonl"))
+            records = [json.loads(line) for line in jsonl_files[0].read_text().splitlines()]
+            assert [r["status"] for r in records] == ["normal", "sleep", "normal", "normal"]
+            assert records[1]["idle_ticks"] == 2
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr", side_effect=Exception("OCR failed"))
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_ocr_failure_is_counted(self, mock_get_window, mock_take_screenshot, mock_perform_ocr):
+        """OCRに失敗したフレームは書き込まれず、失敗数が記録される"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mock_get_window.return_value = ("TestApp", None)
+            mock_take_screenshot.return_value = Path(tmpdir) / "screenshot.png"
+
+            logger = ScreenOCRLogger(ScreenOCRConfig(screenshot_dir=Path(tmpdir), dry_run=True))
+            runner = PipelineRunner(logger, interval_seconds=0.001, max_ticks=2, queue_size=4)
+
+            runner.run()
+
+            stats = runner.stats()
+            assert stats["ocr"]["failures"] == 2
+            assert stats["write"]["processed"] == 0
+
+
+def test_cli_pipeline_enables_ocr_worker(monkeypatch):
+    """パイプラインモードではOCRを監視付きワーカープロセスで実行する"""
+    from screen_times import cli
+
+    configs = []
+
+    def fake_logger(config):
+        configs.append(config)
+        return types.SimpleNamespace(config=config)
+
+    class FakeRunner:
+        def __init__(self, logger, **kwargs):
+            pass
+
+        def install_signal_handlers(self):
+            pass
+
+        def run(self):
+            pass
+
+    monkeypatch.setattr("screen_times.screen_ocr_logger.ScreenOCRLogger", fake_logger)
+    monkeypatch.setattr("screen_times.pipeline.PipelineRunner", FakeRunner)
+
+    cli.run_resident(interval=1, pipeline=True)
+
+    assert configs[0].ocr_worker is True
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+preprocessモジュールのテスト
+"""
+
+import tempfile
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from screen_times.preprocess import (
+    PreprocessConfig,
+    benchmark_preprocess,
+    content_box,
+    preprocess_image,
+)
+
+SAMPLE_SCREENSHOT = Path(__file__).parent.parent / "sample_screenshot.png"
+
+
+def framed_document(path: Path, dpi: int = 144) -> Path:
+    """灰色の枠と白い余白の中央にテキスト（黒い帯）がある画像を保存"""
+    img = Image.new("RGB", (800, 600), color=(200, 200, 200))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([100, 100, 699, 499], fill="white")
+    draw.rectangle([200, 250, 600, 270], fill="black")
+    img.save(path, dpi=(dpi, dpi))
+    return path
+
+
+class TestContentBox:
+    """content_boxのテスト"""
+
+    def test_finds_content(self):
+        """背景色と異なる画素を囲む範囲を返す"""
+        width, height = 10, 6
+        pixels = bytearray([255] * width * height)
+        pixels[2 * width + 3] = 0
+        pixels[4 * width + 7] = 0
+
+        assert content_box(bytes(pixels), width, height, tolerance=10) == (3, 2, 8, 5)
+
+    def test_blank_image(self):
+        """すべて背景色ならNone"""
+        assert content_box(bytes([250, 255] * 8), 4, 4, tolerance=10) is None
+
+
+class TestPreprocessImage:
+    """preprocess_imageのテスト"""
+
+    def test_downscale_grayscale_and_trim(self):
+        """目標DPIまで縮小し、グレースケール化して余白を切り落とす"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = framed_document(Path(tmpdir) / "frame.png", dpi=144)
+            output = Path(tmpdir) / "frame.ocr.png"
+
+            result = preprocess_image(
+                source, output, PreprocessConfig(target_dpi=72, trim_padding=0)
+            )
+
+            assert result.path == output
+            with Image.open(output) as img:
+                assert img.mode == "L"
+                # 灰色の枠を落とした白い領域（400x300 の半分）まで縮む
+                assert abs(img.size[0] - 300) <= 2
+                assert abs(img.size[1] - 200) <= 2
+            assert result.pixel_ratio < 0.15
+
+    def test_blank_frame_needs_no_ocr(self):
+        """画面全体が単色の場合は画像を出力しない"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = Path(tmpdir) / "blank.png"
+            Image.new("RGB", (400, 300), color="black").save(source)
+
+            result = preprocess_image(source, Path(tmpdir) / "out.png")
+
+            assert result.blank is True
+            assert not (Path(tmpdir) / "out.png").exists()
+
+    def test_in_memory_without_output_path(self):
+        """保存先を指定しない場合はファイルに書き出さずメモリ上の画像を返す"""
+        from screen_times.image_utils import ImageBuffer
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = framed_document(Path(tmpdir) / "frame.png")
+            with Image.open(source) as img:
+                buffer = ImageBuffer(pil_image=img.copy())
+
+            result = preprocess_image(buffer, None, PreprocessConfig(target_dpi=72))
+
+            assert result.path is None
+            assert isinstance(result.image, ImageBuffer)
+            assert result.image.pil_image().mode == "L"
+            assert sorted(p.name for p in Path(tmpdir).iterdir()) == ["frame.png"]
+
+    def test_sample_screenshot(self):
+        """サンプルのスクリーンショットを前処理できる"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = preprocess_image(
+                SAMPLE_SCREENSHOT, Path(tmpdir) / "out.png", PreprocessConfig(target_dpi=96)
+            )
+
+            assert result.path is not None
+            assert result.pixel_ratio < 0.5
+
+
+class TestBenchmarkPreprocess:
+    """benchmark_preprocessのテスト"""
+
+    def test_compares_settings_against_baseline(self):
+        """前処理なしを基準に設定ごとの画素数とOCR結果の類似度を測定する"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = framed_document(Path(tmpdir) / "frame.png")
+
+            def fake_ocr(path: Path) -> str:
+                with Image.open(path) as img:
+                    return "large text" if img.size[0] >= 300 else "small txt"
+
+            results = benchmark_preprocess(
+                [source],
+                [PreprocessConfig(target_dpi=None), PreprocessConfig(target_dpi=36)],
+                fake_ocr,
+                Path(tmpdir),
+            )
+
+            assert [r.settings for r in results][0] == "none"
+            assert results[1].similarity == 100.0
+            assert results[2].similarity < 100.0
+            assert results[2].pixel_ratio < results[1].pixel_ratio
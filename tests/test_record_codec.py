@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+レコードのコンパクトな表現のユニットテスト
+"""
+
+import json
+
+from screen_times.record_codec import (
+    DELTA_KEY,
+    KEYFRAME_INTERVAL,
+    CompactDecoder,
+    CompactEncoder,
+    apply_diff,
+    diff_lines,
+    is_compact,
+)
+
+RECORDS = [
+    {
+        "timestamp": "2025-12-28T10:00:00",
+        "window": "Editor",
+        "text": "def main():",
+        "text_length": 11,
+        "status": "normal",
+        "frame_hash": "abcd",
+    },
+    {
+        "timestamp": "2025-12-28T10:01:00",
+        "window": "Browser",
+        "text": "検索結果",
+        "text_length": 4,
+        "status": "normal",
+        "timestamp_end": "2025-12-28T10:03:00",
+        "merged_count": 3,
+    },
+    {
+        "timestamp": "2025-12-28T10:04:00",
+        "window": "Editor",
+        "text": "",
+        "text_length": 0,
+        "status": "sleep",
+        "timestamp_end": "2025-12-28T10:30:00",
+        "idle_reason": "locked",
+        "idle_ticks": 26,
+    },
+    {
+        "timestamp": "2025-12-28T10:31:00",
+        "window": "Editor",
+        "text": "text_length が一致しない古いレコード",
+        "text_length": 3,
+        "status": "unknown",
+    },
+]
+
+
+def round_trip(records):
+    """エンコードしてJSONの行にし、読み戻してデコードする"""
+    encoder = CompactEncoder()
+    lines = [json.dumps(obj, ensure_ascii=False) for r in records for obj in encoder.encode(r)]
+    decoder = CompactDecoder()
+    decoded = [decoder.decode(json.loads(line)) for line in lines]
+    return lines, [record for record in decoded if record is not None]
+
+
+class TestCompactCodec:
+    """CompactEncoder / CompactDecoder のテスト"""
+
+    def test_round_trip_preserves_records_and_key_order(self):
+        """デコードすると元のレコードとキーの順序まで同じになる"""
+        _, decoded = round_trip(RECORDS)
+
+        assert decoded == RECORDS
+        assert [list(r) for r in decoded] == [list(r) for r in RECORDS]
+
+    def test_encoding(self):
+        """ウィンドウは初出時に辞書の行を書き、text_length と normal は省略する"""
+        lines, _ = round_trip(RECORDS[:3])
+
+        assert [json.loads(line) for line in lines] == [
+            {"type": "window", "id": 0, "name": "Editor"},
+            {"t": "2025-12-28T10:00:00", "w": 0, "x": "def main():", "frame_hash": "abcd"},
+            {"type": "window", "id": 1, "name": "Browser"},
+            {
+                "t": "2025-12-28T10:01:00",
+                "w": 1,
+                "x": "検索結果",
+                "e": "2025-12-28T10:03:00",
+                "m": 3,
+            },
+            {
+                "t": "2025-12-28T10:04:00",
+                "w": 0,
+                "x": "",
+                "s": 1,
+                "e": "2025-12-28T10:30:00",
+                "idle_reason": "locked",
+                "idle_ticks": 26,
+            },
+        ]
+
+    def test_uncompactable_records_are_kept(self):
+        """短いキーと同じ名前のフィールドを持つレコードやメタデータはそのまま書く"""
+        encoder = CompactEncoder()
+        clashing = {**RECORDS[0], "t": 1}
+        metadata = {"type": "task_metadata", "timestamp": "x", "description": "d"}
+
+        assert encoder.encode(clashing) == [clashing]
+        assert not is_compact(clashing)
+        assert CompactDecoder().decode(clashing) == clashing
+        assert encoder.encode({"description": "d"}) == [{"description": "d"}]
+        assert CompactDecoder().decode(metadata) == metadata
+
+    def test_load_continues_existing_dictionary(self):
+        """既存のセグメントの辞書を読み込むと、続きの番号で新しいウィンドウを追加する"""
+        lines, _ = round_trip(RECORDS[:2])
+        encoder = CompactEncoder()
+        encoder.load(lines + ["broken {"])
+
+        assert encoder.encode(RECORDS[0])[0]["w"] == 0
+        assert encoder.encode({**RECORDS[0], "window": "Terminal"})[0] == {
+            "type": "window",
+            "id": 2,
+            "name": "Terminal",
+        }
+
+
+def window_texts(count):
+    """同じウィンドウで1行ずつ変わっていくテキスト（行の追加・削除・置換を含む）"""
+    lines = [f"line {row} " + "lorem ipsum " * 3 for row in range(12)]
+    texts = []
+    for index in range(count):
+        if index % 4 == 1:
+            lines.insert(index % len(lines), f"inserted {index}")
+        elif index % 4 == 2:
+            del lines[index % len(lines)]
+        else:
+            lines[index % len(lines)] = f"changed {index}"
+        texts.append("\n".join(lines))
+    return texts
+
+
+class TestDeltaCodec:
+    """テキストの差分（delta）のテスト"""
+
+    def records(self, count):
+        texts = window_texts(count)
+        return [
+            {
+                "timestamp": f"2025-12-28T10:{index:02d}:00",
+                "window": "Editor" if index % 3 else "Browser",
+                "text": "" if index % 9 == 8 else text,
+                "text_length": 0 if index % 9 == 8 else len(text),
+                "status": "sleep" if index % 9 == 8 else "normal",
+            }
+            for index, text in enumerate(texts)
+        ]
+
+    def test_diff_round_trip(self):
+        """差分を適用すると新しいテキストに戻る"""
+        texts = [""] + window_texts(20) + ["", "single line"]
+        for base, text in zip(texts, texts[1:]):
+            base_lines, lines = base.split("\n"), text.split("\n")
+            assert apply_diff(base_lines, diff_lines(base_lines, lines)) == lines
+
+    def test_round_trip(self):
+        """差分で書いたレコードも元のレコードに戻り、全文より小さくなる"""
+        records = self.records(40)
+        encoder = CompactEncoder(delta=True)
+        lines = [json.dumps(obj, ensure_ascii=False) for r in records for obj in encoder.encode(r)]
+        decoder = CompactDecoder()
+        decoded = [decoder.decode(json.loads(line)) for line in lines]
+
+        assert [r for r in decoded if r is not None] == records
+        assert sum(map(len, lines)) * 3 < sum(len(json.dumps(r)) for r in records)
+
+    def test_keyframes(self):
+        """同じウィンドウで差分が KEYFRAME_INTERVAL 回続いたら全文を書く"""
+        encoder = CompactEncoder(delta=True)
+        texts = window_texts(KEYFRAME_INTERVAL * 2 + 2)
+        encoded = [
+            encoder.encode({"timestamp": "t", "window": "Editor", "text": text})[-1]
+            for text in texts
+        ]
+
+        keyframes = [index for index, obj in enumerate(encoded) if DELTA_KEY not in obj]
+        assert keyframes == [0, KEYFRAME_INTERVAL + 1]
+
+    def test_load_and_reset_start_with_keyframe(self):
+        """既存のセグメントに追記する場合と辞書を空にした場合は全文から始める"""
+        record = {"timestamp": "t", "window": "Editor", "text": window_texts(1)[0]}
+        encoder = CompactEncoder(delta=True)
+        encoder.encode(record)
+        assert DELTA_KEY in encoder.encode(record)[-1]
+
+        reloaded = CompactEncoder(delta=True)
+        reloaded.load([json.dumps({"type": "window", "id": 0, "name": "Editor"})])
+        assert reloaded.encode(record)[-1]["x"] == record["text"]
+        encoder.reset()
+        assert encoder.encode(record)[-1]["x"] == record["text"]
+
+    def test_unrelated_text_is_written_in_full(self):
+        """差分が全文より大きくなる場合は全文で書く"""
+        encoder = CompactEncoder(delta=True)
+        encoder.encode({"timestamp": "t", "window": "Editor", "text": "a\nb\nc"})
+
+        assert encoder.encode({"timestamp": "t", "window": "Editor", "text": "x\ny"})[-1] == {
+            "t": "t",
+            "w": 0,
+            "x": "x\ny",
+        }
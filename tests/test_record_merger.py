@@ -156,6 +156,20 @@ class TestMergeRecords:
         assert merged["timestamp_end"] == "2025-12-29T10:02:00"
         assert merged["merged_count"] == 3
 
+    def test_merge_interval_record_keeps_its_end(self):
+        """期間を持つレコード（アイドル期間など）をマージした場合はその終了時刻を引き継ぐ"""
+        prev = {"timestamp": "2025-12-29T10:00:00", "window": "loginwindow", "text": ""}
+        curr = {
+            "timestamp": "2025-12-29T10:01:00",
+            "timestamp_end": "2025-12-29T10:30:00",
+            "window": "loginwindow",
+            "text": "",
+        }
+
+        merged = merge_records(prev, curr)
+
+        assert merged["timestamp_end"] == "2025-12-29T10:30:00"
+
 
 class TestRecordMerger:
     """RecordMergerクラスのテスト"""
@@ -280,8 +294,56 @@ class TestRecordMerger:
         assert final["window"] == "Firefox"
         assert "merged_count" not in final  # マージされていない
 
+    def test_add_records_matches_add_record(self):
+        """add_recordsはadd_recordを順に呼んだ場合と同じ結果になる"""
+        records = [
+            {"timestamp": f"2025-12-29T10:0{i}:00", "window": window, "text": text}
+            for i, (window, text) in enumerate(
+                [
+                    ("Chrome", "Same text"),
+                    ("Chrome", "Same text"),
+                    ("Firefox", "Other"),
+                    ("Chrome", "Same text"),
+                    ("Chrome", "Same text!"),
+                    ("Chrome", "Completely different"),
+                ]
+            )
+        ]
+        one_by_one = RecordMerger(threshold=0.90)
+        expected = [out for out in map(one_by_one.add_record, records) if out is not None]
+
+        batch = RecordMerger(threshold=0.90)
+        first = batch.add_records(records[:2])
+        rest = batch.add_records(records[2:])
+
+        assert first == []
+        assert first + rest == expected
+        assert batch.flush() == one_by_one.flush()
+
     def test_flush_empty_buffer(self):
         """空のバッファをフラッシュ"""
         merger = RecordMerger(threshold=0.90)
         output = merger.flush()
         assert output is None
+
+
+class TestShouldMergeWithFrameHash:
+    """frame_hashを使ったマージ判定のテスト"""
+
+    def test_identical_frame_hash_merges_without_similarity(self):
+        """同じwindowでframe_hashが一致すれば、テキストが異なってもマージ"""
+        prev = {"window": "Editor", "text": "abc", "frame_hash": "00ff00ff00ff00ff"}
+        curr = {"window": "Editor", "text": "xyz", "frame_hash": "00ff00ff00ff00ff"}
+        assert should_merge(prev, curr, threshold=0.90) is True
+
+    def test_frame_hash_ignored_for_different_window(self):
+        """windowが異なればframe_hashが一致してもマージしない"""
+        prev = {"window": "Editor", "text": "abc", "frame_hash": "00ff00ff00ff00ff"}
+        curr = {"window": "Browser", "text": "abc", "frame_hash": "00ff00ff00ff00ff"}
+        assert should_merge(prev, curr, threshold=0.90) is False
+
+    def test_different_frame_hash_falls_back_to_similarity(self):
+        """frame_hashが異なる場合はテキスト類似度で判定"""
+        prev = {"window": "Editor", "text": "Hello World", "frame_hash": "00ff00ff00ff00ff"}
+        curr = {"window": "Editor", "text": "Hello World", "frame_hash": "ff00ff00ff00ff00"}
+        assert should_merge(prev, curr, threshold=0.90) is True
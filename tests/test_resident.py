@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+ResidentRunner（常駐モード）のユニットテスト
+"""
+
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from screen_times.adaptive_schedule import AdaptiveScheduler
+from screen_times.resident import ResidentReport, ResidentRunner, TickStats, next_tick_time
+from screen_times.screen_ocr_logger import ScreenOCRConfig, ScreenOCRResult
+
+
+def make_result(success: bool = True) -> ScreenOCRResult:
+    """テスト用の実行結果を生成"""
+    return ScreenOCRResult(
+        success=success,
+        timestamp=datetime(2025, 12, 28, 10, 0, 0),
+        window_name="TestApp",
+        screenshot_path=None,
+        text="text",
+        text_length=4,
+        jsonl_path=None,
+        error=None if success else "boom",
+        timings={"window": 0.01},
+    )
+
+
+def make_logger(success: bool = True) -> MagicMock:
+    """テスト用のScreenOCRLoggerモックを生成"""
+    logger = MagicMock()
+    logger.config = ScreenOCRConfig(verbose=False)
+    logger.run.return_value = make_result(success)
+    logger.schedule_cleanup.return_value = False
+    return logger
+
+
+class TestNextTickTime:
+    """next_tick_time関数のテスト"""
+
+    def test_next_tick_on_grid(self):
+        """実行時刻は基準時刻からの格子点に揃う"""
+        assert next_tick_time(100.0, 60.0, 100.5) == 160.0
+        assert next_tick_time(100.0, 60.0, 159.9) == 160.0
+
+    def test_no_drift_after_slow_tick(self):
+        """処理が遅れても次の格子点に戻る（ドリフトしない）"""
+        assert next_tick_time(100.0, 60.0, 163.0) == 220.0
+
+    def test_missed_ticks_are_skipped(self):
+        """複数周期遅れた場合は取りこぼした時刻を読み飛ばす"""
+        assert next_tick_time(0.0, 10.0, 35.0) == 40.0
+
+    def test_before_start(self):
+        """基準時刻より前の場合は基準時刻を返す"""
+        assert next_tick_time(100.0, 60.0, 50.0) == 100.0
+
+    def test_invalid_interval(self):
+        """不正な間隔はエラー"""
+        with pytest.raises(ValueError):
+            next_tick_time(0.0, 0.0, 1.0)
+
+
+class TestResidentReport:
+    """ResidentReportのテスト"""
+
+    def test_summary_without_ticks(self):
+        """tickがない場合"""
+        report = ResidentReport(startup_cpu_seconds=0.5)
+        assert report.summary() == "No ticks executed"
+
+    def test_summary_compares_cold_and_warm(self):
+        """コールドスタートと常駐tickの差分が表示される"""
+        report = ResidentReport(startup_cpu_seconds=0.5)
+        report.ticks = [
+            TickStats(wall_seconds=3.0, cpu_seconds=1.0, success=True),
+            TickStats(wall_seconds=1.0, cpu_seconds=0.2, success=True),
+            TickStats(wall_seconds=2.0, cpu_seconds=0.4, success=True),
+        ]
+
+        warm = report.warm_median()
+        assert warm is not None
+        assert warm.wall_seconds == pytest.approx(1.5)
+        assert warm.cpu_seconds == pytest.approx(0.3)
+
+        summary = report.summary()
+        assert "Cold start: 3.000s wall / 1.500s CPU" in summary
+        assert "Warm tick (median of 2)" in summary
+        assert "Saved per tick: 1.500s wall / 1.200s CPU" in summary
+
+    def test_warm_median_per_stage(self):
+        """処理段階ごとの経過時間も常駐tickの中央値で表示される"""
+        report = ResidentReport(startup_cpu_seconds=0.0)
+        report.ticks = [
+            TickStats(1.0, 0.1, True, stages={"window": 0.5}),
+            TickStats(1.0, 0.1, True, stages={"window": 0.002, "ocr": 0.3}),
+            TickStats(1.0, 0.1, True, stages={"window": 0.004, "ocr": 0.5}),
+        ]
+
+        warm = report.warm_median()
+        assert warm is not None
+        assert warm.stages == pytest.approx({"window": 0.003, "ocr": 0.4})
+        assert "Warm stages (median): window 3.0ms, ocr 400.0ms" in report.summary()
+
+
+class TestResidentRunner:
+    """ResidentRunnerのテスト"""
+
+    def test_runs_until_max_ticks(self):
+        """max_ticks回実行して終了する"""
+        logger = make_logger()
+        runner = ResidentRunner(logger, interval_seconds=0.001, max_ticks=3)
+
+        report = runner.run()
+
+        assert logger.run.call_count == 3
+        assert logger.schedule_cleanup.call_count == 3
+        assert len(report.ticks) == 3
+        assert report.cold_tick is not None
+        assert len(report.warm_ticks) == 2
+        assert all(t.stages == {"window": 0.01} for t in report.ticks)
+
+    def test_shutdown_called_on_exit(self):
+        """終了時にshutdown（マージャーのフラッシュ）が呼ばれる"""
+        logger = make_logger()
+        runner = ResidentRunner(logger, interval_seconds=0.001, max_ticks=1)
+
+        runner.run()
+
+        logger.shutdown.assert_called_once()
+
+    def test_stop_interrupts_wait(self):
+        """stop()で待機中のループを抜ける"""
+        logger = make_logger()
+        runner = ResidentRunner(logger, interval_seconds=3600)
+        logger.run.side_effect = lambda: (runner.stop(), make_result())[1]
+
+        report = runner.run()
+
+        assert len(report.ticks) == 1
+        logger.shutdown.assert_called_once()
+
+    def test_failed_tick_keeps_running(self, capsys):
+        """失敗したtickがあってもループは継続する"""
+        logger = make_logger(success=False)
+        runner = ResidentRunner(logger, interval_seconds=0.001, max_ticks=2)
+
+        report = runner.run()
+
+        assert len(report.ticks) == 2
+        assert all(not t.success for t in report.ticks)
+        assert "Error: boom" in capsys.readouterr().err
+
+    def test_adaptive_scheduler_sets_interval(self):
+        """スケジューラがある場合は実行結果を観測し、その間隔で次のtickを実行する"""
+        logger = make_logger()
+        scheduler = AdaptiveScheduler(0.001, 0.002)
+        runner = ResidentRunner(logger, interval_seconds=3600, max_ticks=3, scheduler=scheduler)
+
+        report = runner.run()
+
+        assert len(report.ticks) == 3
+        assert len(scheduler.samples) == 2
+        assert all(0.001 <= s.interval_seconds <= 0.002 for s in scheduler.samples)
+        # 次のtickのメトリクスに記録する実行間隔
+        assert logger.tick_interval == scheduler.samples[-1].interval_seconds
+
+    def test_verbose_prints_interval_timeline(self, capsys):
+        """verbose では終了時に時間帯ごとの平均間隔を表示する"""
+        logger = make_logger()
+        logger.config = ScreenOCRConfig(verbose=True)
+        scheduler = AdaptiveScheduler(0.001, 0.002)
+        runner = ResidentRunner(logger, interval_seconds=3600, max_ticks=3, scheduler=scheduler)
+
+        runner.run()
+
+        assert "mean interval" in capsys.readouterr().out
+
+    def test_invalid_interval(self):
+        """不正な間隔はエラー"""
+        with pytest.raises(ValueError):
+            ResidentRunner(make_logger(), interval_seconds=0)
@@ -3,17 +3,37 @@
 ScreenOCRLogger（ファサードクラス）のユニットテスト
 """
 
+import json
 import tempfile
 from datetime import datetime
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
+import pytest
+
+from screen_times.jsonl_manager import FlushPolicy, JsonlManager
 from screen_times.screen_ocr_logger import ScreenOCRLogger, ScreenOCRConfig, ScreenOCRResult
 
 
+class AlarmTimeoutBackend:
+    """ワーカー内の recognize_text と同じく OcrTimeoutError を送出するバックエンド"""
+
+    settings = "alarm"
+
+    def recognize(self, image_path, timeout_seconds, region=None):
+        from screen_times.ocr import OcrTimeoutError
+
+        raise OcrTimeoutError(f"OCR timed out after {timeout_seconds}s")
+
+
 class TestScreenOCRConfig:
     """ScreenOCRConfig設定クラスのテスト"""
 
+    def test_incremental_and_tiered_ocr_are_exclusive(self):
+        """差分OCRと段階的OCRは同時に指定できない"""
+        with pytest.raises(ValueError):
+            ScreenOCRLogger(ScreenOCRConfig(incremental_ocr=True, tiered_ocr=True))
+
     def test_default_config(self):
         """デフォルト設定のテスト"""
         config = ScreenOCRConfig()
@@ -35,6 +55,32 @@ class TestScreenOCRConfig:
         assert config.screenshot_retention_hours == 48
         assert config.verbose is True
 
+    def test_ocr_cache_from_env(self, monkeypatch):
+        """環境変数 SCREENOCR_OCR_CACHE_MB からOCRキャッシュの容量上限を読み込むテスト"""
+        from screen_times.screen_ocr_logger import OCR_CACHE_MB_ENV, ocr_cache_max_bytes_from_env
+
+        monkeypatch.delenv(OCR_CACHE_MB_ENV, raising=False)
+        assert ocr_cache_max_bytes_from_env() is None
+        monkeypatch.setenv(OCR_CACHE_MB_ENV, "50")
+        assert ocr_cache_max_bytes_from_env() == 50 * 1024 * 1024
+        for invalid in ("0", "-1", "50MB"):
+            monkeypatch.setenv(OCR_CACHE_MB_ENV, invalid)
+            with pytest.raises(ValueError):
+                ocr_cache_max_bytes_from_env()
+
+    def test_launchd_entry_points_enable_ocr_cache(self, monkeypatch):
+        """launchdから毎分起動されるエントリーポイントでも環境変数でOCRキャッシュを有効にできるテスト"""
+        from screen_times import screen_ocr_logger, screenshot_ocr
+
+        monkeypatch.setenv(screen_ocr_logger.OCR_CACHE_MB_ENV, "8")
+        for module in (screen_ocr_logger, screenshot_ocr):
+            with patch.object(module, "ScreenOCRLogger") as mock_logger:
+                mock_logger.return_value.run.return_value = MagicMock(success=True)
+                module.main()
+
+            config = mock_logger.call_args[0][0]
+            assert config.ocr_cache_max_bytes == 8 * 1024 * 1024
+
 
 class TestScreenOCRResult:
     """ScreenOCRResult結果クラスのテスト"""
@@ -128,6 +174,66 @@ class TestScreenOCRLogger:
             mock_take_screenshot.assert_called_once()
             mock_perform_ocr.assert_called_once()
 
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_window_provider_from_config(
+        self, mock_get_window, mock_take_screenshot, mock_perform_ocr
+    ):
+        """設定したウィンドウ取得を使い、処理段階ごとの経過時間を記録するテスト"""
+        from screen_times.window_provider import FakeWindowProvider
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_path = Path(tmpdir) / "test_screenshot.png"
+            screenshot_path.touch()
+            mock_take_screenshot.return_value = screenshot_path
+            mock_perform_ocr.return_value = "text"
+            provider = FakeWindowProvider([("Editor", (0, 0, 800, 600))])
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir), dry_run=True, window_provider=provider
+            )
+            result = ScreenOCRLogger(config).run()
+
+            assert result.window_name == "Editor"
+            assert provider.calls == 1
+            mock_get_window.assert_not_called()
+            mock_take_screenshot.assert_called_once()
+            assert mock_take_screenshot.call_args[0][1] == (0, 0, 800, 600)
+            assert list(result.timings) == ["window", "capture", "ocr", "sleep"]
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_records_tick_metrics(self, mock_get_window, mock_take_screenshot, mock_perform_ocr):
+        """tickごとの処理段階の時間と書き込んだバイト数をメトリクスファイルに記録するテスト"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_path = Path(tmpdir) / "test_screenshot.png"
+            screenshot_path.write_bytes(b"x" * 100)
+            mock_get_window.return_value = ("Editor", None)
+            mock_take_screenshot.return_value = screenshot_path
+            mock_perform_ocr.return_value = "text"
+
+            logger = ScreenOCRLogger(
+                ScreenOCRConfig(screenshot_dir=Path(tmpdir), merge_threshold=0.9)
+            )
+            logger.jsonl_manager = JsonlManager(base_dir=Path(tmpdir), merge_threshold=0.9)
+            result = logger.run()
+
+            assert logger.metrics_log is not None
+            (record,) = logger.metrics_log.read()
+            assert set(record["s"]) == {"window", "capture", "ocr", "sleep", "merge", "write"}
+            assert record["s"]["write"][0] == pytest.approx(
+                result.timings["write"] * 1000, abs=0.01
+            )
+            assert record["ib"] == 100
+            # 最初のレコードはマージャーのバッファに残るためJSONLにはまだ書き込まれない
+            assert record["jb"] == 0
+
+            mock_get_window.return_value = ("Browser", None)
+            logger.run()
+            assert logger.metrics_log.read()[-1]["jb"] > 0
+
     @patch("screen_times.screen_ocr_logger.perform_ocr")
     @patch("screen_times.screen_ocr_logger.take_screenshot")
     @patch("screen_times.screen_ocr_logger.get_active_window")
@@ -230,6 +336,58 @@ class TestScreenOCRLogger:
         # 検証
         assert deleted_count == 0
 
+    def test_cleanup_removes_expired_buckets(self):
+        """保持期間を過ぎたバケットディレクトリだけをまとめて削除するテスト"""
+        from datetime import timedelta
+
+        from screen_times.screenshot import screenshot_bucket
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_dir = Path(tmpdir)
+            now = datetime.now()
+            expired = screenshot_bucket(screenshot_dir, now - timedelta(hours=75))
+            current = screenshot_bucket(screenshot_dir, now)
+            for bucket in (expired, current):
+                bucket.mkdir()
+                (bucket / "screenshot_a.png").touch()
+                (bucket / "screenshot_b.png").touch()
+            (screenshot_dir / "ocr_cache").mkdir()
+
+            config = ScreenOCRConfig(screenshot_dir=screenshot_dir, screenshot_retention_hours=72)
+            logger = ScreenOCRLogger(config)
+
+            assert logger.cleanup() == 2
+            assert not expired.exists()
+            assert len(list(current.iterdir())) == 2
+            assert (screenshot_dir / "ocr_cache").exists()
+
+    def test_schedule_cleanup_respects_interval(self):
+        """前回のクリーンアップから間隔が空くまで再実行しないテスト"""
+        import os
+        import time
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config = ScreenOCRConfig(screenshot_dir=Path(tmpdir), cleanup_interval_seconds=600)
+            logger = ScreenOCRLogger(config)
+
+            with patch.object(logger, "cleanup", return_value=0) as mock_cleanup:
+                assert logger.schedule_cleanup(background=False)
+                assert not logger.schedule_cleanup(background=False)
+                assert mock_cleanup.call_count == 1
+
+                # 別プロセス（launchdの次回起動）でも前回の実行時刻が引き継がれる
+                other = ScreenOCRLogger(config)
+                with patch.object(other, "cleanup", return_value=0) as other_cleanup:
+                    assert not other.schedule_cleanup(background=False)
+                    other_cleanup.assert_not_called()
+
+                marker = Path(tmpdir) / ".last_cleanup"
+                old_time = time.time() - 601
+                os.utime(marker, (old_time, old_time))
+                assert logger.schedule_cleanup()
+                logger.shutdown()
+                assert mock_cleanup.call_count == 2
+
     @patch("screen_times.screen_ocr_logger.perform_ocr")
     @patch("screen_times.screen_ocr_logger.take_screenshot")
     @patch("screen_times.screen_ocr_logger.get_active_window")
@@ -375,3 +533,542 @@ class TestScreenOCRLogger:
             assert result.success is False
             assert result.status == "error"
             assert result.error == "Test error"
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_shutdown_flushes_merger(self, mock_get_window, mock_take_screenshot, mock_perform_ocr):
+        """shutdownでマージャーのバッファがJSONLに書き込まれるテスト"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mock_get_window.return_value = ("TestApp", (0, 0, 800, 600))
+            mock_screenshot_path = Path(tmpdir) / "test_screenshot.png"
+            mock_screenshot_path.write_text("dummy content")
+            mock_take_screenshot.return_value = mock_screenshot_path
+            mock_perform_ocr.return_value = "Same text"
+
+            config = ScreenOCRConfig(screenshot_dir=Path(tmpdir), merge_threshold=0.9)
+            logger = ScreenOCRLogger(config)
+            logger.jsonl_manager = JsonlManager(base_dir=Path(tmpdir), merge_threshold=0.9)
+
+            result = logger.run()
+            logger.run()
+            # マージ中のレコードはまだバッファにある
+            assert not result.jsonl_path.exists()
+
+            logger.shutdown()
+
+            lines = result.jsonl_path.read_text(encoding="utf-8").splitlines()
+            assert len(lines) == 1
+            assert json.loads(lines[0])["merged_count"] == 2
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_shutdown_closes_jsonl_writer(
+        self, mock_get_window, mock_take_screenshot, mock_perform_ocr
+    ):
+        """JSONLを開いたまま追記する場合、書き出していないレコードもshutdownで書き込まれるテスト"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mock_get_window.return_value = ("TestApp", (0, 0, 800, 600))
+            mock_screenshot_path = Path(tmpdir) / "test_screenshot.png"
+            mock_screenshot_path.write_text("dummy content")
+            mock_take_screenshot.return_value = mock_screenshot_path
+            mock_perform_ocr.side_effect = ["First text", "Second text"]
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir),
+                jsonl_base_dir=Path(tmpdir),
+                jsonl_flush_policy=FlushPolicy(every_records=10),
+            )
+            logger = ScreenOCRLogger(config)
+
+            result = logger.run()
+            logger.run()
+            assert result.jsonl_path.read_text(encoding="utf-8") == ""
+
+            logger.shutdown()
+
+            lines = result.jsonl_path.read_text(encoding="utf-8").splitlines()
+            assert [json.loads(line)["text"] for line in lines] == ["First text", "Second text"]
+            assert logger.jsonl_manager.writer.path is None
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_frame_hash_skips_ocr_on_unchanged_frame(
+        self, mock_get_window, mock_take_screenshot, mock_perform_ocr
+    ):
+        """同じウィンドウで画面が変わらない場合はOCRを省略してテキストを再利用するテスト"""
+        from PIL import Image, ImageDraw
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_path = Path(tmpdir) / "screenshot.png"
+            img = Image.new("RGB", (400, 300), color="white")
+            ImageDraw.Draw(img).rectangle([20, 20, 300, 40], fill="black")
+            img.save(screenshot_path)
+
+            mock_get_window.return_value = ("Editor", None)
+            mock_take_screenshot.return_value = screenshot_path
+            mock_perform_ocr.return_value = "Document text"
+
+            config = ScreenOCRConfig(screenshot_dir=Path(tmpdir), frame_hash_threshold=4)
+            logger = ScreenOCRLogger(config)
+            logger.jsonl_manager = JsonlManager(base_dir=Path(tmpdir))
+
+            first = logger.run()
+            second = logger.run()
+
+            assert mock_perform_ocr.call_count == 1
+            assert first.ocr_skipped is False
+            assert second.ocr_skipped is True
+            assert second.text == "Document text"
+            assert first.frame_hash is not None
+            assert second.frame_hash == first.frame_hash
+
+            lines = second.jsonl_path.read_text(encoding="utf-8").splitlines()
+            records = [json.loads(line) for line in lines]
+            assert [r["frame_hash"] for r in records] == [first.frame_hash] * 2
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_frame_hash_failure_falls_back_to_ocr(
+        self, mock_get_window, mock_take_screenshot, mock_perform_ocr
+    ):
+        """フレームハッシュが計算できない場合は通常どおりOCRするテスト"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_path = Path(tmpdir) / "screenshot.png"
+            screenshot_path.write_text("not an image")
+            mock_get_window.return_value = ("Editor", None)
+            mock_take_screenshot.return_value = screenshot_path
+            mock_perform_ocr.return_value = "Document text"
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir), frame_hash_threshold=4, dry_run=True
+            )
+            logger = ScreenOCRLogger(config)
+
+            logger.run()
+            result = logger.run()
+
+            assert mock_perform_ocr.call_count == 2
+            assert result.success is True
+            assert result.frame_hash is None
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_ocr_cache_is_shared_across_logger_instances(
+        self, mock_get_window, mock_take_screenshot, mock_perform_ocr
+    ):
+        """同じ内容の画像は別プロセス（別インスタンス）でもキャッシュからOCR結果を得るテスト"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_path = Path(tmpdir) / "screenshot_1.png"
+            screenshot_path.write_bytes(b"same image content")
+            mock_get_window.return_value = ("Editor", None)
+            mock_take_screenshot.return_value = screenshot_path
+            mock_perform_ocr.return_value = "Document text"
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir), dry_run=True, ocr_cache_max_bytes=1024 * 1024
+            )
+            first = ScreenOCRLogger(config).run()
+            second = ScreenOCRLogger(config).run()
+
+            assert mock_perform_ocr.call_count == 1
+            assert first.ocr_skipped is False
+            assert second.ocr_skipped is True
+            assert second.text == "Document text"
+
+            stats = ScreenOCRLogger(config).ocr_cache.stats()
+            assert stats["hits"] == 1
+            assert stats["misses"] == 1
+
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_ocr_failure_is_not_cached(self, mock_get_window, mock_take_screenshot):
+        """OCRの失敗は空文字列としてキャッシュせず、同じ画像でも次はOCRし直すテスト"""
+        from screen_times.ocr import OcrError, TextObservation
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_path = Path(tmpdir) / "screenshot_1.png"
+            screenshot_path.write_bytes(b"same image content")
+            mock_get_window.return_value = ("Editor", None)
+            mock_take_screenshot.return_value = screenshot_path
+            backend = MagicMock()
+            backend.settings = "mock"
+            backend.recognize.side_effect = [
+                OcrError("Vision Framework request failed"),
+                [TextObservation(text="Document text", confidence=1.0, bbox=(0, 0, 1, 1))],
+            ]
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir),
+                dry_run=True,
+                ocr_backend=backend,
+                ocr_cache_max_bytes=1024 * 1024,
+            )
+            failed = ScreenOCRLogger(config).run()
+            recovered = ScreenOCRLogger(config).run()
+            cached = ScreenOCRLogger(config).run()
+
+            assert failed.success is False
+            assert recovered.text == "Document text"
+            assert recovered.ocr_skipped is False
+            assert cached.text == "Document text"
+            assert cached.ocr_skipped is True
+            assert backend.recognize.call_count == 2
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_ocr_backend_from_config(self, mock_get_window, mock_take_screenshot, mock_perform_ocr):
+        """設定で渡したOCRバックエンドを使うテスト"""
+        from screen_times.ocr_backend import FakeOcrBackend
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mock_get_window.return_value = ("Editor", None)
+            mock_take_screenshot.return_value = Path(tmpdir) / "screenshot_1.png"
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir),
+                dry_run=True,
+                ocr_backend=FakeOcrBackend(texts={"screenshot_1.png": "from backend"}),
+            )
+            result = ScreenOCRLogger(config).run()
+
+            assert result.success is True
+            assert result.text == "from backend"
+            mock_perform_ocr.assert_not_called()
+
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_ocr_timeout_is_recorded(self, mock_get_window, mock_take_screenshot):
+        """OCRのタイムアウトは空文字列ではなく ocr_timeout として記録されるテスト"""
+        from screen_times.ocr_worker import OcrTimeoutError
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mock_get_window.return_value = ("Editor", None)
+            mock_take_screenshot.return_value = Path(tmpdir) / "screenshot_1.png"
+            backend = MagicMock()
+            backend.settings = "mock"
+            backend.recognize.side_effect = OcrTimeoutError("OCR did not finish within 30s")
+
+            config = ScreenOCRConfig(screenshot_dir=Path(tmpdir), ocr_backend=backend)
+            logger = ScreenOCRLogger(config)
+            logger.jsonl_manager = JsonlManager(base_dir=Path(tmpdir))
+            result = logger.run()
+
+            assert result.success is True
+            assert result.status == "ocr_timeout"
+            record = json.loads(result.jsonl_path.read_text(encoding="utf-8").splitlines()[0])
+            assert record["status"] == "ocr_timeout"
+            assert record["text"] == ""
+
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_ocr_timeout_in_worker_is_recorded(self, mock_get_window, mock_take_screenshot):
+        """監視付きワーカー内で起きたタイムアウトも ocr_timeout として記録されるテスト"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mock_get_window.return_value = ("Editor", None)
+            mock_take_screenshot.return_value = Path(tmpdir) / "screenshot_1.png"
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir), ocr_backend=AlarmTimeoutBackend(), ocr_worker=True
+            )
+            logger = ScreenOCRLogger(config)
+            logger.jsonl_manager = JsonlManager(base_dir=Path(tmpdir))
+            try:
+                result = logger.run()
+            finally:
+                logger.shutdown()
+
+            assert result.success is True
+            assert result.status == "ocr_timeout"
+            assert logger.ocr_worker is not None
+            stats = logger.ocr_worker.stats()
+            assert (stats["timeouts"], stats["errors"]) == (1, 0)
+            record = json.loads(result.jsonl_path.read_text(encoding="utf-8").splitlines()[0])
+            assert record["status"] == "ocr_timeout"
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_tiered_ocr_records_pass(self, mock_get_window, mock_take_screenshot, mock_perform_ocr):
+        """段階的OCRでは認識したパスがレコードに保存されるテスト"""
+        from screen_times.ocr_backend import FakeOcrBackend
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mock_get_window.return_value = ("Editor", None)
+            mock_take_screenshot.return_value = Path(tmpdir) / "screenshot_1.png"
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir),
+                tiered_ocr=True,
+                fast_ocr_backend=FakeOcrBackend(texts={"screenshot_1.png": "fast text"}),
+                ocr_backend=FakeOcrBackend(texts={"screenshot_1.png": "accurate text"}),
+            )
+            logger = ScreenOCRLogger(config)
+            logger.jsonl_manager = JsonlManager(base_dir=Path(tmpdir))
+            result = logger.run()
+
+            assert result.text == "fast text"
+            record = json.loads(result.jsonl_path.read_text(encoding="utf-8").splitlines()[0])
+            assert record["ocr_pass"] == "fast"
+            mock_perform_ocr.assert_not_called()
+
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_tiered_fast_pass_runs_in_worker(self, mock_get_window, mock_take_screenshot):
+        """監視付きワーカーを使う場合は段階的OCRの高速パスもワーカーで実行するテスト"""
+        from screen_times.ocr_backend import FakeOcrBackend
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mock_get_window.return_value = ("Editor", None)
+            mock_take_screenshot.return_value = Path(tmpdir) / "screenshot_1.png"
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir),
+                tiered_ocr=True,
+                ocr_worker=True,
+                fast_ocr_backend=FakeOcrBackend(texts={"screenshot_1.png": "fast text"}),
+                ocr_backend=FakeOcrBackend(texts={"screenshot_1.png": "accurate text"}),
+            )
+            logger = ScreenOCRLogger(config)
+            logger.jsonl_manager = JsonlManager(base_dir=Path(tmpdir))
+            try:
+                result = logger.run()
+                assert logger.ocr_worker is not None
+                stats = logger.ocr_worker.stats()
+            finally:
+                logger.shutdown()
+
+            assert result.text == "fast text"
+            assert (stats["jobs"], stats["starts"]) == (1, 1)
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_preprocess_before_ocr(self, mock_get_window, mock_take_screenshot, mock_perform_ocr):
+        """前処理した画像をOCRし、OCR後に削除するテスト"""
+        from PIL import Image, ImageDraw
+
+        from screen_times.preprocess import PreprocessConfig
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_path = Path(tmpdir) / "screenshot_1.png"
+            img = Image.new("RGB", (800, 600), color="white")
+            ImageDraw.Draw(img).rectangle([100, 100, 500, 120], fill="black")
+            img.save(screenshot_path)
+            mock_get_window.return_value = ("Editor", None)
+            mock_take_screenshot.return_value = screenshot_path
+            ocr_sizes = []
+
+            def fake_ocr(path, timeout_seconds, raise_errors=False):
+                with Image.open(path) as ocr_img:
+                    ocr_sizes.append(ocr_img.size)
+                return "text"
+
+            mock_perform_ocr.side_effect = fake_ocr
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir), dry_run=True, preprocess=PreprocessConfig()
+            )
+            result = ScreenOCRLogger(config).run()
+
+            assert result.text == "text"
+            assert ocr_sizes[0][0] < 800 and ocr_sizes[0][1] < 100
+            assert sorted(p.name for p in Path(tmpdir).iterdir()) == ["screenshot_1.png"]
+
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_preprocess_with_incremental_ocr(self, mock_get_window, mock_take_screenshot):
+        """差分OCRと前処理を組み合わせた場合は余白除去せず、変化した部分だけをOCRするテスト"""
+        from PIL import Image, ImageDraw
+
+        from screen_times.ocr import TextObservation
+        from screen_times.preprocess import PreprocessConfig
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mock_get_window.return_value = ("Editor", None)
+            regions = []
+            backend = MagicMock()
+            backend.settings = "mock"
+
+            def fake_recognize(image, timeout_seconds, region=None):
+                regions.append(region)
+                return [TextObservation(text="line", confidence=0.9, bbox=(0.1, 0.1, 0.5, 0.02))]
+
+            backend.recognize.side_effect = fake_recognize
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir),
+                dry_run=True,
+                ocr_backend=backend,
+                incremental_ocr=True,
+                preprocess=PreprocessConfig(target_dpi=None),
+            )
+            logger = ScreenOCRLogger(config)
+            assert logger.config.preprocess is not None
+            assert logger.config.preprocess.trim_margins is False
+
+            # 2フレーム目は下端に行が増え、余白除去すると画像の大きさが変わる
+            for index, bottom_line in enumerate([False, True]):
+                screenshot_path = Path(tmpdir) / f"screenshot_{index}.png"
+                img = Image.new("RGB", (800, 640), color="white")
+                draw = ImageDraw.Draw(img)
+                draw.rectangle([100, 100, 500, 114], fill="black")
+                if bottom_line:
+                    draw.rectangle([100, 580, 500, 594], fill="black")
+                img.save(screenshot_path)
+                mock_take_screenshot.return_value = screenshot_path
+                assert logger.run().success is True
+
+            assert regions[0] is None
+            assert len(regions) > 1 and all(region is not None for region in regions[1:])
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.capture_image")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_in_memory_capture(
+        self, mock_get_window, mock_take_screenshot, mock_capture_image, mock_perform_ocr
+    ):
+        """メモリ上の画像をOCRに渡し、保存はバックグラウンドで行うテスト"""
+        from PIL import Image
+
+        from screen_times.image_utils import ImageBuffer
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            image = ImageBuffer(pil_image=Image.new("RGB", (64, 48), color="white"))
+            mock_get_window.return_value = ("Editor", None)
+            mock_capture_image.return_value = image
+            mock_perform_ocr.return_value = "text"
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir), dry_run=True, in_memory_capture=True
+            )
+            logger = ScreenOCRLogger(config)
+            result = logger.run()
+            logger.shutdown()
+
+            mock_take_screenshot.assert_not_called()
+            assert mock_perform_ocr.call_args[0][0] is image
+            assert result.text == "text"
+            # 保存先は書き込みが終わってから設定される
+            assert image.path is not None
+            assert image.path.parent.parent == Path(tmpdir)
+            assert image.path.exists()
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.capture_image")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_in_memory_sleep_detection_without_files(
+        self, mock_get_window, mock_capture_image, mock_perform_ocr
+    ):
+        """保存しない場合も画素データのハッシュでスリープを検出するテスト"""
+        from PIL import Image
+
+        from screen_times.image_utils import ImageBuffer
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mock_get_window.return_value = ("loginwindow", None)
+            mock_capture_image.side_effect = lambda bounds: ImageBuffer(
+                pil_image=Image.new("RGB", (64, 48), color="black")
+            )
+            mock_perform_ocr.return_value = ""
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir),
+                dry_run=True,
+                in_memory_capture=True,
+                screenshot_persistence="never",
+            )
+            logger = ScreenOCRLogger(config)
+            statuses = [logger.run().status for _ in range(3)]
+
+            assert statuses == ["normal", "normal", "sleep"]
+            assert list(Path(tmpdir).iterdir()) == []
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_screenshot_archive_moves_file_after_ocr(
+        self, mock_get_window, mock_take_screenshot, mock_perform_ocr
+    ):
+        """screencaptureのファイルをOCRの後にアーカイブへ移すテスト"""
+        from PIL import Image
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mock_get_window.return_value = ("Editor", None)
+            mock_perform_ocr.return_value = "text"
+            shots = []
+
+            def fake_screenshot(screenshot_dir, bounds):
+                Path(screenshot_dir).mkdir(parents=True, exist_ok=True)
+                path = Path(screenshot_dir) / f"screenshot_{len(shots)}.png"
+                Image.new("RGB", (64, 48), color="white").save(path)
+                shots.append(path)
+                return path
+
+            mock_take_screenshot.side_effect = fake_screenshot
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir),
+                dry_run=True,
+                screenshot_archive=True,
+                screenshot_persistence="sync",
+            )
+            logger = ScreenOCRLogger(config)
+            logger.run()
+            logger.run()
+
+            assert not any(path.exists() for path in shots)
+            assert logger.screenshot_archive is not None
+            assert logger.screenshot_archive.disk_usage()[0] == 1
+            assert logger.screenshot_archive.stats()["frames"] == 2
+
+    @patch("screen_times.screen_ocr_logger.perform_ocr")
+    @patch("screen_times.screen_ocr_logger.take_screenshot")
+    @patch("screen_times.screen_ocr_logger.get_active_window")
+    def test_idle_run_is_one_interval_record(
+        self, mock_get_window, mock_take_screenshot, mock_perform_ocr
+    ):
+        """ロック中はキャプチャもOCRもせず、アイドル期間を1件のレコードとして書き込むテスト"""
+        from PIL import Image
+
+        from screen_times.idle import FakeIdleSignalProvider, IdleSignal
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_path = Path(tmpdir) / "screenshot.png"
+            Image.new("RGB", (64, 48), color="black").save(screenshot_path)
+            mock_get_window.return_value = ("loginwindow", None)
+            mock_take_screenshot.return_value = screenshot_path
+            mock_perform_ocr.return_value = "text"
+            locked = IdleSignal(locked=True, idle_seconds=600)
+            signals = FakeIdleSignalProvider([IdleSignal(idle_seconds=1)] + [locked] * 5)
+
+            config = ScreenOCRConfig(
+                screenshot_dir=Path(tmpdir),
+                idle_detection=True,
+                idle_signal_provider=signals,
+            )
+            logger = ScreenOCRLogger(config)
+            logger.jsonl_manager = JsonlManager(base_dir=Path(tmpdir) / "logs")
+
+            results = [logger.run() for _ in range(5)]
+            logger.shutdown()
+
+            assert [r.status for r in results] == ["normal"] + ["sleep"] * 4
+            assert mock_take_screenshot.call_count == 2
+            assert mock_perform_ocr.call_count == 1
+
+            lines = []
+            for path in sorted(logger.jsonl_manager.logs_dir.glob("*.jsonl")):
+                lines += [json.loads(line) for line in path.read_text().splitlines()]
+            records = [line for line in lines if "status" in line]
+            assert [r["status"] for r in records] == ["normal", "sleep"]
+            assert records[1]["timestamp"] == results[1].timestamp.isoformat()
+            assert records[1]["timestamp_end"] == results[4].timestamp.isoformat()
+            assert records[1]["idle_reason"] == "locked"
+            assert records[1]["idle_ticks"] == 4
@@ -6,12 +6,19 @@
 import subprocess
 import sys
 import tempfile
+from datetime import datetime
 from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
-from screen_times.screenshot import take_screenshot
+from screen_times.screenshot import (
+    CaptureBackend,
+    FakeCaptureBackend,
+    parse_bucket,
+    screenshot_bucket,
+    take_screenshot,
+)
 
 
 @pytest.mark.skipif(sys.platform != "darwin", reason="macOS only")
@@ -55,3 +62,39 @@ class TestTakeScreenshot:
 
         with pytest.raises(subprocess.CalledProcessError):
             take_screenshot(screenshot_dir)
+
+
+class TestScreenshotBucket:
+    """1時間ごとのバケットディレクトリのテスト"""
+
+    def test_bucket_round_trip(self):
+        """バケット名から撮影時刻を含む1時間の開始時刻を求められる"""
+        bucket = screenshot_bucket(Path("/tmp/screen-times"), datetime(2026, 1, 2, 3, 4, 5))
+
+        assert bucket == Path("/tmp/screen-times/20260102_03")
+        assert parse_bucket(bucket.name) == datetime(2026, 1, 2, 3)
+
+    def test_parse_bucket_ignores_other_directories(self):
+        """バケット以外のディレクトリ名はNone"""
+        assert parse_bucket("ocr_cache") is None
+        assert parse_bucket("archive") is None
+
+
+class TestFakeCaptureBackend:
+    """FakeCaptureBackendのテスト"""
+
+    def test_cycles_frames(self):
+        """change_every 回ごとに次の画像に切り替え、最後まで行ったら先頭に戻る"""
+        pytest.importorskip("PIL")
+        backend = FakeCaptureBackend(size=(64, 48), frames=2, change_every=2)
+
+        assert isinstance(backend, CaptureBackend)
+        digests = [backend.capture().digest() for _ in range(5)]
+        assert digests[0] == digests[1] == digests[4]
+        assert digests[1] != digests[2]
+        assert backend.calls == 5
+
+    def test_invalid_arguments(self):
+        """不正な設定はエラー"""
+        with pytest.raises(ValueError):
+            FakeCaptureBackend(frames=0)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+screenshot_archiveモジュールのテスト
+"""
+
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from screen_times.image_utils import ImageBuffer
+from screen_times.screenshot_archive import (
+    FRAME_DUPLICATE,
+    FRAME_KEYFRAME,
+    FRAME_REFERENCE,
+    ScreenshotArchive,
+)
+
+START = datetime(2026, 1, 2, 9, 0, 0)
+
+
+def document(lines: int, cursor: bool = False) -> ImageBuffer:
+    """テキスト（黒い帯）が lines 行ある画面"""
+    img = Image.new("RGB", (320, 240), color="white")
+    draw = ImageDraw.Draw(img)
+    for line in range(lines):
+        draw.rectangle([20, 20 + line * 20, 280, 30 + line * 20], fill="black")
+    if cursor:
+        draw.rectangle([300, 220, 301, 229], fill="black")
+    return ImageBuffer(pil_image=img)
+
+
+class TestScreenshotArchive:
+    """ScreenshotArchiveのテスト"""
+
+    def test_identical_frames_are_stored_once(self):
+        """同じ画面が続く場合はキーフレームを1つだけ保存し、マニフェストには毎回記録する"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            archive = ScreenshotArchive(Path(tmpdir))
+            frames = [archive.add(document(3), START + timedelta(minutes=i)) for i in range(5)]
+
+            assert frames[0].kind == FRAME_KEYFRAME
+            assert {frame.path for frame in frames} == {frames[0].path}
+            assert archive.disk_usage()[0] == 1
+            manifest = (Path(tmpdir) / "manifests" / "2026-01-02.jsonl").read_text()
+            assert len(manifest.splitlines()) == 5
+
+    def test_near_identical_frame_references_keyframe(self):
+        """カーソルの点滅程度の差分は直前のキーフレームを参照する"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            archive = ScreenshotArchive(Path(tmpdir), keyframe_distance=4)
+            keyframe = archive.add(document(3), START)
+            blink = archive.add(document(3, cursor=True), START + timedelta(minutes=1))
+
+            assert blink.kind == FRAME_REFERENCE
+            assert blink.path == keyframe.path
+
+    def test_changed_frame_becomes_keyframe(self):
+        """内容が変わったら新しいキーフレームを保存し、元の画面に戻ったら重複として扱う"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            archive = ScreenshotArchive(Path(tmpdir), keyframe_distance=-1)
+            first = archive.add(document(3), START)
+            second = archive.add(document(8), START + timedelta(minutes=1))
+            back = archive.add(document(3), START + timedelta(minutes=2))
+
+            assert second.kind == FRAME_KEYFRAME
+            assert second.path != first.path
+            assert back.kind == FRAME_DUPLICATE
+            assert back.path == first.path
+            assert archive.stats()["keyframes"] == 2
+
+    def test_resolve_timestamp(self):
+        """時刻からその時点で表示されていたフレームを探せる"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            archive = ScreenshotArchive(Path(tmpdir), keyframe_distance=-1)
+            first = archive.add(document(3), START)
+            second = archive.add(document(8), START + timedelta(minutes=1))
+
+            assert archive.resolve(START + timedelta(seconds=30)) == first.path
+            assert archive.resolve(START + timedelta(minutes=5)) == second.path
+            assert archive.resolve(START - timedelta(minutes=1)) is None
+
+    def test_prune_by_time(self):
+        """保持期間より前から参照されていないフレームと古いマニフェストを削除する"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            archive = ScreenshotArchive(Path(tmpdir), keyframe_distance=-1)
+            old = archive.add(document(3), START)
+            recent = archive.add(document(8), START + timedelta(minutes=1))
+            stale = time.time() - 100 * 3600
+            os.utime(old.path, (stale, stale))
+
+            deleted = archive.prune(retention_hours=72)
+
+            assert not old.path.exists()
+            assert recent.path.exists()
+            # 2026-01-02 のマニフェストは保持期間より前の日付
+            assert deleted == 2
+            assert list((Path(tmpdir) / "manifests").iterdir()) == []
+
+    def test_static_hour_uses_fraction_of_flat_layout(self):
+        """静止した1時間分のフレームは1枚ずつ保存するより1桁以上小さい"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            archive = ScreenshotArchive(Path(tmpdir) / "archive", image_format="jpeg")
+            flat_bytes = 0
+            for minute in range(60):
+                image = document(3, cursor=minute % 2 == 1)
+                flat_bytes += len(image.encode_png())
+                archive.add(image, START + timedelta(minutes=minute))
+
+            _, archive_bytes = archive.disk_usage()
+            assert archive_bytes * 10 < flat_bytes
+            entries = [
+                json.loads(line)
+                for line in (Path(tmpdir) / "archive" / "manifests" / "2026-01-02.jsonl")
+                .read_text()
+                .splitlines()
+            ]
+            assert len(entries) == 60
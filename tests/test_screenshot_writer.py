@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+screenshot_writerモジュールのテスト
+"""
+
+import pickle
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from screen_times.image_utils import ImageBuffer, grayscale_thumbnail, image_size
+from screen_times.screenshot_writer import (
+    PERSIST_DEFERRED,
+    PERSIST_NEVER,
+    PERSIST_SYNC,
+    ScreenshotWriter,
+)
+
+TIMESTAMP = datetime(2026, 1, 2, 3, 4, 5)
+
+
+def solid_image(color: str = "white") -> ImageBuffer:
+    """単色のメモリ上の画像"""
+    return ImageBuffer(pil_image=Image.new("RGB", (64, 48), color=color))
+
+
+class TestImageBuffer:
+    """ImageBufferのテスト"""
+
+    def test_image_helpers_accept_buffer(self):
+        """ファイルに保存せずにサイズや縮小画像を取得できる"""
+        buffer = solid_image("black")
+        assert image_size(buffer) == (64, 48)
+        assert grayscale_thumbnail(buffer, 4, 3) == bytes(12)
+
+    def test_digest_depends_on_pixels(self):
+        """同じ画素なら同じハッシュ、異なる画素なら異なるハッシュになる"""
+        assert solid_image().digest() == solid_image().digest()
+        assert solid_image().digest() != solid_image("black").digest()
+
+    def test_pickle_round_trip(self):
+        """プロセス間で受け渡すためPNGにエンコードしてpickleできる"""
+        buffer = solid_image("black")
+        buffer.path = Path("/tmp/screen-times/screenshot.png")
+        restored = pickle.loads(pickle.dumps(buffer))
+        assert restored.digest() == buffer.digest()
+        assert restored.path == buffer.path
+
+
+class TestScreenshotWriter:
+    """ScreenshotWriterのテスト"""
+
+    def test_sync_writes_immediately(self):
+        """syncでは撮影時刻のファイル名ですぐに保存する"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = ScreenshotWriter(Path(tmpdir), PERSIST_SYNC)
+            image = solid_image()
+            path = writer.persist(image, TIMESTAMP)
+
+            assert path == Path(tmpdir) / "20260102_03" / "screenshot_20260102_030405.png"
+            assert path.exists()
+            assert image.path == path
+            assert writer.stats()["written"] == 1
+
+    def test_deferred_writes_in_background(self):
+        """deferredでは書き込みに成功してから保存先が画像に設定される"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = ScreenshotWriter(Path(tmpdir), PERSIST_DEFERRED)
+            image = solid_image()
+            assert writer.persist(image, TIMESTAMP) is None
+            writer.close()
+
+            assert image.path == Path(tmpdir) / "20260102_03" / "screenshot_20260102_030405.png"
+            with Image.open(image.path) as img:
+                assert img.size == (64, 48)
+            assert writer.stats()["written"] == 1
+
+    def test_deferred_dropped_image_has_no_path(self):
+        """保存待ちから破棄された画像には保存先が設定されない"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = ScreenshotWriter(Path(tmpdir), PERSIST_DEFERRED, max_pending=1)
+            dropped, kept = solid_image(), solid_image("black")
+            # 書き込みスレッドを止めた状態で溢れさせる
+            with patch.object(writer, "_ensure_thread"):
+                writer.persist(dropped, TIMESTAMP)
+                writer.persist(kept, datetime(2026, 1, 2, 3, 4, 6))
+            writer._ensure_thread()
+            writer.close()
+
+            assert dropped.path is None
+            assert kept.path is not None and kept.path.exists()
+            assert writer.stats()["dropped"] == 1
+
+    def test_deferred_failed_write_has_no_path(self):
+        """書き込みに失敗した画像には保存先が設定されない"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            screenshot_dir = Path(tmpdir) / "not_a_directory"
+            screenshot_dir.write_text("")
+            writer = ScreenshotWriter(screenshot_dir, PERSIST_DEFERRED)
+            image = solid_image()
+            writer.persist(image, TIMESTAMP)
+            writer.close()
+
+            assert image.path is None
+            assert writer.stats()["failed"] == 1
+
+    def test_never_does_not_write(self):
+        """neverでは何も保存しない"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = ScreenshotWriter(Path(tmpdir), PERSIST_NEVER)
+            image = solid_image()
+
+            assert writer.persist(image, TIMESTAMP) is None
+            assert image.path is None
+            assert list(Path(tmpdir).iterdir()) == []
+
+    def test_unknown_policy(self):
+        """未知の保存方法はエラーにする"""
+        with pytest.raises(ValueError):
+            ScreenshotWriter(Path("/tmp"), "later")
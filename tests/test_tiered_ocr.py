@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+tiered_ocrモジュールのテスト
+"""
+
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+from screen_times.image_utils import ImageBuffer, image_size
+from screen_times.ocr import Region, TextObservation
+from screen_times.tiered_ocr import (
+    PASS_ACCURATE,
+    PASS_ACCURATE_REGIONS,
+    PASS_FAST,
+    TieredOcr,
+    cjk_ratio,
+    script_plausibility,
+    text_coverage,
+)
+
+IMAGE = Path("frame.png")
+
+
+def line(index: int, text: str, confidence: float) -> TextObservation:
+    """index行目（1行の高さ0.05）の認識結果"""
+    return TextObservation(text=text, confidence=confidence, bbox=(0.05, index * 0.05, 0.6, 0.04))
+
+
+class FakeRecognizer:
+    """固定の認識結果を返し、呼び出された領域を記録する認識関数"""
+
+    def __init__(self, observations: List[TextObservation]):
+        self.observations = observations
+        self.regions: List[Optional[Region]] = []
+
+    def __call__(
+        self, image_path: Path, timeout_seconds: int, region: Optional[Region]
+    ) -> List[TextObservation]:
+        self.regions.append(region)
+        if region is None:
+            return list(self.observations)
+        rx, ry, rw, rh = region
+        return [
+            o
+            for o in self.observations
+            if rx <= o.center[0] <= rx + rw and ry <= o.center[1] <= ry + rh
+        ]
+
+
+def accurate_document() -> FakeRecognizer:
+    return FakeRecognizer([line(i, f"正確な行 {i}", 0.95) for i in range(10)])
+
+
+class TestTieredOcr:
+    """TieredOcrのテスト"""
+
+    def test_confident_fast_pass_is_used_as_is(self):
+        """高速パスの信頼度が十分なら高精度パスを実行しない"""
+        fast = FakeRecognizer([line(i, f"fast line {i}", 0.9) for i in range(10)])
+        accurate = accurate_document()
+
+        result = TieredOcr(fast=fast, accurate=accurate).recognize(IMAGE)
+
+        assert result.ocr_pass == PASS_FAST
+        assert accurate.regions == []
+        assert result.text.splitlines()[0] == "fast line 0"
+        assert result.escalated_area == 0.0
+
+    def test_low_confidence_lines_are_reocr_by_region(self):
+        """信頼度の低い行だけを高精度パスで再認識する"""
+        observations = [line(i, f"fast line {i}", 0.9) for i in range(10)]
+        observations[7] = line(7, "?? ???", 0.2)
+        fast = FakeRecognizer(observations)
+        accurate = accurate_document()
+
+        result = TieredOcr(fast=fast, accurate=accurate).recognize(IMAGE)
+
+        assert result.ocr_pass == PASS_ACCURATE_REGIONS
+        assert len(accurate.regions) == 1
+        assert accurate.regions[0] is not None
+        assert result.escalated_area < 0.1
+        lines = result.text.splitlines()
+        assert lines[7] == "正確な行 7"
+        assert lines[6] == "fast line 6"
+        assert "?? ???" not in result.text
+
+    def test_low_text_density_escalates_whole_frame(self):
+        """高速パスでほとんど認識できない場合は全体を高精度パスで認識する"""
+        fast = FakeRecognizer([])
+        accurate = accurate_document()
+
+        result = TieredOcr(fast=fast, accurate=accurate).recognize(IMAGE)
+
+        assert result.ocr_pass == PASS_ACCURATE
+        assert accurate.regions == [None]
+        assert result.text.splitlines()[0] == "正確な行 0"
+
+    def test_widespread_low_confidence_escalates_whole_frame(self):
+        """信頼度の低い行が多い場合は領域ごとではなく全体を再認識する"""
+        fast = FakeRecognizer([line(i, "??", 0.1) for i in range(10)])
+        accurate = accurate_document()
+
+        result = TieredOcr(fast=fast, accurate=accurate, max_region_ratio=0.2).recognize(IMAGE)
+
+        assert result.ocr_pass == PASS_ACCURATE
+        assert accurate.regions == [None]
+
+    def test_fast_pass_uses_downscaled_image(self, tmp_path):
+        """高速パスは縮小した画像、高精度パスは元の画像で同じ正規化座標の領域を認識する"""
+        Image = pytest.importorskip("PIL.Image")
+        image_path = tmp_path / "frame.png"
+        Image.new("RGB", (3000, 2000), "white").save(image_path)
+        seen = []
+
+        def fast(image, timeout_seconds, region):
+            seen.append(image)
+            return [line(0, "fast line", 0.9), line(1, "blurry", 0.2)]
+
+        accurate = accurate_document()
+        result = TieredOcr(fast=fast, accurate=accurate).recognize(image_path)
+
+        assert isinstance(seen[0], ImageBuffer)
+        assert image_size(seen[0]) == (1500, 1000)
+        assert result.ocr_pass == PASS_ACCURATE_REGIONS
+        assert accurate.regions[0] is not None and accurate.regions[0][1] < 0.1
+
+        seen.clear()
+        TieredOcr(fast=fast, accurate=accurate, fast_scale=1.0).recognize(image_path)
+        assert seen == [image_path]
+        with pytest.raises(ValueError):
+            TieredOcr(fast_scale=0)
+
+    def test_text_coverage(self):
+        """テキスト密度は行の矩形の面積の合計"""
+        assert text_coverage([]) == 0.0
+        assert abs(text_coverage([line(0, "a", 1.0), line(1, "b", 1.0)]) - 0.048) < 1e-9
+
+    def test_confident_wrong_script_escalates_whole_frame(self):
+        """日本語の画面を高速パスが英字の断片として高い信頼度で返した場合は全体を再認識する"""
+        garbage = ["I-\\ 7 O) ~ | -)L", "EJ;$ U 'C L' & C", "O)7 E]*#0 | ~ lt"]
+        fast = FakeRecognizer([line(i, garbage[i % 3], 0.9) for i in range(10)])
+        accurate = accurate_document()
+
+        result = TieredOcr(fast=fast, accurate=accurate).recognize(IMAGE)
+
+        assert result.ocr_pass == PASS_ACCURATE
+        assert result.text.startswith("正確な行 0")
+        assert accurate.regions == [None]
+
+    def test_cjk_window_skips_fast_pass(self):
+        """高精度パスの結果が日本語中心だったウィンドウは、次から高速パスを使わない"""
+        fast = FakeRecognizer([line(i, "fast line", 0.9) for i in range(10)])
+        accurate = accurate_document()
+        tiered = TieredOcr(fast=fast, accurate=accurate, min_coverage=0.3)
+
+        assert tiered.recognize(IMAGE, "エディタ").ocr_pass == PASS_ACCURATE
+        fast.observations = [line(i, "fast line", 0.9) for i in range(20)]
+        assert tiered.recognize(IMAGE, "エディタ").ocr_pass == PASS_ACCURATE
+        assert tiered.recognize(IMAGE, "Terminal").ocr_pass == PASS_FAST
+        assert len(fast.regions) == 2
+
+        # 英語の画面に変わったら高速パスに戻る
+        accurate.observations = [line(i, "accurate line", 0.95) for i in range(10)]
+        tiered.recognize(IMAGE, "エディタ")
+        assert tiered.recognize(IMAGE, "エディタ").ocr_pass == PASS_FAST
+
+    def test_script_plausibility_and_cjk_ratio(self):
+        """英語の文章やコードは英語らしく、記号混じりの断片はそうでない"""
+        assert script_plausibility("return self._cache.get(key, None)") > 0.7
+        assert script_plausibility("I-\\ 7 O) ~ | -)L") < 0.2
+        assert script_plausibility("") == 1.0
+        assert cjk_ratio("日本語 abc") == 0.5
+        assert cjk_ratio("") == 0.0
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+ウィンドウ取得（window_provider）のユニットテスト
+"""
+
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from screen_times import window_provider
+from screen_times.window_provider import (
+    AppleScriptWindowProvider,
+    FakeWindowProvider,
+    QuartzWindowProvider,
+    WindowProvider,
+    benchmark_window_providers,
+    default_window_provider,
+    owner_names_match,
+)
+
+
+def window(pid, owner, bounds=(0, 0, 800, 600), layer=0):
+    """CGWindowListの要素と同じ形の辞書を生成"""
+    x, y, w, h = bounds
+    return {
+        "kCGWindowOwnerPID": pid,
+        "kCGWindowOwnerName": owner,
+        "kCGWindowLayer": layer,
+        "kCGWindowBounds": {"X": x, "Y": y, "Width": w, "Height": h},
+    }
+
+
+def fake_quartz(windows):
+    """CGWindowListCopyWindowInfo が windows を返すQuartzモジュールの代わり"""
+    return SimpleNamespace(
+        CGWindowListCopyWindowInfo=lambda option, window_id: windows,
+        kCGNullWindowID=0,
+        kCGWindowListExcludeDesktopElements=16,
+        kCGWindowListOptionOnScreenOnly=1,
+    )
+
+
+class TestFakeWindowProvider:
+    """FakeWindowProviderのテスト"""
+
+    def test_cycles_windows(self):
+        """登録したウィンドウを順に返し、最後まで行ったら先頭に戻る"""
+        provider = FakeWindowProvider([("Editor", (0, 0, 10, 10)), ("Browser", None)])
+
+        assert isinstance(provider, WindowProvider)
+        assert [provider.active_window()[0] for _ in range(3)] == ["Editor", "Browser", "Editor"]
+        assert provider.calls == 3
+
+    def test_empty_windows(self):
+        """ウィンドウが空の場合はエラー"""
+        with pytest.raises(ValueError):
+            FakeWindowProvider([])
+
+
+class TestQuartzWindowProvider:
+    """QuartzWindowProviderのテスト"""
+
+    def test_owner_names_match(self):
+        """正規化した名前の部分一致で同じアプリケーションとみなす"""
+        assert owner_names_match("weztermgui", "wezterm")
+        assert not owner_names_match("slack", "wezterm")
+
+    def test_prefers_window_of_frontmost_pid(self):
+        """名前が一致するウィンドウより、最前面のプロセスIDが所有するウィンドウを優先する"""
+        windows = [
+            window(1, "Dock", layer=20),
+            window(2, "Code Helper", (1, 1, 1, 1)),
+            window(3, "Electron", (10, 20, 300, 400)),
+        ]
+        provider = QuartzWindowProvider()
+        with (
+            patch.dict(sys.modules, {"Quartz": fake_quartz(windows)}),
+            patch.object(provider, "_frontmost_application", return_value=("Code", 3)),
+        ):
+            assert provider.active_window() == ("Code", (10, 20, 300, 400))
+
+    def test_falls_back_to_cached_owner_names(self):
+        """プロセスIDが一致しない場合は名前で照合し、正規化した名前をキャッシュする"""
+        windows = [window(1, "Finder", (0, 0, 5, 5)), window(2, "WezTerm", (5, 5, 50, 50))]
+        provider = QuartzWindowProvider()
+        with (
+            patch.dict(sys.modules, {"Quartz": fake_quartz(windows)}),
+            patch.object(provider, "_frontmost_application", return_value=("wezterm-gui", 99)),
+        ):
+            assert provider.active_window() == ("wezterm-gui", (5, 5, 50, 50))
+            assert provider.active_window() == ("wezterm-gui", (5, 5, 50, 50))
+
+        assert provider._normalized_names == {
+            "wezterm-gui": "weztermgui",
+            "Finder": "finder",
+            "WezTerm": "wezterm",
+        }
+
+    def test_frontmost_failure(self):
+        """最前面のアプリケーションを取得できない場合はUnknown"""
+        provider = QuartzWindowProvider()
+        with patch.object(provider, "_frontmost_application", side_effect=RuntimeError("boom")):
+            assert provider.active_window() == ("Unknown", None)
+
+
+class TestDefaultWindowProvider:
+    """default_window_providerのテスト"""
+
+    def test_falls_back_to_applescript_without_appkit(self):
+        """AppKitが使えない環境ではosascriptにフォールバックする"""
+        with (
+            patch.object(window_provider, "_default_provider", None),
+            patch.dict(sys.modules, {"AppKit": None}),
+        ):
+            provider = default_window_provider()
+            assert isinstance(provider, AppleScriptWindowProvider)
+            assert default_window_provider() is provider
+
+
+def test_benchmark_window_providers():
+    """実装ごとに指定回数の取得時間を測定する"""
+    provider = FakeWindowProvider()
+    results = benchmark_window_providers({"fake": provider}, iterations=5)
+
+    assert len(results["fake"]) == 5
+    assert all(seconds >= 0 for seconds in results["fake"])
+    assert provider.calls == 5